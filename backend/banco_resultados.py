@@ -0,0 +1,560 @@
+"""
+MÓDULO: Banco de resultados (SQLite)
+
+Guarda uploads, resumos das curvas de carga, dimensionamentos e
+simulações (resumo + agregados diários) para que consultas repetidas e
+telas de histórico sejam respondidas pelo banco, sem rodar os motores
+de novo.
+
+- Conexões reaproveitadas por um pool (em vez de uma por requisição),
+  em modo WAL: leituras não esperam a escrita em andamento.
+- Agregados diários gravados com `executemany`, na mesma transação da
+  simulação.
+- Dimensionamentos e simulações são identificados por (upload, hash da
+  tarifa, hash dos demais parâmetros) e indexados por (upload, hash da
+  tarifa, tamanho do BESS) para o histórico.
+
+Uso:
+    banco = BancoResultados("db.sqlite3")
+    upload_id = banco.registrar_upload("medicao.xlsx", digest, linhas=35040)
+    simulacao_id = banco.gravar_simulacao(upload_id, parametros, resultado)
+    banco.obter_simulacao(upload_id, parametros)  # sem simular de novo
+"""
+
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Versão do esquema (PRAGMA user_version)
+VERSAO_ESQUEMA = 2
+
+# Campos que definem a tarifa de um cálculo
+CAMPOS_TARIFA = (
+    "tarifa_ponta",
+    "tarifa_intermediaria",
+    "tarifa_fora_ponta",
+    "cobranca_demanda",
+    "multa_ultrapassagem",
+    "feriados",
+)
+
+# Colunas de cada dia em simulacoes_diarias (chaves de resultados_diarios)
+COLUNAS_DIARIAS = (
+    "demanda_max_original_kw",
+    "demanda_max_com_bess_kw",
+    "reducao_demanda_kw",
+    "energia_carregada_kwh",
+    "energia_descarregada_kwh",
+    "custo_carregamento_reais",
+    "economia_descarga_reais",
+    "economia_liquida_reais",
+    "soc_inicial_percent",
+    "soc_final_percent",
+)
+
+# Colunas de resumos_curva e as chaves de analisar_curva_carga que as preenchem
+COLUNAS_RESUMO_CURVA = {
+    "demanda_maxima_kw": "potencia_maxima",
+    "demanda_media_kw": "potencia_media",
+    "demanda_minima_kw": "potencia_minima",
+}
+
+LIMITE_HISTORICO = 50
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome_arquivo TEXT NOT NULL,
+    digest_curva TEXT NOT NULL UNIQUE,
+    linhas INTEGER,
+    data_inicio TEXT,
+    data_fim TEXT,
+    intervalo_minutos REAL,
+    criado_em TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS resumos_curva (
+    upload_id INTEGER PRIMARY KEY REFERENCES uploads(id) ON DELETE CASCADE,
+    {", ".join(f"{coluna} REAL" for coluna in COLUNAS_RESUMO_CURVA)},
+    analise_json TEXT NOT NULL,
+    criado_em TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS dimensionamentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    upload_id INTEGER NOT NULL REFERENCES uploads(id) ON DELETE CASCADE,
+    hash_tarifa TEXT NOT NULL,
+    hash_parametros TEXT NOT NULL,
+    capacidade_kwh REAL,
+    potencia_kw REAL,
+    custo_investimento_reais REAL,
+    economia_anual_reais REAL,
+    payback_anos REAL,
+    vpl_reais REAL,
+    resultado_json TEXT NOT NULL,
+    criado_em TEXT NOT NULL,
+    UNIQUE (upload_id, hash_tarifa, hash_parametros)
+);
+CREATE INDEX IF NOT EXISTS idx_dimensionamentos_upload_tarifa_tamanho
+    ON dimensionamentos (upload_id, hash_tarifa, capacidade_kwh, potencia_kw);
+
+CREATE TABLE IF NOT EXISTS simulacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    upload_id INTEGER NOT NULL REFERENCES uploads(id) ON DELETE CASCADE,
+    hash_tarifa TEXT NOT NULL,
+    hash_parametros TEXT NOT NULL,
+    capacidade_kwh REAL NOT NULL,
+    potencia_kw REAL NOT NULL,
+    estrategia TEXT,
+    dias_simulados INTEGER,
+    economia_anual_estimada_reais REAL,
+    reducao_demanda_media_kw REAL,
+    resultado_json TEXT NOT NULL,
+    criado_em TEXT NOT NULL,
+    UNIQUE (upload_id, hash_tarifa, hash_parametros)
+);
+CREATE INDEX IF NOT EXISTS idx_simulacoes_upload_tarifa_tamanho
+    ON simulacoes (upload_id, hash_tarifa, capacidade_kwh, potencia_kw);
+
+CREATE TABLE IF NOT EXISTS simulacoes_diarias (
+    simulacao_id INTEGER NOT NULL REFERENCES simulacoes(id) ON DELETE CASCADE,
+    data TEXT NOT NULL,
+    {", ".join(f"{coluna} REAL" for coluna in COLUNAS_DIARIAS)},
+    PRIMARY KEY (simulacao_id, data)
+) WITHOUT ROWID;
+"""
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _json(valor) -> str:
+    return json.dumps(valor, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def hash_json(valor) -> str:
+    """
+    Hash estável de um valor JSON (chaves ordenadas).
+
+    Args:
+        valor: Dict, lista ou escalar serializável
+
+    Returns:
+        16 primeiros dígitos hexadecimais do SHA-256
+    """
+    return hashlib.sha256(_json(valor).encode()).hexdigest()[:16]
+
+
+def separar_tarifas(parametros: Dict) -> Tuple[Dict, Dict]:
+    """
+    Separa os campos de tarifa dos demais parâmetros de um cálculo.
+
+    Args:
+        parametros: Parâmetros da tarefa (sem a curva de carga)
+
+    Returns:
+        Tupla (tarifas, demais parâmetros)
+    """
+    tarifas = {campo: parametros[campo] for campo in CAMPOS_TARIFA if parametros.get(campo) is not None}
+    demais = {campo: valor for campo, valor in parametros.items() if campo not in CAMPOS_TARIFA}
+    return tarifas, demais
+
+
+class PoolConexoes:
+    """
+    Conexões SQLite reaproveitadas entre requisições.
+
+    Cada conexão é usada por uma thread de cada vez; no modo WAL várias
+    podem ler enquanto outra escreve. Com o pool esgotado, `conexao()`
+    espera uma ser devolvida.
+    """
+
+    def __init__(self, caminho: str, tamanho: int = 4, timeout_s: float = 30):
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self.caminho = caminho
+        self.timeout_s = timeout_s
+        self._livres = queue.Queue()
+        self._todas = []
+        for _ in range(tamanho):
+            conexao = sqlite3.connect(caminho, timeout=timeout_s, check_same_thread=False)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute("PRAGMA foreign_keys=ON")
+            self._todas.append(conexao)
+            self._livres.put(conexao)
+
+    @contextmanager
+    def conexao(self) -> Iterator[sqlite3.Connection]:
+        """
+        Empresta uma conexão; a transação é confirmada ao sair (ou desfeita em erro).
+        """
+        conexao = self._livres.get(timeout=self.timeout_s)
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            self._livres.put(conexao)
+
+    def fechar(self) -> None:
+        for conexao in self._todas:
+            conexao.close()
+        self._todas = []
+
+
+class BancoResultados:
+    """
+    Resultados dos motores BESS persistidos em SQLite.
+    """
+
+    def __init__(self, caminho: str, tamanho_pool: int = 4):
+        self.pool = PoolConexoes(caminho, tamanho_pool)
+        self.criar_esquema()
+
+    def criar_esquema(self) -> None:
+        with self.pool.conexao() as conexao:
+            versao = conexao.execute("PRAGMA user_version").fetchone()[0]
+            if versao < VERSAO_ESQUEMA:
+                conexao.executescript(ESQUEMA)
+                if versao == 1:
+                    # A versão 1 gravava os resumos com as colunas vazias (nomes de
+                    # chave errados); os valores são recuperados de analise_json
+                    atribuicoes = ", ".join(
+                        f"{coluna} = json_extract(analise_json, '$.{chave}')"
+                        for coluna, chave in COLUNAS_RESUMO_CURVA.items()
+                    )
+                    conexao.execute(f"UPDATE resumos_curva SET {atribuicoes}")
+                conexao.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+
+    def fechar(self) -> None:
+        self.pool.fechar()
+
+    # ------------------------------------------------------------------
+    # Uploads e curvas
+    # ------------------------------------------------------------------
+
+    def registrar_upload(
+        self,
+        nome_arquivo: str,
+        digest_curva: str,
+        linhas: int = None,
+        data_inicio: str = None,
+        data_fim: str = None,
+        intervalo_minutos: float = None,
+    ) -> int:
+        """
+        Registra um upload; a mesma curva (mesmo digest) reaproveita o registro.
+
+        Args:
+            nome_arquivo: Nome do arquivo enviado
+            digest_curva: Hash do conteúdo da curva
+            linhas: Número de medições
+            data_inicio: Primeira medição (ISO)
+            data_fim: Última medição (ISO)
+            intervalo_minutos: Intervalo entre medições
+
+        Returns:
+            Id do upload
+        """
+        with self.pool.conexao() as conexao:
+            conexao.execute(
+                """
+                INSERT INTO uploads (nome_arquivo, digest_curva, linhas, data_inicio, data_fim, intervalo_minutos, criado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (digest_curva) DO NOTHING
+                """,
+                (nome_arquivo, digest_curva, linhas, data_inicio, data_fim, intervalo_minutos, _agora()),
+            )
+            return conexao.execute("SELECT id FROM uploads WHERE digest_curva = ?", (digest_curva,)).fetchone()[0]
+
+    def obter_upload(self, upload_id: int = None, digest_curva: str = None) -> Optional[Dict]:
+        with self.pool.conexao() as conexao:
+            if upload_id is not None:
+                linha = conexao.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+            else:
+                linha = conexao.execute("SELECT * FROM uploads WHERE digest_curva = ?", (digest_curva,)).fetchone()
+        return dict(linha) if linha else None
+
+    def listar_uploads(self, limite: int = LIMITE_HISTORICO) -> List[Dict]:
+        with self.pool.conexao() as conexao:
+            linhas = conexao.execute("SELECT * FROM uploads ORDER BY id DESC LIMIT ?", (limite,)).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def gravar_resumo_curva(self, upload_id: int, analise: Dict) -> None:
+        """
+        Guarda a análise da curva (analisar_curva_carga) de um upload.
+        """
+        with self.pool.conexao() as conexao:
+            conexao.execute(
+                f"""
+                INSERT OR REPLACE INTO resumos_curva
+                    (upload_id, {", ".join(COLUNAS_RESUMO_CURVA)}, analise_json, criado_em)
+                VALUES (?, {", ".join("?" for _ in COLUNAS_RESUMO_CURVA)}, ?, ?)
+                """,
+                (
+                    upload_id,
+                    *(analise.get(chave) for chave in COLUNAS_RESUMO_CURVA.values()),
+                    _json(analise),
+                    _agora(),
+                ),
+            )
+
+    def obter_resumo_curva(self, upload_id: int) -> Optional[Dict]:
+        with self.pool.conexao() as conexao:
+            linha = conexao.execute(
+                "SELECT analise_json FROM resumos_curva WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    # ------------------------------------------------------------------
+    # Dimensionamentos
+    # ------------------------------------------------------------------
+
+    def gravar_dimensionamento(self, upload_id: int, parametros: Dict, resultado: Dict) -> int:
+        """
+        Guarda o resultado de dimensionar_bess (substitui o de mesmos parâmetros).
+
+        Args:
+            upload_id: Upload da curva dimensionada
+            parametros: Parâmetros do dimensionamento (tarifas incluídas, sem a curva)
+            resultado: Dict retornado por dimensionar_bess
+
+        Returns:
+            Id do dimensionamento
+        """
+        tarifas, demais = separar_tarifas(parametros)
+        dimensionamento = resultado.get("dimensionamento") or {}
+        payback = resultado.get("payback") or {}
+
+        with self.pool.conexao() as conexao:
+            cursor = conexao.execute(
+                """
+                INSERT OR REPLACE INTO dimensionamentos (
+                    upload_id, hash_tarifa, hash_parametros, capacidade_kwh, potencia_kw,
+                    custo_investimento_reais, economia_anual_reais, payback_anos, vpl_reais,
+                    resultado_json, criado_em
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    upload_id,
+                    hash_json(tarifas),
+                    hash_json(demais),
+                    dimensionamento.get("capacidade_bess_kwh"),
+                    dimensionamento.get("potencia_bess_kw"),
+                    resultado.get("custo_investimento_reais"),
+                    (resultado.get("economia") or {}).get("economia_total_anual_reais"),
+                    payback.get("payback_anos"),
+                    payback.get("vpl_reais"),
+                    _json(resultado),
+                    _agora(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def obter_dimensionamento(self, upload_id: int, parametros: Dict) -> Optional[Dict]:
+        """
+        Resultado guardado para o mesmo upload e parâmetros (None se não houver).
+        """
+        tarifas, demais = separar_tarifas(parametros)
+        with self.pool.conexao() as conexao:
+            linha = conexao.execute(
+                """
+                SELECT id, resultado_json FROM dimensionamentos
+                WHERE upload_id = ? AND hash_tarifa = ? AND hash_parametros = ?
+                """,
+                (upload_id, hash_json(tarifas), hash_json(demais)),
+            ).fetchone()
+        if linha is None:
+            return None
+        return {**json.loads(linha["resultado_json"]), "dimensionamento_id": linha["id"]}
+
+    def historico_dimensionamentos(
+        self,
+        upload_id: int,
+        hash_tarifa: str = None,
+        capacidade_kwh: float = None,
+        potencia_kw: float = None,
+        limite: int = LIMITE_HISTORICO,
+    ) -> List[Dict]:
+        """
+        Dimensionamentos de um upload, mais recentes primeiro (sem o JSON completo).
+        """
+        filtro, valores = self._filtro_tamanho(upload_id, hash_tarifa, capacidade_kwh, potencia_kw)
+        with self.pool.conexao() as conexao:
+            linhas = conexao.execute(
+                f"""
+                SELECT id, upload_id, hash_tarifa, hash_parametros, capacidade_kwh, potencia_kw,
+                       custo_investimento_reais, economia_anual_reais, payback_anos, vpl_reais, criado_em
+                FROM dimensionamentos WHERE {filtro} ORDER BY id DESC LIMIT ?
+                """,
+                (*valores, limite),
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    # ------------------------------------------------------------------
+    # Simulações
+    # ------------------------------------------------------------------
+
+    def gravar_simulacao(self, upload_id: int, parametros: Dict, resultado: Dict) -> int:
+        """
+        Guarda o resultado de simular_bess: resumo em `simulacoes` e um
+        registro por dia em `simulacoes_diarias`, numa única transação.
+
+        Args:
+            upload_id: Upload da curva simulada
+            parametros: Parâmetros da simulação (tarifas incluídas, sem a curva)
+            resultado: Dict retornado por simular_bess
+
+        Returns:
+            Id da simulação
+        """
+        tarifas, demais = separar_tarifas(parametros)
+        resumo = resultado.get("resumo") or {}
+        diarios = resultado.get("resultados_diarios") or []
+        sem_diarios = {chave: valor for chave, valor in resultado.items() if chave != "resultados_diarios"}
+
+        with self.pool.conexao() as conexao:
+            # Regravar a mesma simulação substitui também os dias (ON DELETE CASCADE)
+            conexao.execute(
+                "DELETE FROM simulacoes WHERE upload_id = ? AND hash_tarifa = ? AND hash_parametros = ?",
+                (upload_id, hash_json(tarifas), hash_json(demais)),
+            )
+            cursor = conexao.execute(
+                """
+                INSERT INTO simulacoes (
+                    upload_id, hash_tarifa, hash_parametros, capacidade_kwh, potencia_kw, estrategia,
+                    dias_simulados, economia_anual_estimada_reais, reducao_demanda_media_kw,
+                    resultado_json, criado_em
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    upload_id,
+                    hash_json(tarifas),
+                    hash_json(demais),
+                    demais.get("capacidade_bess_kwh"),
+                    demais.get("potencia_bess_kw"),
+                    demais.get("estrategia_carregamento"),
+                    resumo.get("dias_simulados", len(diarios)),
+                    resumo.get("economia_anual_estimada_reais"),
+                    resumo.get("reducao_demanda_media_kw"),
+                    _json(sem_diarios),
+                    _agora(),
+                ),
+            )
+            simulacao_id = cursor.lastrowid
+            conexao.executemany(
+                f"""
+                INSERT INTO simulacoes_diarias (simulacao_id, data, {", ".join(COLUNAS_DIARIAS)})
+                VALUES (?, ?, {", ".join("?" for _ in COLUNAS_DIARIAS)})
+                """,
+                (
+                    (simulacao_id, dia["data"], *(dia.get(coluna) for coluna in COLUNAS_DIARIAS))
+                    for dia in diarios
+                ),
+            )
+        return simulacao_id
+
+    def obter_simulacao(self, upload_id: int, parametros: Dict, incluir_diarios: bool = True) -> Optional[Dict]:
+        """
+        Resultado guardado para o mesmo upload e parâmetros (None se não houver).
+
+        Args:
+            upload_id: Upload da curva
+            parametros: Parâmetros da simulação (tarifas incluídas, sem a curva)
+            incluir_diarios: Remontar `resultados_diarios` a partir dos dias gravados
+
+        Returns:
+            Dict no formato de simular_bess, com `simulacao_id`
+        """
+        tarifas, demais = separar_tarifas(parametros)
+        with self.pool.conexao() as conexao:
+            linha = conexao.execute(
+                """
+                SELECT id, resultado_json FROM simulacoes
+                WHERE upload_id = ? AND hash_tarifa = ? AND hash_parametros = ?
+                """,
+                (upload_id, hash_json(tarifas), hash_json(demais)),
+            ).fetchone()
+        if linha is None:
+            return None
+
+        resultado = {**json.loads(linha["resultado_json"]), "simulacao_id": linha["id"]}
+        if incluir_diarios:
+            resultado["resultados_diarios"] = self.obter_diarios(linha["id"])
+        return resultado
+
+    def obter_diarios(self, simulacao_id: int, data_inicio: str = None, data_fim: str = None) -> List[Dict]:
+        """
+        Agregados diários de uma simulação, em ordem de data.
+
+        Args:
+            simulacao_id: Id da simulação
+            data_inicio: Primeiro dia (ISO, inclusive)
+            data_fim: Último dia (ISO, inclusive)
+
+        Returns:
+            Lista de dicts com as chaves de resultados_diarios
+        """
+        condicoes, valores = ["simulacao_id = ?"], [simulacao_id]
+        if data_inicio:
+            condicoes.append("data >= ?")
+            valores.append(data_inicio)
+        if data_fim:
+            # Datas gravadas com hora (ISO) continuam dentro do último dia
+            condicoes.append("substr(data, 1, 10) <= ?")
+            valores.append(data_fim[:10])
+        with self.pool.conexao() as conexao:
+            linhas = conexao.execute(
+                f"""
+                SELECT data, {", ".join(COLUNAS_DIARIAS)} FROM simulacoes_diarias
+                WHERE {" AND ".join(condicoes)} ORDER BY data
+                """,
+                valores,
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def historico_simulacoes(
+        self,
+        upload_id: int,
+        hash_tarifa: str = None,
+        capacidade_kwh: float = None,
+        potencia_kw: float = None,
+        limite: int = LIMITE_HISTORICO,
+    ) -> List[Dict]:
+        """
+        Simulações de um upload, mais recentes primeiro (só o resumo indexado).
+        """
+        filtro, valores = self._filtro_tamanho(upload_id, hash_tarifa, capacidade_kwh, potencia_kw)
+        with self.pool.conexao() as conexao:
+            linhas = conexao.execute(
+                f"""
+                SELECT id, upload_id, hash_tarifa, hash_parametros, capacidade_kwh, potencia_kw, estrategia,
+                       dias_simulados, economia_anual_estimada_reais, reducao_demanda_media_kw, criado_em
+                FROM simulacoes WHERE {filtro} ORDER BY id DESC LIMIT ?
+                """,
+                (*valores, limite),
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    @staticmethod
+    def _filtro_tamanho(upload_id, hash_tarifa, capacidade_kwh, potencia_kw) -> Tuple[str, Tuple]:
+        # Mesma ordem das colunas do índice (upload, tarifa, capacidade, potência)
+        condicoes, valores = ["upload_id = ?"], [upload_id]
+        for coluna, valor in (
+            ("hash_tarifa", hash_tarifa),
+            ("capacidade_kwh", capacidade_kwh),
+            ("potencia_kw", potencia_kw),
+        ):
+            if valor is not None:
+                condicoes.append(f"{coluna} = ?")
+                valores.append(valor)
+        return " AND ".join(condicoes), tuple(valores)
@@ -0,0 +1,149 @@
+"""
+MÓDULO: Benchmark do pool de processos dos motores
+
+Compara duas formas de atender N requisições simultâneas da mesma tarefa:
+
+- processo novo por requisição: um `python` por chamada, que importa os
+  motores, calcula e devolve o JSON pela saída padrão (como as rotas
+  faziam antes do ExecutorMotores)
+- pool: ExecutorMotores com os processos já aquecidos (uma chamada de
+  aquecimento antes da medição, como em um servidor em produção)
+
+A curva é a mesma do benchmark_bess (gerador de casos, semente fixa),
+lida do arquivo colunar como nas chamadas com upload_id.
+
+Uso:
+    python backend/benchmark_computacao.py --requests 8 --days 30
+    python backend/benchmark_computacao.py --task dimensionar_bess --workers 2
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict
+
+from computacao_bess import DIRETORIO_MOTORES, ExecutorMotores, _iniciar_processo, preparar_curva
+
+# Parâmetros de cada tarefa medida (a curva entra por arquivo_curva)
+PARAMETROS_TAREFA = {
+    "simular_bess": {
+        "capacidade_bess_kwh": 300,
+        "potencia_bess_kw": 100,
+        "estrategia_carregamento": "grid-offpeak",
+        "tarifa_ponta": 1.71,
+        "tarifa_intermediaria": 1.12,
+        "tarifa_fora_ponta": 0.72,
+        "cobranca_demanda": 50,
+    },
+    "dimensionar_bess": {
+        "tarifa_ponta": 1.71,
+        "tarifa_intermediaria": 1.12,
+        "tarifa_fora_ponta": 0.72,
+        "cobranca_demanda": 50,
+    },
+    "analisar_curva_carga": {},
+}
+
+# Executado em cada processo novo: argv = (pasta dos motores, tarefa), parâmetros no stdin
+CODIGO_PROCESSO_NOVO = (
+    "import json, sys\n"
+    "sys.path.insert(0, sys.argv[1])\n"
+    "from servidor_workers import executar_tarefa, valores_finitos\n"
+    "print(json.dumps(valores_finitos(executar_tarefa(sys.argv[2], json.load(sys.stdin)))))\n"
+)
+
+
+async def _processo_novo(tarefa: str, parametros: Dict) -> Dict:
+    processo = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", CODIGO_PROCESSO_NOVO, os.path.abspath(DIRETORIO_MOTORES), tarefa,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    saida, _ = await processo.communicate(json.dumps(parametros).encode())
+    return json.loads(saida)
+
+
+async def medir_processo_novo(tarefa: str, parametros: Dict, requisicoes: int) -> Dict:
+    """
+    N requisições simultâneas, cada uma em um `python` novo.
+    """
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(_processo_novo(tarefa, dict(parametros)) for _ in range(requisicoes)))
+    return _resumir(resultados, time.perf_counter() - inicio)
+
+
+async def medir_pool(tarefa: str, parametros: Dict, requisicoes: int, processos: int) -> Dict:
+    """
+    N requisições simultâneas no ExecutorMotores (processos aquecidos).
+    """
+    executor = ExecutorMotores(processos, max_em_espera=requisicoes)
+    try:
+        # Aquecimento: todos os processos sobem e importam os motores
+        await asyncio.gather(*(executor.executar(tarefa, dict(parametros)) for _ in range(executor.processos)))
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(executor.executar(tarefa, dict(parametros)) for _ in range(requisicoes)))
+        return _resumir(resultados, time.perf_counter() - inicio)
+    finally:
+        executor.encerrar()
+
+
+def _resumir(resultados, tempo: float) -> Dict:
+    return {
+        "tempo_s": round(tempo, 3),
+        "requisicoes_por_s": round(len(resultados) / tempo, 1),
+        "falhas": sum(not r.get("sucesso") for r in resultados),
+    }
+
+
+def executar_benchmark(
+    tarefa: str = "simular_bess",
+    requisicoes: int = 8,
+    dias: int = 30,
+    intervalo_minutos: int = 15,
+    processos: int = None,
+) -> Dict:
+    """
+    Mede as duas formas com a mesma curva e os mesmos parâmetros.
+
+    Returns:
+        Dict com os tempos de cada forma e a aceleração do pool
+    """
+    _iniciar_processo(DIRETORIO_MOTORES)
+    from benchmark_bess import PASTA_ENTRADAS_PADRAO, preparar_entradas
+
+    entradas = preparar_entradas(PASTA_ENTRADAS_PADRAO, dias, intervalo_minutos)
+    parametros = preparar_curva(tarefa, {**PARAMETROS_TAREFA[tarefa], "arquivo_curva": entradas["curva"]})
+
+    processo_novo = asyncio.run(medir_processo_novo(tarefa, parametros, requisicoes))
+    pool = asyncio.run(medir_pool(tarefa, parametros, requisicoes, processos))
+    return {
+        "tarefa": tarefa,
+        "requisicoes": requisicoes,
+        "dias": dias,
+        "intervalo_minutos": intervalo_minutos,
+        "processos_pool": processos or os.cpu_count() or 1,
+        "processo_por_requisicao": processo_novo,
+        "pool": pool,
+        "aceleracao": round(processo_novo["tempo_s"] / pool["tempo_s"], 1),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Processo novo por requisição vs. pool de processos aquecidos")
+    parser.add_argument("--task", default="simular_bess", choices=list(PARAMETROS_TAREFA))
+    parser.add_argument("--requests", type=int, default=8, help="Requisições simultâneas")
+    parser.add_argument("--days", type=int, default=30, help="Dias da curva")
+    parser.add_argument("--interval", type=int, default=15, help="Minutos entre medições")
+    parser.add_argument("--workers", type=int, default=None, help="Processos do pool (padrão: núcleos)")
+
+    args = parser.parse_args()
+
+    print(json.dumps(
+        executar_benchmark(args.task, args.requests, args.days, args.interval, args.workers),
+        indent=2, ensure_ascii=False,
+    ))
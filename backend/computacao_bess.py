@@ -0,0 +1,242 @@
+"""
+MÓDULO: Execução dos motores BESS no backend FastAPI
+
+Chama parser_excel, dimensionador_bess e simulador_bess no próprio
+backend, em vez de um `python3` por requisição. O trabalho de CPU vai
+para um ProcessPoolExecutor de processos já aquecidos (módulos e
+pandas/NumPy importados uma vez), e o event loop só aguarda.
+
+- No máximo `processos` tarefas estão no pool ao mesmo tempo; as demais
+  esperam sem ocupar memória do pool, até `max_em_espera`. Acima disso
+  `executar` levanta FilaCheia (HTTP 503 no main.py).
+- Uploads são gravados em disco bloco a bloco, com o digest calculado no
+  caminho; respostas grandes saem em blocos por `iterar_json`, sem montar
+  o JSON inteiro em memória.
+
+Os motores ficam em server/python-workers (ou BESS_WORKERS_DIR) e são
+executados pela mesma `executar_tarefa` do servidor de workers do Node.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, Tuple
+
+
+DIRETORIO_MOTORES = os.environ.get("BESS_WORKERS_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "server", "python-workers"
+)
+
+# Parâmetros que carregam a curva (os mesmos de cache_resultados.PARAMETROS_CURVA)
+PARAMETROS_CURVA = ("potencias_kw", "potencias", "timestamps", "arquivo_curva")
+
+# Argumentos da curva de cada tarefa (preenchidos com None quando a curva
+# vem de `arquivo_curva`)
+ARGUMENTOS_CURVA = {
+    "analisar_curva_carga": ("potencias", "timestamps"),
+    "classificar_por_horario": ("potencias", "timestamps"),
+    "dimensionar_bess": ("potencias_kw", "timestamps"),
+    "simular_bess": ("potencias_kw", "timestamps"),
+}
+
+# Pasta das séries de simular_bess (a mesma de simulador_bess.DIRETORIO_SERIES)
+DIRETORIO_SERIES = os.path.join(tempfile.gettempdir(), "bess-series")
+
+# Bloco de leitura dos uploads e de escrita das respostas
+TAMANHO_BLOCO = 1 << 20
+TAMANHO_BLOCO_RESPOSTA = 64 * 1024
+
+# cache_resultados dos motores, carregado na primeira chamada de versao_motores
+_cache_resultados = None
+
+
+class FilaCheia(Exception):
+    """
+    Mais tarefas esperando do que `max_em_espera`.
+    """
+
+
+def _iniciar_processo(diretorio_motores: str) -> None:
+    """
+    Inicializador de cada processo do pool: importa os motores uma vez.
+    """
+    sys.path.insert(0, os.path.abspath(diretorio_motores))
+    import importlib
+
+    from servidor_workers import MODULOS_AQUECIDOS
+    for modulo in MODULOS_AQUECIDOS:
+        try:
+            importlib.import_module(modulo)
+        except ImportError:
+            pass
+
+
+def _executar(tarefa: str, parametros: Dict) -> Dict:
+    from servidor_workers import executar_tarefa, valores_finitos
+    # NaN/inf (ex.: payback sem economia) viram None: a resposta é JSON estrito
+    return valores_finitos(executar_tarefa(tarefa, parametros))
+
+
+class ExecutorMotores:
+    """
+    Pool de processos limitado para as tarefas dos motores BESS.
+    """
+
+    def __init__(self, processos: int = None, max_em_espera: int = None, diretorio_motores: str = DIRETORIO_MOTORES):
+        self.processos = processos or os.cpu_count() or 1
+        self.max_em_espera = max_em_espera if max_em_espera is not None else self.processos * 8
+        self.diretorio_motores = diretorio_motores
+        self._vagas = asyncio.Semaphore(self.processos)
+        self._em_espera = 0
+        self._em_execucao = 0
+        self._executor = self._criar_executor()
+
+    def _criar_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.processos,
+            mp_context=mp.get_context("spawn"),
+            initializer=_iniciar_processo,
+            initargs=(self.diretorio_motores,),
+        )
+
+    async def executar(self, tarefa: str, parametros: Dict) -> Dict:
+        """
+        Executa uma tarefa (nome de servidor_workers.TAREFAS) em um processo do pool.
+
+        Args:
+            tarefa: Nome da tarefa
+            parametros: Argumentos nomeados da função
+
+        Returns:
+            Dict retornado pela função da tarefa
+        """
+        if self._em_espera >= self.max_em_espera:
+            raise FilaCheia("Muitas tarefas em espera, tente novamente mais tarde")
+
+        self._em_espera += 1
+        try:
+            await self._vagas.acquire()
+        finally:
+            self._em_espera -= 1
+
+        self._em_execucao += 1
+        try:
+            executor = self._executor
+            return await asyncio.get_running_loop().run_in_executor(executor, _executar, tarefa, parametros)
+        except BrokenProcessPool:
+            # Um processo morreu (ex.: falta de memória); o pool é recriado
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._criar_executor()
+            return {"sucesso": False, "erro": "Processo de cálculo encerrado inesperadamente"}
+        finally:
+            self._em_execucao -= 1
+            self._vagas.release()
+
+    def estatisticas(self) -> Dict:
+        return {
+            "processos": self.processos,
+            "em_execucao": self._em_execucao,
+            "em_espera": self._em_espera,
+            "max_em_espera": self.max_em_espera,
+        }
+
+    def encerrar(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def versao_motores(tarefa: str, diretorio_motores: str = DIRETORIO_MOTORES) -> Dict[str, str]:
+    """
+    Versão do código de uma tarefa: hash de cada módulo que ela usa.
+
+    A mesma de cache_resultados.versao_tarefa; entra na chave dos resultados
+    guardados no banco, para que uma mudança nos motores não devolva
+    resultados calculados pela versão anterior.
+    """
+    global _cache_resultados
+    if _cache_resultados is None:
+        # Carregado pelo caminho: o processo do FastAPI não tem os motores no sys.path
+        spec = importlib.util.spec_from_file_location(
+            "cache_resultados", os.path.join(diretorio_motores, "cache_resultados.py")
+        )
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        _cache_resultados = modulo
+    return _cache_resultados.versao_tarefa(tarefa)
+
+
+def series_disponiveis(resultado: Dict, diretorio_series: str = DIRETORIO_SERIES) -> bool:
+    """
+    Verifica se as séries referenciadas por um resultado guardado ainda
+    existem (simulador_bess.limitar_series remove as antigas).
+
+    O mesmo teste de servidor_workers._series_disponiveis, sem importar os
+    motores no processo do FastAPI.
+    """
+    if "series" not in resultado:
+        return True
+    id_series = (resultado["series"] or {}).get("id")
+    if not isinstance(id_series, str) or not re.fullmatch(r"[0-9a-f]{32}", id_series):
+        return False
+    return os.path.exists(os.path.join(diretorio_series, f"{id_series}.npz"))
+
+
+def preparar_curva(tarefa: str, parametros: Dict) -> Dict:
+    """
+    Completa com None os argumentos de curva ausentes quando a curva vem
+    de `arquivo_curva` (as funções dos motores os exigem posicionalmente).
+    """
+    if parametros.get("arquivo_curva"):
+        for nome in ARGUMENTOS_CURVA.get(tarefa, ()):
+            parametros.setdefault(nome, None)
+    return parametros
+
+
+async def salvar_upload(arquivo, caminho_destino: str) -> Tuple[str, int]:
+    """
+    Grava um UploadFile em disco bloco a bloco.
+
+    Args:
+        arquivo: UploadFile do FastAPI
+        caminho_destino: Caminho do arquivo a gravar
+
+    Returns:
+        Tupla (SHA-256 do conteúdo, bytes gravados)
+    """
+    os.makedirs(os.path.dirname(caminho_destino) or ".", exist_ok=True)
+    digest = hashlib.sha256()
+    tamanho = 0
+    with open(caminho_destino, "wb") as destino:
+        while True:
+            bloco = await arquivo.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            digest.update(bloco)
+            tamanho += len(bloco)
+            await asyncio.to_thread(destino.write, bloco)
+    return digest.hexdigest(), tamanho
+
+
+def iterar_json(valor, tamanho_bloco: int = TAMANHO_BLOCO_RESPOSTA) -> Iterator[bytes]:
+    """
+    Serializa `valor` em JSON aos poucos, em blocos de ~tamanho_bloco bytes.
+    """
+    partes = []
+    acumulado = 0
+    for parte in json.JSONEncoder(ensure_ascii=False, allow_nan=False, default=str).iterencode(valor):
+        partes.append(parte)
+        acumulado += len(parte)
+        if acumulado >= tamanho_bloco:
+            yield "".join(partes).encode("utf-8")
+            partes = []
+            acumulado = 0
+    if partes:
+        yield "".join(partes).encode("utf-8")
@@ -1,10 +1,30 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-import sqlite3
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Annotated, Any, Callable, ClassVar, Dict, List, Literal, Optional, Tuple
+from uuid import uuid4
 import os
 
+from banco_resultados import BancoResultados
+from computacao_bess import (
+    PARAMETROS_CURVA,
+    ExecutorMotores,
+    FilaCheia,
+    iterar_json,
+    preparar_curva,
+    salvar_upload,
+    series_disponiveis,
+    versao_motores,
+)
+
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///app/db.sqlite3")
 DB_PATH = DATABASE_URL.split("sqlite:///")[-1]
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "4"))
+UPLOADS_DIR = os.environ.get("UPLOADS_DIR", os.path.join(os.path.dirname(DB_PATH) or ".", "uploads"))
+COMPUTE_WORKERS = int(os.environ.get("COMPUTE_WORKERS", "0")) or None
+COMPUTE_MAX_QUEUE = int(os.environ["COMPUTE_MAX_QUEUE"]) if os.environ.get("COMPUTE_MAX_QUEUE") else None
 
 app = FastAPI()
 
@@ -17,22 +37,165 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Banco compartilhado pelas requisições (pool de conexões em modo WAL)
+banco: Optional[BancoResultados] = None
+
+# Pool de processos dos motores BESS (parser, dimensionador, simulador)
+executor: Optional[ExecutorMotores] = None
+
+
+class Upload(BaseModel):
+    nome_arquivo: str
+    digest_curva: str
+    linhas: Optional[int] = None
+    data_inicio: Optional[str] = None
+    data_fim: Optional[str] = None
+    intervalo_minutos: Optional[float] = None
+
+
+class Resultado(BaseModel):
+    # Parâmetros da tarefa Python (tarifas incluídas, sem a curva) e o dict que ela retornou
+    upload_id: int
+    parametros: Dict[str, Any]
+    resultado: Dict[str, Any]
+
+
+class Consulta(BaseModel):
+    upload_id: int
+    parametros: Dict[str, Any]
+
+
+# Parâmetros dos cálculos: só os campos listados são aceitos. Caminhos não
+# entram; a curva vem nas listas ou pelo upload_id (ver resolver_upload)
+
+Valor = Annotated[float, Field(ge=0)]
+Positivo = Annotated[float, Field(gt=0)]
+Fracao = Annotated[float, Field(ge=0, le=1)]
+Eficiencia = Annotated[float, Field(gt=0, le=1)]
+Hora = Annotated[int, Field(ge=0, le=24)]
+Data = Annotated[str, Field(pattern=r"^\d{4}-\d{2}-\d{2}$")]
+Estrategia = Literal["solar", "grid-offpeak", "otimo"]
+
+
+class Premissas(BaseModel):
+    # Chaves de projecao_financeira.PREMISSAS_PADRAO
+    model_config = ConfigDict(extra="forbid")
+
+    anos_analise: Optional[Annotated[int, Field(ge=1, le=50)]] = None
+    taxa_desconto: Optional[Fracao] = None
+    reajuste_tarifa_anual: Optional[Annotated[float, Field(ge=-1, le=1)]] = None
+    custo_om_anual_percent: Optional[Annotated[float, Field(ge=0, le=100)]] = None
+    reajuste_om_anual: Optional[Annotated[float, Field(ge=-1, le=1)]] = None
+    perda_capacidade_anual: Optional[Fracao] = None
+    custo_reposicao_percent: Optional[Annotated[float, Field(ge=0, le=200)]] = None
+    variacao_custo_reposicao_anual: Optional[Annotated[float, Field(ge=-1, le=1)]] = None
+    capacidade_fim_vida: Optional[Fracao] = None
+    vida_util_anos: Optional[Annotated[int, Field(ge=1, le=50)]] = None
+
+
+class ModeloDegradacao(BaseModel):
+    # Parâmetros de degradacao_bess.ContadorRainflow
+    model_config = ConfigDict(extra="forbid")
+
+    ciclos_vida_100_dod: Optional[Positivo] = None
+    expoente_dod: Optional[Positivo] = None
+    perda_fim_vida: Optional[Annotated[float, Field(gt=0, le=1)]] = None
+
+
+class ParametrosCurva(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    # Nome da lista de potências na função Python da tarefa
+    campo_potencias: ClassVar[str] = "potencias_kw"
+
+    upload_id: Optional[int] = None
+    timestamps: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def uma_curva(self):
+        potencias = getattr(self, self.campo_potencias)
+        if self.upload_id is not None:
+            if potencias is not None or self.timestamps is not None:
+                raise ValueError(f"Informe upload_id ou {self.campo_potencias}/timestamps, não ambos")
+        elif potencias is None or self.timestamps is None:
+            raise ValueError(f"Informe upload_id ou {self.campo_potencias} e timestamps")
+        return self
+
+    def argumentos(self) -> Dict[str, Any]:
+        # Campos omitidos ficam com o padrão da função Python
+        return self.model_dump(exclude_none=True)
+
+
+class ParametrosAnalise(ParametrosCurva):
+    campo_potencias: ClassVar[str] = "potencias"
+
+    potencias: Optional[List[float]] = None
+
+
+class ParametrosClassificacao(ParametrosAnalise):
+    horarios_ponta: Optional[Tuple[Hora, Hora]] = None
+    horarios_intermediaria: Optional[Tuple[Hora, Hora]] = None
+    feriados: Optional[List[Data]] = None
+
+
+class ParametrosDimensionamento(ParametrosCurva):
+    potencias_kw: Optional[List[float]] = None
+    feriados: Optional[List[Data]] = None
+    tarifa_ponta: Valor
+    tarifa_intermediaria: Optional[Valor] = None
+    tarifa_fora_ponta: Valor
+    cobranca_demanda: Valor
+    estrategia_carregamento: Optional[Estrategia] = None
+    reducao_demanda_percent: Optional[Annotated[float, Field(ge=0, le=100)]] = None
+    custo_investimento_reais: Optional[Valor] = None
+    objetivo: Optional[Literal["vpl", "payback"]] = None
+    custo_kwh_reais: Optional[Valor] = None
+    custo_kw_reais: Optional[Valor] = None
+    perda_capacidade_anual: Optional[Fracao] = None
+    premissas_financeiras: Optional[Premissas] = None
+
+
+class ParametrosSimulacao(ParametrosCurva):
+    potencias_kw: Optional[List[float]] = None
+    feriados: Optional[List[Data]] = None
+    capacidade_bess_kwh: Positivo
+    potencia_bess_kw: Positivo
+    estrategia_carregamento: Estrategia
+    tarifa_ponta: Valor
+    tarifa_intermediaria: Valor
+    tarifa_fora_ponta: Valor
+    cobranca_demanda: Optional[Valor] = None
+    multa_ultrapassagem: Optional[Valor] = None
+    detalhe: Optional[Literal["resumo", "completo"]] = None
+    eficiencia_carga: Optional[Eficiencia] = None
+    eficiencia_descarga: Optional[Eficiencia] = None
+    modelo_degradacao: Optional[ModeloDegradacao] = None
+    custo_investimento_reais: Optional[Valor] = None
+    premissas_financeiras: Optional[Premissas] = None
+
+
 # Cria o banco se não existir
 def init_db():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL
-    )
-    """)
-    conn.commit()
-    conn.close()
+    global banco
+    banco = BancoResultados(DB_PATH, DB_POOL_SIZE)
+    with banco.pool.conexao() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL
+        )
+        """)
 
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
+    global executor
     init_db()
+    executor = ExecutorMotores(COMPUTE_WORKERS, COMPUTE_MAX_QUEUE)
+
+@app.on_event("shutdown")
+def shutdown_event():
+    executor.encerrar()
+    banco.fechar()
 
 @app.get("/")
 def read_root():
@@ -40,19 +203,201 @@ def read_root():
 
 @app.get("/items")
 def get_items():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM items")
-    items = [{"id": row[0], "name": row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return items
+    with banco.pool.conexao() as conn:
+        rows = conn.execute("SELECT id, name FROM items").fetchall()
+    return [{"id": row[0], "name": row[1]} for row in rows]
 
 @app.post("/items")
 def add_item(name: str):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO items (name) VALUES (?)", (name,))
-    conn.commit()
-    item_id = cursor.lastrowid
-    conn.close()
+    with banco.pool.conexao() as conn:
+        item_id = conn.execute("INSERT INTO items (name) VALUES (?)", (name,)).lastrowid
     return {"id": item_id, "name": name}
+
+# ----------------------------------------------------------------------------
+# Uploads e resumos de curva
+# ----------------------------------------------------------------------------
+
+@app.get("/uploads")
+def listar_uploads(limite: int = 50):
+    return banco.listar_uploads(limite)
+
+@app.post("/uploads")
+def registrar_upload(upload: Upload):
+    # A mesma curva (mesmo digest) devolve o upload já registrado
+    upload_id = banco.registrar_upload(**upload.model_dump())
+    return banco.obter_upload(upload_id)
+
+@app.get("/uploads/{upload_id}")
+def obter_upload(upload_id: int):
+    upload = banco.obter_upload(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload não encontrado")
+    return {**upload, "resumo_curva": banco.obter_resumo_curva(upload_id)}
+
+@app.put("/uploads/{upload_id}/resumo-curva")
+def gravar_resumo_curva(upload_id: int, analise: Dict[str, Any]):
+    banco.gravar_resumo_curva(upload_id, analise)
+    return {"sucesso": True}
+
+# ----------------------------------------------------------------------------
+# Dimensionamentos e simulações
+# ----------------------------------------------------------------------------
+
+@app.post("/resultados/dimensionamentos")
+def gravar_dimensionamento(dados: Resultado):
+    return {"sucesso": True, "id": banco.gravar_dimensionamento(dados.upload_id, dados.parametros, dados.resultado)}
+
+@app.post("/resultados/dimensionamentos/consultar")
+def consultar_dimensionamento(consulta: Consulta):
+    resultado = banco.obter_dimensionamento(consulta.upload_id, consulta.parametros)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Dimensionamento não encontrado")
+    return resultado
+
+@app.get("/resultados/dimensionamentos")
+def historico_dimensionamentos(
+    upload_id: int,
+    hash_tarifa: Optional[str] = None,
+    capacidade_kwh: Optional[float] = None,
+    potencia_kw: Optional[float] = None,
+    limite: int = 50,
+):
+    return banco.historico_dimensionamentos(upload_id, hash_tarifa, capacidade_kwh, potencia_kw, limite)
+
+@app.post("/resultados/simulacoes")
+def gravar_simulacao(dados: Resultado):
+    return {"sucesso": True, "id": banco.gravar_simulacao(dados.upload_id, dados.parametros, dados.resultado)}
+
+@app.post("/resultados/simulacoes/consultar")
+def consultar_simulacao(consulta: Consulta, incluir_diarios: bool = True):
+    resultado = banco.obter_simulacao(consulta.upload_id, consulta.parametros, incluir_diarios)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Simulação não encontrada")
+    return resultado
+
+@app.get("/resultados/simulacoes")
+def historico_simulacoes(
+    upload_id: int,
+    hash_tarifa: Optional[str] = None,
+    capacidade_kwh: Optional[float] = None,
+    potencia_kw: Optional[float] = None,
+    limite: int = 50,
+):
+    return banco.historico_simulacoes(upload_id, hash_tarifa, capacidade_kwh, potencia_kw, limite)
+
+@app.get("/resultados/simulacoes/{simulacao_id}/diarios")
+def obter_diarios(simulacao_id: int, data_inicio: Optional[str] = None, data_fim: Optional[str] = None):
+    return banco.obter_diarios(simulacao_id, data_inicio, data_fim)
+
+# ----------------------------------------------------------------------------
+# Cálculos (motores BESS em processos do pool)
+# ----------------------------------------------------------------------------
+
+def caminho_curva(digest: str) -> str:
+    return os.path.join(UPLOADS_DIR, "curvas", f"{digest}.bcurva")
+
+def resposta_json(resultado: Dict[str, Any]) -> StreamingResponse:
+    # Séries de um ano passam de 1 MB: o JSON sai em blocos
+    return StreamingResponse(iterar_json(resultado), media_type="application/json")
+
+async def executar(tarefa: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return await executor.executar(tarefa, preparar_curva(tarefa, parametros))
+    except FilaCheia as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+async def resolver_upload(parametros: Dict[str, Any]) -> Optional[int]:
+    # Com upload_id e sem curva nos parâmetros, usa a curva colunar gravada no
+    # parse; é o único caminho de arquivo que chega aos motores
+    upload_id = parametros.pop("upload_id", None)
+    if upload_id is None or any(parametros.get(nome) is not None for nome in PARAMETROS_CURVA):
+        return upload_id
+    upload = await run_in_threadpool(banco.obter_upload, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload não encontrado")
+    parametros["arquivo_curva"] = caminho_curva(upload["digest_curva"])
+    return upload_id
+
+async def calcular_com_banco(
+    tarefa: str,
+    parametros: Dict[str, Any],
+    obter: Callable,
+    gravar: Callable,
+    campo_id: str,
+) -> Dict[str, Any]:
+    # Mesmo upload, mesmos parâmetros e mesma versão dos motores: resposta
+    # direto do banco, sem recalcular. Uma simulação cujas séries já foram
+    # removidas é recalculada (e regravada), como no cache dos workers
+    upload_id = await resolver_upload(parametros)
+    chave = {nome: valor for nome, valor in parametros.items() if nome not in PARAMETROS_CURVA}
+    chave["versao_motores"] = versao_motores(tarefa)
+    if upload_id is not None:
+        guardado = await run_in_threadpool(obter, upload_id, chave)
+        if guardado is not None and series_disponiveis(guardado):
+            return {**guardado, "banco": True}
+
+    resultado = await executar(tarefa, parametros)
+    if upload_id is not None and resultado.get("sucesso"):
+        resultado[campo_id] = await run_in_threadpool(gravar, upload_id, chave, resultado)
+    return resultado
+
+@app.post("/bess/parse")
+async def parsear(arquivo: UploadFile = File(...), serie: bool = True):
+    # O upload vai para o disco em blocos; o nome final é o digest do conteúdo
+    extensao = os.path.splitext(arquivo.filename or "")[1].lower()
+    temporario = os.path.join(UPLOADS_DIR, f".{uuid4().hex}{extensao}")
+    digest, _ = await salvar_upload(arquivo, temporario)
+    caminho = os.path.join(UPLOADS_DIR, f"{digest}{extensao}")
+    os.replace(temporario, caminho)
+
+    # serie=false (ou CSV): só metadados, com memória constante
+    tarefa = "parsear_arquivo_excel" if serie and extensao in (".xlsx", ".xlsm") else "parsear_arquivo_streaming"
+    os.makedirs(os.path.dirname(caminho_curva(digest)), exist_ok=True)
+    resultado = await executar(tarefa, {"caminho_arquivo": caminho, "caminho_colunar": caminho_curva(digest)})
+    if resultado.get("sucesso"):
+        dados = resultado["dados"]
+        resultado["upload_id"] = await run_in_threadpool(
+            banco.registrar_upload,
+            arquivo.filename or caminho,
+            digest,
+            dados.get("total_pontos"),
+            dados.get("data_inicio"),
+            dados.get("data_fim"),
+        )
+    return resposta_json(resultado)
+
+@app.post("/bess/analyze")
+async def analisar(dados: ParametrosAnalise):
+    parametros = dados.argumentos()
+    upload_id = await resolver_upload(parametros)
+    if upload_id is not None:
+        analise = await run_in_threadpool(banco.obter_resumo_curva, upload_id)
+        if analise is not None:
+            return resposta_json({"sucesso": True, "analise": analise, "banco": True})
+
+    resultado = await executar("analisar_curva_carga", parametros)
+    if upload_id is not None and resultado.get("sucesso"):
+        await run_in_threadpool(banco.gravar_resumo_curva, upload_id, resultado["analise"])
+    return resposta_json(resultado)
+
+@app.post("/bess/classify")
+async def classificar(dados: ParametrosClassificacao):
+    parametros = dados.argumentos()
+    await resolver_upload(parametros)
+    return resposta_json(await executar("classificar_por_horario", parametros))
+
+@app.post("/bess/dimension")
+async def dimensionar(dados: ParametrosDimensionamento):
+    return resposta_json(await calcular_com_banco(
+        "dimensionar_bess", dados.argumentos(), banco.obter_dimensionamento, banco.gravar_dimensionamento, "dimensionamento_id",
+    ))
+
+@app.post("/bess/simulate")
+async def simular(dados: ParametrosSimulacao):
+    return resposta_json(await calcular_com_banco(
+        "simular_bess", dados.argumentos(), banco.obter_simulacao, banco.gravar_simulacao, "simulacao_id",
+    ))
+
+@app.get("/bess/estatisticas")
+def estatisticas_calculo():
+    return executor.estatisticas()
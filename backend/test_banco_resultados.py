@@ -0,0 +1,191 @@
+"""
+Testes do banco de resultados (SQLite)
+
+Gravam resultados reais de simular_bess, executados como o backend faz
+(computacao_bess), e conferem a leitura pela mesma chave de parâmetros,
+incluindo a versão dos motores.
+"""
+
+import sqlite3
+
+import pytest
+
+from banco_resultados import BancoResultados, hash_json
+from computacao_bess import (
+    DIRETORIO_MOTORES,
+    DIRETORIO_SERIES,
+    _executar,
+    _iniciar_processo,
+    series_disponiveis,
+    versao_motores,
+)
+
+# Motores no sys.path, como em cada processo do ExecutorMotores
+_iniciar_processo(DIRETORIO_MOTORES)
+
+from casos_sinteticos import TARIFAS, curva_sintetica  # noqa: E402
+import simulador_bess  # noqa: E402
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = BancoResultados(str(tmp_path / "db.sqlite3"), tamanho_pool=2)
+    yield banco
+    banco.fechar()
+
+
+@pytest.fixture(scope="module")
+def simulacao(tmp_path_factory):
+    potencias, timestamps = curva_sintetica(dias=5)
+    chave = {
+        "capacidade_bess_kwh": 400,
+        "potencia_bess_kw": 200,
+        "estrategia_carregamento": "grid-offpeak",
+        "diretorio_series": str(tmp_path_factory.mktemp("series")),
+        **TARIFAS,
+    }
+    resultado = _executar("simular_bess", {"potencias_kw": potencias, "timestamps": timestamps, **chave})
+    assert resultado["sucesso"], resultado.get("erro")
+    chave["versao_motores"] = versao_motores("simular_bess")
+    return chave, resultado
+
+
+def test_upload_reaproveitado_pelo_digest(banco):
+    primeiro = banco.registrar_upload("medicao.xlsx", "abc", linhas=96)
+    repetido = banco.registrar_upload("copia.xlsx", "abc", linhas=96)
+    outro = banco.registrar_upload("outra.xlsx", "def")
+
+    assert repetido == primeiro
+    assert outro != primeiro
+    assert banco.obter_upload(digest_curva="abc")["nome_arquivo"] == "medicao.xlsx"
+    assert [upload["id"] for upload in banco.listar_uploads()] == [outro, primeiro]
+
+
+def test_simulacao_lida_pela_mesma_chave(banco, simulacao):
+    chave, resultado = simulacao
+    upload_id = banco.registrar_upload("medicao.xlsx", "abc")
+
+    simulacao_id = banco.gravar_simulacao(upload_id, chave, resultado)
+    guardado = banco.obter_simulacao(upload_id, dict(reversed(list(chave.items()))))
+
+    assert guardado["simulacao_id"] == simulacao_id
+    assert guardado["resumo"] == resultado["resumo"]
+    assert guardado["resultados_diarios"] == resultado["resultados_diarios"]
+
+    # Outra tarifa, outro tamanho ou outra versão dos motores: nada guardado
+    assert banco.obter_simulacao(upload_id, {**chave, "tarifa_ponta": 2.0}) is None
+    assert banco.obter_simulacao(upload_id, {**chave, "potencia_bess_kw": 250}) is None
+    versao_antiga = {**chave["versao_motores"], "simulador_bess": "0" * 16}
+    assert banco.obter_simulacao(upload_id, {**chave, "versao_motores": versao_antiga}) is None
+
+
+def test_simulacao_sem_series_deixa_de_valer(banco, simulacao, tmp_path):
+    chave, resultado = simulacao
+    upload_id = banco.registrar_upload("medicao.xlsx", "abc")
+    banco.gravar_simulacao(upload_id, chave, resultado)
+    guardado = banco.obter_simulacao(upload_id, chave)
+    diretorio = chave["diretorio_series"]
+
+    assert guardado["series"] == resultado["series"]
+    assert series_disponiveis(guardado, diretorio)
+    assert series_disponiveis({k: v for k, v in guardado.items() if k != "series"}, diretorio)
+
+    # Removidas (ex.: limitar_series): o resultado guardado é tratado como ausente
+    copia = tmp_path / "series"
+    copia.mkdir()
+    assert not series_disponiveis(guardado, str(copia))
+    assert not series_disponiveis({**guardado, "series": {"id": "../db"}}, diretorio)
+    # Sem diretorio_series, a mesma pasta padrão do simulador
+    assert DIRETORIO_SERIES == simulador_bess.DIRETORIO_SERIES
+
+
+def test_resumo_curva_preenche_as_colunas(banco):
+    potencias, timestamps = curva_sintetica(dias=3)
+    analise = _executar("analisar_curva_carga", {"potencias": potencias, "timestamps": timestamps})["analise"]
+    upload_id = banco.registrar_upload("medicao.xlsx", "abc")
+
+    banco.gravar_resumo_curva(upload_id, analise)
+
+    with banco.pool.conexao() as conexao:
+        linha = conexao.execute("SELECT * FROM resumos_curva WHERE upload_id = ?", (upload_id,)).fetchone()
+    assert linha["demanda_maxima_kw"] == analise["potencia_maxima"] == max(potencias)
+    assert linha["demanda_media_kw"] == analise["potencia_media"]
+    assert linha["demanda_minima_kw"] == analise["potencia_minima"] == min(potencias)
+    assert banco.obter_resumo_curva(upload_id)["percentis"] == analise["percentis"]
+
+
+def test_banco_da_versao_1_recupera_as_colunas_do_resumo(tmp_path):
+    caminho = str(tmp_path / "db.sqlite3")
+    banco = BancoResultados(caminho, tamanho_pool=1)
+    upload_id = banco.registrar_upload("medicao.xlsx", "abc")
+    banco.gravar_resumo_curva(upload_id, {"potencia_maxima": 900.0, "potencia_media": 450.0, "potencia_minima": 80.0})
+    banco.fechar()
+
+    # Como a versão 1 gravava: colunas vazias, análise só no JSON
+    conexao = sqlite3.connect(caminho)
+    conexao.execute("UPDATE resumos_curva SET demanda_maxima_kw = NULL, demanda_media_kw = NULL, demanda_minima_kw = NULL")
+    conexao.execute("PRAGMA user_version = 1")
+    conexao.commit()
+    conexao.close()
+
+    banco = BancoResultados(caminho, tamanho_pool=1)
+    with banco.pool.conexao() as conexao:
+        linha = conexao.execute("SELECT * FROM resumos_curva").fetchone()
+        versao = conexao.execute("PRAGMA user_version").fetchone()[0]
+    banco.fechar()
+
+    assert (linha["demanda_maxima_kw"], linha["demanda_media_kw"], linha["demanda_minima_kw"]) == (900, 450, 80)
+    assert versao == 2
+
+
+def test_regravar_substitui_os_dias(banco, simulacao):
+    chave, resultado = simulacao
+    upload_id = banco.registrar_upload("medicao.xlsx", "abc")
+
+    banco.gravar_simulacao(upload_id, chave, resultado)
+    simulacao_id = banco.gravar_simulacao(upload_id, chave, resultado)
+
+    assert len(banco.obter_diarios(simulacao_id)) == len(resultado["resultados_diarios"])
+    historico = banco.historico_simulacoes(upload_id)
+    assert [linha["id"] for linha in historico] == [simulacao_id]
+    assert historico[0]["economia_anual_estimada_reais"] == resultado["resumo"]["economia_anual_estimada_reais"]
+
+
+def test_diarios_por_intervalo_de_datas(banco, simulacao):
+    chave, resultado = simulacao
+    simulacao_id = banco.gravar_simulacao(banco.registrar_upload("medicao.xlsx", "abc"), chave, resultado)
+
+    # Datas gravadas com hora: o último dia entra inteiro
+    dias = banco.obter_diarios(simulacao_id, data_inicio="2024-03-05", data_fim="2024-03-07")
+
+    assert [dia["data"][:10] for dia in dias] == ["2024-03-05", "2024-03-06", "2024-03-07"]
+
+
+def test_historico_filtrado_por_tarifa_e_tamanho(banco, simulacao):
+    chave, resultado = simulacao
+    upload_id = banco.registrar_upload("medicao.xlsx", "abc")
+    banco.gravar_simulacao(upload_id, chave, resultado)
+    maior = banco.gravar_simulacao(upload_id, {**chave, "capacidade_bess_kwh": 800}, resultado)
+    banco.gravar_simulacao(upload_id, {**chave, "tarifa_ponta": 2.5}, resultado)
+
+    tarifa = hash_json({campo: chave[campo] for campo in TARIFAS})
+
+    assert len(banco.historico_simulacoes(upload_id)) == 3
+    assert len(banco.historico_simulacoes(upload_id, hash_tarifa=tarifa)) == 2
+    assert [linha["id"] for linha in banco.historico_simulacoes(upload_id, tarifa, 800)] == [maior]
+
+
+def test_dimensionamento_lido_pela_mesma_chave(banco):
+    upload_id = banco.registrar_upload("medicao.xlsx", "abc")
+    chave = {"tarifa_ponta": 1.9, "custo_kwh_reais": 1200, "versao_motores": {"dimensionador_bess": "1" * 16}}
+    resultado = {
+        "sucesso": True,
+        "dimensionamento": {"capacidade_bess_kwh": 500, "potencia_bess_kw": 250},
+        "payback": {"payback_anos": None, "vpl_reais": -10.0},
+    }
+
+    dimensionamento_id = banco.gravar_dimensionamento(upload_id, chave, resultado)
+
+    assert banco.obter_dimensionamento(upload_id, chave) == {**resultado, "dimensionamento_id": dimensionamento_id}
+    assert banco.obter_dimensionamento(upload_id, {**chave, "custo_kwh_reais": 1300}) is None
+    assert banco.historico_dimensionamentos(upload_id, capacidade_kwh=500)[0]["payback_anos"] is None
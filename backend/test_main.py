@@ -0,0 +1,181 @@
+"""
+Testes dos endpoints de cálculo do backend
+
+Sobem o app com TestClient (startup real: banco SQLite e pool de
+processos dos motores) e percorrem o fluxo parse -> análise ->
+classificação -> dimensionamento -> simulação pelo upload_id, além da
+validação dos parâmetros, da fila cheia e da recriação do pool.
+"""
+
+import asyncio
+import io
+import os
+from concurrent.futures import wait
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from computacao_bess import DIRETORIO_MOTORES, DIRETORIO_SERIES, ExecutorMotores, _iniciar_processo
+
+# Motores no sys.path, como em cada processo do ExecutorMotores
+_iniciar_processo(DIRETORIO_MOTORES)
+
+from casos_sinteticos import TARIFAS, curva_sintetica  # noqa: E402
+
+SIMULACAO = {"capacidade_bess_kwh": 400, "potencia_bess_kw": 200, "estrategia_carregamento": "grid-offpeak", **TARIFAS}
+
+
+@pytest.fixture(scope="module")
+def cliente(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("backend")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(main, "DB_PATH", str(pasta / "db.sqlite3"))
+        patch.setattr(main, "UPLOADS_DIR", str(pasta / "uploads"))
+        patch.setattr(main, "COMPUTE_WORKERS", 1)
+        with TestClient(main.app) as cliente:
+            yield cliente
+
+
+@pytest.fixture(scope="module")
+def upload(cliente):
+    potencias, timestamps = curva_sintetica(dias=7)
+    textos = pd.to_datetime(timestamps).strftime("%d/%m/%Y %H:%M:%S").tolist()
+    planilha = io.BytesIO()
+    pd.DataFrame({"Time": textos, "Potência Ativa (kW)": potencias}).to_excel(planilha, index=False)
+
+    resposta = cliente.post("/bess/parse", files={"arquivo": ("medicao.xlsx", planilha.getvalue())})
+
+    assert resposta.status_code == 200
+    resultado = resposta.json()
+    assert resultado["sucesso"], resultado.get("erro")
+    assert resultado["dados"]["total_pontos"] == len(potencias)
+    return resultado["upload_id"], potencias, timestamps
+
+
+def test_parse_registra_o_upload_pelo_conteudo(cliente, upload):
+    upload_id, potencias, _ = upload
+
+    registrado = cliente.get(f"/uploads/{upload_id}").json()
+
+    assert registrado["linhas"] == len(potencias)
+    assert os.path.exists(main.caminho_curva(registrado["digest_curva"]))
+
+
+def test_analise_pelo_upload_e_depois_do_banco(cliente, upload):
+    upload_id, potencias, timestamps = upload
+
+    primeira = cliente.post("/bess/analyze", json={"upload_id": upload_id}).json()
+    segunda = cliente.post("/bess/analyze", json={"upload_id": upload_id}).json()
+    pela_curva = cliente.post("/bess/analyze", json={"potencias": potencias, "timestamps": timestamps}).json()
+
+    assert primeira["sucesso"] and "banco" not in primeira
+    assert segunda["banco"]
+    assert segunda["analise"]["potencia_maxima"] == primeira["analise"]["potencia_maxima"] == max(potencias)
+    assert pela_curva["analise"]["percentis"] == primeira["analise"]["percentis"]
+
+
+def test_classificacao_com_feriados(cliente, upload):
+    upload_id = upload[0]
+
+    sem_feriado = cliente.post("/bess/classify", json={"upload_id": upload_id}).json()
+    com_feriado = cliente.post("/bess/classify", json={"upload_id": upload_id, "feriados": ["2024-03-06"]}).json()
+
+    assert sem_feriado["sucesso"] and com_feriado["sucesso"]
+    pontos_ponta = sem_feriado["classificacao"]["ponta"]["pontos"]
+    assert com_feriado["classificacao"]["ponta"]["pontos"] == pontos_ponta - 12
+    assert pontos_ponta == 5 * 12
+
+
+def test_dimensionamento_guardado_no_banco(cliente, upload):
+    parametros = {"upload_id": upload[0], "estrategia_carregamento": "solar", **TARIFAS}
+
+    primeiro = cliente.post("/bess/dimension", json=parametros).json()
+    segundo = cliente.post("/bess/dimension", json=parametros).json()
+
+    assert primeiro["sucesso"], primeiro.get("erro")
+    assert segundo["banco"]
+    assert segundo["dimensionamento_id"] == primeiro["dimensionamento_id"]
+    assert segundo["dimensionamento"] == primeiro["dimensionamento"]
+
+
+def test_simulacao_recalculada_sem_as_series(cliente, upload):
+    parametros = {"upload_id": upload[0], **SIMULACAO}
+
+    primeira = cliente.post("/bess/simulate", json=parametros).json()
+    segunda = cliente.post("/bess/simulate", json=parametros).json()
+
+    assert primeira["sucesso"], primeira.get("erro")
+    assert segunda["banco"]
+    assert segunda["resumo"] == primeira["resumo"]
+    assert len(segunda["resultados_diarios"]) == 7
+
+    # Séries removidas (limitar_series): o banco não responde e a simulação é regravada
+    os.remove(os.path.join(DIRETORIO_SERIES, f"{primeira['series']['id']}.npz"))
+    terceira = cliente.post("/bess/simulate", json=parametros).json()
+
+    assert "banco" not in terceira
+    assert terceira["resumo"] == primeira["resumo"]
+    assert os.path.exists(os.path.join(DIRETORIO_SERIES, f"{terceira['series']['id']}.npz"))
+    assert cliente.post("/bess/simulate", json=parametros).json()["banco"]
+
+
+@pytest.mark.parametrize("parametros", [
+    {"diretorio_series": "/tmp"},
+    {"arquivo_curva": "/etc/passwd"},
+    {"premissas_financeiras": {"taxa_juros": 0.1}},
+    {"estrategia_carregamento": "manual"},
+    {"potencia_bess_kw": 0},
+])
+def test_parametros_fora_da_lista_rejeitados(cliente, upload, parametros):
+    resposta = cliente.post("/bess/simulate", json={"upload_id": upload[0], **SIMULACAO, **parametros})
+
+    assert resposta.status_code == 422
+
+
+def test_curva_e_upload_juntos_rejeitados(cliente, upload):
+    _, potencias, timestamps = upload
+
+    ambos = cliente.post("/bess/analyze", json={"upload_id": upload[0], "potencias": potencias, "timestamps": timestamps})
+    nenhum = cliente.post("/bess/analyze", json={})
+
+    assert ambos.status_code == nenhum.status_code == 422
+
+
+def test_fila_cheia_responde_503(cliente, monkeypatch):
+    lotado = ExecutorMotores(processos=1, max_em_espera=0)
+    monkeypatch.setattr(main, "executor", lotado)
+    try:
+        resposta = cliente.post("/bess/analyze", json={"potencias": [1.0, 2.0], "timestamps": ["2024-03-04T00:00", "2024-03-04T00:15"]})
+    finally:
+        lotado.encerrar()
+
+    assert resposta.status_code == 503
+    assert resposta.headers["Retry-After"] == "5"
+
+
+def test_pool_quebrado_e_recriado():
+    potencias, timestamps = curva_sintetica(dias=1)
+    parametros = {"potencias": potencias, "timestamps": timestamps}
+    executor = ExecutorMotores(processos=1)
+    quebrado = executor._executor
+
+    # Um processo do pool morre (ex.: falta de memória)
+    morte = quebrado.submit(os._exit, 1)
+    wait([morte])
+
+    async def executar_duas_vezes():
+        falha = await executor.executar("analisar_curva_carga", dict(parametros))
+        return falha, await executor.executar("analisar_curva_carga", dict(parametros))
+
+    try:
+        falha, depois = asyncio.run(executar_duas_vezes())
+    finally:
+        executor.encerrar()
+
+    assert not falha["sucesso"]
+    assert "encerrado" in falha["erro"]
+    assert executor._executor is not quebrado
+    assert depois["sucesso"], depois.get("erro")
+    assert executor.estatisticas()["em_execucao"] == 0
@@ -245,12 +245,12 @@ export default function DimensionadorComponent({
                   </p>
                 </div>
                 <div>
-                  <div className="text-sm text-green-700 mb-1">ROI (10 anos)</div>
+                  <div className="text-sm text-green-700 mb-1">ROI ({resultado.payback?.anos_analise ?? 10} anos)</div>
                   <div className="text-2xl font-bold text-green-900">
-                    {resultado.payback?.roi_10anos_percent}%
+                    {resultado.payback?.roi_percent}%
                   </div>
                   <p className="text-xs text-green-700 mt-1">
-                    Lucro: R$ {resultado.payback?.lucro_10anos_reais?.toLocaleString('pt-BR')}
+                    Lucro: R$ {resultado.payback?.lucro_reais?.toLocaleString('pt-BR')}
                   </p>
                 </div>
               </div>
@@ -5,6 +5,7 @@ import net from "net";
 import { createExpressMiddleware } from "@trpc/server/adapters/express";
 // OAuth removido - sem autenticação
 import { appRouter } from "../routers";
+import { registerJobEventsRoute } from "../pythonJobs";
 import { createContext } from "./context";
 import { serveStatic, setupVite } from "./vite";
 
@@ -42,6 +43,8 @@ async function startServer() {
       createContext,
     })
   );
+  // Progresso dos jobs Python (server-sent events)
+  registerJobEventsRoute(app);
   // development mode uses Vite, production mode uses static files
   if (process.env.NODE_ENV === "development") {
     await setupVite(app, server);
@@ -47,9 +47,9 @@ function dimensionarBESS(input: DimensionamentoInput) {
   // Payback
   const payback_anos = input.custo_investimento_reais / economia_total_anual;
 
-  // ROI 10 anos
-  const lucro_10anos = economia_total_anual * 10 - input.custo_investimento_reais;
-  const roi_10anos_percent = (lucro_10anos / input.custo_investimento_reais) * 100;
+  // ROI no horizonte de análise (10 anos, como anos_analise padrão)
+  const lucro_reais = economia_total_anual * 10 - input.custo_investimento_reais;
+  const roi_percent = (lucro_reais / input.custo_investimento_reais) * 100;
 
   return {
     potencia_bess_kw: Math.round(potencia_bess_kw * 10) / 10,
@@ -60,7 +60,8 @@ function dimensionarBESS(input: DimensionamentoInput) {
     economia_energia_anual: Math.round(economia_energia_anual),
     economia_total_anual: Math.round(economia_total_anual),
     payback_anos: Math.round(payback_anos * 10) / 10,
-    roi_10anos_percent: Math.round(roi_10anos_percent * 10) / 10,
+    lucro_reais: Math.round(lucro_reais * 100) / 100,
+    roi_percent: Math.round(roi_percent * 10) / 10,
     viavel: payback_anos <= 10,
   };
 }
@@ -122,7 +123,8 @@ describe("Dimensionador de BESS", () => {
   it("deve calcular ROI positivo em 10 anos", () => {
     const resultado = dimensionarBESS(inputPadrao);
 
-    expect(resultado.roi_10anos_percent).toBeGreaterThan(100);
+    expect(resultado.roi_percent).toBeGreaterThan(100);
+    expect(resultado.lucro_reais).toBeGreaterThan(inputPadrao.custo_investimento_reais);
   });
 
   it("deve validar cenário com redução maior", () => {
@@ -0,0 +1,388 @@
+"""
+MÓDULO: Benchmarks dos caminhos críticos
+
+Mede parser, análise, classificação tarifária, dimensionamento e
+simulação em curvas de 1 dia, 30 dias, 1 ano e 5 anos, horárias e de
+15 minutos, geradas com o gerador de casos de teste (semente fixa).
+
+Cada caso roda em um processo novo (spawn), para que o pico de memória
+(RSS) medido seja só dele:
+- tempo: mínimo e mediana de N repetições, sem caches aquecidos
+- rss_pico_mb: pico de memória residente do processo
+- alocacao_pico_mb: pico de memória alocada por Python/NumPy (tracemalloc,
+  em uma execução separada para não distorcer o tempo)
+
+Os resultados são acumulados em um histórico JSON. Um caso regrediu
+quando a mediana (ou o pico de alocação) passa da referência — mediana
+das últimas execuções do histórico — por mais que o limiar.
+
+Uso:
+    python benchmark_bess.py                     # roda tudo e grava no histórico
+    python benchmark_bess.py --sizes 1d 30d --targets simular_periodo_completo
+    python benchmark_bess.py --threshold 0.3     # sai com código 1 se regredir
+"""
+
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+# Tamanhos de curva: rótulo -> dias
+TAMANHOS = {
+    "1d": 1,
+    "30d": 30,
+    "1a": 365,
+    "5a": 1825,
+}
+
+# Intervalos de medição (minutos)
+INTERVALOS = (60, 15)
+
+# Caminhos medidos
+ALVOS = (
+    "parsear_arquivo_excel",
+    "analisar_curva_carga",
+    "classificar_por_horario",
+    "dimensionar",
+    "simular_periodo_completo",
+)
+
+# Parâmetros fixos das entradas e do BESS
+SEMENTE = 2024
+DEMANDA_CONTRATADA_KW = 500
+CAPACIDADE_BESS_KWH = 300
+POTENCIA_BESS_KW = 100
+CUSTO_INVESTIMENTO_REAIS = 450_000
+TARIFAS = {"ponta": 1.71, "intermediaria": 1.12, "fora_ponta": 0.72, "demanda": 50}
+
+LIMIAR_PADRAO = 0.20
+EXECUCOES_REFERENCIA = 5
+
+# Diferenças abaixo destes valores são ruído de medição
+RUIDO_TEMPO_S = 0.005
+RUIDO_ALOCACAO_MB = 1.0
+
+HISTORICO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "historico_benchmarks.json")
+PASTA_ENTRADAS_PADRAO = os.path.join(tempfile.gettempdir(), "bess-benchmarks")
+
+
+# ============================================================================
+# ENTRADAS
+# ============================================================================
+
+def preparar_entradas(pasta: str, dias: int, intervalo_minutos: int) -> Dict[str, str]:
+    """
+    Gera (uma vez) a curva de um tamanho em formato colunar e Excel.
+
+    Args:
+        pasta: Pasta onde as entradas ficam guardadas entre execuções
+        dias: Dias da curva
+        intervalo_minutos: Intervalo entre medições
+
+    Returns:
+        Dict com os caminhos 'curva' (.bcurva) e 'excel' (.xlsx ou None)
+    """
+    from curva_colunar import salvar_curva_colunar
+    from gerador_casos_teste import EXCEL_MAX_ROWS, gerar_arquivo_excel, gerar_curvas_carga
+
+    os.makedirs(pasta, exist_ok=True)
+    base = os.path.join(pasta, f"curva_{dias}d_{intervalo_minutos}min")
+    caminhos = {"curva": base + ".bcurva", "excel": base + ".xlsx"}
+
+    pontos = dias * 24 * 60 // intervalo_minutos
+    if pontos + 1 > EXCEL_MAX_ROWS:
+        caminhos["excel"] = None
+
+    if all(c is None or os.path.exists(c) for c in caminhos.values()):
+        return caminhos
+
+    timestamps, curvas = gerar_curvas_carga(
+        DEMANDA_CONTRATADA_KW,
+        "moderado",
+        dias,
+        datetime(2024, 1, 1),
+        intervalo_minutos=intervalo_minutos,
+        perfil_semanal="industrial",
+        amplitude_sazonal=0.1,
+        rng=np.random.default_rng(SEMENTE),
+    )
+    salvar_curva_colunar(caminhos["curva"], timestamps, curvas[0])
+    if caminhos["excel"]:
+        gerar_arquivo_excel(timestamps, curvas[0], "Benchmark Industrial LTDA", caminhos["excel"])
+    return caminhos
+
+
+def _montar_alvo(alvo: str, entradas: Dict[str, str]) -> Callable[[], Dict]:
+    """
+    Carrega a curva como a API a recebe (listas JSON) e devolve a chamada medida.
+    """
+    from curva_colunar import carregar_curva_colunar
+    from dimensionador_bess import DimensionadorBESS
+    from parser_excel import analisar_curva_carga, classificar_por_horario, parsear_arquivo_excel
+    from simulador_bess import SimuladorBESS
+
+    curva = carregar_curva_colunar(entradas["curva"])
+    potencias = np.asarray(curva.potencias).tolist()
+    timestamps = np.datetime_as_string(curva.timestamps).tolist()
+
+    if alvo == "parsear_arquivo_excel":
+        if not entradas["excel"]:
+            raise ValueError("Curva não cabe em uma planilha Excel")
+        return lambda: parsear_arquivo_excel(entradas["excel"])
+    if alvo == "analisar_curva_carga":
+        return lambda: analisar_curva_carga(potencias, timestamps)
+    if alvo == "classificar_por_horario":
+        return lambda: classificar_por_horario(potencias, timestamps)
+    if alvo == "dimensionar":
+        return lambda: DimensionadorBESS(
+            potencias, timestamps,
+            tarifa_ponta=TARIFAS["ponta"],
+            tarifa_fora_ponta=TARIFAS["fora_ponta"],
+            cobranca_demanda=TARIFAS["demanda"],
+            tarifa_intermediaria=TARIFAS["intermediaria"],
+        ).dimensionar(reducao_demanda_percent=20, custo_investimento_reais=CUSTO_INVESTIMENTO_REAIS)
+    if alvo == "simular_periodo_completo":
+        return lambda: SimuladorBESS(
+            potencias, timestamps,
+            CAPACIDADE_BESS_KWH, POTENCIA_BESS_KW, "grid-offpeak",
+            TARIFAS["ponta"], TARIFAS["intermediaria"], TARIFAS["fora_ponta"],
+            cobranca_demanda_reais_kw_mes=TARIFAS["demanda"],
+        ).simular_periodo_completo()
+    raise ValueError(f"Alvo desconhecido: {alvo}")
+
+
+# ============================================================================
+# MEDIÇÃO
+# ============================================================================
+
+def _rss_pico_mb() -> float:
+    # ru_maxrss: KiB no Linux, bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if platform.system() == "Darwin" else pico / 1024
+
+
+def _executar(chamada: Callable[[], Dict]) -> None:
+    from calendario_tarifario import _calendario_compartilhado
+
+    # Sem classificações de execuções anteriores
+    _calendario_compartilhado.cache_clear()
+    resultado = chamada()
+    if isinstance(resultado, dict) and resultado.get("sucesso") is False:
+        raise RuntimeError(resultado.get("erro"))
+
+
+def medir_caso(alvo: str, entradas: Dict[str, str], repeticoes: int) -> Dict:
+    """
+    Mede um alvo no processo atual.
+
+    Returns:
+        Dict com tempos (s), RSS e pico de alocação (MB)
+    """
+    chamada = _montar_alvo(alvo, entradas)
+    rss_base = _rss_pico_mb()
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        _executar(chamada)
+        tempos.append(time.perf_counter() - inicio)
+    rss_pico = _rss_pico_mb()
+
+    tracemalloc.start()
+    _executar(chamada)
+    _, alocacao_pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "tempo_min_s": round(min(tempos), 5),
+        "tempo_mediano_s": round(float(np.median(tempos)), 5),
+        "repeticoes": repeticoes,
+        "rss_base_mb": round(rss_base, 1),
+        "rss_pico_mb": round(rss_pico, 1),
+        "alocacao_pico_mb": round(alocacao_pico / (1024 * 1024), 2),
+    }
+
+
+def _medir_em_processo(conexao, alvo: str, entradas: Dict[str, str], repeticoes: int) -> None:
+    try:
+        conexao.send({"sucesso": True, **medir_caso(alvo, entradas, repeticoes)})
+    except Exception as e:
+        conexao.send({"sucesso": False, "erro": str(e)})
+    finally:
+        conexao.close()
+
+
+def medir_isolado(alvo: str, entradas: Dict[str, str], repeticoes: int) -> Dict:
+    """
+    Mede um alvo em um processo novo (RSS sem resíduos de outros casos).
+    """
+    contexto = mp.get_context("spawn")
+    receptor, emissor = contexto.Pipe(duplex=False)
+    processo = contexto.Process(target=_medir_em_processo, args=(emissor, alvo, entradas, repeticoes))
+    processo.start()
+    emissor.close()
+    try:
+        resultado = receptor.recv()
+    except EOFError:
+        resultado = {"sucesso": False, "erro": f"Processo encerrado (código {processo.exitcode})"}
+    processo.join()
+    return resultado
+
+
+# ============================================================================
+# HISTÓRICO E REGRESSÕES
+# ============================================================================
+
+def carregar_historico(caminho: str) -> Dict:
+    """
+    Lê o histórico de execuções (vazio se o arquivo não existir).
+    """
+    if not os.path.exists(caminho):
+        return {"execucoes": []}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def gravar_historico(caminho: str, historico: Dict) -> None:
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(historico, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def verificar_regressoes(
+    resultados: Dict[str, Dict],
+    historico: Dict,
+    limiar: float = LIMIAR_PADRAO,
+    execucoes_referencia: int = EXECUCOES_REFERENCIA,
+) -> List[Dict]:
+    """
+    Compara os resultados com a referência do histórico.
+
+    A referência de cada caso é a mediana das últimas execuções em que
+    ele aparece. Diferenças absolutas pequenas (ruído) são ignoradas.
+
+    Args:
+        resultados: Resultados atuais por caso
+        historico: Histórico de execuções anteriores
+        limiar: Piora relativa tolerada (0.2 = 20%)
+        execucoes_referencia: Quantas execuções anteriores formam a referência
+
+    Returns:
+        Lista de regressões (caso, métrica, referência, atual, variação)
+    """
+    regressoes = []
+    metricas = (("tempo_mediano_s", RUIDO_TEMPO_S), ("alocacao_pico_mb", RUIDO_ALOCACAO_MB))
+
+    for caso, atual in resultados.items():
+        if not atual.get("sucesso"):
+            continue
+        anteriores = [
+            execucao["resultados"][caso]
+            for execucao in historico["execucoes"]
+            if execucao["resultados"].get(caso, {}).get("sucesso")
+        ][-execucoes_referencia:]
+        if not anteriores:
+            continue
+
+        for metrica, ruido in metricas:
+            referencia = float(np.median([a[metrica] for a in anteriores]))
+            if atual[metrica] > referencia * (1 + limiar) and atual[metrica] - referencia > ruido:
+                regressoes.append({
+                    "caso": caso,
+                    "metrica": metrica,
+                    "referencia": round(referencia, 5),
+                    "atual": atual[metrica],
+                    "variacao_percent": round((atual[metrica] / referencia - 1) * 100, 1),
+                })
+
+    return regressoes
+
+
+def executar_benchmarks(
+    alvos: List[str] = ALVOS,
+    tamanhos: List[str] = tuple(TAMANHOS),
+    intervalos: List[int] = INTERVALOS,
+    repeticoes: int = 3,
+    pasta_entradas: str = PASTA_ENTRADAS_PADRAO,
+) -> Dict[str, Dict]:
+    """
+    Roda a matriz alvo x tamanho x intervalo.
+
+    Returns:
+        Dict caso -> resultado; o caso é 'alvo/tamanho/intervalo'
+    """
+    resultados = {}
+    for rotulo in tamanhos:
+        for intervalo in intervalos:
+            entradas = preparar_entradas(pasta_entradas, TAMANHOS[rotulo], intervalo)
+            for alvo in alvos:
+                if alvo == "parsear_arquivo_excel" and not entradas["excel"]:
+                    continue
+                resultados[f"{alvo}/{rotulo}/{intervalo}min"] = medir_isolado(alvo, entradas, repeticoes)
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmarks de parser, dimensionador e simulador")
+    parser.add_argument("--targets", nargs="+", default=list(ALVOS), choices=ALVOS)
+    parser.add_argument("--sizes", nargs="+", default=list(TAMANHOS), choices=list(TAMANHOS))
+    parser.add_argument("--intervals", type=int, nargs="+", default=list(INTERVALOS), help="Minutos")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições por caso")
+    parser.add_argument("--history", default=HISTORICO_PADRAO, help="Histórico JSON")
+    parser.add_argument("--threshold", type=float, default=LIMIAR_PADRAO, help="Piora tolerada (0.2 = 20%%)")
+    parser.add_argument("--baseline-runs", type=int, default=EXECUCOES_REFERENCIA)
+    parser.add_argument("--data-dir", default=PASTA_ENTRADAS_PADRAO, help="Pasta das curvas geradas")
+    parser.add_argument("--no-save", action="store_true", help="Não gravar no histórico")
+
+    args = parser.parse_args()
+
+    resultados = executar_benchmarks(args.targets, args.sizes, args.intervals, args.repeat, args.data_dir)
+
+    historico = carregar_historico(args.history)
+    regressoes = verificar_regressoes(resultados, historico, args.threshold, args.baseline_runs)
+
+    if not args.no_save:
+        historico["execucoes"].append({
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "maquina": platform.node(),
+            "resultados": resultados,
+        })
+        gravar_historico(args.history, historico)
+
+    falhas = {caso: r["erro"] for caso, r in resultados.items() if not r.get("sucesso")}
+    print(json.dumps({
+        "sucesso": not regressoes and not falhas,
+        "resultados": resultados,
+        "regressoes": regressoes,
+        "falhas": falhas,
+    }, indent=2, ensure_ascii=False))
+
+    sys.exit(1 if regressoes or falhas else 0)
@@ -0,0 +1,376 @@
+"""
+MÓDULO: Cache de resultados endereçado por conteúdo
+
+Evita refazer simulações e dimensionamentos idênticos. A chave é o hash de:
+- digest da curva de carga (listas JSON ou arquivo colunar)
+- parâmetros da tarefa (tarifas, tamanho do BESS, estratégia...)
+- versão do código que calcula (hash do módulo da tarefa e de todos os
+  módulos locais que ele importa, direta ou indiretamente)
+
+Dois níveis:
+- Memória: LRU com número máximo de entradas
+- Disco: um arquivo JSON por chave, com remoção dos menos usados ao
+  ultrapassar o tamanho máximo
+"""
+
+import ast
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+# Tarefas cujo resultado depende só da curva e dos parâmetros
+TAREFAS_CACHEAVEIS = {
+    "analisar_curva_carga": "parser_excel",
+    "classificar_por_horario": "parser_excel",
+    "dimensionar_bess": "dimensionador_bess",
+    "simular_bess": "simulador_bess",
+    "varrer_bess": "simulador_bess",
+}
+
+# Parâmetros que descrevem a curva (entram na chave pelo digest)
+PARAMETROS_CURVA = ("potencias_kw", "potencias", "timestamps", "arquivo_curva")
+
+# Parâmetros com efeito fora do resultado: a chamada sempre executa
+# (a simulação incremental precisa gravar o checkpoint)
+PARAMETROS_SEM_CACHE = ("caminho_checkpoint",)
+
+# Diretório dos módulos de cálculo (imports locais entram na versão)
+DIRETORIO_MODULOS = Path(__file__).resolve().parent
+
+_versoes_modulos: Dict[str, str] = {}
+_dependencias_modulos: Dict[str, Tuple[str, ...]] = {}
+_digests_arquivos: Dict[tuple, str] = {}
+
+
+def cacheavel(tarefa: str, parametros: Dict) -> bool:
+    """
+    Indica se o resultado de uma chamada pode vir do cache.
+
+    Args:
+        tarefa: Nome da tarefa
+        parametros: Parâmetros da tarefa
+
+    Returns:
+        False para tarefas fora de TAREFAS_CACHEAVEIS ou com algum
+        parâmetro de PARAMETROS_SEM_CACHE
+    """
+    if tarefa not in TAREFAS_CACHEAVEIS:
+        return False
+    return not any((parametros or {}).get(nome) for nome in PARAMETROS_SEM_CACHE)
+
+
+def versao_modulo(nome_modulo: str) -> str:
+    """
+    Versão de um módulo de cálculo: hash do seu código-fonte.
+
+    Qualquer alteração no módulo invalida as entradas antigas do cache.
+    """
+    if nome_modulo not in _versoes_modulos:
+        # Pelo diretório dos módulos: funciona mesmo fora do sys.path (backend)
+        origem = DIRETORIO_MODULOS / f"{nome_modulo}.py"
+        _versoes_modulos[nome_modulo] = hashlib.sha256(origem.read_bytes()).hexdigest()[:16]
+    return _versoes_modulos[nome_modulo]
+
+
+def _imports_locais(nome_modulo: str) -> set:
+    # Inclui imports dentro de funções (usados para adiar dependências)
+    origem = DIRETORIO_MODULOS / f"{nome_modulo}.py"
+    arvore = ast.parse(origem.read_text(encoding="utf-8"))
+    nomes = set()
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.Import):
+            nomes.update(alias.name.split(".")[0] for alias in no.names)
+        elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+            nomes.add(no.module.split(".")[0])
+    return {nome for nome in nomes if (DIRETORIO_MODULOS / f"{nome}.py").is_file()}
+
+
+def modulos_dependentes(nome_modulo: str) -> Tuple[str, ...]:
+    """
+    Módulo e todos os módulos locais que ele importa, direta ou indiretamente.
+
+    Args:
+        nome_modulo: Nome do módulo de cálculo
+
+    Returns:
+        Nomes dos módulos, em ordem alfabética
+    """
+    if nome_modulo not in _dependencias_modulos:
+        visitados = set()
+        pendentes = [nome_modulo]
+        while pendentes:
+            atual = pendentes.pop()
+            if atual in visitados:
+                continue
+            visitados.add(atual)
+            pendentes.extend(_imports_locais(atual) - visitados)
+        _dependencias_modulos[nome_modulo] = tuple(sorted(visitados))
+    return _dependencias_modulos[nome_modulo]
+
+
+def versao_tarefa(tarefa: str) -> Dict[str, str]:
+    """
+    Versão do código de uma tarefa cacheável: hash de cada módulo envolvido.
+
+    Args:
+        tarefa: Nome da tarefa (chave de TAREFAS_CACHEAVEIS)
+
+    Returns:
+        Dict {módulo: hash do código-fonte}
+    """
+    return {
+        modulo: versao_modulo(modulo)
+        for modulo in modulos_dependentes(TAREFAS_CACHEAVEIS[tarefa])
+    }
+
+
+def _digest_arquivo(caminho: str) -> str:
+    estado = os.stat(caminho)
+    chave = (os.path.abspath(caminho), estado.st_size, estado.st_mtime_ns)
+    if chave not in _digests_arquivos:
+        h = hashlib.sha256()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+        _digests_arquivos[chave] = h.hexdigest()
+    return _digests_arquivos[chave]
+
+
+def digest_curva(parametros: Dict) -> str:
+    """
+    Digest da curva de carga contida nos parâmetros de uma tarefa.
+
+    Args:
+        parametros: Parâmetros da tarefa
+
+    Returns:
+        Hash hexadecimal da curva
+    """
+    if parametros.get("arquivo_curva"):
+        return _digest_arquivo(parametros["arquivo_curva"])
+
+    h = hashlib.sha256()
+    for nome in ("potencias_kw", "potencias", "timestamps"):
+        valor = parametros.get(nome)
+        if valor is None:
+            continue
+        h.update(nome.encode())
+        if isinstance(valor, np.ndarray):
+            h.update(str(valor.dtype).encode())
+            h.update(np.ascontiguousarray(valor).tobytes())
+        else:
+            h.update(json.dumps(valor, separators=(",", ":")).encode())
+    return h.hexdigest()
+
+
+def chave_resultado(tarefa: str, parametros: Dict) -> str:
+    """
+    Chave do cache para uma tarefa.
+
+    Args:
+        tarefa: Nome da tarefa
+        parametros: Parâmetros da tarefa
+
+    Returns:
+        Hash hexadecimal de (curva, parâmetros, versão do código)
+    """
+    demais = {k: v for k, v in parametros.items() if k not in PARAMETROS_CURVA}
+    conteudo = json.dumps(
+        {
+            "tarefa": tarefa,
+            "curva": digest_curva(parametros),
+            "parametros": demais,
+            "versao": versao_tarefa(tarefa),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+class CacheResultados:
+    """
+    Cache de resultados em dois níveis (memória LRU + disco).
+    """
+
+    def __init__(
+        self,
+        diretorio: Optional[str] = None,
+        max_entradas_memoria: int = 256,
+        max_bytes_disco: int = 512 * 1024 * 1024,
+    ):
+        """
+        Inicializa o cache.
+
+        Args:
+            diretorio: Diretório do nível em disco (None desativa o disco)
+            max_entradas_memoria: Entradas mantidas em memória
+            max_bytes_disco: Tamanho máximo do nível em disco (bytes)
+        """
+        self.diretorio = Path(diretorio) if diretorio else None
+        self.max_entradas_memoria = max_entradas_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self._memoria: "OrderedDict[str, Dict]" = OrderedDict()
+        self._trava = threading.Lock()
+        self.contadores = {
+            "acertos_memoria": 0,
+            "acertos_disco": 0,
+            "falhas": 0,
+            "gravacoes": 0,
+            "remocoes_memoria": 0,
+            "remocoes_disco": 0,
+        }
+
+        self._bytes_disco_estimados = 0
+        if self.diretorio:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            self._bytes_disco_estimados = self._bytes_disco()
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / f"{chave}.json"
+
+    def obter(self, chave: str) -> Optional[Dict]:
+        """
+        Busca um resultado, primeiro em memória e depois em disco.
+        """
+        with self._trava:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                self.contadores["acertos_memoria"] += 1
+                return self._memoria[chave]
+
+        if self.diretorio:
+            caminho = self._caminho(chave)
+            try:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    resultado = json.load(f)
+                os.utime(caminho)
+            except (FileNotFoundError, json.JSONDecodeError):
+                resultado = None
+
+            if resultado is not None:
+                with self._trava:
+                    self.contadores["acertos_disco"] += 1
+                self._guardar_memoria(chave, resultado)
+                return resultado
+
+        with self._trava:
+            self.contadores["falhas"] += 1
+        return None
+
+    def gravar(self, chave: str, resultado: Dict) -> None:
+        """
+        Grava um resultado nos dois níveis.
+        """
+        self._guardar_memoria(chave, resultado)
+        with self._trava:
+            self.contadores["gravacoes"] += 1
+
+        if self.diretorio:
+            caminho = self._caminho(chave)
+            temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(resultado, f, ensure_ascii=False)
+            os.replace(temporario, caminho)
+
+            with self._trava:
+                self._bytes_disco_estimados += caminho.stat().st_size
+                excedeu = self._bytes_disco_estimados > self.max_bytes_disco
+            if excedeu:
+                self._limitar_disco()
+
+    def obter_ou_calcular(self, tarefa: str, parametros: Dict, calcular: Callable[[], Dict]) -> Dict:
+        """
+        Retorna o resultado em cache ou calcula e grava (só se sucesso).
+
+        Args:
+            tarefa: Nome da tarefa
+            parametros: Parâmetros da tarefa
+            calcular: Função sem argumentos que produz o resultado
+
+        Returns:
+            Resultado da tarefa
+        """
+        if not cacheavel(tarefa, parametros):
+            return calcular()
+
+        chave = chave_resultado(tarefa, parametros)
+        resultado = self.obter(chave)
+        if resultado is None:
+            resultado = calcular()
+            if resultado.get("sucesso"):
+                self.gravar(chave, resultado)
+        return resultado
+
+    def estatisticas(self) -> Dict:
+        """
+        Contadores de acertos/falhas e ocupação de cada nível.
+        """
+        with self._trava:
+            contadores = dict(self.contadores)
+            entradas_memoria = len(self._memoria)
+            bytes_disco = self._bytes_disco_estimados
+
+        consultas = contadores["acertos_memoria"] + contadores["acertos_disco"] + contadores["falhas"]
+        acertos = contadores["acertos_memoria"] + contadores["acertos_disco"]
+
+        return {
+            **contadores,
+            "consultas": consultas,
+            "taxa_acerto": round(acertos / consultas, 4) if consultas else 0,
+            "entradas_memoria": entradas_memoria,
+            # Estimativa mantida por gravar/_limitar_disco (sem varrer o diretório)
+            "bytes_disco": bytes_disco,
+        }
+
+    def _guardar_memoria(self, chave: str, resultado: Dict) -> None:
+        with self._trava:
+            self._memoria[chave] = resultado
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_entradas_memoria:
+                self._memoria.popitem(last=False)
+                self.contadores["remocoes_memoria"] += 1
+
+    def _bytes_disco(self) -> int:
+        if not self.diretorio:
+            return 0
+        return sum(p.stat().st_size for p in self.diretorio.glob("*.json"))
+
+    def _limitar_disco(self) -> None:
+        arquivos = []
+        total = 0
+        for caminho in self.diretorio.glob("*.json"):
+            try:
+                estado = caminho.stat()
+            except FileNotFoundError:
+                continue
+            arquivos.append((estado.st_mtime, estado.st_size, caminho))
+            total += estado.st_size
+
+        if total > self.max_bytes_disco:
+            total = self._remover_antigos(arquivos, total)
+
+        with self._trava:
+            self._bytes_disco_estimados = total
+
+    def _remover_antigos(self, arquivos, total: int) -> int:
+        # Remove os acessados há mais tempo (mtime é atualizado a cada acerto)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                caminho.unlink()
+            except FileNotFoundError:
+                continue
+            total -= tamanho
+            with self._trava:
+                self.contadores["remocoes_disco"] += 1
+        return total
@@ -0,0 +1,216 @@
+"""
+MÓDULO: Calendário tarifário
+
+Classificação única de postos tarifários (ponta, intermediária, fora de
+ponta) usada pelo simulador, pelo dimensionador e pelo parser.
+
+Em vez de calcular weekday() e hour amostra por amostra, o calendário
+produz de uma vez um array uint8 com a classe de cada instante:
+- 0: fora de ponta
+- 1: intermediária
+- 2: ponta
+
+Ponta e intermediária só valem em dias úteis (seg-sex por padrão, sem
+feriados). Os arrays de classes são guardados por série, então várias
+consultas sobre a mesma curva não refazem a classificação.
+"""
+
+import hashlib
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from curva_colunar import para_datetime64
+from metricas import contar, fase
+
+
+CLASSE_FORA_PONTA = 0
+CLASSE_INTERMEDIARIA = 1
+CLASSE_PONTA = 2
+NOMES_CLASSES = ("fora_ponta", "intermediaria", "ponta")
+
+SEGUNDOS_HORA = 3600
+SEGUNDOS_DIA = 86400
+
+# Máscara de dias úteis no formato de np.busday (seg..dom)
+DIAS_UTEIS_PADRAO = "1111100"
+
+
+class CalendarioTarifario:
+    """
+    Calendário de postos tarifários com janelas e feriados configuráveis.
+    """
+
+    def __init__(
+        self,
+        horario_ponta: Tuple[float, float] = (18, 21),
+        horario_intermediaria: Tuple[float, float] = (17, 22),
+        feriados: Optional[Iterable[Union[str, date]]] = None,
+        dias_uteis: str = DIAS_UTEIS_PADRAO,
+        max_series: int = 8,
+    ):
+        """
+        Inicializa o calendário.
+
+        Args:
+            horario_ponta: (hora_inicio, hora_fim) da ponta; aceita frações (17.5 = 17:30)
+            horario_intermediaria: (hora_inicio, hora_fim) da intermediária
+            feriados: Datas ISO (YYYY-MM-DD) tratadas como dias não úteis
+            dias_uteis: Máscara seg..dom dos dias com ponta (ex.: '1111100')
+            max_series: Séries classificadas mantidas em memória
+        """
+        self.horario_ponta = tuple(horario_ponta)
+        self.horario_intermediaria = tuple(horario_intermediaria)
+        self.feriados = np.array(
+            sorted(str(f)[:10] for f in (feriados or [])), dtype="datetime64[D]"
+        )
+        self.dias_uteis = dias_uteis
+        self.max_series = max_series
+        self._series: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+
+        self._ponta_s = (self.horario_ponta[0] * SEGUNDOS_HORA, self.horario_ponta[1] * SEGUNDOS_HORA)
+        self._intermediaria_s = (
+            self.horario_intermediaria[0] * SEGUNDOS_HORA,
+            self.horario_intermediaria[1] * SEGUNDOS_HORA,
+        )
+
+    def dia_util(self, dias: np.ndarray) -> np.ndarray:
+        """
+        Máscara de dias úteis (com ponta) para um array datetime64[D].
+        """
+        return np.is_busday(dias, weekmask=self.dias_uteis, holidays=self.feriados)
+
+    def janela_ponta(self, segundos_do_dia: np.ndarray) -> np.ndarray:
+        """
+        Máscara dos instantes do dia dentro da janela de ponta (qualquer dia).
+        """
+        return (segundos_do_dia >= self._ponta_s[0]) & (segundos_do_dia < self._ponta_s[1])
+
+    def _classes(self, util: np.ndarray, segundos_do_dia: np.ndarray) -> np.ndarray:
+        ponta = util & self.janela_ponta(segundos_do_dia)
+        intermediaria = (
+            util
+            & (segundos_do_dia >= self._intermediaria_s[0])
+            & (segundos_do_dia < self._intermediaria_s[1])
+        )
+
+        classes = np.zeros(np.broadcast(util, segundos_do_dia).shape, dtype=np.uint8)
+        classes[intermediaria] = CLASSE_INTERMEDIARIA
+        classes[ponta] = CLASSE_PONTA
+        return classes
+
+    def _memorizar(self, chave: tuple, calcular) -> np.ndarray:
+        if chave in self._series:
+            contar("calendario_cache_acertos")
+            self._series.move_to_end(chave)
+            return self._series[chave]
+
+        contar("calendario_cache_falhas")
+        with fase("classificar_tarifas"):
+            classes = calcular()
+        classes.setflags(write=False)
+        self._series[chave] = classes
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+        return classes
+
+    def classificar(self, timestamps: Union[List[str], np.ndarray]) -> np.ndarray:
+        """
+        Classe tarifária de cada instante de uma série.
+
+        Args:
+            timestamps: Timestamps ISO ou array datetime64
+
+        Returns:
+            Array uint8 (n,) com CLASSE_FORA_PONTA, CLASSE_INTERMEDIARIA ou CLASSE_PONTA
+        """
+        instantes = para_datetime64(timestamps)
+        segundos = instantes.astype(np.int64)
+        chave = ("serie", len(segundos), hashlib.blake2b(segundos.tobytes(), digest_size=16).digest())
+
+        def calcular():
+            dias = np.floor_divide(segundos, SEGUNDOS_DIA)
+            util = self.dia_util(dias.astype("datetime64[D]"))
+            return self._classes(util, segundos - dias * SEGUNDOS_DIA)
+
+        return self._memorizar(chave, calcular)
+
+    def classificar_grade(self, datas: List[datetime], passos_por_dia: int, intervalo_s: int) -> np.ndarray:
+        """
+        Classes tarifárias de uma grade (dias x passos do dia).
+
+        Args:
+            datas: Data de cada linha da grade
+            passos_por_dia: Colunas da grade
+            intervalo_s: Duração de cada passo (s)
+
+        Returns:
+            Matriz uint8 (dias x passos)
+        """
+        dias = np.array([d.date() if isinstance(d, datetime) else d for d in datas], dtype="datetime64[D]")
+        chave = ("grade", passos_por_dia, intervalo_s, dias.tobytes())
+
+        def calcular():
+            segundos_do_dia = np.arange(passos_por_dia) * intervalo_s
+            return self._classes(self.dia_util(dias)[:, None], segundos_do_dia[None, :])
+
+        return self._memorizar(chave, calcular)
+
+    def classe_instante(self, instante: datetime) -> int:
+        """
+        Classe tarifária de um único instante.
+        """
+        segundos = instante.hour * SEGUNDOS_HORA + instante.minute * 60 + instante.second
+        util = self.dia_util(np.datetime64(instante.date(), "D"))
+        return int(self._classes(util, np.int64(segundos)))
+
+
+@lru_cache(maxsize=32)
+def _calendario_compartilhado(
+    horario_ponta: Tuple[float, float],
+    horario_intermediaria: Tuple[float, float],
+    feriados: Tuple[str, ...],
+    dias_uteis: str,
+) -> CalendarioTarifario:
+    return CalendarioTarifario(horario_ponta, horario_intermediaria, feriados, dias_uteis)
+
+
+def obter_calendario(
+    horario_ponta: Tuple[float, float] = (18, 21),
+    horario_intermediaria: Tuple[float, float] = (17, 22),
+    feriados: Optional[Iterable[Union[str, date]]] = None,
+    dias_uteis: str = DIAS_UTEIS_PADRAO,
+) -> CalendarioTarifario:
+    """
+    Calendário compartilhado no processo para uma configuração.
+
+    Módulos que usam a mesma configuração recebem a mesma instância e,
+    com ela, as classificações já calculadas para cada série.
+    """
+    return _calendario_compartilhado(
+        tuple(horario_ponta),
+        tuple(horario_intermediaria),
+        tuple(sorted(str(f)[:10] for f in (feriados or []))),
+        dias_uteis,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Classifica instantes por posto tarifário")
+    parser.add_argument("timestamps", nargs="+", help="Timestamps ISO")
+    parser.add_argument("--holiday", action="append", default=[], help="Feriado (YYYY-MM-DD)")
+
+    args = parser.parse_args()
+
+    classes = obter_calendario(feriados=args.holiday).classificar(args.timestamps)
+    print(json.dumps(
+        {ts: NOMES_CLASSES[c] for ts, c in zip(args.timestamps, classes.tolist())},
+        indent=2,
+        ensure_ascii=False,
+    ))
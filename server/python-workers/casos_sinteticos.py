@@ -0,0 +1,33 @@
+"""
+Casos sintéticos compartilhados pelos testes
+
+Curvas de carga e grades diárias pequenas, determinísticas pela semente,
+usadas pelos testes dos motores, do servidor de workers e do backend.
+"""
+
+import numpy as np
+
+
+TARIFAS = dict(tarifa_ponta=1.9, tarifa_intermediaria=1.1, tarifa_fora_ponta=0.55, cobranca_demanda=40)
+
+
+def curva_sintetica(dias=21, intervalo_minutos=15, semente=3):
+    rng = np.random.default_rng(semente)
+    passos = dias * 24 * 60 // intervalo_minutos
+    instantes = np.datetime64("2024-03-04T00:00") + np.arange(passos) * np.timedelta64(intervalo_minutos, "m")
+    horas = (np.arange(passos) * intervalo_minutos / 60) % 24
+    potencias = 400 + 150 * np.sin((horas - 6) / 24 * 2 * np.pi) + 60 * rng.standard_normal(passos)
+    potencias[(horas >= 18) & (horas < 21)] += 250
+    return np.round(potencias, 1).tolist(), np.datetime_as_string(instantes).tolist()
+
+
+def montar_caso(rng, n_dias, passos_por_dia, misto=False):
+    horas = np.arange(passos_por_dia) * 24 / passos_por_dia
+    matriz = 300 + 250 * rng.random((n_dias, passos_por_dia))
+    matriz[:, (horas >= 17) & (horas < 22)] += 200
+    limite_carga = np.where(horas < 6, 80.0 * 24 / passos_por_dia, 0.0)
+    janela_descarga = (horas >= 18) & (horas < 21)
+    if misto:
+        # Carga e descarga no mesmo passo: trecho resolvido pelo laço
+        limite_carga[(horas >= 19) & (horas < 20)] = 10.0
+    return matriz, limite_carga, janela_descarga
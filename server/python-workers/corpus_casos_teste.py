@@ -0,0 +1,353 @@
+"""
+MÓDULO: Corpus de casos de teste
+
+Gera de uma vez uma matriz de casos (estágios x severidades x repetições)
+para testes de regressão e de carga, distribuindo os casos em um pool de
+processos.
+
+Reprodutibilidade: a semente de cada caso é derivada de
+(semente do corpus, estágio, severidade, repetição), então um mesmo caso
+tem sempre o mesmo conteúdo, qualquer que seja o número de processos ou
+o subconjunto da matriz gerado.
+
+Todos os metadados vão para um único manifesto (JSON ou Parquet) na
+pasta do corpus; benchmarks carregam o manifesto em vez de abrir cada
+arquivo.
+"""
+
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from gerador_casos_teste import COMPANY_STAGES, SEVERITY_LEVELS, WEEKLY_PROFILES, gerar_caso_teste
+
+
+VERSAO_MANIFESTO = 1
+
+# Nome do manifesto por formato
+MANIFESTOS = {
+    "json": "manifesto.json",
+    "parquet": "manifesto.parquet",
+}
+
+# Data de início padrão: fixa para que o corpus seja reprodutível
+DATA_INICIO_PADRAO = "2024-01-01"
+
+
+def semente_caso(semente: int, stage: int, severidade: str, repeticao: int) -> int:
+    """
+    Semente de um caso do corpus, derivada da semente do corpus.
+
+    Returns:
+        Inteiro não negativo de 63 bits (cabe em int64 no Parquet)
+    """
+    chave = (stage, list(SEVERITY_LEVELS).index(severidade), repeticao)
+    estado = np.random.SeedSequence(semente, spawn_key=chave).generate_state(1, dtype=np.uint64)
+    return int(estado[0] >> 1)
+
+
+def planejar_corpus(
+    diretorio: str,
+    stages: Iterable[int] = None,
+    severidades: Iterable[str] = None,
+    repeticoes: int = 1,
+    dias: int = 30,
+    data_inicio: str = DATA_INICIO_PADRAO,
+    formato: str = "xlsx",
+    intervalo_minutos: int = 60,
+    perfil_semanal: str = "continuo",
+    amplitude_sazonal: float = 0.0,
+    semente: int = 0,
+) -> List[Dict]:
+    """
+    Lista os casos do corpus como parâmetros de gerar_caso_teste.
+
+    Args:
+        diretorio: Pasta do corpus
+        stages: Estágios a gerar (padrão: todos de COMPANY_STAGES)
+        severidades: Severidades a gerar (padrão: todas de SEVERITY_LEVELS)
+        repeticoes: Casos por combinação estágio x severidade
+        semente: Semente do corpus
+
+    Returns:
+        Lista de dicts de parâmetros, na ordem estágio, severidade, repetição
+    """
+    stages = sorted(stages or COMPANY_STAGES)
+    severidades = list(severidades or SEVERITY_LEVELS)
+
+    for stage in stages:
+        if stage not in COMPANY_STAGES:
+            raise ValueError(f"Estágio inválido: {stage}. Deve ser 1-5.")
+    for severidade in severidades:
+        if severidade not in SEVERITY_LEVELS:
+            raise ValueError(f"Severidade inválida: {severidade}")
+    if perfil_semanal not in WEEKLY_PROFILES:
+        raise ValueError(f"Perfil semanal inválido: {perfil_semanal}")
+    if formato not in ("xlsx", "csv", "parquet"):
+        raise ValueError(f"Formato inválido: {formato}")
+    if repeticoes < 1:
+        raise ValueError(f"Repetições inválido: {repeticoes}")
+
+    casos = []
+    for stage in stages:
+        for severidade in severidades:
+            for repeticao in range(repeticoes):
+                nome_arquivo = f"caso_s{stage}_{severidade}_{repeticao:04d}.{formato}"
+                casos.append({
+                    "stage": stage,
+                    "severidade": severidade,
+                    "dias": dias,
+                    "data_inicio": data_inicio,
+                    "caminho_saida": os.path.join(diretorio, nome_arquivo),
+                    "intervalo_minutos": intervalo_minutos,
+                    "perfil_semanal": perfil_semanal,
+                    "amplitude_sazonal": amplitude_sazonal,
+                    "semente": semente_caso(semente, stage, severidade, repeticao),
+                })
+    return casos
+
+
+def gerar_caso_corpus(parametros: Dict) -> Dict:
+    """
+    Gera um caso do corpus; erros viram um registro com sucesso=False.
+    """
+    try:
+        return gerar_caso_teste(**parametros)
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": str(e),
+            "arquivo": parametros["caminho_saida"],
+            "stage": parametros["stage"],
+            "severidade": parametros["severidade"],
+            "semente": parametros["semente"],
+        }
+
+
+def gravar_manifesto(diretorio: str, casos: List[Dict], parametros: Dict, formato: str = "json") -> str:
+    """
+    Grava o manifesto do corpus.
+
+    Os caminhos dos arquivos são gravados relativos à pasta do corpus,
+    que pode então ser movida inteira.
+
+    Args:
+        diretorio: Pasta do corpus
+        casos: Metadados devolvidos por gerar_caso_teste
+        parametros: Parâmetros do corpus (gravados no cabeçalho)
+        formato: 'json' ou 'parquet' (requer pyarrow)
+
+    Returns:
+        Caminho do manifesto
+    """
+    if formato not in MANIFESTOS:
+        raise ValueError(f"Formato de manifesto inválido: {formato}")
+
+    registros = [
+        {**caso, "arquivo": os.path.relpath(caso["arquivo"], diretorio)}
+        for caso in casos
+    ]
+    cabecalho = {
+        "versao": VERSAO_MANIFESTO,
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "parametros": parametros,
+    }
+    caminho = os.path.join(diretorio, MANIFESTOS[formato])
+
+    if formato == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Manifesto Parquet requer o pacote pyarrow")
+
+        tabela = pa.Table.from_pylist(registros)
+        tabela = tabela.replace_schema_metadata({"corpus": json.dumps(cabecalho, ensure_ascii=False)})
+        pq.write_table(tabela, caminho)
+        return caminho
+
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({**cabecalho, "casos": registros}, f, indent=2, ensure_ascii=False)
+    return caminho
+
+
+def carregar_manifesto(caminho: str) -> Dict:
+    """
+    Carrega um manifesto de corpus (JSON ou Parquet).
+
+    Args:
+        caminho: Arquivo do manifesto ou pasta do corpus
+
+    Returns:
+        Dict com versao, parametros e casos (caminhos já absolutos)
+    """
+    if os.path.isdir(caminho):
+        candidatos = [os.path.join(caminho, nome) for nome in MANIFESTOS.values()]
+        existentes = [c for c in candidatos if os.path.exists(c)]
+        if not existentes:
+            raise FileNotFoundError(f"Nenhum manifesto em {caminho}")
+        caminho = existentes[0]
+
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+
+    if caminho.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        tabela = pq.read_table(caminho)
+        manifesto = json.loads(tabela.schema.metadata[b"corpus"])
+        manifesto["casos"] = tabela.to_pylist()
+    else:
+        with open(caminho, encoding="utf-8") as f:
+            manifesto = json.load(f)
+
+    for caso in manifesto["casos"]:
+        caso["arquivo"] = os.path.join(diretorio, caso["arquivo"])
+    return manifesto
+
+
+def concluir_corpus(diretorio: str, casos: List[Dict], parametros: Dict, formato_manifesto: str = "json") -> Dict:
+    """
+    Grava o manifesto e resume o resultado da geração do corpus.
+    """
+    falhas = [caso for caso in casos if not caso.get("sucesso")]
+    manifesto = gravar_manifesto(
+        diretorio, [caso for caso in casos if caso.get("sucesso")], parametros, formato_manifesto
+    )
+    return {
+        "sucesso": not falhas,
+        "manifesto": manifesto,
+        "total_casos": len(casos),
+        "casos_gerados": len(casos) - len(falhas),
+        "falhas": falhas,
+    }
+
+
+
+def gerar_corpus(
+    diretorio: str,
+    stages: List[int] = None,
+    severidades: List[str] = None,
+    repeticoes: int = 1,
+    dias: int = 30,
+    data_inicio: str = DATA_INICIO_PADRAO,
+    formato: str = "xlsx",
+    intervalo_minutos: int = 60,
+    perfil_semanal: str = "continuo",
+    amplitude_sazonal: float = 0.0,
+    semente: int = 0,
+    processos: int = None,
+    formato_manifesto: str = "json",
+) -> Dict:
+    """
+    Função wrapper: gera todos os casos do corpus e o manifesto.
+
+    Em um processo daemon (ex.: worker do servidor_workers) os casos são
+    gerados no processo atual; o servidor de workers distribui os casos
+    entre os seus workers.
+
+    Args:
+        diretorio: Pasta do corpus (criada se não existir)
+        stages: Estágios (padrão: todos)
+        severidades: Severidades (padrão: todas)
+        repeticoes: Casos por combinação estágio x severidade
+        dias: Dias de cada caso
+        data_inicio: Data de início de todos os casos (ISO)
+        formato: Formato dos arquivos ('xlsx', 'csv' ou 'parquet')
+        intervalo_minutos: Intervalo entre medições
+        perfil_semanal: Chave de WEEKLY_PROFILES
+        amplitude_sazonal: Variação sazonal relativa
+        semente: Semente do corpus
+        processos: Processos do pool (padrão: núcleos disponíveis)
+        formato_manifesto: 'json' ou 'parquet'
+
+    Returns:
+        Dict com caminho do manifesto e contagem de casos
+    """
+    try:
+        parametros_corpus = {
+            "stages": stages,
+            "severidades": severidades,
+            "repeticoes": repeticoes,
+            "dias": dias,
+            "data_inicio": data_inicio,
+            "formato": formato,
+            "intervalo_minutos": intervalo_minutos,
+            "perfil_semanal": perfil_semanal,
+            "amplitude_sazonal": amplitude_sazonal,
+            "semente": semente,
+        }
+        if formato_manifesto not in MANIFESTOS:
+            raise ValueError(f"Formato de manifesto inválido: {formato_manifesto}")
+        if formato_manifesto == "parquet" and importlib.util.find_spec("pyarrow") is None:
+            raise ValueError("Manifesto Parquet requer o pacote pyarrow")
+
+        os.makedirs(diretorio, exist_ok=True)
+        planejados = planejar_corpus(diretorio, **parametros_corpus)
+
+        processos = processos or os.cpu_count() or 1
+        if mp.current_process().daemon:
+            processos = 1
+        processos = min(processos, len(planejados))
+
+        if processos == 1:
+            casos = [gerar_caso_corpus(p) for p in planejados]
+        else:
+            # Casos pequenos: vários por mensagem para amortizar o IPC
+            chunksize = max(1, len(planejados) // (processos * 8))
+            with mp.get_context("spawn").Pool(processos) as pool:
+                casos = pool.map(gerar_caso_corpus, planejados, chunksize=chunksize)
+
+        return concluir_corpus(diretorio, casos, parametros_corpus, formato_manifesto)
+
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": str(e)
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Gera um corpus de casos de teste em paralelo")
+    parser.add_argument("--output-dir", required=True, help="Pasta do corpus")
+    parser.add_argument("--stages", type=int, nargs="+", default=None, choices=list(COMPANY_STAGES))
+    parser.add_argument("--severities", nargs="+", default=None, choices=list(SEVERITY_LEVELS))
+    parser.add_argument("--repeats", type=int, default=1, help="Casos por estágio x severidade")
+    parser.add_argument("--days", type=int, default=30, help="Dias por caso (1-365)")
+    parser.add_argument("--start", default=DATA_INICIO_PADRAO, help="Data de início (YYYY-MM-DD)")
+    parser.add_argument("--format", default="xlsx", choices=["xlsx", "csv", "parquet"])
+    parser.add_argument("--interval", type=int, default=60, help="Intervalo entre medições (min)")
+    parser.add_argument("--weekly-profile", default="continuo", choices=list(WEEKLY_PROFILES))
+    parser.add_argument("--seasonal-amplitude", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0, help="Semente do corpus")
+    parser.add_argument("--processes", type=int, default=None, help="Processos do pool")
+    parser.add_argument("--manifest", default="json", choices=list(MANIFESTOS))
+
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resultado = gerar_corpus(
+        diretorio=args.output_dir,
+        stages=args.stages,
+        severidades=args.severities,
+        repeticoes=args.repeats,
+        dias=args.days,
+        data_inicio=args.start,
+        formato=args.format,
+        intervalo_minutos=args.interval,
+        perfil_semanal=args.weekly_profile,
+        amplitude_sazonal=args.seasonal_amplitude,
+        semente=args.seed,
+        processos=args.processes,
+        formato_manifesto=args.manifest,
+    )
+    resultado["tempo_s"] = round(time.perf_counter() - inicio, 2)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
@@ -0,0 +1,281 @@
+"""
+MÓDULO: Formato colunar binário para curvas de carga
+
+Grava a curva uma única vez (no upload) em um arquivo compacto e permite
+que dimensionador, simulador e análises a leiam por memory-map, sem
+reconverter JSON nem refazer o parse de timestamps ISO.
+
+Layout do arquivo (.bcurva):
+- 8 bytes: assinatura b"BESSCRV1"
+- 4 bytes: tamanho do cabeçalho JSON (uint32 little-endian)
+- Cabeçalho JSON (UTF-8), completado com espaços até múltiplo de 8 bytes
+- int64[n]: timestamps em segundos desde 1970-01-01 (horário local, sem fuso)
+- float32[n] ou float64[n]: potências em kW
+"""
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import warnings
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from metricas import contar, fase
+
+
+ASSINATURA = b"BESSCRV1"
+VERSAO_FORMATO = 1
+EXTENSAO = ".bcurva"
+DTYPES_POTENCIA = ("float32", "float64")
+
+
+def para_datetime64(timestamps: Union[List[str], np.ndarray]) -> np.ndarray:
+    """
+    Converte timestamps para datetime64[s] (horário local, sem fuso).
+
+    Aceita arrays datetime64/int64 (epoch em segundos) ou listas de strings
+    ISO. Strings sem fuso são convertidas pelo parser nativo do NumPy; as
+    demais passam por datetime.fromisoformat, mantendo o horário de parede,
+    como o restante dos módulos faz.
+
+    Args:
+        timestamps: Timestamps a converter
+
+    Returns:
+        Array datetime64[s]
+    """
+    if isinstance(timestamps, np.ndarray):
+        if np.issubdtype(timestamps.dtype, np.datetime64):
+            return timestamps.astype("datetime64[s]")
+        if np.issubdtype(timestamps.dtype, np.integer):
+            return timestamps.astype("datetime64[s]")
+
+    with fase("converter_timestamps"):
+        contar("timestamps_convertidos", len(timestamps))
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                return np.array(timestamps, dtype="datetime64[s]")
+        except (ValueError, TypeError, Warning):
+            return np.array(
+                [datetime.fromisoformat(ts).replace(tzinfo=None) for ts in timestamps],
+                dtype="datetime64[s]",
+            )
+
+
+class CurvaColunar:
+    """
+    Curva de carga lida de um arquivo colunar (colunas em memory-map).
+    """
+
+    def __init__(self, timestamps: np.ndarray, potencias: np.ndarray, cabecalho: Dict):
+        self.timestamps = timestamps
+        self.potencias = potencias
+        self.cabecalho = cabecalho
+
+    def __len__(self) -> int:
+        return len(self.potencias)
+
+    def timestamps_iso(self) -> List[str]:
+        """
+        Timestamps como strings ISO (para consumidores que ainda usam JSON).
+        """
+        return np.datetime_as_string(self.timestamps, unit="s").tolist()
+
+
+def intervalo_dominante(timestamps_s: np.ndarray) -> Optional[int]:
+    """
+    Intervalo de medição mais frequente, em segundos.
+    """
+    if len(timestamps_s) < 2:
+        return None
+    diferencas = np.diff(timestamps_s)
+    diferencas = diferencas[diferencas > 0]
+    if diferencas.size == 0:
+        return None
+    valores, contagens = np.unique(diferencas, return_counts=True)
+    return int(valores[np.argmax(contagens)])
+
+
+def _escrever_cabecalho(arquivo, cabecalho: Dict) -> None:
+    dados = json.dumps(cabecalho, ensure_ascii=False).encode("utf-8")
+    preenchimento = (-(len(ASSINATURA) + 4 + len(dados))) % 8
+    dados += b" " * preenchimento
+    arquivo.write(ASSINATURA)
+    arquivo.write(struct.pack("<I", len(dados)))
+    arquivo.write(dados)
+
+
+class EscritorCurvaColunar:
+    """
+    Grava uma curva em blocos, com memória constante.
+
+    As colunas são acumuladas em arquivos temporários e concatenadas após o
+    cabeçalho em `finalizar`, quando o total de pontos já é conhecido.
+    """
+
+    def __init__(self, caminho: str, dtype_potencia: str = "float64"):
+        if dtype_potencia not in DTYPES_POTENCIA:
+            raise ValueError(f"dtype_potencia inválido: {dtype_potencia}")
+
+        self.caminho = caminho
+        self.dtype_potencia = dtype_potencia
+        self.total_pontos = 0
+        self.intervalo_s = None
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        self._timestamps = tempfile.TemporaryFile(dir=diretorio)
+        self._potencias = tempfile.TemporaryFile(dir=diretorio)
+
+    def adicionar(self, timestamps: Union[List[str], np.ndarray], potencias) -> None:
+        """
+        Acrescenta um bloco de amostras.
+
+        Args:
+            timestamps: Timestamps do bloco
+            potencias: Potências do bloco em kW
+        """
+        segundos = para_datetime64(timestamps).astype(np.int64)
+        valores = np.asarray(potencias, dtype=self.dtype_potencia)
+        if len(segundos) != len(valores):
+            raise ValueError("timestamps e potencias devem ter o mesmo tamanho")
+
+        if self.intervalo_s is None:
+            self.intervalo_s = intervalo_dominante(segundos)
+
+        self._timestamps.write(segundos.astype("<i8").tobytes())
+        self._potencias.write(valores.astype(np.dtype(self.dtype_potencia).newbyteorder("<")).tobytes())
+        self.total_pontos += len(segundos)
+
+    def finalizar(self, metadados: Dict = None) -> Dict:
+        """
+        Escreve o arquivo final e descarta os temporários.
+
+        Args:
+            metadados: Metadados da origem (arquivo, empresa, fuso...)
+
+        Returns:
+            Cabeçalho gravado
+        """
+        metadados = dict(metadados or {})
+        cabecalho = {
+            "versao": VERSAO_FORMATO,
+            "total_pontos": self.total_pontos,
+            "dtype_potencia": self.dtype_potencia,
+            "intervalo_s": self.intervalo_s,
+            "fuso": metadados.pop("fuso", None),
+            "origem": metadados,
+        }
+
+        try:
+            with open(self.caminho, "wb") as saida:
+                _escrever_cabecalho(saida, cabecalho)
+                for coluna in (self._timestamps, self._potencias):
+                    coluna.seek(0)
+                    shutil.copyfileobj(coluna, saida)
+        finally:
+            self._timestamps.close()
+            self._potencias.close()
+
+        return cabecalho
+
+
+def salvar_curva_colunar(
+    caminho: str,
+    timestamps: Union[List[str], np.ndarray],
+    potencias,
+    metadados: Dict = None,
+    dtype_potencia: str = "float64",
+) -> Dict:
+    """
+    Grava uma curva completa no formato colunar.
+
+    Args:
+        caminho: Caminho do arquivo de saída
+        timestamps: Timestamps (ISO ou datetime64)
+        potencias: Potências em kW
+        metadados: Metadados da origem (podem incluir 'fuso')
+        dtype_potencia: 'float64' ou 'float32'
+
+    Returns:
+        Cabeçalho gravado
+    """
+    escritor = EscritorCurvaColunar(caminho, dtype_potencia)
+    escritor.adicionar(timestamps, potencias)
+    return escritor.finalizar(metadados)
+
+
+def carregar_curva_colunar(caminho: str) -> CurvaColunar:
+    """
+    Abre uma curva colunar por memory-map (leitura sob demanda).
+
+    Args:
+        caminho: Caminho do arquivo .bcurva
+
+    Returns:
+        CurvaColunar com colunas em memory-map
+    """
+    with open(caminho, "rb") as arquivo:
+        if arquivo.read(len(ASSINATURA)) != ASSINATURA:
+            raise ValueError(f"Arquivo não está no formato colunar: {caminho}")
+        (tamanho_cabecalho,) = struct.unpack("<I", arquivo.read(4))
+        cabecalho = json.loads(arquivo.read(tamanho_cabecalho).decode("utf-8"))
+
+    n = cabecalho["total_pontos"]
+    inicio = len(ASSINATURA) + 4 + tamanho_cabecalho
+    dtype_potencia = np.dtype(cabecalho["dtype_potencia"]).newbyteorder("<")
+
+    if n == 0:
+        return CurvaColunar(
+            np.empty(0, dtype="datetime64[s]"), np.empty(0, dtype=dtype_potencia), cabecalho
+        )
+
+    segundos = np.memmap(caminho, dtype="<i8", mode="r", offset=inicio, shape=(n,))
+    potencias = np.memmap(caminho, dtype=dtype_potencia, mode="r", offset=inicio + 8 * n, shape=(n,))
+
+    return CurvaColunar(segundos.view("datetime64[s]"), potencias, cabecalho)
+
+
+def resolver_curva(
+    potencias_kw,
+    timestamps,
+    arquivo_curva: str = None,
+):
+    """
+    Escolhe entre a curva passada em listas e a gravada em arquivo colunar.
+
+    Potências float32 são promovidas a float64 para os cálculos; float64
+    continuam no memory-map, sem cópia.
+
+    Returns:
+        Tupla (potências, timestamps)
+    """
+    if arquivo_curva:
+        curva = carregar_curva_colunar(arquivo_curva)
+        return np.asarray(curva.potencias, dtype=np.float64), curva.timestamps
+
+    if potencias_kw is None or timestamps is None:
+        raise ValueError("Informe potencias_kw e timestamps ou arquivo_curva")
+
+    return potencias_kw, timestamps
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspeciona uma curva colunar")
+    parser.add_argument("--file", required=True, help="Arquivo .bcurva")
+
+    args = parser.parse_args()
+
+    curva = carregar_curva_colunar(args.file)
+    resumo = dict(curva.cabecalho)
+    if len(curva):
+        resumo["data_inicio"] = str(curva.timestamps[0])
+        resumo["data_fim"] = str(curva.timestamps[-1])
+
+    print(json.dumps(resumo, indent=2, ensure_ascii=False))
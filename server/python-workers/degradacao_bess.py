@@ -0,0 +1,173 @@
+"""
+MÓDULO: Degradação do BESS (contagem de ciclos rainflow)
+
+Conta os ciclos de carga/descarga da trajetória de SoC com o método
+rainflow (ASTM E1049, três pontos) e converte cada ciclo em dano pela
+profundidade de descarga (DoD):
+
+    ciclos até o fim de vida com DoD D:  N(D) = N100 * D^(-k)
+    dano de um ciclo de profundidade D:  D^k / N100 (meio ciclo: metade)
+    perda de capacidade:                 dano * perda no fim de vida
+
+A contagem é incremental: o despacho entrega a trajetória de cada dia
+assim que a calcula e o contador guarda apenas a pilha de reversões
+ainda abertas (poucas dezenas de pontos). Os extremos de cada trecho são
+extraídos com NumPy; só as reversões passam pelo laço Python, então o
+custo total é O(n) sem guardar a série de vários anos.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+
+# Ciclos a 100% de DoD até o fim de vida (LFP típico)
+CICLOS_VIDA_100_DOD = 6000
+
+# Expoente da curva ciclos x DoD (ciclos rasos desgastam menos por kWh)
+EXPOENTE_DOD = 1.3
+
+# Fração da capacidade perdida quando o dano chega a 1 (fim de vida)
+PERDA_FIM_VIDA = 0.2
+
+DIAS_ANO = 365
+
+
+class ContadorRainflow:
+    """
+    Contador rainflow incremental com acúmulo de dano por DoD.
+
+    Os valores são frações da capacidade nominal (0 a 1). A pilha guarda
+    as reversões ainda sem ciclo fechado; o último ponto é o extremo do
+    trecho em curso e pode avançar enquanto a direção não muda.
+    """
+
+    def __init__(
+        self,
+        ciclos_vida_100_dod: float = CICLOS_VIDA_100_DOD,
+        expoente_dod: float = EXPOENTE_DOD,
+        perda_fim_vida: float = PERDA_FIM_VIDA,
+    ):
+        if ciclos_vida_100_dod <= 0:
+            raise ValueError("ciclos_vida_100_dod deve ser positivo")
+        self.ciclos_vida_100_dod = float(ciclos_vida_100_dod)
+        self.expoente_dod = float(expoente_dod)
+        self.perda_fim_vida = float(perda_fim_vida)
+
+        self._pilha: List[float] = []
+        self._direcao = 0
+        self.ciclos_completos = 0
+        self.meios_ciclos = 0
+        self.ciclos_equivalentes = 0.0
+        self.dano = 0.0
+
+    def _contar(self, profundidade: float, fator: float) -> None:
+        self.ciclos_equivalentes += fator * profundidade
+        self.dano += fator * profundidade ** self.expoente_dod / self.ciclos_vida_100_dod
+
+    def _extrair_ciclos(self) -> None:
+        pilha = self._pilha
+        while len(pilha) >= 3:
+            x = abs(pilha[-1] - pilha[-2])
+            y = abs(pilha[-2] - pilha[-3])
+            if x < y:
+                break
+            if len(pilha) == 3:
+                # y contém o ponto inicial: meio ciclo, o início avança
+                self._contar(y, 0.5)
+                self.meios_ciclos += 1
+                del pilha[0]
+            else:
+                self._contar(y, 1.0)
+                self.ciclos_completos += 1
+                del pilha[-3:-1]
+
+    def adicionar(self, valores: np.ndarray) -> None:
+        """
+        Acrescenta um trecho da trajetória de SoC (fração da capacidade).
+
+        Args:
+            valores: Valores em ordem cronológica (NaN é ignorado)
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if valores.size == 0:
+            return
+
+        if not self._pilha:
+            self._pilha.append(float(valores[0]))
+        serie = np.concatenate(([self._pilha[-1]], valores))
+
+        passos = np.diff(serie)
+        movimentos = np.flatnonzero(passos)
+        if movimentos.size == 0:
+            return
+
+        # Fim de cada trecho monotônico: onde o sinal do passo muda, e o último
+        sinais = np.sign(passos[movimentos])
+        fins = np.flatnonzero(np.append(sinais[1:] != sinais[:-1], True))
+        extremos = serie[movimentos[fins] + 1].tolist()
+
+        for extremo, direcao in zip(extremos, sinais[fins].tolist()):
+            if direcao == self._direcao:
+                self._pilha[-1] = extremo
+            else:
+                self._pilha.append(extremo)
+                self._direcao = direcao
+            self._extrair_ciclos()
+
+    def dano_total(self) -> float:
+        """
+        Dano acumulado, contando as faixas ainda abertas como meios ciclos.
+        """
+        residuo = np.abs(np.diff(self._pilha)) if len(self._pilha) > 1 else np.zeros(0)
+        return self.dano + float(
+            np.sum(0.5 * residuo ** self.expoente_dod) / self.ciclos_vida_100_dod
+        )
+
+    def perda_capacidade(self) -> float:
+        """
+        Fração da capacidade nominal perdida até agora.
+        """
+        return min(1.0, self.dano_total() * self.perda_fim_vida)
+
+    def resumo(self, capacidade_kwh: float, dias: int) -> Dict:
+        """
+        Resumo da degradação para o resultado da simulação.
+
+        Args:
+            capacidade_kwh: Capacidade nominal (kWh)
+            dias: Dias simulados
+
+        Returns:
+            Dict com ciclos, dano e perda de capacidade (total e por ano)
+        """
+        residuo = np.abs(np.diff(self._pilha)) if len(self._pilha) > 1 else np.zeros(0)
+        ciclos_equivalentes = self.ciclos_equivalentes + 0.5 * float(residuo.sum())
+        perda = self.perda_capacidade()
+        anos = dias / DIAS_ANO if dias else 0
+
+        return {
+            "ciclos_equivalentes": round(ciclos_equivalentes, 2),
+            "ciclos_equivalentes_ano": round(ciclos_equivalentes / anos, 2) if anos else 0,
+            "ciclos_completos": self.ciclos_completos,
+            "meios_ciclos": self.meios_ciclos + len(residuo),
+            "dano_acumulado": round(self.dano_total(), 6),
+            "perda_capacidade_percent": round(perda * 100, 3),
+            "perda_capacidade_anual_percent": round(perda * 100 / anos, 3) if anos else 0,
+            "capacidade_final_kwh": round(capacidade_kwh * (1 - perda), 2),
+        }
+
+
+def fatores_retencao(perda_capacidade_anual: float, anos: int) -> np.ndarray:
+    """
+    Fração da capacidade nominal no início de cada ano de operação.
+
+    Args:
+        perda_capacidade_anual: Perda por ano (fração, ex.: 0.02)
+        anos: Anos de análise
+
+    Returns:
+        Array (anos,) com 1, 1 - p, 1 - 2p, ... (mínimo 0)
+    """
+    return np.maximum(0.0, 1 - perda_capacidade_anual * np.arange(anos))
@@ -0,0 +1,250 @@
+"""
+MÓDULO: Despacho ótimo do BESS por programação linear
+
+Calcula carga e descarga que minimizam o custo de energia e de demanda
+de cada dia, em horizonte deslizante: cada problema cobre alguns dias à
+frente, só o primeiro dia é adotado e o SoC final dele inicia o próximo.
+Serve de limite superior de economia para comparar com as regras fixas
+("solar", "grid-offpeak") do simulador.
+
+Variáveis de um horizonte com T passos e K dias:
+- c[t]: energia carregada da rede no passo (kWh)
+- d[t]: energia descarregada para a carga no passo (kWh)
+- s[t]: SoC ao fim do passo (kWh)
+- m[k]: demanda máxima líquida do dia (kW)
+
+Restrições:
+- s[t] = s[t-1] + c[t] * ef_carga - d[t] / ef_descarga
+- carga[t] + (c[t] - d[t]) / h <= m[k]
+- 0 <= c[t] <= P*h; 0 <= d[t] <= min(P, carga[t])*h; 0 <= s[t] <= capacidade
+
+As matrizes de restrição dependem só do número de passos e de dias do
+horizonte; são montadas uma vez e reaproveitadas para todos os dias e
+todos os tamanhos de BESS. A cada problema mudam apenas custos e limites.
+
+Requer scipy (solver HiGHS).
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+from degradacao_bess import DIAS_ANO, ContadorRainflow
+from metricas import contar, cronometrada, progresso
+
+
+# Dias cobertos por cada problema (o primeiro é adotado)
+DIAS_HORIZONTE = 2
+
+# Custo por kWh movimentado: desempata soluções equivalentes, evitando
+# carregar e descarregar no mesmo passo sem ganho
+CUSTO_CICLO_REAIS_KWH = 1e-6
+
+
+def _importar_linprog():
+    try:
+        from scipy.optimize import linprog
+    except ImportError:
+        raise ValueError("Estratégia 'otimo' requer o pacote scipy")
+    return linprog
+
+
+@lru_cache(maxsize=16)
+def montar_restricoes(
+    passos_por_dia: int,
+    dias: int,
+    horas_passo: float,
+    eficiencia_carga: float = 1.0,
+    eficiencia_descarga: float = 1.0,
+):
+    """
+    Matrizes esparsas do problema de um horizonte.
+
+    Args:
+        passos_por_dia: Passos de cada dia
+        dias: Dias do horizonte
+        horas_passo: Duração de cada passo (h)
+        eficiencia_carga: Fração da energia da rede que entra na bateria
+        eficiencia_descarga: Fração da energia da bateria entregue à carga
+
+    Returns:
+        Tupla (A_eq, A_ub) em formato CSR, colunas na ordem [c, d, s, m]
+    """
+    from scipy import sparse
+
+    T = passos_por_dia * dias
+    passos = np.arange(T)
+    c, d, s, m = 0, T, 2 * T, 3 * T
+
+    # Balanço de energia: s[t] - s[t-1] - c[t]*ef + d[t]/ef = 0 (s[-1] vai para b_eq)
+    linhas = np.concatenate((passos, passos, passos, passos[1:]))
+    colunas = np.concatenate((s + passos, c + passos, d + passos, s + passos[:-1]))
+    valores = np.concatenate((
+        np.ones(T), np.full(T, -eficiencia_carga), np.full(T, 1 / eficiencia_descarga), -np.ones(T - 1),
+    ))
+    a_eq = sparse.csr_matrix((valores, (linhas, colunas)), shape=(T, 3 * T + dias))
+
+    # Demanda líquida: (c[t] - d[t]) / h - m[dia(t)] <= -carga[t]
+    linhas = np.concatenate((passos, passos, passos))
+    colunas = np.concatenate((c + passos, d + passos, m + passos // passos_por_dia))
+    valores = np.concatenate((np.full(T, 1 / horas_passo), np.full(T, -1 / horas_passo), -np.ones(T)))
+    a_ub = sparse.csr_matrix((valores, (linhas, colunas)), shape=(T, 3 * T + dias))
+
+    contar("lp_matrizes_montadas")
+    return a_eq, a_ub
+
+
+def resolver_horizonte(
+    cargas_kw: np.ndarray,
+    tarifas: np.ndarray,
+    capacidade_kwh: float,
+    potencia_kw: float,
+    horas_passo: float,
+    soc_inicial_kwh: float,
+    custo_demanda_dia: float,
+    eficiencia_carga: float = 1.0,
+    eficiencia_descarga: float = 1.0,
+    passos_validos: np.ndarray = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resolve o despacho ótimo de um horizonte.
+
+    Args:
+        cargas_kw: Potências (dias x passos) em kW
+        tarifas: Tarifas (dias x passos) em R$/kWh
+        capacidade_kwh: Capacidade do BESS (kWh)
+        potencia_kw: Potência do BESS (kW)
+        horas_passo: Duração de cada passo (h)
+        soc_inicial_kwh: SoC no início do horizonte (kWh)
+        custo_demanda_dia: Custo de cada kW da demanda máxima diária (R$)
+        eficiencia_carga: Fração da energia da rede que entra na bateria
+        eficiencia_descarga: Fração da energia da bateria entregue à carga
+        passos_validos: Máscara (dias x passos) dos passos medidos; os
+            demais não carregam nem descarregam (None = todos)
+
+    Returns:
+        Tupla (cargas, descargas) em kWh, no formato (dias x passos)
+    """
+    linprog = _importar_linprog()
+    dias, passos_por_dia = cargas_kw.shape
+    T = dias * passos_por_dia
+    a_eq, a_ub = montar_restricoes(passos_por_dia, dias, horas_passo, eficiencia_carga, eficiencia_descarga)
+
+    carga = cargas_kw.ravel()
+    tarifa = tarifas.ravel()
+    energia_max = potencia_kw * horas_passo
+
+    custos = np.concatenate((
+        tarifa + CUSTO_CICLO_REAIS_KWH,
+        CUSTO_CICLO_REAIS_KWH - tarifa,
+        np.zeros(T),
+        np.full(dias, custo_demanda_dia),
+    ))
+    b_eq = np.zeros(T)
+    b_eq[0] = soc_inicial_kwh
+
+    limites = np.empty((3 * T + dias, 2))
+    limites[:T] = (0, energia_max)
+    limites[T:2 * T, 0] = 0
+    limites[T:2 * T, 1] = np.minimum(energia_max, np.maximum(carga, 0) * horas_passo)
+    limites[2 * T:3 * T] = (0, capacidade_kwh)
+    limites[3 * T:] = (-np.inf, np.inf)
+    if passos_validos is not None:
+        sem_medicao = ~passos_validos.ravel()
+        limites[:T][sem_medicao, 1] = 0
+        limites[T:2 * T][sem_medicao, 1] = 0
+
+    solucao = linprog(
+        custos, A_ub=a_ub, b_ub=-carga, A_eq=a_eq, b_eq=b_eq,
+        bounds=limites, method="highs",
+    )
+    if solucao.status != 0:
+        raise ValueError(f"Despacho ótimo sem solução: {solucao.message}")
+
+    contar("lp_resolvidos")
+    x = solucao.x
+    forma = (dias, passos_por_dia)
+    return (
+        np.clip(x[:T], 0, energia_max).reshape(forma),
+        np.clip(x[T:2 * T], 0, None).reshape(forma),
+    )
+
+
+@cronometrada("despacho_otimo")
+def despachar_otimo(
+    matriz: np.ndarray,
+    tarifas: np.ndarray,
+    capacidade_kwh: float,
+    potencia_kw: float,
+    custo_demanda_dia: float,
+    horas_passo: float = 1.0,
+    soc_inicial_percent: float = 50,
+    dias_horizonte: int = DIAS_HORIZONTE,
+    eficiencia_carga: float = 1.0,
+    eficiencia_descarga: float = 1.0,
+    degradacao: ContadorRainflow = None,
+    passos_validos: np.ndarray = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[float]]:
+    """
+    Despacho ótimo dia a dia em horizonte deslizante.
+
+    Mesma saída e mesmas convenções de simulador_bess.despachar_soc: SoC
+    transportado entre dias arredondado em 0,1%, eficiências de carga e
+    descarga e, com `degradacao`, contagem de ciclos a cada dia e perda de
+    capacidade aplicada a cada 365 dias. Passos fora de `passos_validos`
+    não carregam nem descarregam.
+
+    Args:
+        matriz: Potências (dias x passos) em kW
+        tarifas: Tarifas (dias x passos) em R$/kWh
+        capacidade_kwh: Capacidade do BESS (kWh)
+        potencia_kw: Potência do BESS (kW)
+        custo_demanda_dia: Custo de cada kW da demanda máxima diária (R$)
+        horas_passo: Duração de cada passo (h)
+        soc_inicial_percent: SoC inicial do primeiro dia (%)
+        dias_horizonte: Dias de cada problema (1 = sem olhar à frente)
+        eficiencia_carga: Fração da energia da rede que entra na bateria
+        eficiencia_descarga: Fração da energia da bateria entregue à carga
+        degradacao: Contador de ciclos (None = bateria sem desgaste)
+        passos_validos: Máscara (dias x passos) dos passos medidos (None = todos)
+
+    Returns:
+        Tupla (cargas, descargas, trajetória de SoC em kWh, SoC final de cada dia em %)
+    """
+    n_dias, n_passos = matriz.shape
+    cargas = np.zeros((n_dias, n_passos), dtype=np.float64)
+    descargas = np.zeros((n_dias, n_passos), dtype=np.float64)
+    socs = np.zeros((n_dias, n_passos + 1), dtype=np.float64)
+    socs_finais = []
+
+    capacidade = capacidade_kwh
+    soc_percent = soc_inicial_percent
+    for dia in range(n_dias):
+        progresso("dias_simulados", dia, n_dias)
+        if degradacao is not None and dia and dia % DIAS_ANO == 0:
+            capacidade = capacidade_kwh * (1 - degradacao.perda_capacidade())
+
+        fim = min(n_dias, dia + dias_horizonte)
+        soc = min((soc_percent / 100) * capacidade_kwh, capacidade)
+        carga, descarga = resolver_horizonte(
+            matriz[dia:fim], tarifas[dia:fim], capacidade, potencia_kw,
+            horas_passo, soc, custo_demanda_dia, eficiencia_carga, eficiencia_descarga,
+            None if passos_validos is None else passos_validos[dia:fim],
+        )
+
+        # Trajetória refeita a partir dos fluxos adotados (sem ruído do solver)
+        variacao = carga[0] * eficiencia_carga - descarga[0] / eficiencia_descarga
+        trajetoria = np.clip(soc + np.cumsum(variacao), 0, capacidade)
+        socs[dia, 0] = soc
+        socs[dia, 1:] = trajetoria
+        cargas[dia] = carga[0]
+        descargas[dia] = descarga[0]
+
+        if degradacao is not None:
+            degradacao.adicionar(socs[dia] / capacidade_kwh)
+
+        soc_percent = round((float(trajetoria[-1]) / capacidade_kwh) * 100, 1)
+        socs_finais.append(soc_percent)
+
+    return cargas, descargas, socs, socs_finais
@@ -9,6 +9,14 @@ import json
 from typing import List, Dict, Tuple
 from datetime import datetime
 
+import numpy as np
+
+from calendario_tarifario import CLASSE_PONTA, obter_calendario
+from curva_colunar import para_datetime64, resolver_curva
+from metricas import cronometrada, progresso
+from projecao_financeira import normalizar_premissas, projetar_investimento, resumir_projecao
+from simulador_bess import SEGUNDOS_HORA, SimuladorBESS
+
 
 class DimensionadorBESS:
     """
@@ -24,21 +32,29 @@ class DimensionadorBESS:
         cobranca_demanda: float,
         horario_ponta_inicio: int = 18,
         horario_ponta_fim: int = 21,
+        tarifa_intermediaria: float = None,
+        feriados: List[str] = None,
     ):
         """
         Inicializa o dimensionador.
         """
         self.potencias_kw = potencias_kw
-        self.timestamps = [datetime.fromisoformat(ts) for ts in timestamps]
+        self.instantes = para_datetime64(timestamps)
         self.tarifa_ponta = tarifa_ponta
         self.tarifa_fora_ponta = tarifa_fora_ponta
+        self.tarifa_intermediaria = (
+            tarifa_intermediaria if tarifa_intermediaria is not None else tarifa_fora_ponta
+        )
         self.cobranca_demanda = cobranca_demanda
         self.hp_inicio = horario_ponta_inicio
         self.hp_fim = horario_ponta_fim
+        self.feriados = feriados
+        self.calendario = obter_calendario((self.hp_inicio, self.hp_fim), feriados=feriados)
         
         # Calcular demanda contratada
-        self.demanda_contratada = max(potencias_kw)
+        self.demanda_contratada = float(np.max(potencias_kw))
         
+    @cronometrada("extrair_picos")
     def extrair_picos_ponta(self) -> Tuple[List[float], float, float]:
         """
         Extrai os picos de demanda durante o horário de ponta.
@@ -46,21 +62,14 @@ class DimensionadorBESS:
         Returns:
             Tupla (picos, pico_máximo, pico_médio)
         """
-        picos = []
-        
-        for ts, potencia in zip(self.timestamps, self.potencias_kw):
-            hora = ts.hour
-            dia_semana = ts.weekday()
-            
-            # Ponta: seg-sex, 18-21h
-            if dia_semana < 5 and self.hp_inicio <= hora < self.hp_fim:
-                picos.append(potencia)
+        na_ponta = self.calendario.classificar(self.instantes) == CLASSE_PONTA
+        picos = np.asarray(self.potencias_kw)[na_ponta].tolist()
         
         if not picos:
             return [], 0, 0
         
-        pico_max = max(picos)
-        pico_medio = sum(picos) / len(picos)
+        pico_max = float(max(picos))
+        pico_medio = float(sum(picos) / len(picos))
         
         return picos, pico_max, pico_medio
     
@@ -183,47 +192,53 @@ class DimensionadorBESS:
         self,
         custo_investimento_reais: float,
         economia_anual_reais: float,
+        perda_capacidade_anual: float = 0,
+        premissas: Dict = None,
     ) -> Dict:
         """
-        Calcula payback e ROI.
+        Calcula payback, ROI e a projeção financeira da vida útil.
+        
+        O fluxo de caixa é projetado ano a ano (projecao_financeira):
+        reajuste de tarifa, O&M, reposição e perda de capacidade conforme as
+        premissas. Sem premissas, equivale à análise simples de 10 anos.
         
         Args:
             custo_investimento_reais: Custo inicial (R$)
-            economia_anual_reais: Economia anual (R$)
+            economia_anual_reais: Economia anual do primeiro ano (R$)
+            perda_capacidade_anual: Perda de capacidade por ano (fração),
+                ex.: perda_capacidade_anual_percent / 100 do simulador;
+                substitui a das premissas quando maior que zero
+            premissas: Premissas financeiras (ver PREMISSAS_PADRAO)
             
         Returns:
-            Dict com payback e ROI
+            Dict com payback, ROI, VPL, TIR e payback descontado
         """
-        if economia_anual_reais <= 0:
-            return {
-                "payback_anos": float('inf'),
-                "roi_percent": 0,
-                "viavel": False
-            }
-        
-        # Payback simples
-        payback_anos = custo_investimento_reais / economia_anual_reais
+        premissas = normalizar_premissas(premissas, perda_capacidade_anual=perda_capacidade_anual or None)
+        projecao = projetar_investimento(economia_anual_reais, custo_investimento_reais, premissas)
+        resumo = resumir_projecao(projecao, premissas)
         
-        # ROI (10 anos de análise)
-        anos_analise = 10
-        economia_total_10anos = economia_anual_reais * anos_analise
-        lucro = economia_total_10anos - custo_investimento_reais
-        roi_percent = (lucro / custo_investimento_reais) * 100
-        
-        # Viabilidade
-        viavel = payback_anos <= anos_analise
+        payback_anos = float(projecao["payback_simples"])
+        anos_analise = premissas["anos_analise"]
         
         return {
             "payback_anos": round(payback_anos, 1),
-            "roi_10anos_percent": round(roi_percent, 1),
-            "lucro_10anos_reais": round(lucro, 2),
-            "viavel": viavel,
+            "roi_percent": resumo["roi_percent"],
+            "lucro_reais": resumo["lucro_reais"],
+            "anos_analise": anos_analise,
+            "viavel": payback_anos <= anos_analise,
+            "vpl_reais": resumo["vpl_reais"],
+            "tir_percent": resumo["tir_percent"],
+            "payback_descontado_anos": resumo["payback_descontado_anos"],
+            "reposicoes": resumo["reposicoes"],
+            "premissas": resumo["premissas"],
         }
     
     def dimensionar(
         self,
         reducao_demanda_percent: float = 20,
         custo_investimento_reais: float = 0,
+        perda_capacidade_anual: float = 0,
+        premissas: Dict = None,
     ) -> Dict:
         """
         Realiza dimensionamento completo.
@@ -231,6 +246,8 @@ class DimensionadorBESS:
         Args:
             reducao_demanda_percent: Redução de demanda desejada (%)
             custo_investimento_reais: Custo do investimento (R$)
+            perda_capacidade_anual: Perda de capacidade por ano (fração)
+            premissas: Premissas financeiras da projeção (ver calcular_payback)
             
         Returns:
             Dict com dimensionamento completo
@@ -254,7 +271,9 @@ class DimensionadorBESS:
             # Calcular payback
             payback = self.calcular_payback(
                 custo_investimento_reais,
-                economia["economia_total_anual_reais"]
+                economia["economia_total_anual_reais"],
+                perda_capacidade_anual,
+                premissas,
             )
             
             # Extrair picos
@@ -282,6 +301,270 @@ class DimensionadorBESS:
                 "sucesso": False,
                 "erro": str(e)
             }
+    
+    def criar_simulador(self, estrategia: str = "grid-offpeak") -> SimuladorBESS:
+        """
+        Cria um simulador sobre a mesma curva, com as tarifas do dimensionador.
+        
+        Args:
+            estrategia: Estratégia de carregamento
+            
+        Returns:
+            SimuladorBESS pronto para varreduras
+        """
+        return SimuladorBESS(
+            potencias_kw=self.potencias_kw,
+            timestamps=self.instantes,
+            capacidade_bess_kwh=1,
+            potencia_bess_kw=1,
+            estrategia_carregamento=estrategia,
+            tarifa_ponta_reais_kwh=self.tarifa_ponta,
+            tarifa_intermediaria_reais_kwh=self.tarifa_intermediaria,
+            tarifa_fora_ponta_reais_kwh=self.tarifa_fora_ponta,
+            cobranca_demanda_reais_kw_mes=self.cobranca_demanda,
+            horario_ponta_inicio=self.hp_inicio,
+            horario_ponta_fim=self.hp_fim,
+            feriados=self.feriados,
+        )
+    
+    def dimensionar_otimo(
+        self,
+        objetivo: str = "vpl",
+        custo_kwh_reais: float = 0,
+        custo_kw_reais: float = 0,
+        estrategia: str = "grid-offpeak",
+        taxa_desconto: float = None,
+        anos_analise: int = None,
+        tolerancia: float = 0.01,
+        folga_otimalidade: float = 0.005,
+        caixas_por_lote: int = 16,
+        max_simulacoes: int = 1000,
+        perda_capacidade_anual: float = 0,
+        premissas: Dict = None,
+    ) -> Dict:
+        """
+        Busca o par kW/kWh que maximiza o VPL ou minimiza o payback.
+        
+        Branch-and-bound sobre o retângulo (potência, energia). No despacho
+        por limiar, mais potência ou mais energia nunca reduz a economia
+        anual, e o investimento cresce com ambas; assim, numa caixa [p0, p1] x [e0, e1]
+        nenhum tamanho supera o objetivo calculado com a economia do canto
+        (p1, e1) e o investimento do canto (p0, e0). Caixas cujo limite não
+        supera o melhor tamanho já simulado (com `folga_otimalidade`) são
+        descartadas sem simular o interior.
+        
+        A cada iteração as `caixas_por_lote` caixas de maior limite são
+        divididas em quatro, e os cantos superiores e centros das filhas são
+        simulados numa única varredura. Tamanhos dominados nem entram na
+        busca: potência acima do maior excedente sobre o limiar de descarga,
+        energia acima do que a potência descarrega na janela diária e
+        energia acima do maior excedente diário só acrescentam custo.
+        
+        Args:
+            objetivo: 'vpl' (maximizar) ou 'payback' (minimizar)
+            custo_kwh_reais: Custo de investimento por kWh (R$)
+            custo_kw_reais: Custo de investimento por kW (R$)
+            estrategia: Estratégia de carregamento simulada
+            taxa_desconto: Taxa de desconto anual para o VPL (0-1);
+                substitui a das premissas (padrão 10%)
+            anos_analise: Horizonte do VPL (anos); substitui o das premissas
+            tolerancia: Lado mínimo das caixas, em fração da potência e da
+                energia máximas úteis
+            folga_otimalidade: Folga relativa do corte (0 = limite exato)
+            caixas_por_lote: Caixas divididas por varredura
+            max_simulacoes: Limite de tamanhos simulados
+            perda_capacidade_anual: Perda de capacidade por ano (fração);
+                reduz a economia dos anos seguintes no VPL
+            premissas: Premissas financeiras da projeção (ver calcular_payback)
+            
+        Returns:
+            Dict com dimensionamento ótimo
+        """
+        try:
+            if objetivo not in ("vpl", "payback"):
+                return {"sucesso": False, "erro": f"Objetivo inválido: {objetivo}"}
+            
+            if custo_kwh_reais <= 0 and custo_kw_reais <= 0:
+                return {
+                    "sucesso": False,
+                    "erro": "Informe custo por kWh e/ou por kW para a busca ótima"
+                }
+            
+            simulador = self.criar_simulador(estrategia)
+            datas, matriz = simulador.montar_grade_diaria()
+            _, janela_descarga = simulador.montar_perfil_despacho(matriz.shape[1], simulador.intervalo_s)
+            horas_passo = simulador.intervalo_s / SEGUNDOS_HORA
+            
+            # Limites físicos: acima deles o BESS não descarrega mais nada
+            excedente = np.maximum(matriz[:, janela_descarga] - simulador.demanda_contratada * 0.7, 0)
+            potencia_max = float(excedente.max()) if excedente.size else 0.0
+            energia_max = float(excedente.sum(axis=1).max()) * horas_passo if excedente.size else 0.0
+            horas_janela = float(janela_descarga.sum()) * horas_passo
+            
+            if potencia_max <= 0 or energia_max <= 0:
+                return {
+                    "sucesso": False,
+                    "erro": "Curva sem excedente na ponta: não há tamanho de BESS viável"
+                }
+            
+            premissas = normalizar_premissas(
+                premissas,
+                taxa_desconto=taxa_desconto,
+                anos_analise=anos_analise,
+                perda_capacidade_anual=perda_capacidade_anual or None,
+            )
+            avaliados = {}
+            
+            def pontuar(economia: np.ndarray, investimento: np.ndarray) -> np.ndarray:
+                # Maior é melhor nos dois objetivos
+                if objetivo == "vpl":
+                    return projetar_investimento(economia, investimento, premissas, calcular_taxa_interna=False)["vpl"]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    return np.where(economia > 0, -investimento / economia, -np.inf)
+            
+            def energia_util(potencia: float, energia: float) -> float:
+                return min(energia, potencia * horas_janela, energia_max)
+            
+            def tamanho(potencia: float, energia: float, arredondar=round) -> Tuple[float, float]:
+                potencia = arredondar(potencia * 10) / 10
+                return potencia, arredondar(energia_util(potencia, energia) * 10) / 10
+            
+            def avaliar(candidatos: List[Tuple[float, float]]) -> None:
+                novos = sorted({c for c in candidatos if c not in avaliados and c[0] > 0 and c[1] > 0})
+                if not novos:
+                    return
+                resultado = simulador.simular_varredura(
+                    [c[1] for c in novos],
+                    [c[0] for c in novos],
+                    estrategias=[estrategia],
+                    custo_kwh_reais=custo_kwh_reais,
+                    custo_kw_reais=custo_kw_reais,
+                    premissas_financeiras=premissas,
+                )["resultados"]
+                economias = np.asarray(resultado["economia_anual_estimada_reais"])
+                investimentos = np.asarray(resultado["custo_investimento_reais"])
+                pontos = pontuar(economias, investimentos)
+                for i, candidato in enumerate(novos):
+                    avaliados[candidato] = {
+                        "economia_anual": resultado["economia_anual_estimada_reais"][i],
+                        "reducao_demanda": resultado["reducao_demanda_media_kw"][i],
+                        "investimento": resultado["custo_investimento_reais"][i],
+                        "vpl": resultado["vpl_reais"][i],
+                        "pontuacao": float(pontos[i]),
+                    }
+                progresso("simulacoes_busca", len(avaliados), max_simulacoes)
+            
+            def canto_superior(caixa: Tuple[float, float, float, float]) -> Tuple[float, float]:
+                # Arredondado para cima: a economia do canto continua sendo um limite
+                return tamanho(caixa[1], caixa[3], np.ceil)
+            
+            def centro(caixa: Tuple[float, float, float, float]) -> Tuple[float, float]:
+                return tamanho((caixa[0] + caixa[1]) / 2, (caixa[2] + caixa[3]) / 2)
+            
+            def limites(caixas: List[Tuple[float, float, float, float]]) -> np.ndarray:
+                economia = np.array([avaliados[canto_superior(c)]["economia_anual"] for c in caixas])
+                investimento = np.array([c[2] * custo_kwh_reais + c[0] * custo_kw_reais for c in caixas])
+                return pontuar(economia, investimento)
+            
+            def dividir(caixa: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+                p0, p1, e0, e1 = caixa
+                pm, em = (p0 + p1) / 2, (e0 + e1) / 2
+                filhas = []
+                for pa, pb in ((p0, pm), (pm, p1)):
+                    for ea, eb in ((e0, em), (em, e1)):
+                        # Energia acima de pb * horas_janela é dominada
+                        eb = min(eb, pb * horas_janela)
+                        if eb > ea:
+                            filhas.append((pa, pb, ea, eb))
+                return filhas
+            
+            def convergida(caixa: Tuple[float, float, float, float]) -> bool:
+                return caixa[1] - caixa[0] <= tolerancia * potencia_max and caixa[3] - caixa[2] <= tolerancia * energia_max
+            
+            raiz = (0.0, potencia_max, 0.0, min(energia_max, potencia_max * horas_janela))
+            avaliar([canto_superior(raiz), centro(raiz)])
+            abertas = [(float(limites([raiz])[0]), raiz)]
+            iteracoes = 0
+            podadas = 0
+            
+            def melhor_pontuacao() -> float:
+                return max((dados["pontuacao"] for dados in avaliados.values()), default=-np.inf)
+            
+            def corte() -> float:
+                melhor = melhor_pontuacao()
+                return melhor + folga_otimalidade * abs(melhor)
+            
+            while abertas and len(avaliados) < max_simulacoes:
+                iteracoes += 1
+                abertas.sort(key=lambda item: item[0], reverse=True)
+                lote, abertas = abertas[:caixas_por_lote], abertas[caixas_por_lote:]
+                
+                filhas = [filha for _, caixa in lote for filha in dividir(caixa)]
+                avaliar([ponto for filha in filhas for ponto in (canto_superior(filha), centro(filha))])
+                
+                if filhas:
+                    abertas.extend(
+                        (float(limite), filha)
+                        for limite, filha in zip(limites(filhas), filhas)
+                        if not convergida(filha)
+                    )
+                
+                # Poda: caixas que não podem superar o melhor tamanho simulado
+                limite_corte = corte()
+                restantes = [(limite, caixa) for limite, caixa in abertas if limite > limite_corte]
+                podadas += len(abertas) - len(restantes)
+                abertas = restantes
+            
+            if not avaliados or not np.isfinite(melhor_pontuacao()):
+                return {
+                    "sucesso": False,
+                    "erro": "Não foi possível encontrar tamanho viável"
+                }
+            
+            melhor = max(avaliados, key=lambda c: avaliados[c]["pontuacao"])
+            potencia_bess, capacidade_bess = melhor
+            dados = avaliados[melhor]
+            _, pico_max, pico_medio = self.extrair_picos_ponta()
+            maior_limite = max((limite for limite, _ in abertas), default=None)
+            
+            return {
+                "sucesso": True,
+                "dimensionamento": {
+                    "potencia_bess_kw": potencia_bess,
+                    "capacidade_bess_kwh": capacidade_bess,
+                    "demanda_contratada_kw": round(self.demanda_contratada, 2),
+                    "pico_demanda_ponta_kw": round(pico_max, 2),
+                    "pico_medio_ponta_kw": round(pico_medio, 2),
+                    "objetivo": objetivo,
+                    "estrategia": estrategia,
+                },
+                "economia": {
+                    "economia_total_anual_reais": dados["economia_anual"],
+                    "reducao_demanda_kw": dados["reducao_demanda"],
+                },
+                "payback": self.calcular_payback(dados["investimento"], dados["economia_anual"], premissas=premissas),
+                "vpl_reais": round(dados["vpl"], 2),
+                "custo_investimento_reais": dados["investimento"],
+                "custo_por_kwh": custo_kwh_reais,
+                "custo_por_kw": custo_kw_reais,
+                "busca": {
+                    "simulacoes": len(avaliados),
+                    "iteracoes": iteracoes,
+                    "caixas_podadas": podadas,
+                    # Caixas ainda abertas ao atingir max_simulacoes (0 = busca concluída);
+                    # nenhum tamanho supera "limite_abertas" (VPL ou -payback)
+                    "caixas_abertas": len(abertas),
+                    "limite_abertas": round(float(maior_limite), 2) if maior_limite is not None else None,
+                    "potencia_max_util_kw": round(potencia_max, 2),
+                    "capacidade_max_util_kwh": round(energia_max, 2),
+                },
+            }
+            
+        except Exception as e:
+            return {
+                "sucesso": False,
+                "erro": str(e)
+            }
 
 
 def dimensionar_bess(
@@ -292,21 +575,53 @@ def dimensionar_bess(
     cobranca_demanda: float,
     reducao_demanda_percent: float = 20,
     custo_investimento_reais: float = 0,
+    objetivo: str = None,
+    custo_kwh_reais: float = 0,
+    custo_kw_reais: float = 0,
+    arquivo_curva: str = None,
+    feriados: List[str] = None,
+    perda_capacidade_anual: float = 0,
+    premissas_financeiras: Dict = None,
+    tarifa_intermediaria: float = None,
+    estrategia_carregamento: str = "grid-offpeak",
 ) -> Dict:
     """
     Função wrapper para dimensionar BESS.
+    
+    Com `objetivo` ('vpl' ou 'payback'), usa a busca ótima sobre a curva
+    simulada em vez do percentual fixo de redução, com a estratégia de
+    carregamento e a tarifa intermediária informadas (sem
+    `tarifa_intermediaria`, vale a fora de ponta). Com `arquivo_curva`
+    (formato colunar), a curva é lida por memory-map. Com
+    `premissas_financeiras` (ver projecao_financeira), o payback traz a
+    projeção da vida útil com reajustes, O&M e reposição.
     """
+    potencias_kw, timestamps = resolver_curva(potencias_kw, timestamps, arquivo_curva)
     dimensionador = DimensionadorBESS(
         potencias_kw=potencias_kw,
         timestamps=timestamps,
         tarifa_ponta=tarifa_ponta,
         tarifa_fora_ponta=tarifa_fora_ponta,
         cobranca_demanda=cobranca_demanda,
+        tarifa_intermediaria=tarifa_intermediaria,
+        feriados=feriados,
     )
     
+    if objetivo:
+        return dimensionador.dimensionar_otimo(
+            objetivo=objetivo,
+            custo_kwh_reais=custo_kwh_reais,
+            custo_kw_reais=custo_kw_reais,
+            estrategia=estrategia_carregamento,
+            perda_capacidade_anual=perda_capacidade_anual,
+            premissas=premissas_financeiras,
+        )
+    
     return dimensionador.dimensionar(
         reducao_demanda_percent=reducao_demanda_percent,
         custo_investimento_reais=custo_investimento_reais,
+        perda_capacidade_anual=perda_capacidade_anual,
+        premissas=premissas_financeiras,
     )
 
 
@@ -317,6 +632,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Dimensionador de BESS")
     parser.add_argument("--reduction", type=float, default=20, help="Redução de demanda (%)")
     parser.add_argument("--cost", type=float, default=0, help="Custo do investimento (R$)")
+    parser.add_argument("--optimize", choices=["vpl", "payback"], help="Busca ótima por VPL ou payback")
+    parser.add_argument("--cost-kwh", type=float, default=0, help="Custo por kWh (R$), usado com --optimize")
+    parser.add_argument("--cost-kw", type=float, default=0, help="Custo por kW (R$), usado com --optimize")
     
     args = parser.parse_args()
     
@@ -335,6 +653,9 @@ if __name__ == "__main__":
         cobranca_demanda=50,
         reducao_demanda_percent=args.reduction,
         custo_investimento_reais=args.cost,
+        objetivo=args.optimize,
+        custo_kwh_reais=args.cost_kwh,
+        custo_kw_reais=args.cost_kw,
     )
     
     print(json.dumps(resultado, indent=2, ensure_ascii=False))
@@ -8,13 +8,15 @@ Uso:
     python gerador_casos_teste.py --stage 3 --severity moderado --days 30
 """
 
+import csv
+import os
 import random
 import json
+import zipfile
+from xml.sax.saxutils import escape
 from datetime import datetime, timedelta
 from typing import Tuple, List, Dict
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+import numpy as np
 
 
 # ============================================================================
@@ -37,6 +39,89 @@ SEVERITY_LEVELS = {
     "grave": {"min_var": -0.30, "max_var": 0.30, "peak_factor": 1.50},
 }
 
+# Multiplicadores da curva base por dia da semana (seg..dom)
+WEEKLY_PROFILES = {
+    "continuo": (1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0),
+    "industrial": (1.0, 1.0, 1.0, 1.0, 1.0, 0.75, 0.5),
+    "comercial": (1.0, 1.0, 1.0, 1.0, 1.0, 0.6, 0.35),
+}
+
+# Dia do ano com maior consumo no perfil sazonal (verão: fim de janeiro)
+SEASONAL_PEAK_DAY = 30
+
+# Dia da semana de 1970-01-01 (quinta-feira), base do cálculo vetorizado
+WEEKDAY_EPOCH = 3
+
+# Escrita em blocos: linhas formatadas por vez e limite de linhas do Excel
+WRITE_BLOCK_ROWS = 100_000
+EXCEL_MAX_ROWS = 1_048_576
+
+# Posições de YYYY-MM-DDTHH:MM:SS reordenadas para DD/MM/YYYY HH:MM:SS
+# (2, 5 e 10 recebem os separadores)
+ELSPEC_CHAR_ORDER = [8, 9, 4, 5, 6, 7, 0, 1, 2, 3, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+
+# Partes fixas do pacote XLSX (uma planilha "Data", colunas A=30 e B=50)
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        "</styleSheet>"
+    ),
+}
+
+XLSX_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<cols><col min="1" max="1" width="30" customWidth="1"/>'
+    '<col min="2" max="2" width="50" customWidth="1"/></cols>'
+    "<sheetData>"
+)
+
 # Prefixos para nomes de empresas
 COMPANY_PREFIXES = [
     "Metalúrgica",
@@ -86,26 +171,31 @@ COMPANY_SUFFIXES = [
 # FUNÇÕES AUXILIARES
 # ============================================================================
 
-def gerar_nome_empresa() -> str:
+def gerar_nome_empresa(aleatorio: random.Random = None) -> str:
     """
     Gera um nome de empresa aleatório realista.
     
+    Args:
+        aleatorio: Gerador a usar (padrão: o global do módulo random)
+        
     Returns:
         str: Nome da empresa (ex: "Metalúrgica Silva LTDA")
     """
-    prefixo = random.choice(COMPANY_PREFIXES)
-    nome = random.choice(COMPANY_NAMES)
-    sufixo = random.choice(COMPANY_SUFFIXES)
+    aleatorio = aleatorio or random
+    prefixo = aleatorio.choice(COMPANY_PREFIXES)
+    nome = aleatorio.choice(COMPANY_NAMES)
+    sufixo = aleatorio.choice(COMPANY_SUFFIXES)
     
     return f"{prefixo} {nome} {sufixo}"
 
 
-def selecionar_demanda_contratada(stage: int) -> float:
+def selecionar_demanda_contratada(stage: int, aleatorio: random.Random = None) -> float:
     """
     Seleciona uma demanda contratada aleatória dentro do range do estágio.
     
     Args:
         stage: Estágio da empresa (1-5)
+        aleatorio: Gerador a usar (padrão: o global do módulo random)
         
     Returns:
         float: Demanda contratada em kW
@@ -114,7 +204,7 @@ def selecionar_demanda_contratada(stage: int) -> float:
         raise ValueError(f"Estágio inválido: {stage}. Deve ser 1-5.")
     
     config = COMPANY_STAGES[stage]
-    demanda = random.uniform(config["min_kw"], config["max_kw"])
+    demanda = (aleatorio or random).uniform(config["min_kw"], config["max_kw"])
     
     # Arredondar para valor mais realista
     return round(demanda, 1)
@@ -166,6 +256,10 @@ def gerar_curva_base(hora: int) -> float:
         return 0.98 - (hora - 22) * 0.315
 
 
+# Curva base de cada hora do dia, para consultas vetorizadas
+PERFIL_BASE_HORARIO = np.array([gerar_curva_base(hora) for hora in range(24)])
+
+
 def aplicar_variabilidade(valor_base: float, severidade: str) -> float:
     """
     Aplica variabilidade ao valor base conforme o nível de severidade.
@@ -192,6 +286,30 @@ def aplicar_variabilidade(valor_base: float, severidade: str) -> float:
     return valor_variado
 
 
+def aplicar_variabilidade_array(
+    valores_base: np.ndarray,
+    severidade: str,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Versão vetorizada de aplicar_variabilidade para um array de valores.
+    
+    Args:
+        valores_base: Valores normalizados (pu)
+        severidade: Nível de severidade ('leve', 'moderado', 'grave')
+        rng: Gerador NumPy (define a reprodutibilidade)
+        
+    Returns:
+        np.ndarray: Valores com variabilidade aplicada
+    """
+    if severidade not in SEVERITY_LEVELS:
+        raise ValueError(f"Severidade inválida: {severidade}")
+    
+    config = SEVERITY_LEVELS[severidade]
+    ruido = rng.uniform(config["min_var"], config["max_var"], size=np.shape(valores_base))
+    return np.clip(valores_base + ruido, 0.1, 1.5)
+
+
 def converter_para_kw(valor_pu: float, demanda_contratada: float) -> float:
     """
     Converte valor normalizado (pu) para kW.
@@ -217,21 +335,111 @@ def gerar_timestamps(data_inicio: datetime, dias: int) -> List[datetime]:
     Returns:
         List[datetime]: Lista de timestamps
     """
-    timestamps = []
-    data_atual = data_inicio
+    return gerar_timestamps_array(data_inicio, dias).astype(object).tolist()
+
+
+def gerar_timestamps_array(
+    data_inicio: datetime,
+    dias: int,
+    intervalo_minutos: int = 60,
+) -> np.ndarray:
+    """
+    Gera os timestamps do período como array datetime64[s].
+    
+    Args:
+        data_inicio: Data de início
+        dias: Número de dias
+        intervalo_minutos: Intervalo entre medições (deve dividir o dia)
+        
+    Returns:
+        np.ndarray: Timestamps datetime64[s]
+    """
+    if intervalo_minutos <= 0 or (24 * 60) % intervalo_minutos != 0:
+        raise ValueError(f"Intervalo inválido: {intervalo_minutos} min. Deve dividir o dia.")
+    
+    passos = dias * (24 * 60 // intervalo_minutos)
+    inicio = np.datetime64(data_inicio.replace(microsecond=0), "s")
+    return inicio + np.arange(passos, dtype=np.int64) * np.timedelta64(intervalo_minutos * 60, "s")
+
+
+def gerar_curvas_carga(
+    demandas_contratadas,
+    severidade: str,
+    dias: int,
+    data_inicio: datetime = None,
+    intervalo_minutos: int = 60,
+    perfil_semanal: str = "continuo",
+    amplitude_sazonal: float = 0.0,
+    rng: np.random.Generator = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gera um lote de curvas de carga de uma vez, como arrays.
+    
+    Mesma composição de gerar_curva_carga (curva base, ruído da severidade,
+    conversão para kW com 1 casa decimal), calculada para todos os pontos e
+    curvas em operações NumPy. O período pode ter vários anos.
+    
+    A curva base de cada passo é a da sua hora. Antes do ruído ela é
+    multiplicada pelo fator do dia da semana (WEEKLY_PROFILES) e por um
+    fator sazonal 1 + amplitude * cos(2π (dia_do_ano - SEASONAL_PEAK_DAY) / 365.25).
+    
+    Args:
+        demandas_contratadas: Demanda contratada (kW) de cada curva do lote
+        severidade: Nível de severidade
+        dias: Número de dias
+        data_inicio: Data de início (padrão: hoje)
+        intervalo_minutos: Intervalo entre medições (60, 15, 5, 1...)
+        perfil_semanal: Chave de WEEKLY_PROFILES
+        amplitude_sazonal: Variação sazonal relativa (0 desativa)
+        rng: Gerador NumPy (padrão: novo gerador sem semente)
+        
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Timestamps (n,) e potências (curvas x n) em kW
+    """
+    if perfil_semanal not in WEEKLY_PROFILES:
+        raise ValueError(f"Perfil semanal inválido: {perfil_semanal}")
+    
+    if data_inicio is None:
+        data_inicio = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    rng = rng if rng is not None else np.random.default_rng()
+    demandas = np.atleast_1d(np.asarray(demandas_contratadas, dtype=np.float64))
     
-    for _ in range(dias * 24):  # 24 horas por dia
-        timestamps.append(data_atual)
-        data_atual += timedelta(hours=1)
+    timestamps = gerar_timestamps_array(data_inicio, dias, intervalo_minutos)
+    segundos = timestamps.astype(np.int64)
+    dias_epoca = np.floor_divide(segundos, 86400)
+    horas = (segundos - dias_epoca * 86400) // 3600
+    
+    valores_base = PERFIL_BASE_HORARIO[horas]
+    
+    fatores_semana = np.asarray(WEEKLY_PROFILES[perfil_semanal])
+    if np.any(fatores_semana != 1.0):
+        valores_base = valores_base * fatores_semana[(dias_epoca + WEEKDAY_EPOCH) % 7]
+    
+    if amplitude_sazonal:
+        dia_do_ano = (timestamps.astype("datetime64[D]") - timestamps.astype("datetime64[Y]")).astype(np.int64)
+        valores_base = valores_base * (
+            1 + amplitude_sazonal * np.cos(2 * np.pi * (dia_do_ano - SEASONAL_PEAK_DAY) / 365.25)
+        )
+    
+    # Ruído independente por curva e por ponto
+    valores_variados = aplicar_variabilidade_array(
+        np.broadcast_to(valores_base, (len(demandas), len(valores_base))), severidade, rng
+    )
+    potencias = np.round(valores_variados * demandas[:, None], 1)
     
-    return timestamps
+    return timestamps, potencias
 
 
 def gerar_curva_carga(
     demanda_contratada: float,
     severidade: str,
     dias: int,
-    data_inicio: datetime = None
+    data_inicio: datetime = None,
+    intervalo_minutos: int = 60,
+    perfil_semanal: str = "continuo",
+    amplitude_sazonal: float = 0.0,
+    semente: int = None,
 ) -> Tuple[List[datetime], List[float]]:
     """
     Gera a curva de carga completa para o período especificado.
@@ -241,89 +449,239 @@ def gerar_curva_carga(
         severidade: Nível de severidade
         dias: Número de dias
         data_inicio: Data de início (padrão: hoje)
+        intervalo_minutos: Intervalo entre medições
+        perfil_semanal: Chave de WEEKLY_PROFILES
+        amplitude_sazonal: Variação sazonal relativa (0 desativa)
+        semente: Semente do gerador (reprodutibilidade)
         
     Returns:
         Tuple[List[datetime], List[float]]: Timestamps e potências em kW
     """
-    if data_inicio is None:
-        data_inicio = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    timestamps, potencias = gerar_curvas_carga(
+        demanda_contratada,
+        severidade,
+        dias,
+        data_inicio,
+        intervalo_minutos=intervalo_minutos,
+        perfil_semanal=perfil_semanal,
+        amplitude_sazonal=amplitude_sazonal,
+        rng=np.random.default_rng(semente),
+    )
+    
+    return timestamps.astype(object).tolist(), potencias[0].tolist()
+
+
+def cabecalho_potencia(nome_empresa: str) -> str:
+    """
+    Cabeçalho da coluna de potência no formato Elspec.
+    """
+    return f"[kW] Active Power Total (Cycle) Average, {nome_empresa} - WYE"
+
+
+def formatar_timestamps_elspec(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Formata timestamps no padrão Elspec (DD/MM/YYYY HH:MM:SS.000000) de uma vez.
     
-    timestamps = gerar_timestamps(data_inicio, dias)
-    potencias = []
+    Os caracteres da string ISO são reordenados como array de códigos,
+    sem strftime por linha.
     
-    for timestamp in timestamps:
-        hora = timestamp.hour
-        
-        # Gerar curva base
-        valor_base = gerar_curva_base(hora)
-        
-        # Aplicar variabilidade
-        valor_variado = aplicar_variabilidade(valor_base, severidade)
-        
-        # Converter para kW
-        potencia_kw = converter_para_kw(valor_variado, demanda_contratada)
-        
-        # Arredondar para 1 casa decimal
-        potencia_kw = round(potencia_kw, 1)
+    Args:
+        timestamps: Array datetime64
         
-        potencias.append(potencia_kw)
+    Returns:
+        np.ndarray: Strings formatadas
+    """
+    iso = np.datetime_as_string(np.asarray(timestamps).astype("datetime64[s]"), unit="s").astype("U19")
+    codigos = iso.view(np.uint32).reshape(len(iso), 19)
     
-    return timestamps, potencias
+    elspec = codigos[:, ELSPEC_CHAR_ORDER].copy()
+    elspec[:, 2] = elspec[:, 5] = ord("/")
+    elspec[:, 10] = ord(" ")
+    return np.char.add(elspec.view("U19").ravel(), ".000000")
+
+
+def _blocos_curva(timestamps, potencias):
+    """
+    Percorre a curva em blocos de WRITE_BLOCK_ROWS linhas.
+    """
+    timestamps = np.asarray(timestamps, dtype="datetime64[s]")
+    potencias = np.asarray(potencias, dtype=np.float64)
+    
+    for inicio in range(0, len(timestamps), WRITE_BLOCK_ROWS):
+        fim = inicio + WRITE_BLOCK_ROWS
+        yield timestamps[inicio:fim], potencias[inicio:fim]
 
 
 def gerar_arquivo_excel(
-    timestamps: List[datetime],
-    potencias: List[float],
+    timestamps,
+    potencias,
     nome_empresa: str,
     caminho_saida: str
 ) -> str:
     """
     Gera arquivo Excel no formato Elspec.
     
+    O pacote XLSX é escrito diretamente: o XML da planilha é gerado em
+    blocos e gravado em streaming dentro do zip, sem montar a planilha em
+    memória nem criar um objeto por célula. Os timestamps vão como texto
+    (inlineStr) já formatados.
+    
     Args:
-        timestamps: Lista de timestamps
-        potencias: Lista de potências em kW
+        timestamps: Timestamps (lista de datetime ou array datetime64)
+        potencias: Potências em kW
         nome_empresa: Nome da empresa
         caminho_saida: Caminho para salvar o arquivo
         
     Returns:
         str: Caminho do arquivo criado
     """
-    # Criar workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Data"
+    if len(timestamps) + 1 > EXCEL_MAX_ROWS:
+        raise ValueError(
+            f"{len(timestamps)} pontos excedem o limite de linhas do Excel. Use saída .csv ou .parquet."
+        )
     
-    # Adicionar headers
-    ws["A1"] = "Time stamp"
-    ws["B1"] = f"[kW] Active Power Total (Cycle) Average, {nome_empresa} - WYE"
+    # Garantir que o diretório existe
+    os.makedirs(os.path.dirname(os.path.abspath(caminho_saida)), exist_ok=True)
     
-    # Adicionar dados
-    for i, (timestamp, potencia) in enumerate(zip(timestamps, potencias), start=2):
-        # Formatar timestamp como DD/MM/YYYY HH:MM:SS.000000
-        timestamp_str = timestamp.strftime("%d/%m/%Y %H:%M:%S.000000")
-        ws[f"A{i}"] = timestamp_str
-        ws[f"B{i}"] = potencia
+    with zipfile.ZipFile(caminho_saida, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as pacote:
+        for nome, conteudo in XLSX_PARTS.items():
+            pacote.writestr(nome, conteudo)
+        
+        with pacote.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as planilha:
+            # Headers e largura das colunas
+            planilha.write((
+                XLSX_SHEET_HEADER
+                + '<row r="1">'
+                + '<c r="A1" t="inlineStr"><is><t>Time stamp</t></is></c>'
+                + f'<c r="B1" t="inlineStr"><is><t>{escape(cabecalho_potencia(nome_empresa))}</t></is></c>'
+                + "</row>"
+            ).encode("utf-8"))
+            
+            # Dados em blocos, com timestamps já formatados
+            linha = 2
+            for bloco_ts, bloco_potencias in _blocos_curva(timestamps, potencias):
+                textos = formatar_timestamps_elspec(bloco_ts).tolist()
+                planilha.write("".join(
+                    f'<row r="{n}"><c r="A{n}" t="inlineStr"><is><t>{texto}</t></is></c>'
+                    f'<c r="B{n}"><v>{valor!r}</v></c></row>'
+                    for n, texto, valor in zip(range(linha, linha + len(textos)), textos, bloco_potencias.tolist())
+                ).encode("ascii"))
+                linha += len(textos)
+            
+            planilha.write(b"</sheetData></worksheet>")
     
-    # Ajustar largura das colunas
-    ws.column_dimensions["A"].width = 30
-    ws.column_dimensions["B"].width = 50
+    return caminho_saida
+
+
+def gerar_arquivo_csv(
+    timestamps,
+    potencias,
+    nome_empresa: str,
+    caminho_saida: str
+) -> str:
+    """
+    Gera arquivo CSV com o mesmo layout Elspec (lido pelo parser).
     
-    # Garantir que o diretório existe
-    import os
-    os.makedirs(os.path.dirname(caminho_saida), exist_ok=True)
-    # Salvar arquivo
-    wb.save(caminho_saida)
+    Args:
+        timestamps: Timestamps (lista de datetime ou array datetime64)
+        potencias: Potências em kW
+        nome_empresa: Nome da empresa
+        caminho_saida: Caminho para salvar o arquivo
+        
+    Returns:
+        str: Caminho do arquivo criado
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(caminho_saida)), exist_ok=True)
+    
+    with open(caminho_saida, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["Time stamp", cabecalho_potencia(nome_empresa)])
+        for bloco_ts, bloco_potencias in _blocos_curva(timestamps, potencias):
+            f.write("".join(
+                f"{texto},{valor!r}\n"
+                for texto, valor in zip(formatar_timestamps_elspec(bloco_ts).tolist(), bloco_potencias.tolist())
+            ))
     
     return caminho_saida
 
 
+def gerar_arquivo_parquet(
+    timestamps,
+    potencias,
+    nome_empresa: str,
+    caminho_saida: str
+) -> str:
+    """
+    Gera arquivo Parquet (colunas timestamp e potencia_kw), em row groups.
+    
+    Requer pyarrow.
+    
+    Args:
+        timestamps: Timestamps (lista de datetime ou array datetime64)
+        potencias: Potências em kW
+        nome_empresa: Nome da empresa
+        caminho_saida: Caminho para salvar o arquivo
+        
+    Returns:
+        str: Caminho do arquivo criado
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Saída Parquet requer o pacote pyarrow")
+    
+    os.makedirs(os.path.dirname(os.path.abspath(caminho_saida)), exist_ok=True)
+    
+    esquema = pa.schema(
+        [("timestamp", pa.timestamp("s")), ("potencia_kw", pa.float64())],
+        metadata={"empresa": nome_empresa, "coluna_potencia": cabecalho_potencia(nome_empresa)},
+    )
+    with pq.ParquetWriter(caminho_saida, esquema) as escritor:
+        for bloco_ts, bloco_potencias in _blocos_curva(timestamps, potencias):
+            escritor.write_table(
+                pa.Table.from_arrays([pa.array(bloco_ts), pa.array(bloco_potencias)], schema=esquema)
+            )
+    
+    return caminho_saida
+
+
+def gravar_curva(
+    timestamps,
+    potencias,
+    nome_empresa: str,
+    caminho_saida: str
+) -> str:
+    """
+    Grava a curva no formato indicado pela extensão (.xlsx, .csv ou .parquet).
+    
+    Returns:
+        str: Caminho do arquivo criado
+    """
+    extensao = os.path.splitext(caminho_saida)[1].lower()
+    if extensao not in OUTPUT_WRITERS:
+        raise ValueError(f"Formato de saída não suportado: {extensao}")
+    
+    return OUTPUT_WRITERS[extensao](timestamps, potencias, nome_empresa, caminho_saida)
+
+
+OUTPUT_WRITERS = {
+    ".xlsx": gerar_arquivo_excel,
+    ".csv": gerar_arquivo_csv,
+    ".parquet": gerar_arquivo_parquet,
+}
+
+
 def gerar_caso_teste(
     stage: int,
     severidade: str,
     dias: int,
     data_inicio: datetime = None,
-    caminho_saida: str = None
+    caminho_saida: str = None,
+    formato: str = "xlsx",
+    intervalo_minutos: int = 60,
+    perfil_semanal: str = "continuo",
+    amplitude_sazonal: float = 0.0,
+    semente: int = None,
 ) -> Dict:
     """
     Gera um caso de teste completo (arquivo Excel + metadados).
@@ -332,8 +690,14 @@ def gerar_caso_teste(
         stage: Estágio da empresa (1-5)
         severidade: Nível de severidade ('leve', 'moderado', 'grave')
         dias: Número de dias a simular
-        data_inicio: Data de início (padrão: hoje)
-        caminho_saida: Caminho para salvar (padrão: auto-gerado)
+        data_inicio: Data de início, datetime ou ISO (padrão: hoje)
+        caminho_saida: Caminho para salvar (padrão: auto-gerado); a extensão
+            define o formato (.xlsx, .csv ou .parquet)
+        formato: Formato do caminho auto-gerado ('xlsx', 'csv' ou 'parquet')
+        intervalo_minutos: Intervalo entre medições
+        perfil_semanal: Chave de WEEKLY_PROFILES
+        amplitude_sazonal: Variação sazonal relativa (0 desativa)
+        semente: Semente do caso; fixa empresa, demanda e curva
         
     Returns:
         Dict: Metadados do caso gerado
@@ -351,28 +715,37 @@ def gerar_caso_teste(
     # Definir data de início
     if data_inicio is None:
         data_inicio = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    elif isinstance(data_inicio, str):
+        data_inicio = datetime.fromisoformat(data_inicio)
+    
+    aleatorio = random.Random(semente) if semente is not None else None
     
     # Gerar nome da empresa
-    nome_empresa = gerar_nome_empresa()
+    nome_empresa = gerar_nome_empresa(aleatorio)
     
     # Selecionar demanda contratada
-    demanda_contratada = selecionar_demanda_contratada(stage)
+    demanda_contratada = selecionar_demanda_contratada(stage, aleatorio)
     
     # Gerar curva de carga
-    timestamps, potencias = gerar_curva_carga(
+    timestamps, curvas = gerar_curvas_carga(
         demanda_contratada,
         severidade,
         dias,
-        data_inicio
+        data_inicio,
+        intervalo_minutos=intervalo_minutos,
+        perfil_semanal=perfil_semanal,
+        amplitude_sazonal=amplitude_sazonal,
+        rng=np.random.default_rng(semente),
     )
+    potencias = curvas[0]
     
     # Definir caminho de saída
     if caminho_saida is None:
-        nome_arquivo = f"caso_teste_{stage}_{severidade}_{dias}dias.xlsx"
+        nome_arquivo = f"caso_teste_{stage}_{severidade}_{dias}dias.{formato}"
         caminho_saida = f"/uploads/{nome_arquivo}"
     
-    # Gerar arquivo Excel
-    caminho_arquivo = gerar_arquivo_excel(
+    # Gerar arquivo (Excel, CSV ou Parquet)
+    caminho_arquivo = gravar_curva(
         timestamps,
         potencias,
         nome_empresa,
@@ -380,9 +753,9 @@ def gerar_caso_teste(
     )
     
     # Calcular estatísticas
-    potencia_max = max(potencias)
-    potencia_min = min(potencias)
-    potencia_media = sum(potencias) / len(potencias)
+    potencia_max = float(potencias.max())
+    potencia_min = float(potencias.min())
+    potencia_media = float(potencias.mean())
     
     # Retornar metadados
     return {
@@ -396,6 +769,10 @@ def gerar_caso_teste(
         "data_inicio": data_inicio.isoformat(),
         "data_fim": (data_inicio + timedelta(days=dias - 1)).isoformat(),
         "demanda_contratada_kw": demanda_contratada,
+        "intervalo_minutos": intervalo_minutos,
+        "perfil_semanal": perfil_semanal,
+        "amplitude_sazonal": amplitude_sazonal,
+        "semente": semente,
         "potencia_maxima_kw": round(potencia_max, 1),
         "potencia_minima_kw": round(potencia_min, 1),
         "potencia_media_kw": round(potencia_media, 1),
@@ -439,6 +816,38 @@ if __name__ == "__main__":
         default=None,
         help="Caminho de saída do arquivo"
     )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default="xlsx",
+        choices=["xlsx", "csv", "parquet"],
+        help="Formato do arquivo quando --output não é informado"
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=60,
+        help="Intervalo entre medições em minutos (60, 15, 5, 1...)"
+    )
+    parser.add_argument(
+        "--weekly-profile",
+        type=str,
+        default="continuo",
+        choices=list(WEEKLY_PROFILES),
+        help="Perfil de consumo por dia da semana"
+    )
+    parser.add_argument(
+        "--seasonal-amplitude",
+        type=float,
+        default=0.0,
+        help="Variação sazonal relativa (ex.: 0.15)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Semente do caso (empresa, demanda e curva)"
+    )
     
     args = parser.parse_args()
     
@@ -447,7 +856,12 @@ if __name__ == "__main__":
         stage=args.stage,
         severidade=args.severity,
         dias=args.days,
-        caminho_saida=args.output
+        caminho_saida=args.output,
+        formato=args.format,
+        intervalo_minutos=args.interval,
+        perfil_semanal=args.weekly_profile,
+        amplitude_sazonal=args.seasonal_amplitude,
+        semente=args.seed,
     )
     
     # Exibir resultado
@@ -0,0 +1,224 @@
+"""
+MÓDULO: Métricas de execução (instrumentação opcional)
+
+Cronômetros por fase e contadores para localizar onde o tempo de uma
+tarefa é gasto (leitura da planilha, conversão de timestamps, montagem
+da grade, despacho, serialização...).
+
+A coleta só acontece dentro de `coletar_metricas()`. Fora dela,
+`fase()` e `contar()` apenas consultam uma ContextVar e retornam, então
+os módulos de cálculo podem chamá-las sem custo perceptível.
+
+O andamento de tarefas longas segue o mesmo modelo: `progresso()` avisa
+quantos itens de uma etapa (dias simulados, candidatos avaliados...) já
+foram concluídos, e só tem efeito dentro de `ouvir_progresso()`.
+
+Uso:
+    with coletar_metricas(perfil="cprofile") as coletor:
+        resultado = simular_bess(...)
+    resultado["metricas"] = coletor.resultado()
+"""
+
+import cProfile
+import functools
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+
+PERFIS = ("cprofile", "tracemalloc")
+
+# Funções (cProfile) ou linhas (tracemalloc) listadas no perfil
+LINHAS_PERFIL = 25
+
+# Intervalo mínimo entre dois eventos de progresso da mesma etapa (s)
+INTERVALO_PROGRESSO_S = 0.25
+
+_coletor: ContextVar[Optional["ColetorMetricas"]] = ContextVar("coletor_metricas", default=None)
+_ouvinte_progresso: ContextVar[Optional[Callable]] = ContextVar("ouvinte_progresso", default=None)
+_SEM_COLETA = nullcontext()
+
+
+class ColetorMetricas:
+    """
+    Acumula tempos por fase (s) e contadores de uma execução.
+
+    Fases com o mesmo nome somam seus tempos; fases aninhadas são medidas
+    independentemente (o tempo da fase interna também conta na externa).
+    """
+
+    def __init__(self):
+        self.fases: Dict[str, float] = {}
+        self.chamadas: Dict[str, int] = {}
+        self.contadores: Dict[str, int] = {}
+        self.inicio = time.perf_counter()
+        self.tempo_total_s = None
+        self.perfil = None
+
+    @contextmanager
+    def fase(self, nome: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = self.fases.get(nome, 0.0) + (time.perf_counter() - inicio)
+            self.chamadas[nome] = self.chamadas.get(nome, 0) + 1
+
+    def contar(self, nome: str, quantidade: int = 1) -> None:
+        self.contadores[nome] = self.contadores.get(nome, 0) + int(quantidade)
+
+    def resultado(self) -> Dict:
+        """
+        Métricas em formato JSON.
+
+        Returns:
+            Dict com tempo_total_s, fases_s, chamadas, contadores e perfil
+        """
+        total = self.tempo_total_s if self.tempo_total_s is not None else time.perf_counter() - self.inicio
+        metricas = {
+            "tempo_total_s": round(total, 6),
+            "fases_s": {nome: round(tempo, 6) for nome, tempo in self.fases.items()},
+            "chamadas": dict(self.chamadas),
+            "contadores": dict(self.contadores),
+        }
+        if self.perfil is not None:
+            metricas["perfil"] = self.perfil
+        return metricas
+
+
+def fase(nome: str):
+    """
+    Cronometra um trecho na coleta ativa (sem efeito fora dela).
+    """
+    coletor = _coletor.get()
+    return coletor.fase(nome) if coletor is not None else _SEM_COLETA
+
+
+def contar(nome: str, quantidade: int = 1) -> None:
+    """
+    Incrementa um contador na coleta ativa (sem efeito fora dela).
+    """
+    coletor = _coletor.get()
+    if coletor is not None:
+        coletor.contar(nome, quantidade)
+
+
+def cronometrada(nome: str):
+    """
+    Decorador: cada chamada da função conta como uma fase `nome`.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            coletor = _coletor.get()
+            if coletor is None:
+                return funcao(*args, **kwargs)
+            with coletor.fase(nome):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def _resumir_cprofile(perfilador: cProfile.Profile) -> Dict:
+    estatisticas = pstats.Stats(perfilador)
+    funcoes = []
+    for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in estatisticas.stats.items():
+        funcoes.append({
+            "funcao": f"{arquivo}:{linha}({funcao})",
+            "chamadas": chamadas,
+            "tempo_proprio_s": round(proprio, 6),
+            "tempo_acumulado_s": round(acumulado, 6),
+        })
+    funcoes.sort(key=lambda f: f["tempo_acumulado_s"], reverse=True)
+    return {"tipo": "cprofile", "funcoes": funcoes[:LINHAS_PERFIL]}
+
+
+def _resumir_tracemalloc(instantaneo: tracemalloc.Snapshot, pico: int) -> Dict:
+    linhas = [
+        {
+            "local": f"{estatistica.traceback[0].filename}:{estatistica.traceback[0].lineno}",
+            "kb": round(estatistica.size / 1024, 1),
+            "blocos": estatistica.count,
+        }
+        for estatistica in instantaneo.statistics("lineno")[:LINHAS_PERFIL]
+    ]
+    return {"tipo": "tracemalloc", "alocacao_pico_mb": round(pico / (1024 * 1024), 3), "linhas": linhas}
+
+
+@contextmanager
+def coletar_metricas(perfil: Optional[str] = None):
+    """
+    Ativa a coleta de métricas no contexto atual.
+
+    Args:
+        perfil: None, 'cprofile' (funções mais custosas) ou 'tracemalloc'
+            (pico e linhas que mais alocam); ambos deixam a execução mais lenta
+
+    Yields:
+        ColetorMetricas da execução
+    """
+    if perfil is not None and perfil not in PERFIS:
+        raise ValueError(f"Perfil inválido: {perfil}")
+
+    coletor = ColetorMetricas()
+    token = _coletor.set(coletor)
+    perfilador = cProfile.Profile() if perfil == "cprofile" else None
+    rastrear = perfil == "tracemalloc" and not tracemalloc.is_tracing()
+
+    if rastrear:
+        tracemalloc.start()
+    if perfilador:
+        perfilador.enable()
+    try:
+        yield coletor
+    finally:
+        if perfilador:
+            perfilador.disable()
+            coletor.perfil = _resumir_cprofile(perfilador)
+        if rastrear:
+            _, pico = tracemalloc.get_traced_memory()
+            coletor.perfil = _resumir_tracemalloc(tracemalloc.take_snapshot(), pico)
+            tracemalloc.stop()
+        coletor.tempo_total_s = time.perf_counter() - coletor.inicio
+        _coletor.reset(token)
+
+
+def progresso(etapa: str, feitos: int, total: Optional[int] = None) -> None:
+    """
+    Informa o andamento de uma etapa ao ouvinte ativo (sem efeito fora dele).
+    """
+    ouvinte = _ouvinte_progresso.get()
+    if ouvinte is not None:
+        ouvinte(etapa, feitos, total)
+
+
+@contextmanager
+def ouvir_progresso(enviar: Callable[[Dict], None], intervalo_s: float = INTERVALO_PROGRESSO_S):
+    """
+    Encaminha os eventos de progresso do contexto atual.
+
+    Cada etapa envia no máximo um evento por `intervalo_s`, para que laços
+    por dia não inundem o canal; o fim da tarefa é sinalizado pela
+    resposta, não por um último evento.
+
+    Args:
+        enviar: Função chamada com {'etapa', 'feitos', 'total'}
+        intervalo_s: Intervalo mínimo entre eventos da mesma etapa (s)
+    """
+    ultimos: Dict[str, float] = {}
+
+    def ouvinte(etapa: str, feitos: int, total: Optional[int]) -> None:
+        agora = time.monotonic()
+        if agora - ultimos.get(etapa, float("-inf")) < intervalo_s:
+            return
+        ultimos[etapa] = agora
+        enviar({"etapa": etapa, "feitos": int(feitos), "total": None if total is None else int(total)})
+
+    token = _ouvinte_progresso.set(ouvinte)
+    try:
+        yield
+    finally:
+        _ouvinte_progresso.reset(token)
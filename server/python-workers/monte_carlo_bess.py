@@ -0,0 +1,441 @@
+"""
+MÓDULO: Análise de incerteza (Monte Carlo) para BESS
+
+Gera N cenários perturbados de uma curva de carga real, com o mesmo
+modelo de variabilidade do gerador de casos de teste, e simula o BESS em
+cada um. O resultado são distribuições de economia e payback com
+percentis (P50/P90) e, com premissas financeiras, de VPL, TIR e payback
+descontado, projetados para todos os cenários de uma vez.
+
+Reprodutibilidade: o cenário i usa sempre o gerador derivado de
+(semente, i), independentemente de quantos processos ou lotes foram
+usados. Sem semente, uma é sorteada e devolvida no resultado.
+
+Paralelismo: os cenários são divididos em lotes contíguos e executados
+em um pool de processos (spawn). Cada lote monta a grade da curva uma
+única vez e perturba apenas a matriz de potências.
+"""
+
+import json
+import multiprocessing as mp
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from curva_colunar import resolver_curva
+from gerador_casos_teste import SEVERITY_LEVELS, aplicar_variabilidade_array
+from metricas import contar, progresso
+from projecao_financeira import normalizar_premissas, projetar_investimento
+from simulador_bess import SimuladorBESS
+
+
+# Percentis reportados para cada métrica
+PERCENTIS = (5, 10, 25, 50, 75, 90, 95)
+
+# Classes do histograma de cada métrica
+CLASSES_HISTOGRAMA = 20
+
+# Métricas por cenário (na ordem das colunas de simular_cenarios)
+METRICAS = (
+    "economia_anual_reais",
+    "economia_periodo_reais",
+    "reducao_demanda_media_kw",
+)
+
+
+def _criar_simulador(parametros: Dict) -> SimuladorBESS:
+    """
+    Monta o simulador (e a grade diária) da curva base.
+    """
+    potencias_kw, timestamps = resolver_curva(
+        parametros.get("potencias_kw"), parametros.get("timestamps"), parametros.get("arquivo_curva")
+    )
+    simulador = SimuladorBESS(
+        potencias_kw=potencias_kw,
+        timestamps=timestamps,
+        capacidade_bess_kwh=parametros["capacidade_bess_kwh"],
+        potencia_bess_kw=parametros["potencia_bess_kw"],
+        estrategia_carregamento=parametros["estrategia_carregamento"],
+        tarifa_ponta_reais_kwh=parametros["tarifa_ponta"],
+        tarifa_intermediaria_reais_kwh=parametros["tarifa_intermediaria"],
+        tarifa_fora_ponta_reais_kwh=parametros["tarifa_fora_ponta"],
+        cobranca_demanda_reais_kw_mes=parametros.get("cobranca_demanda", 0),
+        feriados=parametros.get("feriados"),
+    )
+    simulador.montar_grade_diaria()
+    return simulador
+
+
+def gerador_cenario(semente: int, indice: int) -> np.random.Generator:
+    """
+    Gerador NumPy do cenário `indice` (independente dos demais).
+    """
+    return np.random.default_rng(np.random.SeedSequence(semente, spawn_key=(indice,)))
+
+
+def simular_cenarios(
+    inicio: int,
+    fim: int,
+    semente: int,
+    severidade: str,
+    demanda_referencia_kw: float = None,
+    **parametros,
+) -> Dict:
+    """
+    Simula os cenários [inicio, fim) de uma análise Monte Carlo.
+
+    As potências são normalizadas pela demanda de referência (padrão: a
+    máxima da curva), recebem o ruído da severidade e voltam para kW.
+    Passos sem medição continuam zerados.
+
+    Args:
+        inicio: Primeiro cenário do lote
+        fim: Cenário final (exclusivo)
+        semente: Semente da análise
+        severidade: 'leve', 'moderado' ou 'grave'
+        demanda_referencia_kw: Base da normalização (kW)
+        **parametros: Curva, tamanho do BESS, estratégia e tarifas
+
+    Returns:
+        Dict com uma lista por métrica, na ordem dos cenários
+    """
+    if severidade not in SEVERITY_LEVELS:
+        raise ValueError(f"Severidade inválida: {severidade}")
+
+    simulador = _criar_simulador(parametros)
+    _, matriz = simulador.montar_grade_diaria()
+    referencia = demanda_referencia_kw or simulador.demanda_contratada
+    medido = simulador.passos_validos if simulador.passos_validos is not None else np.ones(matriz.shape, dtype=bool)
+    base_pu = matriz[medido] / referencia
+
+    contar("cenarios_simulados", fim - inicio)
+    resultados = np.zeros((fim - inicio, len(METRICAS)))
+    for linha, indice in enumerate(range(inicio, fim)):
+        progresso("cenarios_simulados", linha, fim - inicio)
+        perturbada = np.zeros_like(matriz)
+        perturbada[medido] = (
+            aplicar_variabilidade_array(base_pu, severidade, gerador_cenario(semente, indice)) * referencia
+        )
+
+        varredura = simulador.com_matriz(perturbada).simular_varredura(
+            [simulador.capacidade_bess_kwh], [simulador.potencia_bess_kw]
+        )["resultados"]
+        resultados[linha] = (
+            varredura["economia_anual_estimada_reais"][0],
+            varredura["economia_total_periodo_reais"][0],
+            varredura["reducao_demanda_media_kw"][0],
+        )
+
+    return {
+        "sucesso": True,
+        "inicio": inicio,
+        "fim": fim,
+        **{nome: resultados[:, i].tolist() for i, nome in enumerate(METRICAS)},
+    }
+
+
+def dividir_cenarios(cenarios: int, lotes: int) -> List[Tuple[int, int]]:
+    """
+    Divide os cenários em intervalos contíguos de tamanho parecido.
+    """
+    lotes = max(1, min(lotes, cenarios))
+    limites = np.linspace(0, cenarios, lotes + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(limites[:-1], limites[1:]) if b > a]
+
+
+def _executar_lote(argumentos: Tuple[int, int, Dict]) -> Dict:
+    inicio, fim, parametros = argumentos
+    return simular_cenarios(inicio, fim, **parametros)
+
+
+def _distribuicao(valores: np.ndarray) -> Dict:
+    """
+    Estatísticas, percentis e histograma de uma métrica.
+
+    Percentis empíricos (sem interpolação); valores infinitos, como o
+    payback de cenários sem economia, viram None.
+    """
+    def numero(valor):
+        return round(float(valor), 2) if np.isfinite(valor) else None
+
+    finitos = valores[np.isfinite(valores)]
+    percentis = np.percentile(valores, PERCENTIS, method="inverted_cdf")
+
+    distribuicao = {
+        "media": numero(finitos.mean()) if finitos.size else None,
+        "desvio_padrao": numero(finitos.std()) if finitos.size else None,
+        "min": numero(valores.min()),
+        "max": numero(valores.max()),
+        "percentis": {f"p{p}": numero(v) for p, v in zip(PERCENTIS, percentis)},
+    }
+
+    if finitos.size:
+        contagens, limites = np.histogram(finitos, bins=CLASSES_HISTOGRAMA)
+        distribuicao["histograma"] = {
+            "limites": np.round(limites, 2).tolist(),
+            "contagens": contagens.tolist(),
+        }
+
+    return distribuicao
+
+
+def consolidar_cenarios(
+    lotes: List[Dict],
+    investimento_reais: float,
+    incluir_cenarios: bool = False,
+    premissas_financeiras: Dict = None,
+) -> Dict:
+    """
+    Junta os lotes (em qualquer ordem) e calcula as distribuições.
+
+    Args:
+        lotes: Resultados de simular_cenarios
+        investimento_reais: Custo do BESS para o payback (R$)
+        incluir_cenarios: Devolver também os valores de cada cenário
+        premissas_financeiras: Premissas da projeção da vida útil
+            (None = sem VPL/TIR)
+
+    Returns:
+        Dict com resumo P50/P90 e distribuições por métrica
+    """
+    falhas = [lote for lote in lotes if not lote.get("sucesso")]
+    if falhas:
+        return {"sucesso": False, "erro": falhas[0].get("erro", "Falha em um lote de cenários")}
+
+    lotes = sorted(lotes, key=lambda lote: lote["inicio"])
+    valores = {nome: np.concatenate([lote[nome] for lote in lotes]) for nome in METRICAS}
+
+    economia = valores["economia_anual_reais"]
+    with np.errstate(divide="ignore"):
+        valores["payback_anos"] = np.where(economia > 0, investimento_reais / economia, np.inf)
+
+    if premissas_financeiras is not None:
+        projecao = projetar_investimento(economia, investimento_reais, premissas_financeiras)
+        valores["vpl_reais"] = projecao["vpl"]
+        valores["tir_percent"] = projecao["tir"] * 100
+        valores["payback_descontado_anos"] = projecao["payback_descontado"]
+
+    distribuicoes = {nome: _distribuicao(serie) for nome, serie in valores.items()}
+    sem_retorno = int(np.count_nonzero(~np.isfinite(valores["payback_anos"])))
+
+    resultado = {
+        "sucesso": True,
+        "cenarios": len(economia),
+        "investimento_reais": round(investimento_reais, 2),
+        # P90: valor atingido em 90% dos cenários (economia no percentil 10,
+        # payback no percentil 90)
+        "resumo": {
+            "economia_anual_p50_reais": distribuicoes["economia_anual_reais"]["percentis"]["p50"],
+            "economia_anual_p90_reais": distribuicoes["economia_anual_reais"]["percentis"]["p10"],
+            "payback_p50_anos": distribuicoes["payback_anos"]["percentis"]["p50"],
+            "payback_p90_anos": distribuicoes["payback_anos"]["percentis"]["p90"],
+            "cenarios_sem_retorno": sem_retorno,
+        },
+        "distribuicoes": distribuicoes,
+    }
+
+    if premissas_financeiras is not None:
+        resultado["resumo"].update({
+            "vpl_p50_reais": distribuicoes["vpl_reais"]["percentis"]["p50"],
+            "vpl_p90_reais": distribuicoes["vpl_reais"]["percentis"]["p10"],
+            "probabilidade_vpl_positivo_percent": round(float(np.mean(valores["vpl_reais"] > 0)) * 100, 1),
+        })
+        resultado["premissas_financeiras"] = normalizar_premissas(premissas_financeiras)
+
+    if incluir_cenarios:
+        resultado["valores_cenarios"] = {
+            nome: [valor if np.isfinite(valor) else None for valor in serie.tolist()]
+            for nome, serie in valores.items()
+        }
+
+    return resultado
+
+
+def preparar_monte_carlo(
+    potencias_kw: List[float],
+    timestamps: List[str],
+    capacidade_bess_kwh: float,
+    potencia_bess_kw: float,
+    estrategia_carregamento: str,
+    tarifa_ponta: float,
+    tarifa_intermediaria: float,
+    tarifa_fora_ponta: float,
+    cobranca_demanda: float = 0,
+    cenarios: int = 1000,
+    severidade: str = "moderado",
+    semente: int = None,
+    demanda_referencia_kw: float = None,
+    custo_investimento_reais: float = None,
+    custo_kwh_reais: float = 0,
+    custo_kw_reais: float = 0,
+    arquivo_curva: str = None,
+    feriados: List[str] = None,
+) -> Tuple[Dict, float]:
+    """
+    Valida a requisição e monta os parâmetros comuns a todos os lotes.
+
+    Returns:
+        Tupla (parâmetros de simular_cenarios sem inicio/fim, investimento em R$)
+    """
+    if cenarios < 1:
+        raise ValueError("cenarios deve ser pelo menos 1")
+    if severidade not in SEVERITY_LEVELS:
+        raise ValueError(f"Severidade inválida: {severidade}")
+    if capacidade_bess_kwh <= 0:
+        raise ValueError("capacidade_bess_kwh deve ser positiva")
+
+    if semente is None:
+        semente = int(np.random.SeedSequence().generate_state(1, dtype=np.uint64)[0] >> 1)
+
+    if custo_investimento_reais is None:
+        custo_investimento_reais = capacidade_bess_kwh * custo_kwh_reais + potencia_bess_kw * custo_kw_reais
+
+    parametros = {
+        "semente": int(semente),
+        "severidade": severidade,
+        "demanda_referencia_kw": demanda_referencia_kw,
+        "potencias_kw": None if arquivo_curva else potencias_kw,
+        "timestamps": None if arquivo_curva else timestamps,
+        "arquivo_curva": arquivo_curva,
+        "capacidade_bess_kwh": capacidade_bess_kwh,
+        "potencia_bess_kw": potencia_bess_kw,
+        "estrategia_carregamento": estrategia_carregamento,
+        "tarifa_ponta": tarifa_ponta,
+        "tarifa_intermediaria": tarifa_intermediaria,
+        "tarifa_fora_ponta": tarifa_fora_ponta,
+        "cobranca_demanda": cobranca_demanda,
+        "feriados": feriados,
+    }
+    return parametros, float(custo_investimento_reais)
+
+
+def monte_carlo_bess(
+    potencias_kw: List[float],
+    timestamps: List[str],
+    capacidade_bess_kwh: float,
+    potencia_bess_kw: float,
+    estrategia_carregamento: str,
+    tarifa_ponta: float,
+    tarifa_intermediaria: float,
+    tarifa_fora_ponta: float,
+    cobranca_demanda: float = 0,
+    cenarios: int = 1000,
+    severidade: str = "moderado",
+    semente: int = None,
+    demanda_referencia_kw: float = None,
+    custo_investimento_reais: float = None,
+    custo_kwh_reais: float = 0,
+    custo_kw_reais: float = 0,
+    processos: int = None,
+    incluir_cenarios: bool = False,
+    arquivo_curva: str = None,
+    feriados: List[str] = None,
+    premissas_financeiras: Dict = None,
+) -> Dict:
+    """
+    Função wrapper da análise Monte Carlo.
+
+    Em um processo daemon (ex.: worker do servidor_workers) não é possível
+    abrir um pool próprio e os cenários rodam no processo atual; o
+    servidor de workers distribui os lotes entre os seus workers.
+
+    Args:
+        cenarios: Número de cenários perturbados
+        severidade: Amplitude do ruído ('leve', 'moderado', 'grave')
+        semente: Semente da análise (sorteada se omitida)
+        demanda_referencia_kw: Base da normalização (padrão: máxima da curva)
+        custo_investimento_reais: Custo total do BESS (padrão: por kWh/kW)
+        processos: Processos do pool (padrão: núcleos disponíveis)
+        incluir_cenarios: Devolver também os valores de cada cenário
+        premissas_financeiras: Premissas da projeção da vida útil ({} =
+            padrão); acrescenta distribuições de VPL, TIR e payback descontado
+
+    Returns:
+        Dict com resumo P50/P90, distribuições e a semente usada
+    """
+    try:
+        if premissas_financeiras is not None:
+            premissas_financeiras = normalizar_premissas(premissas_financeiras)
+
+        parametros, investimento = preparar_monte_carlo(
+            potencias_kw, timestamps, capacidade_bess_kwh, potencia_bess_kw,
+            estrategia_carregamento, tarifa_ponta, tarifa_intermediaria, tarifa_fora_ponta,
+            cobranca_demanda=cobranca_demanda,
+            cenarios=cenarios,
+            severidade=severidade,
+            semente=semente,
+            demanda_referencia_kw=demanda_referencia_kw,
+            custo_investimento_reais=custo_investimento_reais,
+            custo_kwh_reais=custo_kwh_reais,
+            custo_kw_reais=custo_kw_reais,
+            arquivo_curva=arquivo_curva,
+            feriados=feriados,
+        )
+
+        processos = processos or os.cpu_count() or 1
+        if mp.current_process().daemon:
+            processos = 1
+        processos = min(processos, cenarios)
+
+        if processos == 1:
+            lotes = [simular_cenarios(0, cenarios, **parametros)]
+        else:
+            # Poucos lotes por processo: cada lote remonta a grade uma vez
+            intervalos = dividir_cenarios(cenarios, processos * 4)
+            with mp.get_context("spawn").Pool(processos) as pool:
+                lotes = pool.map(
+                    _executar_lote, [(inicio, fim, parametros) for inicio, fim in intervalos], chunksize=1
+                )
+
+        resultado = consolidar_cenarios(lotes, investimento, incluir_cenarios, premissas_financeiras)
+        resultado["semente"] = parametros["semente"]
+        resultado["severidade"] = severidade
+        return resultado
+
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": str(e)
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Análise Monte Carlo de BESS")
+    parser.add_argument("--curve", required=True, help="Curva no formato colunar (.bcurva)")
+    parser.add_argument("--capacity", type=float, required=True, help="Capacidade BESS (kWh)")
+    parser.add_argument("--power", type=float, required=True, help="Potência BESS (kW)")
+    parser.add_argument("--strategy", default="grid-offpeak", choices=["solar", "grid-offpeak"])
+    parser.add_argument("--scenarios", type=int, default=1000, help="Número de cenários")
+    parser.add_argument("--severity", default="moderado", choices=list(SEVERITY_LEVELS))
+    parser.add_argument("--seed", type=int, default=None, help="Semente")
+    parser.add_argument("--processes", type=int, default=None, help="Processos do pool")
+    parser.add_argument("--cost", type=float, default=None, help="Custo total do BESS (R$)")
+
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resultado = monte_carlo_bess(
+        potencias_kw=None,
+        timestamps=None,
+        arquivo_curva=args.curve,
+        capacidade_bess_kwh=args.capacity,
+        potencia_bess_kw=args.power,
+        estrategia_carregamento=args.strategy,
+        tarifa_ponta=1.71,
+        tarifa_intermediaria=1.12,
+        tarifa_fora_ponta=0.72,
+        cobranca_demanda=50,
+        cenarios=args.scenarios,
+        severidade=args.severity,
+        semente=args.seed,
+        custo_investimento_reais=args.cost,
+        processos=args.processes,
+    )
+    resultado.pop("distribuicoes", None)
+    resultado["tempo_s"] = round(time.perf_counter() - inicio, 2)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
@@ -7,21 +7,39 @@ utilizada pela aplicação.
 Formato esperado:
 - Coluna A: Timestamps (DD/MM/YYYY HH:MM:SS.000000)
 - Coluna B: Potência ativa em kW
+- Colunas C em diante (opcional): outros medidores, ver separar_medidores
 """
 
+import hashlib
 import json
+import os
 from datetime import datetime
 from typing import List, Dict, Tuple
 from pathlib import Path
+import numpy as np
 import pandas as pd
+from openpyxl import load_workbook
 
+from calendario_tarifario import (
+    CLASSE_FORA_PONTA,
+    CLASSE_INTERMEDIARIA,
+    CLASSE_PONTA,
+    SEGUNDOS_DIA,
+    SEGUNDOS_HORA,
+    obter_calendario,
+)
+from curva_colunar import EXTENSAO as EXTENSAO_CURVA
+from curva_colunar import EscritorCurvaColunar, para_datetime64, resolver_curva, salvar_curva_colunar
+from metricas import contar, cronometrada, fase
 
-def parsear_arquivo_excel(caminho_arquivo: str) -> Dict:
+
+def parsear_arquivo_excel(caminho_arquivo: str, caminho_colunar: str = None) -> Dict:
     """
     Faz parse de arquivo Excel no formato Elspec.
     
     Args:
         caminho_arquivo: Caminho para o arquivo Excel
+        caminho_colunar: Se informado, grava também a curva no formato colunar
         
     Returns:
         Dict com dados parseados e metadados
@@ -35,7 +53,9 @@ def parsear_arquivo_excel(caminho_arquivo: str) -> Dict:
             }
         
         # Ler arquivo Excel
-        df = pd.read_excel(caminho_arquivo, sheet_name=0)
+        with fase("ler_planilha"):
+            df = pd.read_excel(caminho_arquivo, sheet_name=0)
+        contar("linhas_lidas", len(df))
         
         # Validar colunas
         if len(df.columns) < 2:
@@ -53,31 +73,33 @@ def parsear_arquivo_excel(caminho_arquivo: str) -> Dict:
         potencias = []
         erros = []
         
-        for idx, (ts_str, pw) in enumerate(zip(col_timestamp, col_potencia)):
-            try:
-                # Skip header se necessário
-                if idx == 0 and isinstance(ts_str, str) and "Time" in ts_str:
-                    continue
-                
-                # Parsear timestamp
-                if isinstance(ts_str, str):
-                    # Formato: DD/MM/YYYY HH:MM:SS.000000
-                    ts = datetime.strptime(ts_str.split('.')[0], "%d/%m/%Y %H:%M:%S")
-                else:
-                    # Pandas datetime
-                    ts = pd.Timestamp(ts_str).to_pydatetime()
-                
-                # Converter potência para float
-                potencia_kw = float(pw)
-                
-                timestamps.append(ts)
-                potencias.append(potencia_kw)
-                
-            except Exception as e:
-                erros.append({
-                    "linha": idx + 1,
-                    "erro": str(e)
-                })
+        with fase("converter_linhas"):
+            for idx, (ts_str, pw) in enumerate(zip(col_timestamp, col_potencia)):
+                try:
+                    # Skip header se necessário
+                    if idx == 0 and isinstance(ts_str, str) and "Time" in ts_str:
+                        continue
+                    
+                    # Parsear timestamp
+                    if isinstance(ts_str, str):
+                        # Formato: DD/MM/YYYY HH:MM:SS.000000
+                        ts = datetime.strptime(ts_str.split('.')[0], "%d/%m/%Y %H:%M:%S")
+                    else:
+                        # Pandas datetime
+                        ts = pd.Timestamp(ts_str).to_pydatetime()
+                    
+                    # Converter potência para float
+                    potencia_kw = float(pw)
+                    
+                    timestamps.append(ts)
+                    potencias.append(potencia_kw)
+                    
+                except Exception as e:
+                    erros.append({
+                        "linha": idx + 1,
+                        "erro": str(e)
+                    })
+        contar("linhas_invalidas", len(erros))
         
         # Validar dados
         if not timestamps or not potencias:
@@ -95,11 +117,23 @@ def parsear_arquivo_excel(caminho_arquivo: str) -> Dict:
         potencia_min = min(potencias)
         potencia_media = sum(potencias) / len(potencias)
         
+        if caminho_colunar:
+            with fase("gravar_colunar"):
+                salvar_curva_colunar(
+                    caminho_colunar,
+                    np.array(timestamps, dtype="datetime64[s]"),
+                    potencias,
+                    metadados={"arquivo": Path(caminho_arquivo).name},
+                )
+        
+        with fase("formatar_timestamps"):
+            timestamps_iso = [ts.isoformat() for ts in timestamps]
+        
         # Retornar resultado
         return {
             "sucesso": True,
             "dados": {
-                "timestamps": [ts.isoformat() for ts in timestamps],
+                "timestamps": timestamps_iso,
                 "potencias": potencias,
                 "data_inicio": data_inicio.isoformat(),
                 "data_fim": data_fim.isoformat(),
@@ -109,6 +143,7 @@ def parsear_arquivo_excel(caminho_arquivo: str) -> Dict:
                 "potencia_minima_kw": round(potencia_min, 2),
                 "potencia_media_kw": round(potencia_media, 2),
             },
+            "arquivo_curva": caminho_colunar,
             "avisos": erros if erros else None
         }
         
@@ -119,65 +154,650 @@ def parsear_arquivo_excel(caminho_arquivo: str) -> Dict:
         }
 
 
-def analisar_curva_carga(potencias: List[float], timestamps: List[str]) -> Dict:
+# Formatos aceitos pelo modo streaming
+EXTENSOES_EXCEL = (".xlsx", ".xlsm")
+EXTENSOES_CSV = (".csv", ".txt")
+
+# Limite de avisos guardados no modo streaming (memória constante)
+MAX_AVISOS_STREAMING = 100
+
+
+class EstatisticasIncrementais:
     """
-    Analisa a curva de carga e identifica características principais.
+    Acumula estatísticas da curva bloco a bloco, sem guardar a série.
+    """
+    
+    def __init__(self):
+        self.total_pontos = 0
+        self.soma = 0.0
+        self.maximo = -np.inf
+        self.minimo = np.inf
+        self.inicio = None
+        self.fim = None
+        self.soma_por_hora = np.zeros(24)
+        self.pontos_por_hora = np.zeros(24, dtype=np.int64)
+    
+    def adicionar(self, timestamps: pd.DatetimeIndex, potencias: np.ndarray) -> None:
+        """
+        Incorpora um bloco de amostras válidas.
+        
+        Args:
+            timestamps: Timestamps do bloco
+            potencias: Potências do bloco em kW
+        """
+        if len(potencias) == 0:
+            return
+        
+        self.total_pontos += len(potencias)
+        self.soma += float(potencias.sum())
+        self.maximo = max(self.maximo, float(potencias.max()))
+        self.minimo = min(self.minimo, float(potencias.min()))
+        
+        inicio, fim = timestamps.min(), timestamps.max()
+        self.inicio = inicio if self.inicio is None else min(self.inicio, inicio)
+        self.fim = fim if self.fim is None else max(self.fim, fim)
+        
+        horas = np.asarray(timestamps.hour)
+        self.soma_por_hora += np.bincount(horas, weights=potencias, minlength=24)
+        self.pontos_por_hora += np.bincount(horas, minlength=24)
+    
+    def resultado(self) -> Dict:
+        """
+        Retorna os metadados no mesmo formato de parsear_arquivo_excel.
+        """
+        inicio = self.inicio.to_pydatetime()
+        fim = self.fim.to_pydatetime()
+        
+        media_por_hora = {
+            hora: round(float(self.soma_por_hora[hora] / self.pontos_por_hora[hora]), 2)
+            if self.pontos_por_hora[hora] else 0
+            for hora in range(24)
+        }
+        
+        return {
+            "data_inicio": inicio.isoformat(),
+            "data_fim": fim.isoformat(),
+            "total_dias": (fim - inicio).days + 1,
+            "total_pontos": self.total_pontos,
+            "potencia_maxima_kw": round(self.maximo, 2),
+            "potencia_minima_kw": round(self.minimo, 2),
+            "potencia_media_kw": round(self.soma / self.total_pontos, 2),
+            "media_por_hora": media_por_hora,
+        }
+
+
+def _transpor_linhas(linhas: List[Tuple], largura: int) -> Tuple[List, List[List]]:
+    """
+    Converte linhas (timestamp, potência, ...) em colunas, completando com None.
+    """
+    completas = (linha + (None,) * (largura - len(linha)) for linha in linhas)
+    colunas = [list(coluna) for coluna in zip(*completas)]
+    return colunas[0], colunas[1:]
+
+
+def _detectar_separador(caminho_arquivo: str) -> str:
+    """
+    Separador de um CSV pela linha de cabeçalho (';', ',' ou tabulação).
+    """
+    with open(caminho_arquivo, newline="", encoding="utf-8-sig") as f:
+        cabecalho = f.readline()
+    
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    if "\t" in cabecalho and separador not in cabecalho:
+        separador = "\t"
+    return separador
+
+
+def ler_cabecalho(caminho_arquivo: str) -> List[str]:
+    """
+    Nomes das colunas do arquivo (primeira linha da primeira planilha ou do CSV).
+    """
+    if Path(caminho_arquivo).suffix.lower() in EXTENSOES_EXCEL:
+        wb = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+        try:
+            primeira = next(wb.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        finally:
+            wb.close()
+        return ["" if nome is None else str(nome).strip() for nome in primeira]
+    
+    separador = _detectar_separador(caminho_arquivo)
+    with open(caminho_arquivo, newline="", encoding="utf-8-sig") as f:
+        return [nome.strip() for nome in f.readline().rstrip("\r\n").split(separador)]
+
+
+def _iterar_blocos_excel(caminho_arquivo: str, tamanho_bloco: int, largura: int = 2):
+    """
+    Lê as primeiras `largura` colunas da primeira planilha em blocos (openpyxl read_only).
+    
+    Produz (timestamps, [potências de cada coluna a partir da B]).
+    """
+    wb = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        linhas = []
+        
+        for linha in ws.iter_rows(min_row=2, max_col=largura, values_only=True):
+            linhas.append(linha)
+            if len(linhas) >= tamanho_bloco:
+                yield _transpor_linhas(linhas, largura)
+                linhas = []
+        
+        if linhas:
+            yield _transpor_linhas(linhas, largura)
+    finally:
+        wb.close()
+
+
+def _iterar_blocos_csv(caminho_arquivo: str, tamanho_bloco: int, largura: int = 2):
+    """
+    Lê as primeiras `largura` colunas de um CSV em blocos, detectando o separador.
+    
+    Produz (timestamps, [potências de cada coluna a partir da segunda]).
+    """
+    separador = _detectar_separador(caminho_arquivo)
+    leitor = pd.read_csv(
+        caminho_arquivo,
+        sep=separador,
+        decimal="," if separador == ";" else ".",
+        usecols=list(range(largura)),
+        dtype=str,
+        chunksize=tamanho_bloco,
+        encoding="utf-8-sig",
+    )
+    for bloco in leitor:
+        yield bloco.iloc[:, 0].tolist(), [bloco.iloc[:, i].tolist() for i in range(1, largura)]
+
+
+def _cronometrar_blocos(blocos):
+    """
+    Repassa os blocos lidos, contando o tempo de leitura como a fase 'ler_blocos'.
+    """
+    iterador = iter(blocos)
+    while True:
+        with fase("ler_blocos"):
+            bloco = next(iterador, None)
+        if bloco is None:
+            return
+        contar("blocos_lidos")
+        yield bloco
+
+
+# Posições de DD/MM/YYYY HH:MM:SS reordenadas para YYYY-MM-DDTHH:MM:SS
+_ORDEM_ISO = [6, 7, 8, 9, 5, 3, 4, 2, 0, 1, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+_SEPARADORES_ELSPEC = {2: "/", 5: "/", 10: " ", 13: ":", 16: ":"}
+
+
+def _converter_timestamps_texto(textos: List[str]) -> np.ndarray:
+    """
+    Converte timestamps Elspec (DD/MM/YYYY HH:MM:SS[.ffffff]) de forma vetorizada.
+    
+    Os caracteres são reordenados para ISO 8601 e convertidos pelo parser
+    nativo do NumPy; linhas fora do layout fixo caem no parser do pandas.
+    
+    Returns:
+        Array datetime64[ns] com NaT nas linhas inválidas
+    """
+    # U19 descarta a fração de segundos
+    brutos = np.array(textos, dtype="U19")
+    codigos = brutos.view(np.uint32).reshape(len(brutos), 19)
+    
+    layout_ok = np.char.str_len(brutos) == 19
+    for posicao, caractere in _SEPARADORES_ELSPEC.items():
+        layout_ok &= codigos[:, posicao] == ord(caractere)
+    
+    iso = codigos[:, _ORDEM_ISO].copy()
+    iso[:, 4] = iso[:, 7] = ord("-")
+    iso[:, 10] = ord("T")
+    iso_texto = iso.view("U19").ravel()
+    
+    resultado = np.full(len(brutos), np.datetime64("NaT"), dtype="datetime64[ns]")
+    try:
+        resultado[layout_ok] = iso_texto[layout_ok].astype("datetime64[ns]")
+        restantes = ~layout_ok
+    except ValueError:
+        restantes = np.ones(len(brutos), dtype=bool)
+    
+    if restantes.any():
+        resultado[restantes] = pd.to_datetime(
+            pd.Series(brutos[restantes]), format="%d/%m/%Y %H:%M:%S", errors="coerce"
+        ).to_numpy(dtype="datetime64[ns]")
+    
+    return resultado
+
+
+def _converter_datas(col_timestamp: List) -> np.ndarray:
+    """
+    Converte a coluna de timestamps de um bloco (texto Elspec ou datetime do Excel).
+    
+    Returns:
+        Array datetime64[ns] com NaT nas linhas inválidas
+    """
+    eh_texto = np.fromiter(
+        (isinstance(v, str) for v in col_timestamp), dtype=bool, count=len(col_timestamp)
+    )
+    
+    datas = np.full(len(col_timestamp), np.datetime64("NaT"), dtype="datetime64[ns]")
+    if eh_texto.all():
+        datas = _converter_timestamps_texto(col_timestamp)
+    else:
+        valores = np.array(col_timestamp, dtype=object)
+        if eh_texto.any():
+            datas[eh_texto] = _converter_timestamps_texto(valores[eh_texto].tolist())
+        # Células de data do Excel chegam como datetime
+        datas[~eh_texto] = pd.to_datetime(
+            pd.Series(valores[~eh_texto]), errors="coerce"
+        ).to_numpy(dtype="datetime64[ns]")
+    return datas
+
+
+def _converter_potencias(col_potencia: List, decimal_virgula: bool = False) -> np.ndarray:
+    """
+    Converte uma coluna de potências de um bloco (NaN nas linhas inválidas).
+    """
+    potencias = pd.Series(col_potencia, dtype=object)
+    if decimal_virgula:
+        potencias = potencias.astype(str).str.replace(",", ".", regex=False)
+    return pd.to_numeric(potencias, errors="coerce").to_numpy(dtype=np.float64)
+
+
+@cronometrada("converter_bloco")
+def _converter_bloco(
+    col_timestamp: List,
+    col_potencia: List,
+    decimal_virgula: bool = False,
+) -> Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+    """
+    Converte um bloco de forma vetorizada.
+    
+    Returns:
+        Tupla (timestamps válidos, potências válidas, máscara de linhas válidas)
+    """
+    datas = _converter_datas(col_timestamp)
+    potencias = _converter_potencias(col_potencia, decimal_virgula)
+    
+    validos = ~np.isnat(datas) & ~np.isnan(potencias)
+    return pd.DatetimeIndex(datas[validos]), potencias[validos], validos
+
+
+def parsear_arquivo_streaming(
+    caminho_arquivo: str,
+    tamanho_bloco: int = 50000,
+    caminho_colunar: str = None,
+) -> Dict:
+    """
+    Faz parse de arquivo Elspec (Excel ou CSV) com memória constante.
+    
+    Lê o arquivo em blocos e acumula apenas estatísticas; a série completa
+    não é devolvida, ao contrário de parsear_arquivo_excel. Com
+    `caminho_colunar`, cada bloco também é gravado no formato colunar.
     
     Args:
-        potencias: Lista de potências em kW
-        timestamps: Lista de timestamps ISO
+        caminho_arquivo: Caminho para o arquivo Excel (.xlsx/.xlsm) ou CSV
+        tamanho_bloco: Linhas processadas por bloco
+        caminho_colunar: Caminho do arquivo colunar a gravar (opcional)
         
     Returns:
-        Dict com análise da curva
+        Dict com metadados e média por hora
     """
     try:
-        # Converter timestamps
-        datas = [datetime.fromisoformat(ts) for ts in timestamps]
-        
-        # Agrupar por hora do dia
-        consumo_por_hora = {}
-        for hora in range(24):
-            consumo_por_hora[hora] = []
-        
-        for data, potencia in zip(datas, potencias):
-            hora = data.hour
-            consumo_por_hora[hora].append(potencia)
-        
-        # Calcular média por hora
-        media_por_hora = {}
-        for hora, consumos in consumo_por_hora.items():
-            if consumos:
-                media_por_hora[hora] = round(sum(consumos) / len(consumos), 2)
-            else:
-                media_por_hora[hora] = 0
-        
-        # Identificar picos
-        potencia_max = max(potencias)
-        potencia_min = min(potencias)
-        potencia_media = sum(potencias) / len(potencias)
+        caminho = Path(caminho_arquivo)
+        if not caminho.exists():
+            return {
+                "sucesso": False,
+                "erro": f"Arquivo não encontrado: {caminho_arquivo}"
+            }
+        
+        extensao = caminho.suffix.lower()
+        if extensao in EXTENSOES_EXCEL:
+            blocos = _iterar_blocos_excel(caminho_arquivo, tamanho_bloco)
+            decimal_virgula = False
+        elif extensao in EXTENSOES_CSV:
+            blocos = _iterar_blocos_csv(caminho_arquivo, tamanho_bloco)
+            decimal_virgula = True
+        else:
+            return {
+                "sucesso": False,
+                "erro": f"Formato não suportado no modo streaming: {extensao}"
+            }
+        
+        estatisticas = EstatisticasIncrementais()
+        escritor = EscritorCurvaColunar(caminho_colunar) if caminho_colunar else None
+        erros = []
+        total_erros = 0
+        linha_base = 0
         
-        # Identificar horários de pico (acima de 90% do máximo)
-        threshold_pico = potencia_max * 0.90
-        horas_pico = [h for h, p in media_por_hora.items() if p >= threshold_pico]
+        for col_timestamp, (col_potencia,) in _cronometrar_blocos(blocos):
+            timestamps, potencias, validos = _converter_bloco(
+                col_timestamp, col_potencia, decimal_virgula
+            )
+            with fase("acumular_estatisticas"):
+                estatisticas.adicionar(timestamps, potencias)
+            if escritor:
+                with fase("gravar_colunar"):
+                    escritor.adicionar(timestamps.to_numpy(), potencias)
+            
+            invalidos = np.flatnonzero(~validos)
+            contar("linhas_lidas", len(col_timestamp))
+            contar("linhas_invalidas", len(invalidos))
+            total_erros += len(invalidos)
+            for idx in invalidos[:max(0, MAX_AVISOS_STREAMING - len(erros))]:
+                erros.append({
+                    "linha": linha_base + int(idx) + 1,
+                    "erro": "Timestamp ou potência inválidos"
+                })
+            linha_base += len(col_timestamp)
         
-        # Identificar horários de vale (abaixo de 50% do máximo)
-        threshold_vale = potencia_max * 0.50
-        horas_vale = [h for h, p in media_por_hora.items() if p <= threshold_vale]
+        if escritor:
+            escritor.finalizar({"arquivo": caminho.name})
+        
+        if estatisticas.total_pontos == 0:
+            return {
+                "sucesso": False,
+                "erro": "Nenhum dado válido encontrado no arquivo"
+            }
         
         return {
             "sucesso": True,
-            "analise": {
-                "potencia_maxima": round(potencia_max, 2),
-                "potencia_minima": round(potencia_min, 2),
-                "potencia_media": round(potencia_media, 2),
-                "fator_variacao": round((potencia_max - potencia_min) / potencia_media, 2),
-                "media_por_hora": media_por_hora,
-                "horas_pico": sorted(horas_pico),
-                "horas_vale": sorted(horas_vale),
-                "potencial_peak_shaving_kw": round(potencia_max - potencia_media, 2),
+            "dados": estatisticas.resultado(),
+            "arquivo_curva": caminho_colunar,
+            "avisos": erros if erros else None,
+            "total_avisos": total_erros,
+        }
+        
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": f"Erro ao processar arquivo: {str(e)}"
+        }
+
+def separar_medidores(
+    caminho_arquivo: str,
+    diretorio_saida: str,
+    tamanho_bloco: int = 50000,
+) -> Dict:
+    """
+    Separa um arquivo com várias colunas de potência em uma curva por medidor.
+    
+    Lê o arquivo uma única vez em blocos (memória constante): os timestamps
+    são convertidos uma vez por bloco e cada coluna de potência segue para
+    a sua curva colunar e as suas estatísticas. Colunas sem nenhum valor
+    válido (ex.: template vazio) são ignoradas.
+    
+    Args:
+        caminho_arquivo: Arquivo Excel (.xlsx/.xlsm) ou CSV; coluna A com
+            timestamps e uma coluna de potência (kW) por medidor
+        diretorio_saida: Pasta das curvas colunares geradas
+        tamanho_bloco: Linhas processadas por bloco
+        
+    Returns:
+        Dict com um item por medidor (nome, coluna, arquivo_curva, dados)
+    """
+    try:
+        caminho = Path(caminho_arquivo)
+        if not caminho.exists():
+            return {
+                "sucesso": False,
+                "erro": f"Arquivo não encontrado: {caminho_arquivo}"
             }
+        
+        extensao = caminho.suffix.lower()
+        if extensao not in EXTENSOES_EXCEL + EXTENSOES_CSV:
+            return {
+                "sucesso": False,
+                "erro": f"Formato não suportado: {extensao}"
+            }
+        
+        nomes = ler_cabecalho(caminho_arquivo)
+        if len(nomes) < 2:
+            return {
+                "sucesso": False,
+                "erro": "Arquivo deve ter pelo menos 2 colunas"
+            }
+        
+        largura = len(nomes)
+        if extensao in EXTENSOES_EXCEL:
+            blocos = _iterar_blocos_excel(caminho_arquivo, tamanho_bloco, largura)
+        else:
+            blocos = _iterar_blocos_csv(caminho_arquivo, tamanho_bloco, largura)
+        decimal_virgula = extensao in EXTENSOES_CSV
+        
+        # Curvas nomeadas pela origem: arquivos homônimos de pastas diferentes não colidem
+        os.makedirs(diretorio_saida, exist_ok=True)
+        origem = hashlib.md5(str(caminho.resolve()).encode("utf-8")).hexdigest()[:8]
+        caminhos = [
+            os.path.join(diretorio_saida, f"{caminho.stem}_{origem}_c{coluna:02d}{EXTENSAO_CURVA}")
+            for coluna in range(2, largura + 1)
+        ]
+        escritores = [EscritorCurvaColunar(c) for c in caminhos]
+        estatisticas = [EstatisticasIncrementais() for _ in caminhos]
+        invalidos = np.zeros(len(caminhos), dtype=np.int64)
+        
+        for col_timestamp, colunas in _cronometrar_blocos(blocos):
+            with fase("converter_bloco"):
+                datas = _converter_datas(col_timestamp)
+                datas_validas = ~np.isnat(datas)
+            contar("linhas_lidas", len(col_timestamp))
+            
+            for i, col_potencia in enumerate(colunas):
+                with fase("converter_bloco"):
+                    potencias = _converter_potencias(col_potencia, decimal_virgula)
+                    validos = datas_validas & ~np.isnan(potencias)
+                invalidos[i] += len(validos) - int(validos.sum())
+                with fase("acumular_estatisticas"):
+                    estatisticas[i].adicionar(pd.DatetimeIndex(datas[validos]), potencias[validos])
+                with fase("gravar_colunar"):
+                    escritores[i].adicionar(datas[validos], potencias[validos])
+        
+        medidores = []
+        colunas_vazias = []
+        for i, escritor in enumerate(escritores):
+            nome = nomes[i + 1] or f"coluna_{i + 2}"
+            escritor.finalizar({"arquivo": caminho.name, "medidor": nome})
+            if estatisticas[i].total_pontos == 0:
+                os.remove(caminhos[i])
+                colunas_vazias.append(nome)
+                continue
+            medidores.append({
+                "medidor": nome,
+                "coluna": i + 2,
+                "arquivo_curva": caminhos[i],
+                "dados": estatisticas[i].resultado(),
+                "linhas_invalidas": int(invalidos[i]),
+            })
+        
+        if not medidores:
+            return {
+                "sucesso": False,
+                "erro": "Nenhum dado válido encontrado no arquivo"
+            }
+        
+        return {
+            "sucesso": True,
+            "arquivo": str(caminho_arquivo),
+            "medidores": medidores,
+            "colunas_vazias": colunas_vazias,
         }
         
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": f"Erro ao processar arquivo: {str(e)}"
+        }
+
+# Percentis da potência incluídos na análise
+PERCENTIS = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+# Pontos da curva de duração de carga (0% a 100% do tempo)
+PONTOS_CURVA_DURACAO = 101
+
+# Horas de pico/vale: média da hora acima/abaixo desta fração do máximo
+LIMIAR_PICO = 0.90
+LIMIAR_VALE = 0.50
+
+
+def _quantis(ordenado: np.ndarray, fracoes: np.ndarray) -> np.ndarray:
+    # Interpolação linear sobre a série já ordenada (mesmo método de np.quantile)
+    return np.interp(fracoes * (len(ordenado) - 1), np.arange(len(ordenado)), ordenado)
+
+
+def _totais_por_posto(valores: np.ndarray, classes: np.ndarray) -> Dict:
+    """
+    Total, média, máximo e mínimo da potência em cada posto tarifário.
+    """
+    soma = np.bincount(classes, weights=valores, minlength=3)
+    pontos = np.bincount(classes, minlength=3)
+    maximos = np.full(3, -np.inf)
+    minimos = np.full(3, np.inf)
+    np.maximum.at(maximos, classes, valores)
+    np.minimum.at(minimos, classes, valores)
+    
+    def calc_stats(classe: int) -> Dict:
+        if not pontos[classe]:
+            return {"total": 0, "media": 0, "max": 0, "min": 0}
+        total = float(soma[classe])
+        return {
+            "total": round(total, 2),
+            "media": round(total / pontos[classe], 2),
+            "max": round(float(maximos[classe]), 2),
+            "min": round(float(minimos[classe]), 2),
+            "pontos": int(pontos[classe]),
+        }
+    
+    return {
+        "ponta": calc_stats(CLASSE_PONTA),
+        "intermediaria": calc_stats(CLASSE_INTERMEDIARIA),
+        "fora_ponta": calc_stats(CLASSE_FORA_PONTA),
+        "total_pontos": len(valores),
+    }
+
+
+@cronometrada("indicadores_curva")
+def _indicadores_curva(valores: np.ndarray, instantes: np.ndarray, classes: np.ndarray = None) -> Dict:
+    """
+    Calcula todos os indicadores da curva sobre os arrays já convertidos.
+    
+    Cada grandeza sai de uma única operação vetorizada: uma ordenação dá
+    máximo, mínimo, percentis e curva de duração; `bincount` dá médias por
+    hora e totais por posto; `reduceat` dá os picos diários.
+    
+    Args:
+        valores: Potências em kW (float64)
+        instantes: Timestamps datetime64[s]
+        classes: Posto tarifário de cada instante (opcional)
+        
+    Returns:
+        Dict com "analise" e, se `classes` foi informado, "classificacao"
+    """
+    n = len(valores)
+    if not n:
+        raise ValueError("Curva sem pontos")
+    
+    segundos = instantes.astype(np.int64)
+    if n > 1 and (segundos[1:] < segundos[:-1]).any():
+        ordem = np.argsort(segundos, kind="stable")
+        segundos, valores = segundos[ordem], valores[ordem]
+        classes = classes[ordem] if classes is not None else None
+    dias = np.floor_divide(segundos, SEGUNDOS_DIA)
+    horas = (segundos - dias * SEGUNDOS_DIA) // SEGUNDOS_HORA
+    
+    # Média por hora do dia
+    soma_por_hora = np.bincount(horas, weights=valores, minlength=24)
+    pontos_por_hora = np.bincount(horas, minlength=24)
+    media_por_hora = {
+        hora: round(float(soma_por_hora[hora] / pontos_por_hora[hora]), 2)
+        if pontos_por_hora[hora] else 0
+        for hora in range(24)
+    }
+    
+    # Máximo, mínimo, percentis e curva de duração (potência excedida em p% do tempo)
+    ordenado = np.sort(valores)
+    potencia_max = float(ordenado[-1])
+    potencia_min = float(ordenado[0])
+    potencia_media = float(soma_por_hora.sum()) / n
+    percentis = _quantis(ordenado, np.asarray(PERCENTIS) / 100)
+    tempo = np.linspace(0, 100, PONTOS_CURVA_DURACAO)
+    duracao = _quantis(ordenado, 1 - tempo / 100)
+    
+    threshold_pico = potencia_max * LIMIAR_PICO
+    threshold_vale = potencia_max * LIMIAR_VALE
+    horas_pico = [h for h, p in media_por_hora.items() if p >= threshold_pico]
+    horas_vale = [h for h, p in media_por_hora.items() if p <= threshold_vale]
+    
+    # Pico de cada dia e a hora em que ocorre (primeira ocorrência do máximo)
+    inicios = np.flatnonzero(np.r_[True, dias[1:] != dias[:-1]])
+    pontos_dia = np.diff(np.r_[inicios, n])
+    picos = np.maximum.reduceat(valores, inicios)
+    no_pico = np.flatnonzero(valores == np.repeat(picos, pontos_dia))
+    dia_do_pico = np.searchsorted(inicios, no_pico, side="right") - 1
+    primeiros = no_pico[np.r_[True, dia_do_pico[1:] != dia_do_pico[:-1]]]
+    frequencia_hora_pico = np.bincount(horas[primeiros], minlength=24)
+    
+    resultado = {
+        "analise": {
+            "potencia_maxima": round(potencia_max, 2),
+            "potencia_minima": round(potencia_min, 2),
+            "potencia_media": round(potencia_media, 2),
+            "fator_variacao": round((potencia_max - potencia_min) / potencia_media, 2),
+            "fator_carga": round(potencia_media / potencia_max, 4) if potencia_max else 0,
+            "media_por_hora": media_por_hora,
+            "horas_pico": horas_pico,
+            "horas_vale": horas_vale,
+            "potencial_peak_shaving_kw": round(potencia_max - potencia_media, 2),
+            "percentis": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTIS, percentis)},
+            "curva_duracao": {
+                "percentual_tempo": tempo.round(2).tolist(),
+                "potencia_kw": duracao.round(2).tolist(),
+            },
+            "picos_diarios": {
+                "dias": len(picos),
+                "media_kw": round(float(picos.mean()), 2),
+                "maximo_kw": round(float(picos.max()), 2),
+                "minimo_kw": round(float(picos.min()), 2),
+                "desvio_padrao_kw": round(float(picos.std()), 2),
+                "p90_kw": round(float(_quantis(np.sort(picos), np.asarray([0.9]))[0]), 2),
+                "dias_acima_limiar_pico": int((picos >= threshold_pico).sum()),
+                "hora_mais_frequente": int(frequencia_hora_pico.argmax()),
+                "frequencia_por_hora": frequencia_hora_pico.tolist(),
+            },
+        }
+    }
+    
+    if classes is not None:
+        resultado["classificacao"] = _totais_por_posto(valores, classes)
+    
+    return resultado
+
+
+def _preparar_serie(potencias, timestamps, arquivo_curva: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    # Converte potências e timestamps uma única vez para os cálculos
+    potencias, timestamps = resolver_curva(potencias, timestamps, arquivo_curva)
+    return np.asarray(potencias, dtype=np.float64), para_datetime64(timestamps)
+
+
+def analisar_curva_carga(
+    potencias: List[float],
+    timestamps: List[str],
+    arquivo_curva: str = None,
+) -> Dict:
+    """
+    Analisa a curva de carga e identifica características principais.
+    
+    Além de máximo, mínimo, média, média por hora e horas de pico/vale,
+    retorna percentis, curva de duração de carga e estatísticas dos picos
+    diários.
+    
+    Args:
+        potencias: Lista de potências em kW
+        timestamps: Lista de timestamps ISO
+        arquivo_curva: Curva no formato colunar (substitui potencias/timestamps)
+        
+    Returns:
+        Dict com análise da curva
+    """
+    try:
+        valores, instantes = _preparar_serie(potencias, timestamps, arquivo_curva)
+        return {"sucesso": True, **_indicadores_curva(valores, instantes)}
+        
     except Exception as e:
         return {
             "sucesso": False,
@@ -189,7 +809,9 @@ def classificar_por_horario(
     potencias: List[float],
     timestamps: List[str],
     horarios_ponta: Tuple[int, int] = (18, 21),
-    horarios_intermediaria: Tuple[int, int] = (17, 22)
+    horarios_intermediaria: Tuple[int, int] = (17, 22),
+    arquivo_curva: str = None,
+    feriados: List[str] = None,
 ) -> Dict:
     """
     Classifica o consumo por horário tarifário.
@@ -199,57 +821,52 @@ def classificar_por_horario(
         timestamps: Lista de timestamps ISO
         horarios_ponta: Tupla (hora_inicio, hora_fim) da ponta
         horarios_intermediaria: Tupla (hora_inicio, hora_fim) da intermediária
+        arquivo_curva: Curva no formato colunar (substitui potencias/timestamps)
+        feriados: Datas ISO (YYYY-MM-DD) classificadas como fora de ponta
         
     Returns:
         Dict com classificação
     """
     try:
-        datas = [datetime.fromisoformat(ts) for ts in timestamps]
-        
-        consumo_ponta = []
-        consumo_intermediaria = []
-        consumo_fora_ponta = []
-        
-        for data, potencia in zip(datas, potencias):
-            hora = data.hour
-            dia_semana = data.weekday()  # 0=seg, 4=sex, 5=sab, 6=dom
-            
-            # Ponta: seg-sex, 18-21h
-            if dia_semana < 5 and horarios_ponta[0] <= hora < horarios_ponta[1]:
-                consumo_ponta.append(potencia)
-            # Intermediária: seg-sex, 17-22h (exceto ponta)
-            elif dia_semana < 5 and horarios_intermediaria[0] <= hora < horarios_intermediaria[1]:
-                consumo_intermediaria.append(potencia)
-            # Fora de ponta: resto
-            else:
-                consumo_fora_ponta.append(potencia)
-        
-        # Calcular estatísticas
-        def calc_stats(lista):
-            if not lista:
-                return {"total": 0, "media": 0, "max": 0, "min": 0}
-            return {
-                "total": round(sum(lista), 2),
-                "media": round(sum(lista) / len(lista), 2),
-                "max": round(max(lista), 2),
-                "min": round(min(lista), 2),
-                "pontos": len(lista)
-            }
+        valores, instantes = _preparar_serie(potencias, timestamps, arquivo_curva)
+        calendario = obter_calendario(horarios_ponta, horarios_intermediaria, feriados)
+        classes = calendario.classificar(instantes)
+        return {"sucesso": True, "classificacao": _totais_por_posto(valores, classes)}
         
+    except Exception as e:
         return {
-            "sucesso": True,
-            "classificacao": {
-                "ponta": calc_stats(consumo_ponta),
-                "intermediaria": calc_stats(consumo_intermediaria),
-                "fora_ponta": calc_stats(consumo_fora_ponta),
-                "total_pontos": len(potencias),
-            }
+            "sucesso": False,
+            "erro": f"Erro ao classificar: {str(e)}"
         }
+
+
+def analisar_e_classificar(
+    potencias: List[float],
+    timestamps: List[str],
+    horarios_ponta: Tuple[int, int] = (18, 21),
+    horarios_intermediaria: Tuple[int, int] = (17, 22),
+    arquivo_curva: str = None,
+    feriados: List[str] = None,
+) -> Dict:
+    """
+    Análise e classificação por horário numa única passada sobre a série.
+    
+    Equivale a analisar_curva_carga + classificar_por_horario, com uma só
+    conversão dos timestamps (usado por `--analyze`).
+    
+    Returns:
+        Dict com "analise" e "classificacao"
+    """
+    try:
+        valores, instantes = _preparar_serie(potencias, timestamps, arquivo_curva)
+        calendario = obter_calendario(horarios_ponta, horarios_intermediaria, feriados)
+        classes = calendario.classificar(instantes)
+        return {"sucesso": True, **_indicadores_curva(valores, instantes, classes)}
         
     except Exception as e:
         return {
             "sucesso": False,
-            "erro": f"Erro ao classificar: {str(e)}"
+            "erro": f"Erro ao analisar curva: {str(e)}"
         }
 
 
@@ -259,21 +876,25 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Parser de arquivo Excel Elspec")
     parser.add_argument("--file", required=True, help="Caminho do arquivo Excel")
     parser.add_argument("--analyze", action="store_true", help="Realizar análise completa")
+    parser.add_argument("--stream", action="store_true", help="Leitura em blocos com memória constante (só estatísticas)")
+    parser.add_argument("--columnar", default=None, help="Gravar também a curva no formato colunar (.bcurva)")
     
     args = parser.parse_args()
     
+    if args.stream:
+        resultado = parsear_arquivo_streaming(args.file, caminho_colunar=args.columnar)
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        raise SystemExit(0)
+    
     # Parsear arquivo
-    resultado = parsear_arquivo_excel(args.file)
+    resultado = parsear_arquivo_excel(args.file, caminho_colunar=args.columnar)
     
     if resultado["sucesso"] and args.analyze:
         dados = resultado["dados"]
         
-        # Análise de curva
-        analise = analisar_curva_carga(dados["potencias"], dados["timestamps"])
+        # Análise de curva e classificação por horário, numa única passada
+        analise = analisar_e_classificar(dados["potencias"], dados["timestamps"])
         resultado["analise"] = analise.get("analise")
-        
-        # Classificação por horário
-        classificacao = classificar_por_horario(dados["potencias"], dados["timestamps"])
-        resultado["classificacao"] = classificacao.get("classificacao")
+        resultado["classificacao"] = analise.get("classificacao")
     
     print(json.dumps(resultado, indent=2, ensure_ascii=False))
@@ -0,0 +1,488 @@
+"""
+MÓDULO: Análise de portfólio de sites (vários arquivos / medidores)
+
+Dimensiona e simula o BESS de muitos sites em um único lote. Cada arquivo
+pode trazer um medidor (coluna B) ou vários (uma coluna de potência por
+medidor); cada medidor vira um site.
+
+Etapas:
+1. Ingestão: cada arquivo é lido uma vez em blocos (separar_medidores) e
+   cada medidor é gravado como curva colunar na pasta do portfólio.
+2. Análise: cada site é dimensionado e simulado em um processo do pool,
+   lendo a sua curva por memory-map. O resultado do site é compacto (sem
+   os resultados diários; as séries ficam em diretorio_series).
+3. Consolidação: os resultados são agregados à medida que chegam
+   (ConsolidadorPortfolio), sem guardar os sites em memória.
+
+Memória: por processo, apenas a curva do site em análise; no processo
+principal, apenas os totais, o ranking e as falhas. Os workers do pool são
+reciclados a cada MAX_SITES_POR_PROCESSO sites.
+"""
+
+import heapq
+import json
+import multiprocessing as mp
+import os
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from dimensionador_bess import dimensionar_bess
+from parser_excel import separar_medidores
+from projecao_financeira import calcular_tir, normalizar_premissas
+from simulador_bess import ESTRATEGIAS, simular_bess
+
+
+# Sites analisados por processo antes de ser substituído (limita a memória)
+MAX_SITES_POR_PROCESSO = 20
+
+# Sites com maior VPL listados no resumo
+TAMANHO_RANKING = 20
+
+# Falhas guardadas no resumo (as demais só são contadas)
+MAX_FALHAS = 100
+
+# Pasta das curvas extraídas dentro da pasta do portfólio
+SUBPASTA_CURVAS = "curvas"
+
+
+def preparar_portfolio(
+    arquivos: List[str],
+    diretorio: str,
+    tarifa_ponta: float,
+    tarifa_intermediaria: float,
+    tarifa_fora_ponta: float,
+    cobranca_demanda: float = 0,
+    estrategia_carregamento: str = "grid-offpeak",
+    reducao_demanda_percent: float = 20,
+    objetivo: str = None,
+    custo_kwh_reais: float = 0,
+    custo_kw_reais: float = 0,
+    feriados: List[str] = None,
+    premissas_financeiras: Dict = None,
+    diretorio_series: str = None,
+) -> Tuple[List[str], str, Dict]:
+    """
+    Valida a requisição e monta os parâmetros comuns a todos os sites.
+
+    Arquivos ausentes ou ilegíveis não interrompem o lote: viram falhas
+    no resumo, como os sites que não puderam ser analisados.
+
+    Returns:
+        Tupla (arquivos, pasta das curvas, parâmetros de analisar_site sem a curva)
+    """
+    if not arquivos:
+        raise ValueError("Informe ao menos um arquivo")
+    if estrategia_carregamento not in ESTRATEGIAS:
+        raise ValueError(f"Estratégia inválida: {estrategia_carregamento}")
+    if objetivo not in (None, "vpl", "payback"):
+        raise ValueError(f"Objetivo inválido: {objetivo}")
+
+    diretorio_curvas = os.path.join(diretorio, SUBPASTA_CURVAS)
+    os.makedirs(diretorio_curvas, exist_ok=True)
+
+    comuns = {
+        "tarifa_ponta": tarifa_ponta,
+        "tarifa_intermediaria": tarifa_intermediaria,
+        "tarifa_fora_ponta": tarifa_fora_ponta,
+        "cobranca_demanda": cobranca_demanda,
+        "estrategia_carregamento": estrategia_carregamento,
+        "reducao_demanda_percent": reducao_demanda_percent,
+        "objetivo": objetivo,
+        "custo_kwh_reais": custo_kwh_reais,
+        "custo_kw_reais": custo_kw_reais,
+        "feriados": feriados,
+        "premissas_financeiras": normalizar_premissas(premissas_financeiras),
+        "diretorio_series": diretorio_series,
+    }
+    return list(arquivos), diretorio_curvas, comuns
+
+
+def listar_sites(ingestao: Dict, comuns: Dict) -> List[Dict]:
+    """
+    Parâmetros de analisar_site para cada medidor de um arquivo ingerido.
+
+    Args:
+        ingestao: Resultado de separar_medidores
+        comuns: Parâmetros comuns (preparar_portfolio)
+    """
+    return [
+        {
+            **comuns,
+            "arquivo": ingestao["arquivo"],
+            "medidor": medidor["medidor"],
+            "arquivo_curva": medidor["arquivo_curva"],
+        }
+        for medidor in ingestao["medidores"]
+    ]
+
+
+def analisar_site(
+    arquivo_curva: str,
+    tarifa_ponta: float,
+    tarifa_intermediaria: float,
+    tarifa_fora_ponta: float,
+    cobranca_demanda: float = 0,
+    estrategia_carregamento: str = "grid-offpeak",
+    reducao_demanda_percent: float = 20,
+    objetivo: str = None,
+    custo_kwh_reais: float = 0,
+    custo_kw_reais: float = 0,
+    feriados: List[str] = None,
+    premissas_financeiras: Dict = None,
+    diretorio_series: str = None,
+    arquivo: str = None,
+    medidor: str = None,
+) -> Dict:
+    """
+    Dimensiona e simula o BESS de um site.
+
+    O tamanho vem do dimensionador (percentual de redução ou, com
+    `objetivo`, busca ótima); a economia e a projeção financeira vêm da
+    simulação desse tamanho, com investimento por kWh e por kW. Busca e
+    simulação usam as mesmas tarifas e a mesma estratégia.
+
+    Returns:
+        Dict compacto do site: tamanho, investimento, resumo da simulação,
+        descritor das séries e projeção financeira
+    """
+    site = {"arquivo": arquivo, "medidor": medidor, "arquivo_curva": arquivo_curva}
+    try:
+        dimensionamento = dimensionar_bess(
+            potencias_kw=None,
+            timestamps=None,
+            tarifa_ponta=tarifa_ponta,
+            tarifa_intermediaria=tarifa_intermediaria,
+            tarifa_fora_ponta=tarifa_fora_ponta,
+            cobranca_demanda=cobranca_demanda,
+            estrategia_carregamento=estrategia_carregamento,
+            reducao_demanda_percent=reducao_demanda_percent,
+            objetivo=objetivo,
+            custo_kwh_reais=custo_kwh_reais,
+            custo_kw_reais=custo_kw_reais,
+            arquivo_curva=arquivo_curva,
+            feriados=feriados,
+            premissas_financeiras=premissas_financeiras,
+        )
+        if not dimensionamento.get("sucesso"):
+            return {**site, "sucesso": False, "erro": dimensionamento.get("erro")}
+
+        tamanho = dimensionamento["dimensionamento"]
+        potencia = tamanho["potencia_bess_kw"]
+        capacidade = tamanho["capacidade_bess_kwh"]
+        investimento = capacidade * custo_kwh_reais + potencia * custo_kw_reais
+
+        simulacao = simular_bess(
+            potencias_kw=None,
+            timestamps=None,
+            capacidade_bess_kwh=capacidade,
+            potencia_bess_kw=potencia,
+            estrategia_carregamento=estrategia_carregamento,
+            tarifa_ponta=tarifa_ponta,
+            tarifa_intermediaria=tarifa_intermediaria,
+            tarifa_fora_ponta=tarifa_fora_ponta,
+            cobranca_demanda=cobranca_demanda,
+            arquivo_curva=arquivo_curva,
+            feriados=feriados,
+            diretorio_series=diretorio_series,
+            custo_investimento_reais=investimento,
+            premissas_financeiras=premissas_financeiras,
+        )
+        if not simulacao.get("sucesso"):
+            return {**site, "sucesso": False, "erro": simulacao.get("erro")}
+
+        projecao = simulacao["projecao"]
+        projecao.pop("premissas", None)
+
+        return {
+            **site,
+            "sucesso": True,
+            "potencia_bess_kw": potencia,
+            "capacidade_bess_kwh": capacidade,
+            "demanda_contratada_kw": tamanho["demanda_contratada_kw"],
+            "investimento_reais": round(investimento, 2),
+            "resumo": simulacao["resumo"],
+            "series": simulacao.get("series"),
+            "projecao": projecao,
+        }
+
+    except Exception as e:
+        return {**site, "sucesso": False, "erro": str(e)}
+
+
+class ConsolidadorPortfolio:
+    """
+    Agrega os resultados dos sites à medida que chegam.
+
+    Guarda apenas totais, o fluxo de caixa somado, o ranking por VPL e as
+    primeiras falhas; a memória não cresce com o número de sites.
+    """
+
+    def __init__(self, tamanho_ranking: int = TAMANHO_RANKING):
+        self.tamanho_ranking = tamanho_ranking
+        self.sites = 0
+        self.sites_sucesso = 0
+        self.sites_vpl_positivo = 0
+        self.total_falhas = 0
+        self.falhas: List[Dict] = []
+        self.totais = {
+            "potencia_bess_kw": 0.0,
+            "capacidade_bess_kwh": 0.0,
+            "investimento_reais": 0.0,
+            "economia_anual_reais": 0.0,
+            "reducao_demanda_kw": 0.0,
+            "vpl_reais": 0.0,
+        }
+        self._fluxos = None
+        self._ranking: List[Tuple[float, int, Dict]] = []
+
+    def adicionar_falha(self, falha: Dict) -> None:
+        """
+        Registra um arquivo ou site que não pôde ser analisado.
+        """
+        self.total_falhas += 1
+        if len(self.falhas) < MAX_FALHAS:
+            self.falhas.append({
+                "arquivo": falha.get("arquivo"),
+                "medidor": falha.get("medidor"),
+                "erro": falha.get("erro"),
+            })
+
+    def adicionar(self, site: Dict) -> None:
+        """
+        Incorpora o resultado de analisar_site.
+        """
+        self.sites += 1
+        if not site.get("sucesso"):
+            self.adicionar_falha(site)
+            return
+
+        self.sites_sucesso += 1
+        resumo = site["resumo"]
+        projecao = site["projecao"]
+        vpl = projecao["vpl_reais"] or 0.0
+
+        self.totais["potencia_bess_kw"] += site["potencia_bess_kw"]
+        self.totais["capacidade_bess_kwh"] += site["capacidade_bess_kwh"]
+        self.totais["investimento_reais"] += site["investimento_reais"]
+        self.totais["economia_anual_reais"] += resumo["economia_anual_estimada_reais"]
+        self.totais["reducao_demanda_kw"] += resumo["reducao_demanda_media_kw"]
+        self.totais["vpl_reais"] += vpl
+        self.sites_vpl_positivo += vpl > 0
+
+        fluxos = np.asarray(projecao["fluxos_anuais_reais"])
+        self._fluxos = fluxos if self._fluxos is None else self._fluxos + fluxos
+
+        item = {
+            "arquivo": site["arquivo"],
+            "medidor": site["medidor"],
+            "potencia_bess_kw": site["potencia_bess_kw"],
+            "capacidade_bess_kwh": site["capacidade_bess_kwh"],
+            "vpl_reais": projecao["vpl_reais"],
+            "tir_percent": projecao["tir_percent"],
+            "payback_simples_anos": projecao["payback_simples_anos"],
+        }
+        entrada = (vpl, self.sites_sucesso, item)
+        if len(self._ranking) < self.tamanho_ranking:
+            heapq.heappush(self._ranking, entrada)
+        elif entrada > self._ranking[0]:
+            heapq.heapreplace(self._ranking, entrada)
+
+    def resultado(self) -> Dict:
+        """
+        Resumo do portfólio: totais, TIR do fluxo somado e ranking por VPL.
+        """
+        totais = self.totais
+        tir = None
+        if self._fluxos is not None:
+            tir = float(calcular_tir(self._fluxos[None, :])[0])
+            tir = round(tir * 100, 2) if np.isfinite(tir) else None
+
+        economia = totais["economia_anual_reais"]
+        return {
+            "sites": self.sites,
+            "sites_sucesso": self.sites_sucesso,
+            "total_falhas": self.total_falhas,
+            "sites_vpl_positivo": self.sites_vpl_positivo,
+            "potencia_total_bess_kw": round(totais["potencia_bess_kw"], 2),
+            "capacidade_total_bess_kwh": round(totais["capacidade_bess_kwh"], 2),
+            "investimento_total_reais": round(totais["investimento_reais"], 2),
+            "economia_anual_total_reais": round(economia, 2),
+            "reducao_demanda_total_kw": round(totais["reducao_demanda_kw"], 2),
+            "vpl_total_reais": round(totais["vpl_reais"], 2),
+            "tir_portfolio_percent": tir,
+            "payback_portfolio_anos": round(totais["investimento_reais"] / economia, 1) if economia > 0 else None,
+            "ranking_vpl": [item for _, _, item in sorted(self._ranking, reverse=True)],
+            "falhas": self.falhas,
+        }
+
+
+def _separar_arquivo(argumentos: Tuple[str, str]) -> Dict:
+    arquivo, diretorio_curvas = argumentos
+    resultado = separar_medidores(arquivo, diretorio_curvas)
+    resultado.setdefault("arquivo", arquivo)
+    return resultado
+
+
+def _analisar_site(parametros: Dict) -> Dict:
+    return analisar_site(**parametros)
+
+
+def analisar_portfolio(
+    arquivos: List[str],
+    diretorio: str,
+    tarifa_ponta: float,
+    tarifa_intermediaria: float,
+    tarifa_fora_ponta: float,
+    cobranca_demanda: float = 0,
+    estrategia_carregamento: str = "grid-offpeak",
+    reducao_demanda_percent: float = 20,
+    objetivo: str = None,
+    custo_kwh_reais: float = 0,
+    custo_kw_reais: float = 0,
+    feriados: List[str] = None,
+    premissas_financeiras: Dict = None,
+    diretorio_series: str = None,
+    processos: int = None,
+    saida_jsonl: str = None,
+    ao_concluir_site: Callable[[Dict], None] = None,
+) -> Dict:
+    """
+    Função wrapper: ingere os arquivos e analisa todos os sites em paralelo.
+
+    Os resultados por site são entregues assim que cada um termina (em
+    ordem de conclusão): gravados em `saida_jsonl`, uma linha JSON por
+    site, e/ou passados a `ao_concluir_site`. Sem nenhum dos dois, voltam
+    em "sites" no resultado.
+
+    Em um processo daemon (ex.: worker do servidor_workers) tudo roda no
+    processo atual; o servidor de workers distribui arquivos e sites entre
+    os seus workers e envia cada site como resposta parcial.
+
+    Args:
+        arquivos: Arquivos Excel/CSV (coluna A timestamps, demais colunas
+            uma potência por medidor)
+        diretorio: Pasta do portfólio (curvas extraídas ficam em 'curvas/')
+        objetivo: None (redução de demanda fixa) ou 'vpl'/'payback' (busca ótima)
+        custo_kwh_reais: Custo de investimento por kWh (R$)
+        custo_kw_reais: Custo de investimento por kW (R$)
+        premissas_financeiras: Premissas da projeção (ver projecao_financeira)
+        processos: Processos do pool (padrão: núcleos disponíveis)
+        saida_jsonl: Arquivo que recebe uma linha JSON por site
+        ao_concluir_site: Função chamada com o resultado de cada site
+
+    Returns:
+        Dict com o resumo do portfólio
+    """
+    try:
+        arquivos, diretorio_curvas, comuns = preparar_portfolio(
+            arquivos, diretorio, tarifa_ponta, tarifa_intermediaria, tarifa_fora_ponta,
+            cobranca_demanda=cobranca_demanda,
+            estrategia_carregamento=estrategia_carregamento,
+            reducao_demanda_percent=reducao_demanda_percent,
+            objetivo=objetivo,
+            custo_kwh_reais=custo_kwh_reais,
+            custo_kw_reais=custo_kw_reais,
+            feriados=feriados,
+            premissas_financeiras=premissas_financeiras,
+            diretorio_series=diretorio_series,
+        )
+
+        processos = processos or os.cpu_count() or 1
+        if mp.current_process().daemon:
+            processos = 1
+
+        consolidador = ConsolidadorPortfolio()
+        sites_resultado = [] if saida_jsonl is None and ao_concluir_site is None else None
+        saida = open(saida_jsonl, "w", encoding="utf-8") if saida_jsonl else None
+
+        def entregar(site: Dict) -> None:
+            consolidador.adicionar(site)
+            if saida:
+                saida.write(json.dumps(site, ensure_ascii=False) + "\n")
+                saida.flush()
+            if ao_concluir_site:
+                ao_concluir_site(site)
+            if sites_resultado is not None:
+                sites_resultado.append(site)
+
+        def executar(mapear) -> None:
+            sites = []
+            for ingestao in mapear(_separar_arquivo, [(arquivo, diretorio_curvas) for arquivo in arquivos]):
+                if ingestao.get("sucesso"):
+                    sites.extend(listar_sites(ingestao, comuns))
+                else:
+                    consolidador.adicionar_falha(ingestao)
+            for site in mapear(_analisar_site, sites):
+                entregar(site)
+
+        try:
+            if processos == 1:
+                executar(map)
+            else:
+                # Workers reciclados: a memória de cada um não cresce com o portfólio
+                with mp.get_context("spawn").Pool(processos, maxtasksperchild=MAX_SITES_POR_PROCESSO) as pool:
+                    executar(lambda funcao, itens: pool.imap_unordered(funcao, itens, chunksize=1))
+        finally:
+            if saida:
+                saida.close()
+
+        resultado = {
+            "sucesso": True,
+            "resumo": consolidador.resultado(),
+            "diretorio_curvas": diretorio_curvas,
+            "saida_jsonl": saida_jsonl,
+        }
+        if sites_resultado is not None:
+            resultado["sites"] = sites_resultado
+        return resultado
+
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": str(e)
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Análise de portfólio de BESS (vários sites)")
+    parser.add_argument("files", nargs="+", help="Arquivos Excel/CSV (uma coluna de potência por medidor)")
+    parser.add_argument("--output-dir", required=True, help="Pasta do portfólio")
+    parser.add_argument("--strategy", default="grid-offpeak", choices=ESTRATEGIAS)
+    parser.add_argument("--reduction", type=float, default=20, help="Redução de demanda (%)")
+    parser.add_argument("--optimize", choices=["vpl", "payback"], help="Busca ótima por VPL ou payback")
+    parser.add_argument("--cost-kwh", type=float, default=0, help="Custo por kWh (R$)")
+    parser.add_argument("--cost-kw", type=float, default=0, help="Custo por kW (R$)")
+    parser.add_argument("--processes", type=int, default=None, help="Processos do pool")
+    parser.add_argument("--jsonl", default=None, help="Grava uma linha JSON por site")
+
+    args = parser.parse_args()
+
+    def imprimir_site(site: Dict) -> None:
+        resumo = {chave: site.get(chave) for chave in ("arquivo", "medidor", "sucesso", "erro", "potencia_bess_kw", "capacidade_bess_kwh")}
+        print(json.dumps(resumo, ensure_ascii=False), file=sys.stderr)
+
+    inicio = time.perf_counter()
+    resultado = analisar_portfolio(
+        arquivos=args.files,
+        diretorio=args.output_dir,
+        tarifa_ponta=1.71,
+        tarifa_intermediaria=1.12,
+        tarifa_fora_ponta=0.72,
+        cobranca_demanda=50,
+        estrategia_carregamento=args.strategy,
+        reducao_demanda_percent=args.reduction,
+        objetivo=args.optimize,
+        custo_kwh_reais=args.cost_kwh,
+        custo_kw_reais=args.cost_kw,
+        processos=args.processes,
+        saida_jsonl=args.jsonl,
+        ao_concluir_site=imprimir_site,
+    )
+    resultado["tempo_s"] = round(time.perf_counter() - inicio, 2)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
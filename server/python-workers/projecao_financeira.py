@@ -0,0 +1,268 @@
+"""
+MÓDULO: Projeção financeira do BESS ao longo da vida útil
+
+Monta o fluxo de caixa ano a ano de um investimento em BESS e calcula
+VPL, TIR, payback simples e payback descontado. Cada ano considera:
+
+- economia do primeiro ano reajustada pela tarifa: E * (1 + g)^(t-1)
+- capacidade restante (degradação): a economia cai na mesma proporção
+- O&M anual como percentual do investimento, com reajuste próprio
+- reposição das baterias quando a capacidade fica abaixo do fim de vida
+  (ou ao fim da vida calendário), com a capacidade voltando a 100%
+
+Tudo é vetorizado: economia, investimento e perda de capacidade podem
+ser arrays de qualquer forma (candidatos de uma varredura, cenários de
+Monte Carlo ou ambos) e o laço Python percorre apenas os anos. A TIR é
+obtida por bisseção simultânea em todos os elementos.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+
+# Premissas aceitas e valores padrão (padrão = análise simples de 10 anos)
+PREMISSAS_PADRAO = {
+    "anos_analise": 10,
+    "taxa_desconto": 0.10,
+    "reajuste_tarifa_anual": 0.0,
+    "custo_om_anual_percent": 0.0,
+    "reajuste_om_anual": 0.0,
+    "perda_capacidade_anual": 0.0,
+    # None = sem reposição (a capacidade só cai)
+    "custo_reposicao_percent": None,
+    "variacao_custo_reposicao_anual": 0.0,
+    "capacidade_fim_vida": 0.8,
+    "vida_util_anos": None,
+}
+
+# Intervalo de busca da TIR (fração ao ano)
+TIR_MIN = -0.99
+TIR_MAX = 10.0
+ITERACOES_TIR = 60
+
+
+def normalizar_premissas(premissas: Dict = None, **sobrepor) -> Dict:
+    """
+    Completa as premissas com os valores padrão e valida.
+
+    Args:
+        premissas: Premissas informadas (chaves de PREMISSAS_PADRAO)
+        **sobrepor: Valores que substituem os de `premissas` quando não None
+
+    Returns:
+        Dict com todas as premissas
+    """
+    desconhecidas = set(premissas or {}) - set(PREMISSAS_PADRAO)
+    if desconhecidas:
+        raise ValueError(f"Premissas financeiras inválidas: {', '.join(sorted(desconhecidas))}")
+
+    resultado = dict(PREMISSAS_PADRAO)
+    resultado.update(premissas or {})
+    resultado.update({nome: valor for nome, valor in sobrepor.items() if valor is not None})
+
+    if int(resultado["anos_analise"]) < 1:
+        raise ValueError("anos_analise deve ser pelo menos 1")
+    if resultado["taxa_desconto"] <= -1:
+        raise ValueError("taxa_desconto deve ser maior que -100%")
+    if not 0 <= resultado["capacidade_fim_vida"] < 1:
+        raise ValueError("capacidade_fim_vida deve estar entre 0 e 1")
+    resultado["anos_analise"] = int(resultado["anos_analise"])
+    return resultado
+
+
+def montar_fluxos(
+    economia_anual: np.ndarray,
+    investimento: np.ndarray,
+    premissas: Dict,
+    perda_capacidade_anual: np.ndarray = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Fluxo de caixa anual (ano 0 = investimento).
+
+    Args:
+        economia_anual: Economia do primeiro ano (R$), qualquer forma
+        investimento: Investimento inicial (R$), compatível com economia_anual
+        premissas: Premissas completas (normalizar_premissas)
+        perda_capacidade_anual: Perda por ano (fração); padrão: a das premissas
+
+    Returns:
+        Dict com 'fluxos' (forma + (anos + 1,)) e 'reposicoes' (contagem)
+    """
+    if perda_capacidade_anual is None:
+        perda_capacidade_anual = premissas["perda_capacidade_anual"]
+    economia, investimento, perda = np.broadcast_arrays(
+        np.asarray(economia_anual, dtype=np.float64),
+        np.asarray(investimento, dtype=np.float64),
+        np.asarray(perda_capacidade_anual, dtype=np.float64),
+    )
+    anos = premissas["anos_analise"]
+    repor = premissas["custo_reposicao_percent"] is not None
+    vida_util = premissas["vida_util_anos"]
+
+    fluxos = np.empty(economia.shape + (anos + 1,))
+    fluxos[..., 0] = -investimento
+    custo_om = investimento * premissas["custo_om_anual_percent"] / 100
+    idade = np.zeros(economia.shape)
+    reposicoes = np.zeros(economia.shape, dtype=np.int64)
+
+    for ano in range(1, anos + 1):
+        retencao = 1 - perda * idade
+        fluxo = -custo_om * (1 + premissas["reajuste_om_anual"]) ** (ano - 1)
+
+        if repor and ano > 1:
+            trocar = retencao < premissas["capacidade_fim_vida"]
+            if vida_util:
+                trocar |= idade >= vida_util
+            custo_troca = (
+                investimento * premissas["custo_reposicao_percent"] / 100
+                * (1 + premissas["variacao_custo_reposicao_anual"]) ** (ano - 1)
+            )
+            fluxo = fluxo - np.where(trocar, custo_troca, 0.0)
+            retencao = np.where(trocar, 1.0, retencao)
+            idade = np.where(trocar, 0.0, idade)
+            reposicoes += trocar
+
+        fluxo = fluxo + economia * (1 + premissas["reajuste_tarifa_anual"]) ** (ano - 1) * np.maximum(retencao, 0)
+        fluxos[..., ano] = fluxo
+        idade = idade + 1
+
+    return {"fluxos": fluxos, "reposicoes": reposicoes}
+
+
+def _ano_payback(fluxos: np.ndarray, extrapolar: bool = False) -> np.ndarray:
+    """
+    Ano (fracionário, interpolado no ano) em que o acumulado fica >= 0.
+
+    Sem retorno dentro do horizonte, devolve inf; com `extrapolar`, estima
+    o ano repetindo o fluxo do último ano (exato para fluxos constantes).
+    """
+    acumulado = np.cumsum(fluxos, axis=-1)
+    pago = acumulado[..., 1:] >= 0
+    ano = np.argmax(pago, axis=-1)
+    alcancado = pago.any(axis=-1)
+
+    anterior = np.take_along_axis(acumulado, ano[..., None], axis=-1)[..., 0]
+    fluxo = np.take_along_axis(fluxos, (ano + 1)[..., None], axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fracao = np.where(fluxo > 0, -anterior / fluxo, 0.0)
+        if extrapolar:
+            ultimo = fluxos[..., -1]
+            alem = np.where(ultimo > 0, fluxos.shape[-1] - 1 - acumulado[..., -1] / ultimo, np.inf)
+        else:
+            alem = np.inf
+    return np.where(alcancado, ano + np.clip(fracao, 0, 1), alem)
+
+
+def calcular_tir(fluxos: np.ndarray) -> np.ndarray:
+    """
+    TIR de cada fluxo por bisseção vetorizada.
+
+    Args:
+        fluxos: Fluxos anuais (..., anos + 1), ano 0 primeiro
+
+    Returns:
+        TIR (fração ao ano); NaN quando o VPL não troca de sinal no intervalo
+    """
+    expoentes = np.arange(fluxos.shape[-1])
+
+    def vpl(taxa: np.ndarray) -> np.ndarray:
+        return np.sum(fluxos / (1 + taxa[..., None]) ** expoentes, axis=-1)
+
+    baixa = np.full(fluxos.shape[:-1], TIR_MIN)
+    alta = np.full(fluxos.shape[:-1], TIR_MAX)
+    vpl_baixa = vpl(baixa)
+    valida = np.sign(vpl_baixa) != np.sign(vpl(alta))
+
+    for _ in range(ITERACOES_TIR):
+        meio = (baixa + alta) / 2
+        vpl_meio = vpl(meio)
+        mesmo_sinal = np.sign(vpl_meio) == np.sign(vpl_baixa)
+        baixa = np.where(mesmo_sinal, meio, baixa)
+        vpl_baixa = np.where(mesmo_sinal, vpl_meio, vpl_baixa)
+        alta = np.where(mesmo_sinal, alta, meio)
+
+    return np.where(valida, (baixa + alta) / 2, np.nan)
+
+
+def projetar_investimento(
+    economia_anual,
+    investimento,
+    premissas: Dict = None,
+    perda_capacidade_anual=None,
+    calcular_taxa_interna: bool = True,
+    incluir_fluxos: bool = False,
+) -> Dict[str, np.ndarray]:
+    """
+    Projeção de vida útil vetorizada.
+
+    Args:
+        economia_anual: Economia do primeiro ano (R$), escalar ou array
+        investimento: Investimento inicial (R$), escalar ou array
+        premissas: Premissas financeiras (ver PREMISSAS_PADRAO)
+        perda_capacidade_anual: Perda por ano (fração), escalar ou array;
+            padrão: a das premissas
+        calcular_taxa_interna: Calcular a TIR (bisseção, ~60 avaliações do VPL)
+        incluir_fluxos: Devolver também os fluxos anuais
+
+    Returns:
+        Dict de arrays com vpl, tir, payback_simples (estimado além do
+        horizonte), payback_descontado (inf se não se paga no horizonte),
+        lucro (soma dos fluxos sem desconto), roi_percent e reposicoes
+    """
+    premissas = normalizar_premissas(premissas)
+    montado = montar_fluxos(economia_anual, investimento, premissas, perda_capacidade_anual)
+    fluxos = montado["fluxos"]
+
+    descontos = (1 + premissas["taxa_desconto"]) ** -np.arange(fluxos.shape[-1], dtype=np.float64)
+    descontados = fluxos * descontos
+    lucro = fluxos.sum(axis=-1)
+    investimento = -fluxos[..., 0]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = np.where(investimento > 0, lucro / investimento * 100, 0.0)
+
+    projecao = {
+        "vpl": descontados.sum(axis=-1),
+        "payback_simples": _ano_payback(fluxos, extrapolar=True),
+        "payback_descontado": _ano_payback(descontados),
+        "lucro": lucro,
+        "roi_percent": roi,
+        "reposicoes": montado["reposicoes"],
+    }
+    if calcular_taxa_interna:
+        projecao["tir"] = calcular_tir(fluxos)
+    if incluir_fluxos:
+        projecao["fluxos"] = fluxos
+    return projecao
+
+
+def resumir_projecao(projecao: Dict[str, np.ndarray], premissas: Dict = None) -> Dict:
+    """
+    Converte a projeção de um único investimento em Dict serializável.
+
+    Args:
+        projecao: Resultado de projetar_investimento com arrays escalares
+        premissas: Premissas usadas (devolvidas completas no resultado)
+
+    Returns:
+        Dict com VPL, TIR (None sem TIR), paybacks (None se não se paga),
+        lucro, ROI, reposições e, se presentes, os fluxos anuais
+    """
+    def numero(valor, casas):
+        valor = float(valor)
+        return round(valor, casas) if np.isfinite(valor) else None
+
+    resumo = {
+        "vpl_reais": numero(projecao["vpl"], 2),
+        "tir_percent": numero(projecao["tir"] * 100, 2) if "tir" in projecao else None,
+        "payback_simples_anos": numero(projecao["payback_simples"], 1),
+        "payback_descontado_anos": numero(projecao["payback_descontado"], 1),
+        "lucro_reais": numero(projecao["lucro"], 2),
+        "roi_percent": numero(projecao["roi_percent"], 1),
+        "reposicoes": int(projecao["reposicoes"]),
+        "premissas": normalizar_premissas(premissas),
+    }
+    if "fluxos" in projecao:
+        resumo["fluxos_anuais_reais"] = np.round(projecao["fluxos"], 2).tolist()
+    return resumo
@@ -0,0 +1,917 @@
+"""
+MÓDULO: Servidor persistente de workers Python
+
+Mantém um pool de processos com os módulos de cálculo já importados
+(parser_excel, dimensionador_bess, simulador_bess, gerador_casos_teste),
+evitando o custo de iniciar o interpretador e importar pandas/openpyxl
+a cada requisição.
+
+Protocolo (JSON delimitado por nova linha, via stdin/stdout ou socket Unix):
+- Requisição: {"id": "...", "tarefa": "simular_bess", "parametros": {...}, "timeout": 30}
+- Resposta:   {"id": "...", "resultado": {...}}
+- Erro:       {"id": "...", "resultado": {"sucesso": false, "erro": "..."}}
+- Parcial:    {"id": "...", "parcial": {...}} antes da resposta final, em
+  tarefas que entregam resultados aos poucos (analisar_portfolio: um por site)
+- Progresso:  {"id": "...", "progresso": {"etapa": "dias_simulados", "feitos": 120,
+  "total": 365}} enquanto a tarefa roda, se a requisição tiver "progresso": true
+- Cancelamento: {"id": "...", "tarefa": "cancelar_tarefa", "parametros": {"id": "<alvo>"}}
+  responde {"sucesso": true, "encontrada": ...}; a tarefa alvo (e as subtarefas
+  de uma tarefa distribuída) termina com {"sucesso": false, "cancelada": true}
+- Respostas vindas do cache trazem "cache": true; a tarefa
+  "estatisticas_cache" devolve os contadores de acerto/falha.
+- Com "metricas": true (ou "perfil": "cprofile" | "tracemalloc") na
+  requisição, o resultado traz um bloco "metricas" com tempos por fase,
+  contadores, espera na fila e tempo de serialização.
+
+Uso:
+    python servidor_workers.py --workers 4
+    python servidor_workers.py --workers 4 --socket /tmp/bess-workers.sock
+"""
+
+import importlib
+import importlib.util
+import json
+import math
+import multiprocessing as mp
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache_resultados import CacheResultados, cacheavel, chave_resultado
+from metricas import coletar_metricas, ouvir_progresso
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Tarefas expostas: nome -> (módulo, função)
+TAREFAS = {
+    "parsear_arquivo_excel": ("parser_excel", "parsear_arquivo_excel"),
+    "parsear_arquivo_streaming": ("parser_excel", "parsear_arquivo_streaming"),
+    "analisar_curva_carga": ("parser_excel", "analisar_curva_carga"),
+    "classificar_por_horario": ("parser_excel", "classificar_por_horario"),
+    "dimensionar_bess": ("dimensionador_bess", "dimensionar_bess"),
+    "simular_bess": ("simulador_bess", "simular_bess"),
+    "varrer_bess": ("simulador_bess", "varrer_bess"),
+    "obter_series_simulacao": ("simulador_bess", "obter_series_simulacao"),
+    "gerar_caso_teste": ("gerador_casos_teste", "gerar_caso_teste"),
+    "monte_carlo_bess": ("monte_carlo_bess", "monte_carlo_bess"),
+    "monte_carlo_lote": ("monte_carlo_bess", "simular_cenarios"),
+    "gerar_corpus": ("corpus_casos_teste", "gerar_corpus"),
+    "separar_medidores": ("parser_excel", "separar_medidores"),
+    "analisar_site": ("portfolio_bess", "analisar_site"),
+    "analisar_portfolio": ("portfolio_bess", "analisar_portfolio"),
+}
+
+# Cancelamentos lembrados para descartar tarefas ainda na fila
+MAX_CANCELAMENTOS = 1024
+
+RESULTADO_CANCELADO = {"sucesso": False, "erro": "Tarefa cancelada", "cancelada": True}
+
+# Módulos importados na partida de cada worker
+MODULOS_AQUECIDOS = sorted({modulo for modulo, _ in TAREFAS.values()} | {"curva_colunar", "calendario_tarifario"})
+
+
+# ============================================================================
+# PROCESSO WORKER
+# ============================================================================
+
+def valores_finitos(valor):
+    """
+    Troca floats não finitos (NaN, ±inf) por None, recursivamente.
+
+    JSON não tem NaN nem Infinity; o `json` do Python os escreveria mesmo
+    assim e o JSON.parse do Node rejeitaria a linha inteira.
+    """
+    if isinstance(valor, float):
+        return valor if math.isfinite(valor) else None
+    if isinstance(valor, dict):
+        return {chave: valores_finitos(item) for chave, item in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [valores_finitos(item) for item in valor]
+    return valor
+
+
+def serializar_json(valor) -> str:
+    """
+    Serializa uma resposta em JSON estrito (não finitos viram null).
+    """
+    try:
+        return json.dumps(valor, ensure_ascii=False, allow_nan=False)
+    except ValueError:
+        # Caso raro (ex.: payback infinito): só então percorre o resultado
+        return json.dumps(valores_finitos(valor), ensure_ascii=False, allow_nan=False)
+
+
+def executar_tarefa(tarefa: str, parametros: Dict, opcoes_metricas: Dict = None) -> Dict:
+    """
+    Executa uma tarefa registrada no processo atual.
+
+    Args:
+        tarefa: Nome da tarefa (chave de TAREFAS)
+        parametros: Argumentos nomeados da função
+        opcoes_metricas: {'perfil': ..., 'espera_fila_s': ...} para coletar
+            métricas; None executa sem instrumentação
+
+    Returns:
+        Dict retornado pela função da tarefa (com "metricas" se pedido)
+    """
+    if tarefa not in TAREFAS:
+        return {"sucesso": False, "erro": f"Tarefa desconhecida: {tarefa}"}
+
+    modulo, funcao = TAREFAS[tarefa]
+    if opcoes_metricas is None:
+        try:
+            return getattr(importlib.import_module(modulo), funcao)(**(parametros or {}))
+        except Exception as e:
+            return {"sucesso": False, "erro": str(e)}
+
+    try:
+        with coletar_metricas(opcoes_metricas.get("perfil")) as coletor:
+            try:
+                resultado = getattr(importlib.import_module(modulo), funcao)(**(parametros or {}))
+            except Exception as e:
+                resultado = {"sucesso": False, "erro": str(e)}
+            if not isinstance(resultado, dict):
+                return resultado
+            # Mede a serialização que o servidor fará ao responder
+            with coletor.fase("serializar_json"):
+                serializar_json(resultado)
+    except ValueError as e:
+        return {"sucesso": False, "erro": str(e)}
+
+    metricas = coletor.resultado()
+    metricas["tarefa"] = tarefa
+    metricas["espera_fila_s"] = opcoes_metricas.get("espera_fila_s")
+    return {**resultado, "metricas": metricas}
+
+
+def _loop_worker(conexao) -> None:
+    """
+    Laço principal de um processo worker: recebe (id, tarefa, parâmetros)
+    pela conexão e devolve (id, resultado) até receber None. Se a tarefa
+    pedir progresso, envia também (id, "progresso", evento) durante a execução.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    for modulo in MODULOS_AQUECIDOS:
+        try:
+            importlib.import_module(modulo)
+        except ImportError:
+            pass
+
+    while True:
+        try:
+            mensagem = conexao.recv()
+        except EOFError:
+            break
+        if mensagem is None:
+            break
+
+        id_tarefa, tarefa, parametros, opcoes_metricas, enviar_progresso = mensagem
+        contexto = (
+            ouvir_progresso(lambda evento: conexao.send((id_tarefa, "progresso", evento)))
+            if enviar_progresso else nullcontext()
+        )
+        with contexto:
+            resultado = executar_tarefa(tarefa, parametros, opcoes_metricas)
+        conexao.send((id_tarefa, resultado))
+
+
+def _series_disponiveis(resultado: Dict, parametros: Dict) -> bool:
+    """
+    Verifica se as séries referenciadas por um resultado em cache ainda existem.
+    """
+    if "series" not in resultado:
+        return True
+    from simulador_bess import caminho_series
+    try:
+        return os.path.exists(caminho_series(resultado["series"]["id"], parametros.get("diretorio_series")))
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def _metricas_pedidas(job: Dict) -> bool:
+    return bool(job.get("metricas") or job.get("perfil"))
+
+
+def _id_raiz(id_tarefa) -> str:
+    """
+    Id da requisição original de uma subtarefa ("7:site:3" -> "7").
+    """
+    return str(id_tarefa).split(":", 1)[0]
+
+
+class _Worker:
+    """
+    Processo worker com a tarefa em execução e o prazo para concluí-la.
+    """
+
+    def __init__(self, contexto):
+        self.conexao, conexao_filho = contexto.Pipe()
+        self.processo = contexto.Process(target=_loop_worker, args=(conexao_filho,), daemon=True)
+        self.processo.start()
+        conexao_filho.close()
+        self.tarefas_executadas = 0
+        self.trabalho = None  # ((job, responder, enfileirado, ao_progredir), prazo)
+
+    def encerrar(self, forcar: bool = False) -> None:
+        try:
+            if forcar:
+                self.processo.terminate()
+            else:
+                self.conexao.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.processo.join(timeout=1)
+        if self.processo.is_alive():
+            self.processo.kill()
+        self.conexao.close()
+
+
+# ============================================================================
+# POOL
+# ============================================================================
+
+class PoolWorkers:
+    """
+    Pool de processos persistentes com backpressure, timeout por tarefa
+    e reciclagem de workers.
+
+    A fila de entrada é limitada: quando cheia, `submeter` bloqueia e o
+    leitor deixa de consumir stdin/socket, propagando a pressão ao cliente.
+    Tarefas que estouram o prazo têm o worker encerrado e substituído.
+    Cada worker é reciclado após `max_tarefas_por_worker` tarefas.
+    Com `cache`, tarefas repetidas são respondidas sem chegar aos workers.
+
+    Cancelamentos são aplicados pela thread de despacho: a tarefa em
+    execução tem o worker substituído, e as que ainda estão na fila são
+    retiradas dela; ambas são respondidas na hora. Subtarefas enviadas
+    depois do cancelamento são descartadas ao chegar a vez delas.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = None,
+        max_fila: int = 64,
+        timeout_padrao_s: float = 120,
+        max_tarefas_por_worker: int = 500,
+        cache: Optional[CacheResultados] = None,
+    ):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.timeout_padrao_s = timeout_padrao_s
+        self.max_tarefas_por_worker = max_tarefas_por_worker
+        self.cache = cache
+        self.fila = queue.Queue(maxsize=max_fila)
+        self._contexto = mp.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._parar = threading.Event()
+        self._thread = None
+        self._pendentes = 0
+        self._trava_pendentes = threading.Lock()
+        self._cancelamentos = queue.Queue()
+        self._cancelados = OrderedDict()
+        self._trava_cancelados = threading.Lock()
+
+    def iniciar(self) -> "PoolWorkers":
+        self._workers = [_Worker(self._contexto) for _ in range(self.num_workers)]
+        self._thread = threading.Thread(target=self._despachar, daemon=True)
+        self._thread.start()
+        return self
+
+    def submeter(
+        self,
+        job: Dict,
+        responder: Callable[[Dict], None],
+        ao_progredir: Optional[Callable[[Dict], None]] = None,
+    ) -> None:
+        """
+        Enfileira uma tarefa; bloqueia enquanto a fila estiver cheia.
+
+        Args:
+            job: Requisição com id, tarefa, parametros e timeout opcional
+            responder: Função chamada com a resposta da tarefa
+            ao_progredir: Função chamada com cada evento de progresso; se
+                omitida e o job pedir "progresso", os eventos vão para `responder`
+        """
+        tarefa = job.get("tarefa")
+        if ao_progredir is None and job.get("progresso"):
+            ao_progredir = lambda evento: responder({"id": job.get("id"), "progresso": evento})
+
+        if tarefa == "estatisticas_cache":
+            estatisticas = self.cache.estatisticas() if self.cache else None
+            responder({"id": job.get("id"), "resultado": {"sucesso": True, "cache": estatisticas}})
+            return
+
+        if tarefa == "cancelar_tarefa":
+            alvo = (job.get("parametros") or {}).get("id")
+            if alvo is None:
+                responder({"id": job.get("id"), "resultado": {"sucesso": False, "erro": "Informe o id da tarefa"}})
+                return
+            self._cancelamentos.put((alvo, lambda encontrada: responder({
+                "id": job.get("id"),
+                "resultado": {"sucesso": True, "encontrada": encontrada},
+            })))
+            return
+
+        if self.cancelada(job.get("id")):
+            responder({"id": job.get("id"), "resultado": dict(RESULTADO_CANCELADO)})
+            return
+
+        if tarefa == "monte_carlo_bess" and self.num_workers > 1:
+            self._submeter_monte_carlo(job, self._acompanhar(responder), ao_progredir)
+            return
+
+        if tarefa == "gerar_corpus" and self.num_workers > 1:
+            self._submeter_corpus(job, self._acompanhar(responder), ao_progredir)
+            return
+
+        if tarefa == "analisar_portfolio":
+            self._submeter_portfolio(job, self._acompanhar(responder), ao_progredir)
+            return
+
+        inicio = time.perf_counter()
+        chave = None
+        if self.cache and cacheavel(tarefa, job.get("parametros")):
+            try:
+                chave = chave_resultado(tarefa, job.get("parametros") or {})
+            except (OSError, TypeError, ValueError):
+                chave = None
+
+        if chave:
+            resultado = self.cache.obter(chave)
+            if resultado is not None and not _series_disponiveis(resultado, job.get("parametros") or {}):
+                resultado = None
+            if resultado is not None:
+                if _metricas_pedidas(job):
+                    tempo = round(time.perf_counter() - inicio, 6)
+                    resultado = {**resultado, "metricas": {
+                        "tarefa": tarefa,
+                        "tempo_total_s": tempo,
+                        "fases_s": {"consultar_cache": tempo},
+                        "contadores": {"cache_resultados_acertos": 1},
+                    }}
+                responder({"id": job.get("id"), "resultado": resultado, "cache": True})
+                return
+
+        with self._trava_pendentes:
+            self._pendentes += 1
+
+        def concluir(resposta: Dict) -> None:
+            resultado = resposta.get("resultado") or {}
+            if chave and resultado.get("sucesso"):
+                self.cache.gravar(chave, {k: v for k, v in resultado.items() if k != "metricas"})
+                if "metricas" in resultado:
+                    resultado["metricas"]["contadores"]["cache_resultados_falhas"] = 1
+            responder(resposta)
+            with self._trava_pendentes:
+                self._pendentes -= 1
+
+        self.fila.put((job, concluir, time.monotonic(), ao_progredir))
+
+    def _acompanhar(self, responder: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        """
+        Conta uma requisição dividida em subtarefas como pendente até a
+        resposta final (com "resultado"); parciais e progresso não contam.
+
+        Entre duas subtarefas (ex.: arquivo ingerido, sites ainda não
+        enviados) nenhuma está pendente, mas a requisição ainda está.
+        """
+        with self._trava_pendentes:
+            self._pendentes += 1
+
+        def responder_final(resposta: Dict) -> None:
+            responder(resposta)
+            if "resultado" in resposta:
+                with self._trava_pendentes:
+                    self._pendentes -= 1
+
+        return responder_final
+
+    def cancelada(self, id_tarefa) -> bool:
+        """
+        Indica se a tarefa (ou a requisição que a originou) foi cancelada.
+        """
+        with self._trava_cancelados:
+            return str(id_tarefa) in self._cancelados or _id_raiz(id_tarefa) in self._cancelados
+
+    def _submeter_monte_carlo(
+        self,
+        job: Dict,
+        responder: Callable[[Dict], None],
+        ao_progredir: Optional[Callable[[Dict], None]] = None,
+    ) -> None:
+        """
+        Divide uma análise Monte Carlo em lotes de cenários distribuídos
+        entre os workers e consolida quando o último lote termina.
+
+        Os workers são processos daemon e não podem abrir um pool próprio.
+        Os lotes são enviados por uma thread própria, como no portfólio: com
+        a fila cheia `submeter` bloqueia, e a leitura da entrada (inclusive
+        de pedidos de cancelamento) precisa continuar.
+        """
+        from monte_carlo_bess import consolidar_cenarios, dividir_cenarios, preparar_monte_carlo
+        from projecao_financeira import normalizar_premissas
+
+        parametros = dict(job.get("parametros") or {})
+        incluir_cenarios = parametros.pop("incluir_cenarios", False)
+        parametros.pop("processos", None)
+        premissas = parametros.pop("premissas_financeiras", None)
+        try:
+            if premissas is not None:
+                premissas = normalizar_premissas(premissas)
+            comuns, investimento = preparar_monte_carlo(**parametros)
+        except Exception as e:
+            responder({"id": job.get("id"), "resultado": {"sucesso": False, "erro": str(e)}})
+            return
+
+        intervalos = dividir_cenarios(parametros.get("cenarios", 1000), self.num_workers * 4)
+        total_cenarios = sum(fim - inicio for inicio, fim in intervalos)
+        lotes: List[Dict] = []
+        simulados = [0]
+        trava = threading.Lock()
+
+        def receber(resposta: Dict, cenarios: int) -> None:
+            with trava:
+                lotes.append(resposta.get("resultado") or {"sucesso": False})
+                simulados[0] += cenarios
+                completo = len(lotes) == len(intervalos)
+                evento = {"etapa": "cenarios_simulados", "feitos": simulados[0], "total": total_cenarios}
+            if not completo:
+                if ao_progredir:
+                    ao_progredir(evento)
+                return
+
+            resultado = consolidar_cenarios(lotes, investimento, incluir_cenarios, premissas)
+            if resultado.get("sucesso"):
+                resultado["semente"] = comuns["semente"]
+                resultado["severidade"] = comuns["severidade"]
+            responder({"id": job.get("id"), "resultado": resultado})
+
+        def enviar_lotes() -> None:
+            for numero, (inicio, fim) in enumerate(intervalos):
+                self.submeter(
+                    {
+                        "id": f"{job.get('id')}:{numero}",
+                        "tarefa": "monte_carlo_lote",
+                        "parametros": {**comuns, "inicio": inicio, "fim": fim},
+                        "timeout": job.get("timeout"),
+                    },
+                    lambda resposta, cenarios=fim - inicio: receber(resposta, cenarios),
+                )
+
+        threading.Thread(target=enviar_lotes, daemon=True).start()
+
+    def _submeter_corpus(
+        self,
+        job: Dict,
+        responder: Callable[[Dict], None],
+        ao_progredir: Optional[Callable[[Dict], None]] = None,
+    ) -> None:
+        """
+        Distribui os casos de um corpus entre os workers (uma tarefa
+        gerar_caso_teste por caso) e grava o manifesto ao final.
+
+        Os casos são enviados por uma thread própria, para que a fila cheia
+        não trave a leitura da entrada (ver _submeter_monte_carlo).
+        """
+        from corpus_casos_teste import concluir_corpus, planejar_corpus
+
+        parametros = dict(job.get("parametros") or {})
+        diretorio = parametros.pop("diretorio", None)
+        formato_manifesto = parametros.pop("formato_manifesto", "json")
+        parametros.pop("processos", None)
+        try:
+            if formato_manifesto == "parquet" and importlib.util.find_spec("pyarrow") is None:
+                raise ValueError("Manifesto Parquet requer o pacote pyarrow")
+            os.makedirs(diretorio, exist_ok=True)
+            planejados = planejar_corpus(diretorio, **parametros)
+        except Exception as e:
+            responder({"id": job.get("id"), "resultado": {"sucesso": False, "erro": str(e)}})
+            return
+
+        casos: List[Optional[Dict]] = [None] * len(planejados)
+        restantes = [len(planejados)]
+        trava = threading.Lock()
+
+        def receber(indice: int, resposta: Dict) -> None:
+            caso = resposta.get("resultado") or {"sucesso": False}
+            if not caso.get("sucesso"):
+                plano = planejados[indice]
+                caso = {
+                    **caso,
+                    "arquivo": plano["caminho_saida"],
+                    "stage": plano["stage"],
+                    "severidade": plano["severidade"],
+                    "semente": plano["semente"],
+                }
+            with trava:
+                casos[indice] = caso
+                restantes[0] -= 1
+                completo = restantes[0] == 0
+                evento = {"etapa": "casos_gerados", "feitos": len(casos) - restantes[0], "total": len(casos)}
+            if not completo:
+                if ao_progredir:
+                    ao_progredir(evento)
+                return
+
+            try:
+                resultado = concluir_corpus(diretorio, casos, parametros, formato_manifesto)
+            except Exception as e:
+                resultado = {"sucesso": False, "erro": str(e)}
+            responder({"id": job.get("id"), "resultado": resultado})
+
+        def enviar_casos() -> None:
+            for indice, plano in enumerate(planejados):
+                self.submeter(
+                    {
+                        "id": f"{job.get('id')}:{indice}",
+                        "tarefa": "gerar_caso_teste",
+                        "parametros": plano,
+                        "timeout": job.get("timeout"),
+                    },
+                    lambda resposta, indice=indice: receber(indice, resposta),
+                )
+
+        threading.Thread(target=enviar_casos, daemon=True).start()
+
+    def _submeter_portfolio(
+        self,
+        job: Dict,
+        responder: Callable[[Dict], None],
+        ao_progredir: Optional[Callable[[Dict], None]] = None,
+    ) -> None:
+        """
+        Distribui um portfólio entre os workers: uma tarefa separar_medidores
+        por arquivo e, à medida que cada arquivo é ingerido, uma tarefa
+        analisar_site por medidor. Cada site é enviado como resposta parcial
+        e o resumo consolidado vai na resposta final.
+
+        A orquestração roda em uma thread própria: ela pode bloquear em
+        `submeter` com a fila cheia sem travar o despacho das respostas.
+        O progresso conta sites analisados; o total só é conhecido depois
+        que todos os arquivos foram ingeridos.
+        """
+        from portfolio_bess import ConsolidadorPortfolio, listar_sites, preparar_portfolio
+
+        parametros = dict(job.get("parametros") or {})
+        for ignorado in ("processos", "saida_jsonl", "ao_concluir_site"):
+            parametros.pop(ignorado, None)
+        try:
+            arquivos, diretorio_curvas, comuns = preparar_portfolio(**parametros)
+        except Exception as e:
+            responder({"id": job.get("id"), "resultado": {"sucesso": False, "erro": str(e)}})
+            return
+
+        def orquestrar() -> None:
+            respostas = queue.Queue()
+            consolidador = ConsolidadorPortfolio()
+            pendentes = len(arquivos)
+            arquivos_pendentes = len(arquivos)
+            sites = 0
+            analisados = 0
+
+            for indice, arquivo in enumerate(arquivos):
+                self.submeter(
+                    {
+                        "id": f"{job.get('id')}:arquivo:{indice}",
+                        "tarefa": "separar_medidores",
+                        "parametros": {"caminho_arquivo": arquivo, "diretorio_saida": diretorio_curvas},
+                        "timeout": job.get("timeout"),
+                    },
+                    lambda resposta, arquivo=arquivo: respostas.put(("arquivo", {"arquivo": arquivo, **resposta})),
+                )
+
+            while pendentes:
+                tipo, resposta = respostas.get()
+                pendentes -= 1
+                resultado = resposta.get("resultado") or {"sucesso": False}
+
+                if tipo == "site":
+                    consolidador.adicionar(resultado)
+                    responder({"id": job.get("id"), "parcial": resultado})
+                    analisados += 1
+                    if ao_progredir:
+                        ao_progredir({
+                            "etapa": "sites_analisados",
+                            "feitos": analisados,
+                            "total": None if arquivos_pendentes else sites,
+                        })
+                    continue
+
+                arquivos_pendentes -= 1
+                if not resultado.get("sucesso"):
+                    consolidador.adicionar_falha({"arquivo": resposta["arquivo"], **resultado})
+                    continue
+                if self.cancelada(job.get("id")):
+                    continue
+                for site in listar_sites(resultado, comuns):
+                    pendentes += 1
+                    self.submeter(
+                        {
+                            "id": f"{job.get('id')}:site:{sites}",
+                            "tarefa": "analisar_site",
+                            "parametros": site,
+                            "timeout": job.get("timeout"),
+                        },
+                        lambda resposta, site=site: respostas.put(("site", {"resultado": {
+                            "arquivo": site["arquivo"],
+                            "medidor": site["medidor"],
+                            **(resposta.get("resultado") or {"sucesso": False}),
+                        }})),
+                    )
+                    sites += 1
+
+            resultado = {
+                "sucesso": True,
+                "resumo": consolidador.resultado(),
+                "diretorio_curvas": diretorio_curvas,
+            }
+            if self.cancelada(job.get("id")):
+                resultado.update(RESULTADO_CANCELADO)
+            responder({"id": job.get("id"), "resultado": resultado})
+
+        threading.Thread(target=orquestrar, daemon=True).start()
+
+    def encerrar(self) -> None:
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        for worker in self._workers:
+            worker.encerrar()
+
+    def ocioso(self) -> bool:
+        """
+        Indica se não há tarefas na fila nem em execução, nem requisições
+        divididas (Monte Carlo, corpus, portfólio) sem a resposta final.
+        """
+        with self._trava_pendentes:
+            return self._pendentes == 0
+
+    def _substituir(self, worker: _Worker, forcar: bool) -> _Worker:
+        worker.encerrar(forcar=forcar)
+        novo = _Worker(self._contexto)
+        self._workers[self._workers.index(worker)] = novo
+        return novo
+
+    def _cancelar(self, alvo) -> bool:
+        """
+        Cancela a tarefa `alvo` e suas subtarefas (thread de despacho).
+
+        Returns:
+            True se alguma tarefa em execução ou na fila foi atingida
+        """
+        alvo = str(alvo)
+        with self._trava_cancelados:
+            self._cancelados[alvo] = True
+            while len(self._cancelados) > MAX_CANCELAMENTOS:
+                self._cancelados.popitem(last=False)
+
+        encontrada = False
+        for worker in list(self._workers):
+            if worker.trabalho is None:
+                continue
+            (job, responder, _, _), _ = worker.trabalho
+            if alvo not in (str(job.get("id")), _id_raiz(job.get("id"))):
+                continue
+            worker.trabalho = None
+            self._substituir(worker, forcar=True)
+            responder({"id": job.get("id"), "resultado": dict(RESULTADO_CANCELADO)})
+            encontrada = True
+
+        # Sem isso a tarefa só seria respondida quando chegasse a vez dela
+        with self.fila.mutex:
+            retirados = [
+                item for item in self.fila.queue
+                if alvo in (str(item[0].get("id")), _id_raiz(item[0].get("id")))
+            ]
+            for item in retirados:
+                self.fila.queue.remove(item)
+            if retirados:
+                self.fila.not_full.notify(len(retirados))
+        for job, responder, *_ in retirados:
+            responder({"id": job.get("id"), "resultado": dict(RESULTADO_CANCELADO)})
+        return encontrada or bool(retirados)
+
+    def _atribuir(self, worker: _Worker, item: Tuple) -> None:
+        job, responder, enfileirado, ao_progredir = item
+        if self.cancelada(job.get("id")):
+            responder({"id": job.get("id"), "resultado": dict(RESULTADO_CANCELADO)})
+            return
+        timeout = float(job.get("timeout") or self.timeout_padrao_s)
+        opcoes_metricas = None
+        if _metricas_pedidas(job):
+            opcoes_metricas = {
+                "perfil": job.get("perfil"),
+                "espera_fila_s": round(time.monotonic() - enfileirado, 6),
+            }
+        mensagem = (
+            job.get("id"), job.get("tarefa"), job.get("parametros"), opcoes_metricas, ao_progredir is not None,
+        )
+        try:
+            worker.conexao.send(mensagem)
+        except (BrokenPipeError, OSError):
+            worker = self._substituir(worker, forcar=True)
+            worker.conexao.send(mensagem)
+        worker.trabalho = (item, time.monotonic() + timeout)
+
+    def _despachar(self) -> None:
+        while not self._parar.is_set():
+            while True:
+                try:
+                    alvo, confirmar = self._cancelamentos.get_nowait()
+                except queue.Empty:
+                    break
+                confirmar(self._cancelar(alvo))
+
+            # Atribuir tarefas da fila aos workers livres
+            for worker in list(self._workers):
+                if worker.trabalho is not None:
+                    continue
+                try:
+                    item = self.fila.get_nowait()
+                except queue.Empty:
+                    break
+                self._atribuir(worker, item)
+
+            ocupados = [w for w in self._workers if w.trabalho is not None]
+            if not ocupados:
+                try:
+                    item = self.fila.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                self._atribuir(self._workers[0], item)
+                continue
+
+            espera = max(0.0, min(w.trabalho[1] for w in ocupados) - time.monotonic())
+            prontos = wait([w.conexao for w in ocupados], timeout=min(espera, 0.05))
+
+            for worker in ocupados:
+                (job, responder, _, ao_progredir), prazo = worker.trabalho
+
+                if worker.conexao in prontos:
+                    try:
+                        mensagem = worker.conexao.recv()
+                    except (EOFError, OSError):
+                        worker.trabalho = None
+                        self._substituir(worker, forcar=True)
+                        responder({
+                            "id": job.get("id"),
+                            "resultado": {"sucesso": False, "erro": "Worker encerrado inesperadamente"},
+                        })
+                        continue
+
+                    if len(mensagem) == 3:
+                        # Evento de progresso: a tarefa continua em execução
+                        if ao_progredir:
+                            ao_progredir(mensagem[2])
+                        continue
+
+                    worker.trabalho = None
+                    _, resultado = mensagem
+                    worker.tarefas_executadas += 1
+                    responder({"id": job.get("id"), "resultado": resultado})
+                    if worker.tarefas_executadas >= self.max_tarefas_por_worker:
+                        self._substituir(worker, forcar=False)
+
+                elif time.monotonic() >= prazo:
+                    worker.trabalho = None
+                    self._substituir(worker, forcar=True)
+                    responder({
+                        "id": job.get("id"),
+                        "resultado": {"sucesso": False, "erro": "Tempo limite excedido"},
+                    })
+
+
+# ============================================================================
+# ENTRADA / SAÍDA
+# ============================================================================
+
+def _decodificar(linha: str) -> Optional[Dict]:
+    linha = linha.strip()
+    if not linha:
+        return None
+    try:
+        job = json.loads(linha)
+    except json.JSONDecodeError as e:
+        return {"id": None, "erro_protocolo": f"JSON inválido: {e}"}
+    if not isinstance(job, dict):
+        return {"id": None, "erro_protocolo": "Requisição deve ser um objeto JSON"}
+    return job
+
+
+def _criar_responder(escrever: Callable[[str], None]) -> Callable[[Dict], None]:
+    trava = threading.Lock()
+
+    def responder(resposta: Dict) -> None:
+        try:
+            linha = serializar_json(resposta) + "\n"
+        except (TypeError, ValueError) as e:
+            # Sem resposta a requisição ficaria pendente no cliente
+            linha = serializar_json({
+                "id": resposta.get("id"),
+                "resultado": {"sucesso": False, "erro": f"Resultado não serializável: {e}"},
+            }) + "\n"
+        with trava:
+            try:
+                escrever(linha)
+            except (BrokenPipeError, OSError):
+                pass
+
+    return responder
+
+
+def _consumir_linhas(linhas, pool: PoolWorkers, responder: Callable[[Dict], None]) -> None:
+    for linha in linhas:
+        job = _decodificar(linha)
+        if job is None:
+            continue
+        if "erro_protocolo" in job:
+            responder({"id": job["id"], "resultado": {"sucesso": False, "erro": job["erro_protocolo"]}})
+            continue
+        pool.submeter(job, responder)
+
+
+def servir_stdio(pool: PoolWorkers) -> None:
+    """
+    Atende requisições por stdin e escreve respostas em stdout.
+    """
+    def escrever(linha: str) -> None:
+        sys.stdout.write(linha)
+        sys.stdout.flush()
+
+    _consumir_linhas(sys.stdin, pool, _criar_responder(escrever))
+
+
+def servir_socket(pool: PoolWorkers, caminho_socket: str) -> None:
+    """
+    Atende requisições por socket Unix, uma thread por conexão.
+    """
+    if os.path.exists(caminho_socket):
+        os.unlink(caminho_socket)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def escrever(linha: str) -> None:
+                self.wfile.write(linha.encode("utf-8"))
+                self.wfile.flush()
+
+            linhas = (bruta.decode("utf-8") for bruta in self.rfile)
+            _consumir_linhas(linhas, pool, _criar_responder(escrever))
+
+    with socketserver.ThreadingUnixStreamServer(caminho_socket, Handler) as servidor:
+        servidor.daemon_threads = True
+        servidor.serve_forever()
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor persistente de workers BESS")
+    parser.add_argument("--workers", type=int, default=None, help="Número de processos (padrão: CPUs)")
+    parser.add_argument("--max-queue", type=int, default=64, help="Tamanho máximo da fila")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout padrão por tarefa (s)")
+    parser.add_argument("--max-tasks", type=int, default=500, help="Tarefas por worker antes de reciclar")
+    parser.add_argument("--socket", default=None, help="Caminho do socket Unix (padrão: stdin/stdout)")
+    parser.add_argument("--cache-dir", default=None, help="Diretório do cache em disco")
+    parser.add_argument("--cache-entries", type=int, default=256, help="Entradas do cache em memória")
+    parser.add_argument("--cache-max-mb", type=float, default=512, help="Tamanho máximo do cache em disco (MB)")
+    parser.add_argument("--no-cache", action="store_true", help="Desativa o cache de resultados")
+
+    args = parser.parse_args()
+
+    pool = PoolWorkers(
+        num_workers=args.workers,
+        max_fila=args.max_queue,
+        timeout_padrao_s=args.timeout,
+        max_tarefas_por_worker=args.max_tasks,
+        cache=None if args.no_cache else CacheResultados(
+            diretorio=args.cache_dir,
+            max_entradas_memoria=args.cache_entries,
+            max_bytes_disco=int(args.cache_max_mb * 1024 * 1024),
+        ),
+    ).iniciar()
+
+    try:
+        if args.socket:
+            servir_socket(pool, args.socket)
+        else:
+            servir_stdio(pool)
+            # Aguardar tarefas pendentes após EOF em stdin
+            while not pool.ocioso():
+                time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.encerrar()
@@ -7,13 +7,66 @@ calculando economia e payback baseado em estratégias de carregamento.
 Estratégias suportadas:
 - solar: Carrega com geração própria durante o dia
 - grid-offpeak: Carrega na madrugada com tarifa baixa
+- otimo: Despacho ótimo por programação linear (limite superior de
+  economia para comparar com as regras acima; requer scipy)
 """
 
+import base64
+import copy
+import hashlib
 import json
-from datetime import datetime, timedelta
+import os
+import re
+import tempfile
+import time as relogio
+from datetime import date, datetime, time, timedelta
 from typing import List, Dict, Tuple
 import random
 
+import numpy as np
+
+from calendario_tarifario import obter_calendario
+from curva_colunar import intervalo_dominante, para_datetime64, resolver_curva
+from degradacao_bess import DIAS_ANO, ContadorRainflow
+from despacho_otimo import DIAS_HORIZONTE, despachar_otimo
+from metricas import contar, cronometrada, fase, progresso
+from projecao_financeira import normalizar_premissas, projetar_investimento, resumir_projecao
+
+
+HORAS_DIA = 24
+SEGUNDOS_HORA = 3600
+SEGUNDOS_DIA = 86400
+
+ESTRATEGIAS = ("solar", "grid-offpeak", "otimo")
+
+# Estratégias que carregam da rede (energia de carga paga na tarifa do passo)
+ESTRATEGIAS_CARGA_REDE = ("grid-offpeak", "otimo")
+
+# SoC do primeiro dia de um período
+SOC_INICIAL_PERCENT = 50
+
+# Versão do checkpoint incremental (mudar ao alterar o despacho)
+VERSAO_CHECKPOINT = 1
+
+# Arrays guardados no checkpoint incremental
+CAMPOS_CHECKPOINT = ("dias", "impressoes", "cargas", "descargas", "socs", "socs_finais")
+
+# Detalhe do resultado: "resumo" guarda as séries por passo no servidor
+DETALHES = ("resumo", "completo")
+SERIES_SIMULACAO = ("potencias_original", "potencias_com_bess", "socs")
+DIRETORIO_SERIES = os.path.join(tempfile.gettempdir(), "bess-series")
+MAX_DIAS_SERIES = 31
+
+# Limites do diretório de séries: idade máxima desde o último acesso e
+# tamanho total (os menos acessados saem primeiro)
+MAX_IDADE_SERIES_S = float(os.environ.get("BESS_SERIES_MAX_DIAS", 7)) * 86400
+MAX_BYTES_SERIES = int(float(os.environ.get("BESS_SERIES_MAX_MB", 1024)) * 1024 * 1024)
+INTERVALO_LIMPEZA_SERIES_S = 60
+_ultima_limpeza_series: Dict[str, float] = {}
+
+# Ordinal (date.toordinal) de 1970-01-01
+ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
 
 class SimuladorBESS:
     """
@@ -36,16 +89,20 @@ class SimuladorBESS:
         horario_ponta_fim: int = 21,
         horario_intermediaria_inicio: int = 17,
         horario_intermediaria_fim: int = 22,
+        feriados: List[str] = None,
+        eficiencia_carga: float = 1.0,
+        eficiencia_descarga: float = 1.0,
+        modelo_degradacao: Dict = None,
     ):
         """
         Inicializa o simulador.
         
         Args:
             potencias_kw: Lista de potências em kW
-            timestamps: Lista de timestamps ISO
+            timestamps: Lista de timestamps ISO (ou array datetime64)
             capacidade_bess_kwh: Capacidade do BESS em kWh
             potencia_bess_kw: Potência do BESS em kW
-            estrategia_carregamento: 'solar' ou 'grid-offpeak'
+            estrategia_carregamento: 'solar', 'grid-offpeak' ou 'otimo'
             tarifa_ponta_reais_kwh: Preço na ponta (R$/kWh)
             tarifa_intermediaria_reais_kwh: Preço intermediário (R$/kWh)
             tarifa_fora_ponta_reais_kwh: Preço fora de ponta (R$/kWh)
@@ -55,9 +112,17 @@ class SimuladorBESS:
             horario_ponta_fim: Hora de término da ponta
             horario_intermediaria_inicio: Hora de início da intermediária
             horario_intermediaria_fim: Hora de término da intermediária
+            feriados: Datas ISO (YYYY-MM-DD) sem ponta nem intermediária
+            eficiencia_carga: Fração da energia da rede que entra na bateria
+            eficiencia_descarga: Fração da energia da bateria entregue à carga
+            modelo_degradacao: Parâmetros de ContadorRainflow ({} = padrão,
+                None = bateria sem desgaste)
         """
+        if not (0 < eficiencia_carga <= 1 and 0 < eficiencia_descarga <= 1):
+            raise ValueError("Eficiências devem estar entre 0 (exclusive) e 1")
+        
         self.potencias_kw = potencias_kw
-        self.timestamps = [datetime.fromisoformat(ts) for ts in timestamps]
+        self.timestamps = para_datetime64(timestamps)
         self.capacidade_bess_kwh = capacidade_bess_kwh
         self.potencia_bess_kw = potencia_bess_kw
         self.estrategia = estrategia_carregamento
@@ -70,27 +135,35 @@ class SimuladorBESS:
         self.hp_fim = horario_ponta_fim
         self.hi_inicio = horario_intermediaria_inicio
         self.hi_fim = horario_intermediaria_fim
+        self.eficiencia_carga = eficiencia_carga
+        self.eficiencia_descarga = eficiencia_descarga
+        self.modelo_degradacao = modelo_degradacao
+        self.calendario = obter_calendario(
+            (self.hp_inicio, self.hp_fim), (self.hi_inicio, self.hi_fim), feriados
+        )
+        
+        # Tarifa indexada pela classe do calendário (fora ponta, intermediária, ponta)
+        self.tarifas_classe = np.array(
+            [self.tarifa_fora_ponta, self.tarifa_intermediaria, self.tarifa_ponta], dtype=np.float64
+        )
         
         # Calcular demanda contratada (máxima do período)
-        self.demanda_contratada = max(potencias_kw)
+        self.demanda_contratada = float(np.max(potencias_kw))
+        
+        # Grade diária (dias x passos), montada sob demanda
+        self._grade = None
+        self.intervalo_s = SEGUNDOS_HORA
+        self.passos_validos = None
+        self.qualidade_dados = None
+        
+        # Contador de ciclos do último despacho (com modelo_degradacao)
+        self.degradacao = None
         
     def obter_tarifa(self, timestamp: datetime) -> float:
         """
         Obtém a tarifa para um horário específico.
         """
-        hora = timestamp.hour
-        dia_semana = timestamp.weekday()
-        
-        # Ponta: seg-sex, 18-21h
-        if dia_semana < 5 and self.hp_inicio <= hora < self.hp_fim:
-            return self.tarifa_ponta
-        
-        # Intermediária: seg-sex, 17-22h (exceto ponta)
-        if dia_semana < 5 and self.hi_inicio <= hora < self.hi_fim:
-            return self.tarifa_intermediaria
-        
-        # Fora de ponta
-        return self.tarifa_fora_ponta
+        return float(self.tarifas_classe[self.calendario.classe_instante(timestamp)])
     
     def obter_geracao_solar(self, timestamp: datetime) -> float:
         """
@@ -113,163 +186,479 @@ class SimuladorBESS:
         
         return 0
     
-    def simular_dia(
-        self,
-        data: datetime,
-        potencias_dia: List[float],
-        soc_inicial_percent: float = 50
-    ) -> Dict:
+    @cronometrada("agrupar_dias")
+    def montar_grade_diaria(self) -> Tuple[List[datetime], np.ndarray]:
         """
-        Simula um dia completo.
+        Agrupa a série em uma grade (dias x passos do dia).
+        
+        O intervalo de medição (dt) é o mais frequente entre timestamps
+        consecutivos; cada amostra vai para a posição do seu horário no dia
+        (amostras fora da grade vão para o passo em que caem). Amostras na
+        mesma posição entram pela média.
+        
+        Posições sem medição ficam com zero na matriz e fora de
+        `self.passos_validos` (dias x passos; None = grade completa): os
+        despachos não carregam nem descarregam nelas. Passos sem medição,
+        amostras duplicadas e desalinhadas são contados em
+        `self.qualidade_dados` (None = nenhum) e o intervalo fica em
+        `self.intervalo_s`.
+        
+        Returns:
+            Tupla (datas, matriz de potências em kW)
+        """
+        if self._grade is not None:
+            return self._grade
+        
+        segundos = self.timestamps.astype(np.int64)
+        intervalo_s = intervalo_dominante(np.sort(segundos)) or SEGUNDOS_HORA
+        if SEGUNDOS_DIA % intervalo_s != 0:
+            raise ValueError(f"Intervalo de medição não divide o dia: {intervalo_s} s")
+        passos_por_dia = SEGUNDOS_DIA // intervalo_s
+        
+        dias = np.floor_divide(segundos, SEGUNDOS_DIA)
+        deslocamento = segundos - dias * SEGUNDOS_DIA
+        posicao = deslocamento // intervalo_s
+        dias_unicos, indice_dia = np.unique(dias, return_inverse=True)
+        
+        celulas = len(dias_unicos) * passos_por_dia
+        indice = indice_dia * passos_por_dia + posicao
+        soma = np.bincount(indice, weights=np.asarray(self.potencias_kw, dtype=np.float64), minlength=celulas)
+        amostras = np.bincount(indice, minlength=celulas)
+        matriz = (soma / np.maximum(amostras, 1)).reshape(len(dias_unicos), passos_por_dia)
+        
+        validos = (amostras > 0).reshape(matriz.shape)
+        qualidade = {
+            "passos_sem_medicao": int(celulas - np.count_nonzero(validos)),
+            "amostras_duplicadas": int(np.maximum(amostras - 1, 0).sum()),
+            "amostras_desalinhadas": int(np.count_nonzero(deslocamento % intervalo_s)),
+        }
+        self.passos_validos = None if validos.all() else validos
+        self.qualidade_dados = qualidade if any(qualidade.values()) else None
+        
+        datas = [
+            datetime.combine(date.fromordinal(int(o) + ORDINAL_EPOCA), time())
+            for o in dias_unicos
+        ]
+        self.intervalo_s = int(intervalo_s)
+        self._grade = (datas, matriz)
+        return self._grade
+    
+    def com_matriz(self, matriz: np.ndarray) -> "SimuladorBESS":
+        """
+        Cópia do simulador com outras potências sobre a mesma grade.
+        
+        Usado para cenários perturbados de uma curva: datas, intervalo e
+        calendário são reaproveitados e a demanda contratada passa a ser a
+        máxima da nova matriz.
         
         Args:
-            data: Data do dia
-            potencias_dia: Potências para as 24 horas do dia
-            soc_inicial_percent: Estado de carga inicial (%)
+            matriz: Potências (dias x passos) em kW, no formato da grade
             
         Returns:
-            Dict com resultados do dia
+            Novo SimuladorBESS
         """
-        # Inicializar estado
-        soc_atual = (soc_inicial_percent / 100) * self.capacidade_bess_kwh
-        
-        # Demanda máxima do dia
-        demanda_max_original = max(potencias_dia)
+        datas, base = self.montar_grade_diaria()
+        if matriz.shape != base.shape:
+            raise ValueError(f"Matriz {matriz.shape} não corresponde à grade {base.shape}")
         
-        # Listas para rastreamento
-        socs = [soc_atual]
-        potencias_com_bess = []
-        descargas = []
-        cargas = []
-        custos_carga = []
-        economias_descarga = []
+        copia = copy.copy(self)
+        copia._grade = (datas, matriz)
+        copia.demanda_contratada = float(matriz.max())
+        return copia
+    
+    def horas_dos_passos(self, passos_por_dia: int, intervalo_s: int = SEGUNDOS_HORA) -> np.ndarray:
+        """
+        Hora do dia (0-23) de cada passo da grade.
+        """
+        return (np.arange(passos_por_dia) * intervalo_s) // SEGUNDOS_HORA
+    
+    @cronometrada("montar_tarifas")
+    def montar_tarifas_grade(
+        self,
+        datas: List[datetime],
+        passos_por_dia: int = HORAS_DIA,
+        intervalo_s: int = SEGUNDOS_HORA,
+    ) -> np.ndarray:
+        """
+        Pré-calcula a tarifa de cada passo de cada dia da grade.
         
-        # Simular cada hora
-        for hora, potencia_original in enumerate(potencias_dia):
-            timestamp = data.replace(hour=hora)
-            tarifa = self.obter_tarifa(timestamp)
+        Args:
+            datas: Datas (meia-noite) de cada linha da grade
+            passos_por_dia: Colunas da grade
+            intervalo_s: Duração de cada passo (s)
             
-            # Decisão de carregamento/descarregamento
-            if self.estrategia == "solar":
-                geracao_solar = self.obter_geracao_solar(timestamp)
-                energia_disponivel = geracao_solar * self.potencia_bess_kw
-                
-                # Carregar se houver geração e espaço
-                if energia_disponivel > 0 and soc_atual < self.capacidade_bess_kwh:
-                    energia_carga = min(
-                        energia_disponivel,
-                        self.capacidade_bess_kwh - soc_atual
-                    )
-                    soc_atual += energia_carga
-                    cargas.append(energia_carga)
-                    custos_carga.append(0)  # Solar é grátis
-                else:
-                    cargas.append(0)
-                    custos_carga.append(0)
+        Returns:
+            Matriz (dias x passos) de tarifas em R$/kWh
+        """
+        classes = self.calendario.classificar_grade(datas, passos_por_dia, intervalo_s)
+        return self.tarifas_classe[classes]
+    
+    def fracao_carga_horaria(
+        self,
+        estrategia: str = None,
+        passos_por_dia: int = HORAS_DIA,
+        intervalo_s: int = SEGUNDOS_HORA,
+    ) -> np.ndarray:
+        """
+        Fração da potência do BESS disponível para carga em cada passo do dia.
+        
+        Args:
+            estrategia: Uma de ESTRATEGIAS (padrão: a do simulador)
+            passos_por_dia: Colunas da grade
+            intervalo_s: Duração de cada passo (s)
             
-            elif self.estrategia == "grid-offpeak":
-                # Carregar na madrugada (00-06h) com tarifa baixa
-                if 0 <= hora < 6 and soc_atual < self.capacidade_bess_kwh:
-                    energia_carga = min(
-                        self.potencia_bess_kw,
-                        self.capacidade_bess_kwh - soc_atual
-                    )
-                    soc_atual += energia_carga
-                    cargas.append(energia_carga)
-                    custos_carga.append(energia_carga * tarifa)
-                else:
-                    cargas.append(0)
-                    custos_carga.append(0)
+        Returns:
+            Array (passos,) com frações entre 0 e 1
+        """
+        estrategia = estrategia or self.estrategia
+        referencia = datetime(2000, 1, 1)
+        fracao_hora = np.zeros(HORAS_DIA, dtype=np.float64)
+        
+        for hora in range(HORAS_DIA):
+            if estrategia == "solar":
+                fracao_hora[hora] = self.obter_geracao_solar(referencia.replace(hour=hora))
+            elif estrategia == "grid-offpeak" and hora < 6:
+                fracao_hora[hora] = 1.0
+            elif estrategia == "otimo":
+                fracao_hora[hora] = 1.0
+        
+        return fracao_hora[self.horas_dos_passos(passos_por_dia, intervalo_s)]
+    
+    def montar_perfil_despacho(
+        self,
+        passos_por_dia: int = HORAS_DIA,
+        intervalo_s: int = SEGUNDOS_HORA,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pré-calcula, para cada passo do dia, o limite de carga e a janela de descarga.
+        
+        Args:
+            passos_por_dia: Colunas da grade
+            intervalo_s: Duração de cada passo (s)
             
-            # Decisão de descarregamento (durante ponta)
-            hora_ponta = self.hp_inicio <= hora < self.hp_fim
+        Returns:
+            Tupla (energia máxima de carga por passo em kWh, máscara de descarga)
+        """
+        fracao = self.fracao_carga_horaria(passos_por_dia=passos_por_dia, intervalo_s=intervalo_s)
+        limite_carga = fracao * (self.potencia_bess_kw * (intervalo_s / SEGUNDOS_HORA))
+        
+        janela_descarga = self.calendario.janela_ponta(np.arange(passos_por_dia) * intervalo_s)
+        return limite_carga, janela_descarga
+    
+    @property
+    def custo_demanda_dia(self) -> float:
+        """
+        Valor de 1 kW a menos na demanda máxima de um dia (R$).
+        
+        É o peso que resumir_periodo dá à redução média diária de demanda
+        (cobrança mensal x 12 / 365).
+        """
+        return self.cobranca_demanda * 12 / 365
+    
+    def potencias_liquidas(
+        self,
+        matriz: np.ndarray,
+        cargas: np.ndarray,
+        descargas: np.ndarray,
+        horas_passo: float,
+    ) -> np.ndarray:
+        """
+        Potência vista pela rede com o BESS (dias x passos).
+        
+        As regras fixas carregam fora da ponta e contam só a descarga; o
+        despacho ótimo pode carregar a qualquer hora, então a carga também
+        entra na demanda (senão carregar e descarregar no mesmo passo
+        "reduziria" o pico sem custo).
+        """
+        if self.estrategia == "otimo":
+            return matriz + (cargas - descargas) / horas_passo
+        return matriz - descargas / horas_passo
+    
+    def despachar_grade(
+        self,
+        matriz: np.ndarray,
+        soc_inicial_percent: float = 50,
+        intervalo_s: int = None,
+        datas: List[datetime] = None,
+        passos_validos: np.ndarray = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[float]]:
+        """
+        Calcula os fluxos de energia de uma grade.
+        
+        As regras fixas não dependem das tarifas; o despacho ótimo depende
+        e exige `datas`.
+        
+        Com modelo_degradacao, os ciclos ficam em `self.degradacao`.
+        
+        Args:
+            matriz: Potências (dias x passos) em kW
+            soc_inicial_percent: Estado de carga inicial do primeiro dia (%)
+            intervalo_s: Duração de cada passo (padrão: dia / colunas)
+            datas: Datas de cada linha (só para a estratégia 'otimo')
+            passos_validos: Máscara (dias x passos) dos passos medidos
+                (None = todos)
             
-            if hora_ponta and soc_atual > 0:
-                # Descarregar para reduzir pico
-                energia_descarga = min(
-                    self.potencia_bess_kw,
-                    soc_atual,
-                    max(0, potencia_original - (self.demanda_contratada * 0.7))
-                )
-                
-                if energia_descarga > 0:
-                    soc_atual -= energia_descarga
-                    potencia_com_bess = potencia_original - energia_descarga
-                    descargas.append(energia_descarga)
-                    economias_descarga.append(energia_descarga * tarifa)
-                else:
-                    descargas.append(0)
-                    economias_descarga.append(0)
-                    potencia_com_bess = potencia_original
-            else:
-                descargas.append(0)
-                economias_descarga.append(0)
-                potencia_com_bess = potencia_original
+        Returns:
+            Tupla (cargas, descargas, trajetória de SoC em kWh, SoC final de cada dia em %)
+        """
+        if self.estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estratégia inválida: {self.estrategia}")
+        
+        passos_por_dia = matriz.shape[1]
+        intervalo_s = intervalo_s or SEGUNDOS_DIA // passos_por_dia
+        
+        contar("dias_simulados", matriz.shape[0])
+        contar("passos_simulados", matriz.size)
+        
+        self.degradacao = (
+            ContadorRainflow(**self.modelo_degradacao) if self.modelo_degradacao is not None else None
+        )
+        
+        if self.estrategia == "otimo":
+            if datas is None:
+                raise ValueError("Despacho ótimo requer as datas da grade")
+            return despachar_otimo(
+                matriz,
+                self.montar_tarifas_grade(datas, passos_por_dia, intervalo_s),
+                capacidade_kwh=self.capacidade_bess_kwh,
+                potencia_kw=self.potencia_bess_kw,
+                custo_demanda_dia=self.custo_demanda_dia,
+                horas_passo=intervalo_s / SEGUNDOS_HORA,
+                soc_inicial_percent=soc_inicial_percent,
+                eficiencia_carga=self.eficiencia_carga,
+                eficiencia_descarga=self.eficiencia_descarga,
+                degradacao=self.degradacao,
+                passos_validos=passos_validos,
+            )
+        
+        limite_carga, janela_descarga = self.montar_perfil_despacho(passos_por_dia, intervalo_s)
+        return despachar_soc(
+            matriz,
+            limite_carga,
+            janela_descarga,
+            capacidade_kwh=self.capacidade_bess_kwh,
+            potencia_kw=self.potencia_bess_kw,
+            limiar_descarga_kw=self.demanda_contratada * 0.7,
+            horas_passo=intervalo_s / SEGUNDOS_HORA,
+            soc_inicial_percent=soc_inicial_percent,
+            eficiencia_carga=self.eficiencia_carga,
+            eficiencia_descarga=self.eficiencia_descarga,
+            degradacao=self.degradacao,
+            passos_validos=passos_validos,
+        )
+    
+    def precificar_grade(
+        self,
+        datas: List[datetime],
+        matriz: np.ndarray,
+        cargas: np.ndarray,
+        descargas: np.ndarray,
+        socs: np.ndarray,
+        socs_finais: List[float],
+        intervalo_s: int = None,
+        incluir_series: bool = True,
+    ) -> List[Dict]:
+        """
+        Aplica as tarifas aos fluxos de energia e monta o resultado de cada dia.
+        
+        Args:
+            datas: Datas de cada linha
+            matriz: Potências (dias x passos) em kW
+            cargas, descargas, socs, socs_finais: Saída de despachar_grade
+            intervalo_s: Duração de cada passo (padrão: dia / colunas)
+            incluir_series: Incluir potências e SoC de cada passo em cada dia
             
-            potencias_com_bess.append(potencia_com_bess)
-            socs.append(soc_atual)
+        Returns:
+            Lista com os resultados de cada dia
+        """
+        passos_por_dia = matriz.shape[1]
+        intervalo_s = intervalo_s or SEGUNDOS_DIA // passos_por_dia
+        horas_passo = intervalo_s / SEGUNDOS_HORA
+        tarifas = self.montar_tarifas_grade(datas, passos_por_dia, intervalo_s)
+        
+        potencias_com_bess = self.potencias_liquidas(matriz, cargas, descargas, horas_passo)
+        custos_carga = cargas * tarifas if self.estrategia in ESTRATEGIAS_CARGA_REDE else np.zeros_like(cargas)
+        economias_descarga = descargas * tarifas
         
-        # Calcular resultados do dia
-        demanda_max_com_bess = max(potencias_com_bess)
-        reducao_demanda = demanda_max_original - demanda_max_com_bess
+        # cumsum é sequencial: a última coluna reproduz sum() passo a passo
+        demanda_max_original = matriz.max(axis=1).tolist()
+        demanda_max_com_bess = potencias_com_bess.max(axis=1).tolist()
+        energia_carregada = np.cumsum(cargas, axis=1)[:, -1].tolist()
+        energia_descarregada = np.cumsum(descargas, axis=1)[:, -1].tolist()
+        custo_carregamento = np.cumsum(custos_carga, axis=1)[:, -1].tolist()
+        economia_descarga = np.cumsum(economias_descarga, axis=1)[:, -1].tolist()
         
-        # Custos e economias
-        custo_carregamento = sum(custos_carga)
-        economia_descarga = sum(economias_descarga)
-        economia_liquida = economia_descarga - custo_carregamento
+        with fase("montar_resultados"):
+            if incluir_series:
+                socs_percent = np.round(socs / self.capacidade_bess_kwh * 100, 1).tolist()
+                originais = np.round(matriz, 1).tolist()
+                com_bess = np.round(potencias_com_bess, 1).tolist()
+            
+            resultados = []
+            for i, data in enumerate(datas):
+                dia = {
+                    "data": data.isoformat(),
+                    "demanda_max_original_kw": round(demanda_max_original[i], 2),
+                    "demanda_max_com_bess_kw": round(demanda_max_com_bess[i], 2),
+                    "reducao_demanda_kw": round(demanda_max_original[i] - demanda_max_com_bess[i], 2),
+                    "energia_carregada_kwh": round(energia_carregada[i], 2),
+                    "energia_descarregada_kwh": round(energia_descarregada[i], 2),
+                    "custo_carregamento_reais": round(custo_carregamento[i], 2),
+                    "economia_descarga_reais": round(economia_descarga[i], 2),
+                    "economia_liquida_reais": round(economia_descarga[i] - custo_carregamento[i], 2),
+                    "soc_inicial_percent": round((socs[i, 0] / self.capacidade_bess_kwh) * 100, 1),
+                    "soc_final_percent": socs_finais[i],
+                }
+                if incluir_series:
+                    dia["potencias_original"] = originais[i]
+                    dia["potencias_com_bess"] = com_bess[i]
+                    dia["socs"] = socs_percent[i]
+                resultados.append(dia)
+            
+        return resultados
+    
+    def series_grade(
+        self,
+        matriz: np.ndarray,
+        cargas: np.ndarray,
+        descargas: np.ndarray,
+        socs: np.ndarray,
+        intervalo_s: int = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Séries por passo (dias x passos, float32) com o mesmo arredondamento
+        das listas de precificar_grade.
         
+        Args:
+            matriz: Potências (dias x passos) em kW
+            cargas, descargas, socs: Saída de despachar_grade
+            intervalo_s: Duração de cada passo (padrão: dia / colunas)
+            
+        Returns:
+            Dict nome -> matriz, com os nomes de SERIES_SIMULACAO
+        """
+        intervalo_s = intervalo_s or SEGUNDOS_DIA // matriz.shape[1]
+        potencias_com_bess = self.potencias_liquidas(matriz, cargas, descargas, intervalo_s / SEGUNDOS_HORA)
         return {
-            "data": data.isoformat(),
-            "demanda_max_original_kw": round(demanda_max_original, 2),
-            "demanda_max_com_bess_kw": round(demanda_max_com_bess, 2),
-            "reducao_demanda_kw": round(reducao_demanda, 2),
-            "energia_carregada_kwh": round(sum(cargas), 2),
-            "energia_descarregada_kwh": round(sum(descargas), 2),
-            "custo_carregamento_reais": round(custo_carregamento, 2),
-            "economia_descarga_reais": round(economia_descarga, 2),
-            "economia_liquida_reais": round(economia_liquida, 2),
-            "soc_inicial_percent": round((socs[0] / self.capacidade_bess_kwh) * 100, 1),
-            "soc_final_percent": round((socs[-1] / self.capacidade_bess_kwh) * 100, 1),
-            "potencias_original": [round(p, 1) for p in potencias_dia],
-            "potencias_com_bess": [round(p, 1) for p in potencias_com_bess],
-            "socs": [round((s / self.capacidade_bess_kwh) * 100, 1) for s in socs],
+            "potencias_original": np.round(matriz, 1).astype(np.float32),
+            "potencias_com_bess": np.round(potencias_com_bess, 1).astype(np.float32),
+            "socs": np.round(socs / self.capacidade_bess_kwh * 100, 1).astype(np.float32),
         }
     
-    def simular_periodo_completo(self) -> Dict:
+    def resultado_periodo(
+        self,
+        datas: List[datetime],
+        matriz: np.ndarray,
+        fluxos: Tuple,
+        diretorio_series: str = None,
+    ) -> Dict:
         """
-        Simula o período completo.
+        Precifica os fluxos do período e monta o resultado final.
         
+        Args:
+            datas: Datas de cada linha
+            matriz: Potências (dias x passos) em kW
+            fluxos: (cargas, descargas, socs, socs_finais) de despachar_grade
+            diretorio_series: Se informado, as séries por passo são gravadas
+                nele e os dias trazem apenas valores agregados
+            
         Returns:
-            Dict com resultados completos
+            Dict com resumo, resultados diários e, no modo resumido, o
+            descritor "series" para obter_series_simulacao
         """
-        # Agrupar por dia
-        dias_dados = {}
-        for ts, potencia in zip(self.timestamps, self.potencias_kw):
-            data = ts.date()
-            if data not in dias_dados:
-                dias_dados[data] = []
-            dias_dados[data].append(potencia)
+        cargas, descargas, socs, socs_finais = fluxos
+        resultados_diarios = self.precificar_grade(
+            datas, matriz, cargas, descargas, socs, list(socs_finais), self.intervalo_s,
+            incluir_series=diretorio_series is None,
+        )
+        resultado = self.resumir_periodo(resultados_diarios)
+        if self.degradacao is not None:
+            resultado["resumo"]["degradacao"] = self.degradacao.resumo(self.capacidade_bess_kwh, len(datas))
+        if diretorio_series is not None:
+            series = self.series_grade(matriz, cargas, descargas, socs, self.intervalo_s)
+            resultado["series"] = salvar_series(diretorio_series, datas, series, self.intervalo_s)
+        return resultado
+    
+    def simular_grade(
+        self,
+        datas: List[datetime],
+        matriz: np.ndarray,
+        soc_inicial_percent: float = 50,
+        intervalo_s: int = None,
+    ) -> List[Dict]:
+        """
+        Simula uma sequência de dias já organizada em grade.
         
-        # Simular cada dia
-        resultados_diarios = []
-        soc_atual = 50  # Começar com 50%
+        Tarifas, janelas de carga e descarga são calculadas de uma vez para
+        todo o período; apenas a recorrência do SoC é sequencial.
         
-        for data_obj in sorted(dias_dados.keys()):
-            potencias_dia = dias_dados[data_obj]
+        Args:
+            datas: Datas de cada linha
+            matriz: Potências (dias x passos) em kW
+            soc_inicial_percent: Estado de carga inicial do primeiro dia (%)
+            intervalo_s: Duração de cada passo (padrão: dia / colunas)
             
-            # Completar com zeros se necessário
-            while len(potencias_dia) < 24:
-                potencias_dia.append(0)
+        Returns:
+            Lista com os resultados de cada dia
+        """
+        cargas, descargas, socs, socs_finais = self.despachar_grade(matriz, soc_inicial_percent, intervalo_s, datas)
+        return self.precificar_grade(datas, matriz, cargas, descargas, socs, socs_finais, intervalo_s)
+    
+    def simular_dia(
+        self,
+        data: datetime,
+        potencias_dia: List[float],
+        soc_inicial_percent: float = 50
+    ) -> Dict:
+        """
+        Simula um dia completo.
+        
+        Args:
+            data: Data do dia
+            potencias_dia: Potências do dia; até 24 valores são horários,
+                acima disso cobrem o dia em passos iguais (ex.: 96 = 15 min)
+            soc_inicial_percent: Estado de carga inicial (%)
             
-            resultado_dia = self.simular_dia(
-                datetime.combine(data_obj, datetime.min.time()),
-                potencias_dia[:24],
-                soc_inicial_percent=soc_atual
-            )
+        Returns:
+            Dict com resultados do dia
+        """
+        n = len(potencias_dia)
+        if n <= HORAS_DIA:
+            intervalo_s = SEGUNDOS_HORA
+        elif SEGUNDOS_DIA % n == 0:
+            intervalo_s = SEGUNDOS_DIA // n
+        else:
+            raise ValueError(f"{n} amostras não dividem o dia em passos iguais")
+        
+        matriz = np.asarray(potencias_dia, dtype=np.float64).reshape(1, -1)
+        return self.simular_grade([data], matriz, soc_inicial_percent, intervalo_s)[0]
+    
+    def simular_periodo_completo(self, diretorio_series: str = None) -> Dict:
+        """
+        Simula o período completo.
+        
+        Args:
+            diretorio_series: Ver resultado_periodo (None = séries em cada dia)
             
-            resultados_diarios.append(resultado_dia)
-            soc_atual = resultado_dia["soc_final_percent"]
+        Returns:
+            Dict com resultados completos
+        """
+        datas, matriz = self.montar_grade_diaria()
+        
+        # Começar com 50%
+        fluxos = self.despachar_grade(matriz, SOC_INICIAL_PERCENT, self.intervalo_s, datas, self.passos_validos)
+        return self.resultado_periodo(datas, matriz, fluxos, diretorio_series)
+    
+    def resumir_periodo(self, resultados_diarios: List[Dict]) -> Dict:
+        """
+        Totaliza os resultados diários no resumo do período.
         
+        Args:
+            resultados_diarios: Resultados de cada dia (simular_grade)
+            
+        Returns:
+            Dict com resumo e resultados diários
+        """
         # Calcular totais
         economia_total = sum(r["economia_liquida_reais"] for r in resultados_diarios)
         reducao_demanda_media = sum(r["reducao_demanda_kw"] for r in resultados_diarios) / len(resultados_diarios)
@@ -286,19 +675,869 @@ class SimuladorBESS:
         # Economia total anual
         economia_total_anual = economia_anual + economia_demanda_anual
         
+        resumo = {
+            "dias_simulados": dias_simulados,
+            "intervalo_minutos": self.intervalo_s / 60,
+            "economia_total_periodo_reais": round(economia_total, 2),
+            "economia_anual_estimada_reais": round(economia_total_anual, 2),
+            "reducao_demanda_media_kw": round(reducao_demanda_media, 2),
+            "reducao_demanda_contratada_kw": round(reducao_demanda_contratada, 2),
+            "economia_demanda_anual_reais": round(economia_demanda_anual, 2),
+        }
+        if self.qualidade_dados is not None:
+            resumo["qualidade_dados"] = self.qualidade_dados
+        
         return {
             "sucesso": True,
-            "resumo": {
-                "dias_simulados": dias_simulados,
-                "economia_total_periodo_reais": round(economia_total, 2),
-                "economia_anual_estimada_reais": round(economia_total_anual, 2),
-                "reducao_demanda_media_kw": round(reducao_demanda_media, 2),
-                "reducao_demanda_contratada_kw": round(reducao_demanda_contratada, 2),
-                "economia_demanda_anual_reais": round(economia_demanda_anual, 2),
-            },
+            "resumo": resumo,
             "resultados_diarios": resultados_diarios,
         }
 
+    
+    def assinatura_despacho(self, passos_por_dia: int, intervalo_s: int) -> str:
+        """
+        Identifica os parâmetros dos quais o despacho depende.
+        
+        Tarifas, feriados e a janela intermediária não entram: mudá-los só
+        exige reprecificar os fluxos já calculados. No despacho ótimo as
+        tarifas entram nas impressões de cada dia.
+        """
+        parametros = {
+            "versao": VERSAO_CHECKPOINT,
+            "capacidade_kwh": float(self.capacidade_bess_kwh),
+            "potencia_kw": float(self.potencia_bess_kw),
+            "estrategia": self.estrategia,
+            "ponta": [self.hp_inicio, self.hp_fim],
+            "limiar_descarga_kw": self.demanda_contratada * 0.7,
+            "passos_por_dia": int(passos_por_dia),
+            "intervalo_s": int(intervalo_s),
+            "soc_inicial_percent": SOC_INICIAL_PERCENT,
+            "eficiencias": [self.eficiencia_carga, self.eficiencia_descarga],
+        }
+        if self.estrategia == "otimo":
+            del parametros["limiar_descarga_kw"]
+            parametros["custo_demanda_dia"] = self.custo_demanda_dia
+            parametros["dias_horizonte"] = DIAS_HORIZONTE
+        conteudo = json.dumps(parametros, sort_keys=True).encode()
+        return hashlib.blake2b(conteudo, digest_size=16).hexdigest()
+    
+    def simular_periodo_incremental(
+        self,
+        checkpoint: Dict = None,
+        diretorio_series: str = None,
+    ) -> Tuple[Dict, Dict]:
+        """
+        Simula o período reaproveitando um checkpoint de execução anterior.
+        
+        O checkpoint guarda, por dia, a impressão digital das potências, os
+        fluxos de carga/descarga e a trajetória de SoC. Os dias iniciais
+        idênticos aos do checkpoint não são despachados de novo; o despacho
+        recomeça no primeiro dia novo ou alterado, a partir do SoC final
+        guardado do dia anterior. As tarifas são sempre reaplicadas, então
+        mudar apenas preços não refaz nenhum despacho.
+        
+        O despacho usa como limiar 70% da demanda máxima da série: dados
+        novos com um pico maior invalidam o checkpoint inteiro.
+        
+        No despacho ótimo, cada dia depende também das tarifas e dos dias
+        seguintes do horizonte: as tarifas entram na impressão do dia e os
+        últimos dias do trecho comum são despachados de novo.
+        
+        Com modelo_degradacao, a contagem de ciclos precisa da trajetória
+        inteira: o checkpoint é gravado, mas todo o período é despachado.
+        
+        Args:
+            checkpoint: Checkpoint da execução anterior (None = do zero)
+            diretorio_series: Ver resultado_periodo (None = séries em cada dia)
+            
+        Returns:
+            Tupla (resultado igual ao de simular_periodo_completo, novo checkpoint)
+        """
+        datas, matriz = self.montar_grade_diaria()
+        n_dias, passos_por_dia = matriz.shape
+        assinatura = self.assinatura_despacho(passos_por_dia, self.intervalo_s)
+        
+        with fase("comparar_checkpoint"):
+            dias = np.array([d.date() for d in datas], dtype="datetime64[D]")
+            linhas = matriz
+            if self.estrategia == "otimo":
+                linhas = np.hstack((matriz, self.montar_tarifas_grade(datas, passos_por_dia, self.intervalo_s)))
+            validos = self.passos_validos
+            # Dias com falhas de medição incluem a máscara na impressão
+            impressoes = np.array(
+                [
+                    hashlib.blake2b(
+                        linha.tobytes() + (b"" if validos is None or validos[d].all() else validos[d].tobytes()),
+                        digest_size=16,
+                    ).digest()
+                    for d, linha in enumerate(linhas)
+                ],
+                dtype="S16",
+            )
+            reaproveitados = 0
+            reutilizavel = checkpoint is not None and self.modelo_degradacao is None
+            if reutilizavel and checkpoint.get("assinatura_despacho") == assinatura:
+                n_comum = min(n_dias, len(checkpoint["dias"]))
+                iguais = (
+                    (checkpoint["dias"][:n_comum] == dias[:n_comum])
+                    & (checkpoint["impressoes"][:n_comum] == impressoes[:n_comum])
+                )
+                reaproveitados = n_comum if iguais.all() else int(np.argmin(iguais))
+                mesmo_periodo = reaproveitados == n_dias == len(checkpoint["dias"])
+                if self.estrategia == "otimo" and not mesmo_periodo:
+                    reaproveitados = max(0, reaproveitados - (DIAS_HORIZONTE - 1))
+        
+        contar("dias_reaproveitados", reaproveitados)
+        if reaproveitados < n_dias:
+            soc_inicial = (
+                float(checkpoint["socs_finais"][reaproveitados - 1]) if reaproveitados else SOC_INICIAL_PERCENT
+            )
+            novos = self.despachar_grade(
+                matriz[reaproveitados:], soc_inicial, self.intervalo_s, datas[reaproveitados:],
+                None if self.passos_validos is None else self.passos_validos[reaproveitados:],
+            )
+        
+        if reaproveitados == 0:
+            cargas, descargas, socs, socs_finais = novos
+            socs_finais = np.asarray(socs_finais, dtype=np.float64)
+        elif reaproveitados == n_dias:
+            cargas, descargas, socs, socs_finais = (
+                checkpoint[nome][:n_dias] for nome in ("cargas", "descargas", "socs", "socs_finais")
+            )
+        else:
+            cargas, descargas, socs = (
+                np.concatenate((checkpoint[nome][:reaproveitados], novo))
+                for nome, novo in zip(("cargas", "descargas", "socs"), novos[:3])
+            )
+            socs_finais = np.concatenate((checkpoint["socs_finais"][:reaproveitados], novos[3]))
+        
+        resultado = self.resultado_periodo(
+            datas, matriz, (cargas, descargas, socs, socs_finais.tolist()), diretorio_series
+        )
+        resultado["incremental"] = {
+            "dias_reaproveitados": reaproveitados,
+            "dias_despachados": n_dias - reaproveitados,
+        }
+        
+        novo_checkpoint = {
+            "assinatura_despacho": assinatura,
+            "dias": dias,
+            "impressoes": impressoes,
+            "cargas": cargas,
+            "descargas": descargas,
+            "socs": socs,
+            "socs_finais": socs_finais,
+        }
+        return resultado, novo_checkpoint
+    
+    def despachar_otimo_lote(
+        self,
+        matriz: np.ndarray,
+        tarifas: np.ndarray,
+        capacidades: np.ndarray,
+        potencias: np.ndarray,
+        horas_passo: float,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Despacho ótimo de cada candidato, com a saída de despachar_soc_lote.
+        
+        Os candidatos são resolvidos um a um, mas as matrizes de restrição
+        do LP são montadas uma única vez para todos.
+        """
+        n_dias = matriz.shape[0]
+        diarios = {
+            nome: np.zeros((n_dias, len(capacidades)))
+            for nome in (
+                "energia_carregada_kwh",
+                "energia_descarregada_kwh",
+                "custo_carregamento_reais",
+                "economia_descarga_reais",
+                "demanda_max_com_bess_kw",
+            )
+        }
+        
+        for j, (capacidade, potencia) in enumerate(zip(capacidades, potencias)):
+            cargas, descargas, _, _ = despachar_otimo(
+                matriz,
+                tarifas,
+                capacidade_kwh=float(capacidade),
+                potencia_kw=float(potencia),
+                custo_demanda_dia=self.custo_demanda_dia,
+                horas_passo=horas_passo,
+                soc_inicial_percent=SOC_INICIAL_PERCENT,
+                eficiencia_carga=self.eficiencia_carga,
+                eficiencia_descarga=self.eficiencia_descarga,
+                passos_validos=self.passos_validos,
+            )
+            diarios["energia_carregada_kwh"][:, j] = np.cumsum(cargas, axis=1)[:, -1]
+            diarios["energia_descarregada_kwh"][:, j] = np.cumsum(descargas, axis=1)[:, -1]
+            diarios["custo_carregamento_reais"][:, j] = np.cumsum(cargas * tarifas, axis=1)[:, -1]
+            diarios["economia_descarga_reais"][:, j] = np.cumsum(descargas * tarifas, axis=1)[:, -1]
+            diarios["demanda_max_com_bess_kw"][:, j] = (matriz + (cargas - descargas) / horas_passo).max(axis=1)
+        
+        return diarios
+    
+    def simular_varredura(
+        self,
+        capacidades_kwh: List[float],
+        potencias_kw: List[float],
+        estrategias: List[str] = None,
+        custo_kwh_reais: float = 0,
+        custo_kw_reais: float = 0,
+        premissas_financeiras: Dict = None,
+    ) -> Dict:
+        """
+        Simula vários tamanhos de BESS de uma só vez sobre a mesma curva.
+        
+        A grade diária e as tarifas são montadas uma única vez; o SoC de
+        todos os candidatos avança junto como um array por estratégia.
+        As eficiências valem para todos os candidatos; a degradação não é
+        modelada na varredura.
+        
+        Com `premissas_financeiras` ({} = padrão), a projeção da vida útil é
+        feita para todas as linhas de uma vez e as colunas ganham VPL, TIR
+        e payback descontado, permitindo ordenar os candidatos por VPL.
+        
+        Args:
+            capacidades_kwh: Capacidade de cada candidato (kWh)
+            potencias_kw: Potência de cada candidato (kW), pareada com capacidades_kwh
+            estrategias: Estratégias a avaliar (padrão: a do simulador)
+            custo_kwh_reais: Custo de investimento por kWh (R$)
+            custo_kw_reais: Custo de investimento por kW (R$)
+            premissas_financeiras: Premissas da projeção (None = sem projeção)
+            
+        Returns:
+            Dict com uma coluna por métrica e uma linha por (tamanho, estratégia)
+        """
+        capacidades = np.asarray(capacidades_kwh, dtype=np.float64)
+        potencias = np.asarray(potencias_kw, dtype=np.float64)
+        
+        if capacidades.shape != potencias.shape or capacidades.ndim != 1:
+            raise ValueError("capacidades_kwh e potencias_kw devem ter o mesmo tamanho")
+        if np.any(capacidades <= 0):
+            raise ValueError("Todas as capacidades devem ser positivas")
+        
+        estrategias = estrategias or [self.estrategia]
+        contar("candidatos_avaliados", len(capacidades) * len(estrategias))
+        datas, matriz = self.montar_grade_diaria()
+        passos_por_dia = matriz.shape[1]
+        horas_passo = self.intervalo_s / SEGUNDOS_HORA
+        tarifas = self.montar_tarifas_grade(datas, passos_por_dia, self.intervalo_s)
+        _, janela_descarga = self.montar_perfil_despacho(passos_por_dia, self.intervalo_s)
+        dias_simulados = len(datas)
+        
+        colunas = {
+            "capacidade_kwh": [],
+            "potencia_kw": [],
+            "estrategia": [],
+            "economia_total_periodo_reais": [],
+            "economia_anual_estimada_reais": [],
+            "reducao_demanda_media_kw": [],
+            "custo_investimento_reais": [],
+            "payback_anos": [],
+        }
+        
+        for numero, estrategia in enumerate(estrategias):
+            if estrategia not in ESTRATEGIAS:
+                raise ValueError(f"Estratégia inválida: {estrategia}")
+            progresso("candidatos_avaliados", numero * len(capacidades), len(capacidades) * len(estrategias))
+            
+            if estrategia == "otimo":
+                diarios = self.despachar_otimo_lote(matriz, tarifas, capacidades, potencias, horas_passo)
+            else:
+                fracao = self.fracao_carga_horaria(estrategia, passos_por_dia, self.intervalo_s)
+                limite_carga = fracao[None, :] * (potencias[:, None] * horas_passo)
+                
+                diarios = despachar_soc_lote(
+                    matriz,
+                    tarifas,
+                    limite_carga,
+                    janela_descarga,
+                    capacidades_kwh=capacidades,
+                    potencias_kw=potencias,
+                    limiar_descarga_kw=self.demanda_contratada * 0.7,
+                    cobrar_carga=estrategia in ESTRATEGIAS_CARGA_REDE,
+                    horas_passo=horas_passo,
+                    eficiencia_carga=self.eficiencia_carga,
+                    eficiencia_descarga=self.eficiencia_descarga,
+                    passos_validos=self.passos_validos,
+                )
+            
+            # Mesmo arredondamento diário do relatório dia a dia
+            economia_liquida = np.round(
+                diarios["economia_descarga_reais"] - diarios["custo_carregamento_reais"], 2
+            )
+            reducao_demanda = np.round(
+                matriz.max(axis=1)[:, None] - diarios["demanda_max_com_bess_kw"], 2
+            )
+            
+            economia_total = economia_liquida.sum(axis=0)
+            reducao_media = reducao_demanda.sum(axis=0) / dias_simulados
+            economia_anual = (
+                economia_total * (365 / dias_simulados)
+                + reducao_media * self.cobranca_demanda * 12
+            )
+            
+            investimento = capacidades * custo_kwh_reais + potencias * custo_kw_reais
+            with np.errstate(divide="ignore", invalid="ignore"):
+                payback = np.where(economia_anual > 0, investimento / economia_anual, np.inf)
+            
+            colunas["capacidade_kwh"].extend(capacidades.tolist())
+            colunas["potencia_kw"].extend(potencias.tolist())
+            colunas["estrategia"].extend([estrategia] * len(capacidades))
+            colunas["economia_total_periodo_reais"].extend(np.round(economia_total, 2).tolist())
+            colunas["economia_anual_estimada_reais"].extend(np.round(economia_anual, 2).tolist())
+            colunas["reducao_demanda_media_kw"].extend(np.round(reducao_media, 2).tolist())
+            colunas["custo_investimento_reais"].extend(np.round(investimento, 2).tolist())
+            colunas["payback_anos"].extend(np.round(payback, 1).tolist())
+        
+        if premissas_financeiras is not None:
+            projecao = projetar_investimento(
+                np.array(colunas["economia_anual_estimada_reais"]),
+                np.array(colunas["custo_investimento_reais"]),
+                premissas_financeiras,
+            )
+            tir = np.round(projecao["tir"] * 100, 2)
+            colunas["vpl_reais"] = np.round(projecao["vpl"], 2).tolist()
+            colunas["tir_percent"] = [None if np.isnan(v) else float(v) for v in tir]
+            colunas["payback_descontado_anos"] = np.round(projecao["payback_descontado"], 1).tolist()
+        
+        resultado = {
+            "sucesso": True,
+            "dias_simulados": dias_simulados,
+            "total_candidatos": len(colunas["capacidade_kwh"]),
+            "resultados": colunas,
+        }
+        if self.qualidade_dados is not None:
+            resultado["qualidade_dados"] = self.qualidade_dados
+        return resultado
+
+
+@cronometrada("salvar_checkpoint")
+def salvar_checkpoint(caminho: str, checkpoint: Dict) -> None:
+    """
+    Grava um checkpoint de simulação (.npz, sem pickle) de forma atômica.
+    """
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        np.savez(
+            arquivo,
+            assinatura_despacho=np.array(checkpoint["assinatura_despacho"]),
+            **{nome: checkpoint[nome] for nome in CAMPOS_CHECKPOINT},
+        )
+    os.replace(temporario, caminho)
+
+
+@cronometrada("carregar_checkpoint")
+def carregar_checkpoint(caminho: str) -> Dict:
+    """
+    Lê um checkpoint de simulação; devolve None se não existir ou for inválido.
+    """
+    try:
+        with np.load(caminho, allow_pickle=False) as dados:
+            checkpoint = {nome: dados[nome] for nome in CAMPOS_CHECKPOINT}
+            checkpoint["assinatura_despacho"] = str(dados["assinatura_despacho"])
+    except (OSError, KeyError, ValueError):
+        return None
+    return checkpoint
+
+
+def caminho_series(id_series: str, diretorio_series: str = None) -> str:
+    """
+    Caminho do arquivo de séries de uma simulação.
+    """
+    if not re.fullmatch(r"[0-9a-f]{32}", id_series or ""):
+        raise ValueError(f"Identificador de séries inválido: {id_series}")
+    return os.path.join(diretorio_series or DIRETORIO_SERIES, f"{id_series}.npz")
+
+
+def limitar_series(
+    diretorio_series: str = None,
+    max_bytes: int = None,
+    max_idade_s: float = None,
+) -> Dict:
+    """
+    Remove arquivos de séries expirados e, acima do tamanho máximo, os
+    acessados há mais tempo.
+    
+    O mtime marca o último acesso (salvar_series e obter_series_simulacao
+    o atualizam). Resultados em cache que apontam para séries removidas
+    são recalculados (ver servidor_workers._series_disponiveis).
+    
+    Args:
+        diretorio_series: Diretório dos arquivos de séries
+        max_bytes: Tamanho total máximo (padrão: MAX_BYTES_SERIES)
+        max_idade_s: Idade máxima desde o último acesso (padrão: MAX_IDADE_SERIES_S)
+        
+    Returns:
+        Dict com arquivos removidos e bytes restantes
+    """
+    diretorio = diretorio_series or DIRETORIO_SERIES
+    max_bytes = MAX_BYTES_SERIES if max_bytes is None else max_bytes
+    max_idade_s = MAX_IDADE_SERIES_S if max_idade_s is None else max_idade_s
+    limite_idade = relogio.time() - max_idade_s
+    
+    arquivos = []
+    total = 0
+    removidos = 0
+    try:
+        entradas = list(os.scandir(diretorio))
+    except FileNotFoundError:
+        return {"removidos": 0, "bytes": 0}
+    for entrada in entradas:
+        # .tmp antigos são gravações interrompidas
+        if not entrada.name.endswith((".npz", ".tmp")):
+            continue
+        try:
+            estado = entrada.stat()
+        except FileNotFoundError:
+            continue
+        if estado.st_mtime < limite_idade:
+            try:
+                os.remove(entrada.path)
+                removidos += 1
+            except FileNotFoundError:
+                pass
+            continue
+        if entrada.name.endswith(".npz"):
+            arquivos.append((estado.st_mtime, estado.st_size, entrada.path))
+            total += estado.st_size
+    
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(caminho)
+            removidos += 1
+        except FileNotFoundError:
+            continue
+        total -= tamanho
+    
+    return {"removidos": removidos, "bytes": total}
+
+
+@cronometrada("salvar_series")
+def salvar_series(
+    diretorio_series: str,
+    datas: List[datetime],
+    series: Dict[str, np.ndarray],
+    intervalo_s: int,
+) -> Dict:
+    """
+    Grava as séries por passo de uma simulação (.npz, sem pickle).
+    
+    O identificador é o hash do conteúdo: simulações iguais reaproveitam o
+    mesmo arquivo.
+    
+    Args:
+        diretorio_series: Diretório dos arquivos de séries
+        datas: Datas de cada linha
+        series: Saída de SimuladorBESS.series_grade
+        intervalo_s: Duração de cada passo
+        
+    Returns:
+        Descritor com id, dias, passos por dia e período coberto
+    """
+    dias = np.array([d.date() for d in datas], dtype="datetime64[D]")
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(intervalo_s).encode())
+    digest.update(dias.tobytes())
+    for nome in SERIES_SIMULACAO:
+        digest.update(series[nome].tobytes())
+    id_series = digest.hexdigest()
+    
+    caminho = caminho_series(id_series, diretorio_series)
+    try:
+        # Já gravado: só marca o acesso
+        os.utime(caminho)
+    except FileNotFoundError:
+        diretorio = diretorio_series or DIRETORIO_SERIES
+        os.makedirs(diretorio, exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as arquivo:
+            np.savez(arquivo, dias=dias, intervalo_s=np.array(intervalo_s), **series)
+        os.replace(temporario, caminho)
+        
+        # Varre o diretório no máximo uma vez por intervalo em cada processo
+        agora = relogio.monotonic()
+        if agora - _ultima_limpeza_series.get(diretorio, -INTERVALO_LIMPEZA_SERIES_S) >= INTERVALO_LIMPEZA_SERIES_S:
+            _ultima_limpeza_series[diretorio] = agora
+            limitar_series(diretorio)
+    
+    return {
+        "id": id_series,
+        "dias": len(dias),
+        "passos_por_dia": int(series["potencias_original"].shape[1]),
+        "intervalo_minutos": intervalo_s / 60,
+        "data_inicio": str(dias[0]),
+        "data_fim": str(dias[-1]),
+    }
+
+
+def obter_series_simulacao(
+    id_series: str,
+    data_inicio: str = None,
+    data_fim: str = None,
+    max_dias: int = MAX_DIAS_SERIES,
+    diretorio_series: str = None,
+) -> Dict:
+    """
+    Lê as séries por passo de um intervalo de datas (inclusivo).
+    
+    Cada série vem como float32 little-endian em base64, dia a dia, com a
+    forma indicada em "formas" (socs tem um valor a mais por dia: o SoC
+    no início do primeiro passo). Intervalos com mais de `max_dias`
+    dias são paginados: `proxima_data` indica onde continuar.
+    
+    Args:
+        id_series: "id" do descritor "series" de simular_bess
+        data_inicio: Primeiro dia (ISO; padrão: início da simulação)
+        data_fim: Último dia (ISO; padrão: fim da simulação)
+        max_dias: Máximo de dias por resposta
+        diretorio_series: Diretório dos arquivos de séries
+        
+    Returns:
+        Dict com datas, passos por dia e as séries codificadas
+    """
+    try:
+        if max_dias < 1:
+            raise ValueError("max_dias deve ser positivo")
+        
+        caminho = caminho_series(id_series, diretorio_series)
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            return {
+                "sucesso": False,
+                "erro": "Séries não encontradas (expiradas); execute a simulação novamente",
+            }
+        
+        with np.load(caminho, allow_pickle=False) as dados:
+            dias = dados["dias"]
+            inicio = np.searchsorted(dias, np.datetime64(data_inicio[:10], "D")) if data_inicio else 0
+            fim = np.searchsorted(dias, np.datetime64(data_fim[:10], "D"), side="right") if data_fim else len(dias)
+            fim_pagina = min(fim, inicio + max_dias)
+            
+            blocos = {nome: dados[nome][inicio:fim_pagina].astype("<f4") for nome in SERIES_SIMULACAO}
+            intervalo_s = int(dados["intervalo_s"])
+        
+        return {
+            "sucesso": True,
+            "datas": np.datetime_as_string(dias[inicio:fim_pagina].astype("datetime64[s]")).tolist(),
+            "passos_por_dia": blocos["potencias_original"].shape[1],
+            "intervalo_minutos": intervalo_s / 60,
+            "codificacao": "float32-le-base64",
+            "formas": {nome: list(bloco.shape) for nome, bloco in blocos.items()},
+            "series": {nome: base64.b64encode(bloco.tobytes()).decode("ascii") for nome, bloco in blocos.items()},
+            "proxima_data": str(dias[fim_pagina]) if fim_pagina < fim else None,
+        }
+        
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": str(e)
+        }
+
+
+def _segmentos_despacho(carrega: np.ndarray, descarrega: np.ndarray) -> List[Tuple[bool, bool, int, int]]:
+    """
+    Agrupa passos consecutivos com o mesmo tipo de atividade.
+    
+    Returns:
+        Lista (carrega, descarrega, início, fim) dos trechos ativos
+    """
+    tipo = carrega.astype(np.int8) + 2 * descarrega.astype(np.int8)
+    mudancas = np.flatnonzero(np.diff(tipo)) + 1
+    inicios = np.concatenate(([0], mudancas))
+    fins = np.concatenate((mudancas, [len(tipo)]))
+    return [
+        (bool(tipo[i] & 1), bool(tipo[i] & 2), int(i), int(f))
+        for i, f in zip(inicios, fins)
+        if tipo[i]
+    ]
+
+
+def _somar_em_ordem(total: np.ndarray, parcelas: np.ndarray) -> np.ndarray:
+    # cumsum é sequencial: mesmo resultado de somar as parcelas uma a uma
+    return np.cumsum(np.concatenate((total[:, None], parcelas), axis=1), axis=1)[:, -1]
+
+
+@cronometrada("despacho_soc")
+def despachar_soc(
+    matriz: np.ndarray,
+    limite_carga: np.ndarray,
+    janela_descarga: np.ndarray,
+    capacidade_kwh: float,
+    potencia_kw: float,
+    limiar_descarga_kw: float,
+    horas_passo: float = 1.0,
+    soc_inicial_percent: float = 50,
+    eficiencia_carga: float = 1.0,
+    eficiencia_descarga: float = 1.0,
+    degradacao: ContadorRainflow = None,
+    passos_validos: np.ndarray = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[float]]:
+    """
+    Kernel da recorrência de estado de carga (SoC).
+    
+    Os passos ativos do dia formam trechos só de carga, só de descarga ou
+    mistos. Em um trecho só de carga o SoC é a soma acumulada limitada à
+    capacidade; em um só de descarga, a soma acumulada limitada a zero.
+    Assim cada trecho é resolvido com operações de array, qualquer que
+    seja o número de passos por dia; apenas os trechos mistos usam o laço
+    passo a passo. Entre dias, o SoC é transportado arredondado em 0,1%,
+    exatamente como o motor hora a hora fazia.
+    
+    Cargas são medidas do lado da rede (o SoC sobe carga x eficiência) e
+    descargas do lado da carga (o SoC desce descarga / eficiência). Com
+    `degradacao`, a trajetória de cada dia alimenta o contador rainflow
+    logo após o despacho do dia, e a cada 365 dias a capacidade útil
+    passa a descontar a perda acumulada. Passos fora de `passos_validos`
+    (sem medição) não carregam nem descarregam.
+    
+    Args:
+        matriz: Potências (dias x passos) em kW
+        limite_carga: Energia máxima de carga por passo (kWh)
+        janela_descarga: Máscara dos passos de descarga
+        capacidade_kwh: Capacidade do BESS (kWh)
+        potencia_kw: Potência do BESS (kW)
+        limiar_descarga_kw: Potência acima da qual o BESS descarrega
+        horas_passo: Duração de cada passo (h)
+        soc_inicial_percent: SoC inicial do primeiro dia (%)
+        eficiencia_carga: Fração da energia da rede que entra na bateria
+        eficiencia_descarga: Fração da energia da bateria entregue à carga
+        degradacao: Contador de ciclos (None = bateria sem desgaste)
+        passos_validos: Máscara (dias x passos) dos passos medidos (None = todos)
+    
+    Returns:
+        Tupla (cargas, descargas, trajetória de SoC em kWh, SoC final de cada dia em %)
+    """
+    n_dias, n_passos = matriz.shape
+    cargas = np.zeros((n_dias, n_passos), dtype=np.float64)
+    descargas = np.zeros((n_dias, n_passos), dtype=np.float64)
+    socs = np.full((n_dias, n_passos + 1), np.nan, dtype=np.float64)
+    socs_finais = []
+    
+    segmentos = _segmentos_despacho(limite_carga > 0, janela_descarga)
+    
+    # Energia pedida à bateria em cada passo de descarga (antes do limite de SoC)
+    alvos_descarga = np.minimum(
+        potencia_kw * horas_passo,
+        np.maximum(0, matriz - limiar_descarga_kw) * horas_passo,
+    )
+    if passos_validos is not None:
+        alvos_descarga = np.where(passos_validos, alvos_descarga, 0.0)
+    
+    capacidade = capacidade_kwh
+    soc_percent = soc_inicial_percent
+    for d in range(n_dias):
+        progresso("dias_simulados", d, n_dias)
+        if degradacao is not None and d and d % DIAS_ANO == 0:
+            capacidade = capacidade_kwh * (1 - degradacao.perda_capacidade())
+        
+        soc = min((soc_percent / 100) * capacidade_kwh, capacidade)
+        socs[d, 0] = soc
+        limites_dia = limite_carga if passos_validos is None else limite_carga * passos_validos[d]
+        
+        for carrega, descarrega, inicio, fim in segmentos:
+            if carrega and descarrega:
+                for p in range(inicio, fim):
+                    limite = limites_dia[p]
+                    if soc < capacidade:
+                        energia_carga = min(limite, (capacidade - soc) / eficiencia_carga)
+                        soc += energia_carga * eficiencia_carga
+                        cargas[d, p] = energia_carga
+                    
+                    energia_descarga = min(alvos_descarga[d, p], soc * eficiencia_descarga)
+                    if energia_descarga > 0:
+                        soc -= energia_descarga / eficiencia_descarga
+                        descargas[d, p] = energia_descarga
+                    
+                    socs[d, p + 1] = soc
+                continue
+            
+            if carrega:
+                limites = limites_dia[inicio:fim]
+                trajetoria = np.minimum(
+                    np.cumsum(np.concatenate(([soc], limites * eficiencia_carga))), capacidade
+                )
+                cargas[d, inicio:fim] = np.minimum(limites, (capacidade - trajetoria[:-1]) / eficiencia_carga)
+            else:
+                alvos = alvos_descarga[d, inicio:fim]
+                trajetoria = np.maximum(np.cumsum(np.concatenate(([soc], -alvos / eficiencia_descarga))), 0)
+                descargas[d, inicio:fim] = np.minimum(alvos, trajetoria[:-1] * eficiencia_descarga)
+            
+            socs[d, inicio + 1:fim + 1] = trajetoria[1:]
+            soc = float(trajetoria[-1])
+        
+        if degradacao is not None:
+            degradacao.adicionar(socs[d] / capacidade_kwh)
+        
+        soc_percent = round((soc / capacidade_kwh) * 100, 1)
+        socs_finais.append(soc_percent)
+    
+    # Passos sem atividade mantêm o SoC do passo anterior
+    preenchido = ~np.isnan(socs)
+    indices = np.where(preenchido, np.arange(n_passos + 1), 0)
+    np.maximum.accumulate(indices, axis=1, out=indices)
+    socs = socs[np.arange(n_dias)[:, None], indices]
+    
+    return cargas, descargas, socs, socs_finais
+
+
+@cronometrada("despacho_lote")
+def despachar_soc_lote(
+    matriz: np.ndarray,
+    tarifas: np.ndarray,
+    limite_carga: np.ndarray,
+    janela_descarga: np.ndarray,
+    capacidades_kwh: np.ndarray,
+    potencias_kw: np.ndarray,
+    limiar_descarga_kw: float,
+    cobrar_carga: bool,
+    horas_passo: float = 1.0,
+    soc_inicial_percent: float = 50,
+    eficiencia_carga: float = 1.0,
+    eficiencia_descarga: float = 1.0,
+    passos_validos: np.ndarray = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Versão em lote de despachar_soc: K candidatos avançam juntos.
+    
+    Guarda apenas agregados diários, sem as séries passo a passo. Os
+    trechos só de carga ou só de descarga são resolvidos como matrizes
+    (K x passos do trecho).
+    
+    Args:
+        matriz: Potências (dias x passos) em kW
+        tarifas: Tarifas (dias x passos) em R$/kWh
+        limite_carga: Energia máxima de carga (K x passos) em kWh
+        janela_descarga: Máscara dos passos de descarga
+        capacidades_kwh: Capacidades (K,) em kWh
+        potencias_kw: Potências (K,) em kW
+        limiar_descarga_kw: Potência acima da qual o BESS descarrega
+        cobrar_carga: Se a energia de carga é paga na tarifa do passo
+        horas_passo: Duração de cada passo (h)
+        soc_inicial_percent: SoC inicial do primeiro dia (%)
+        eficiencia_carga: Fração da energia da rede que entra na bateria
+        eficiencia_descarga: Fração da energia da bateria entregue à carga
+        passos_validos: Máscara (dias x passos) dos passos medidos (None = todos)
+    
+    Returns:
+        Dict de arrays (dias x K) com energias, custos, economias e demanda máxima
+    """
+    n_dias, n_passos = matriz.shape
+    n_candidatos = len(capacidades_kwh)
+    
+    energia_carregada = np.zeros((n_dias, n_candidatos))
+    energia_descarregada = np.zeros((n_dias, n_candidatos))
+    custo_carregamento = np.zeros((n_dias, n_candidatos))
+    economia_descarga = np.zeros((n_dias, n_candidatos))
+    
+    # Fora da janela de descarga a potência não muda
+    passos_livres = ~janela_descarga[:n_passos]
+    base_livre = matriz[:, passos_livres].max(axis=1) if passos_livres.any() else np.full(n_dias, -np.inf)
+    demanda_max_com_bess = np.repeat(base_livre[:, None], n_candidatos, axis=1)
+    
+    segmentos = _segmentos_despacho(limite_carga.any(axis=0), janela_descarga)
+    capacidades = capacidades_kwh[:, None]
+    energia_max_passo = potencias_kw[:, None] * horas_passo
+    excedentes = np.maximum(0, matriz - limiar_descarga_kw) * horas_passo
+    if passos_validos is not None:
+        excedentes = np.where(passos_validos, excedentes, 0.0)
+    
+    soc_percent = np.full(n_candidatos, float(soc_inicial_percent))
+    for d in range(n_dias):
+        progresso("dias_simulados", d, n_dias)
+        soc = (soc_percent / 100) * capacidades_kwh
+        limites_dia = limite_carga if passos_validos is None else limite_carga * passos_validos[d]
+        
+        for carrega, descarrega, inicio, fim in segmentos:
+            if carrega and descarrega:
+                for p in range(inicio, fim):
+                    limite = limites_dia[:, p]
+                    pode_carregar = (limite > 0) & (soc < capacidades_kwh)
+                    if pode_carregar.any():
+                        carga = np.where(
+                            pode_carregar, np.minimum(limite, (capacidades_kwh - soc) / eficiencia_carga), 0.0
+                        )
+                        soc = soc + carga * eficiencia_carga
+                        energia_carregada[d] += carga
+                        if cobrar_carga:
+                            custo_carregamento[d] += carga * tarifas[d, p]
+                    
+                    descarga = np.minimum(
+                        np.minimum(energia_max_passo[:, 0], soc * eficiencia_descarga), excedentes[d, p]
+                    )
+                    soc = soc - descarga / eficiencia_descarga
+                    energia_descarregada[d] += descarga
+                    economia_descarga[d] += descarga * tarifas[d, p]
+                    np.maximum(
+                        demanda_max_com_bess[d], matriz[d, p] - descarga / horas_passo,
+                        out=demanda_max_com_bess[d],
+                    )
+                continue
+            
+            if carrega:
+                limites = limites_dia[:, inicio:fim]
+                trajetoria = np.minimum(
+                    np.cumsum(np.concatenate((soc[:, None], limites * eficiencia_carga), axis=1), axis=1),
+                    capacidades,
+                )
+                carga = np.minimum(limites, (capacidades - trajetoria[:, :-1]) / eficiencia_carga)
+                energia_carregada[d] = _somar_em_ordem(energia_carregada[d], carga)
+                if cobrar_carga:
+                    custo_carregamento[d] = _somar_em_ordem(custo_carregamento[d], carga * tarifas[d, inicio:fim])
+            else:
+                alvos = np.minimum(energia_max_passo, excedentes[d, inicio:fim])
+                trajetoria = np.maximum(
+                    np.cumsum(np.concatenate((soc[:, None], -alvos / eficiencia_descarga), axis=1), axis=1), 0
+                )
+                descarga = np.minimum(alvos, trajetoria[:, :-1] * eficiencia_descarga)
+                energia_descarregada[d] = _somar_em_ordem(energia_descarregada[d], descarga)
+                economia_descarga[d] = _somar_em_ordem(economia_descarga[d], descarga * tarifas[d, inicio:fim])
+                np.maximum(
+                    demanda_max_com_bess[d],
+                    (matriz[d, inicio:fim] - descarga / horas_passo).max(axis=1),
+                    out=demanda_max_com_bess[d],
+                )
+            
+            soc = trajetoria[:, -1]
+        
+        soc_percent = np.round((soc / capacidades_kwh) * 100, 1)
+    
+    return {
+        "energia_carregada_kwh": energia_carregada,
+        "energia_descarregada_kwh": energia_descarregada,
+        "custo_carregamento_reais": custo_carregamento,
+        "economia_descarga_reais": economia_descarga,
+        "demanda_max_com_bess_kw": demanda_max_com_bess,
+    }
+
+
+def projetar_resumo(resumo: Dict, custo_investimento_reais: float, premissas: Dict = None) -> Dict:
+    """
+    Projeção da vida útil a partir do resumo de uma simulação.
+    
+    Em vez de repetir o ano extrapolado, cada ano aplica os reajustes, o
+    O&M e a reposição das premissas. A perda de capacidade medida pelo
+    contador de ciclos ("degradacao" do resumo) substitui a das premissas.
+    
+    Args:
+        resumo: Resumo de resultado_periodo
+        custo_investimento_reais: Custo do BESS (R$)
+        premissas: Premissas financeiras (ver projecao_financeira)
+        
+    Returns:
+        Dict com VPL, TIR, paybacks e fluxos anuais
+    """
+    perda_percent = resumo.get("degradacao", {}).get("perda_capacidade_anual_percent", 0)
+    premissas = normalizar_premissas(premissas, perda_capacidade_anual=perda_percent / 100 or None)
+    projecao = projetar_investimento(
+        resumo["economia_anual_estimada_reais"], custo_investimento_reais, premissas, incluir_fluxos=True
+    )
+    return resumir_projecao(projecao, premissas)
+
 
 def simular_bess(
     potencias_kw: List[float],
@@ -311,11 +1550,46 @@ def simular_bess(
     tarifa_fora_ponta: float,
     cobranca_demanda: float = 0,
     multa_ultrapassagem: float = 20,
+    arquivo_curva: str = None,
+    feriados: List[str] = None,
+    caminho_checkpoint: str = None,
+    detalhe: str = "resumo",
+    diretorio_series: str = None,
+    eficiencia_carga: float = 1.0,
+    eficiencia_descarga: float = 1.0,
+    modelo_degradacao: Dict = None,
+    custo_investimento_reais: float = None,
+    premissas_financeiras: Dict = None,
 ) -> Dict:
     """
     Função wrapper para simular BESS.
+    
+    Com `arquivo_curva` (formato colunar), a curva é lida por memory-map e
+    potencias_kw/timestamps podem ser None.
+    
+    Com `caminho_checkpoint`, a simulação é incremental: o checkpoint da
+    execução anterior (se houver) é reaproveitado e depois atualizado.
+    
+    Com detalhe="resumo" (padrão), cada dia traz apenas valores agregados e
+    as potências e SoC por passo ficam em `diretorio_series`, lidas por
+    obter_series_simulacao com o "id" do descritor "series" do resultado.
+    detalhe="completo" inclui as séries em cada dia, como antes.
+    
+    Com `modelo_degradacao` (parâmetros de ContadorRainflow, {} = padrão),
+    o resumo traz ciclos equivalentes e perda de capacidade ("degradacao").
+    
+    Com `custo_investimento_reais`, o resultado traz a projeção financeira
+    da vida útil ("projecao", ver projetar_resumo).
     """
     try:
+        if detalhe not in DETALHES:
+            raise ValueError(f"Detalhe inválido: {detalhe}")
+        if detalhe == "resumo":
+            diretorio_series = diretorio_series or DIRETORIO_SERIES
+        else:
+            diretorio_series = None
+        
+        potencias_kw, timestamps = resolver_curva(potencias_kw, timestamps, arquivo_curva)
         simulador = SimuladorBESS(
             potencias_kw=potencias_kw,
             timestamps=timestamps,
@@ -327,9 +1601,85 @@ def simular_bess(
             tarifa_fora_ponta_reais_kwh=tarifa_fora_ponta,
             cobranca_demanda_reais_kw_mes=cobranca_demanda,
             multa_ultrapassagem_percent=multa_ultrapassagem,
+            feriados=feriados,
+            eficiencia_carga=eficiencia_carga,
+            eficiencia_descarga=eficiencia_descarga,
+            modelo_degradacao=modelo_degradacao,
+        )
+        
+        if custo_investimento_reais is not None:
+            premissas_financeiras = normalizar_premissas(premissas_financeiras)
+        
+        if not caminho_checkpoint:
+            resultado = simulador.simular_periodo_completo(diretorio_series)
+        else:
+            resultado, checkpoint = simulador.simular_periodo_incremental(
+                carregar_checkpoint(caminho_checkpoint), diretorio_series
+            )
+            salvar_checkpoint(caminho_checkpoint, checkpoint)
+        
+        if custo_investimento_reais is not None:
+            resultado["projecao"] = projetar_resumo(
+                resultado["resumo"], custo_investimento_reais, premissas_financeiras
+            )
+        return resultado
+        
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": str(e)
+        }
+
+
+def varrer_bess(
+    potencias_kw: List[float],
+    timestamps: List[str],
+    capacidades_kwh: List[float],
+    potencias_bess_kw: List[float],
+    estrategias: List[str],
+    tarifa_ponta: float,
+    tarifa_intermediaria: float,
+    tarifa_fora_ponta: float,
+    cobranca_demanda: float = 0,
+    custo_kwh_reais: float = 0,
+    custo_kw_reais: float = 0,
+    arquivo_curva: str = None,
+    feriados: List[str] = None,
+    eficiencia_carga: float = 1.0,
+    eficiencia_descarga: float = 1.0,
+    premissas_financeiras: Dict = None,
+) -> Dict:
+    """
+    Função wrapper para varredura de tamanhos de BESS.
+    
+    Com `premissas_financeiras` ({} = padrão), cada linha traz VPL, TIR e
+    payback descontado da projeção da vida útil.
+    """
+    try:
+        potencias_kw, timestamps = resolver_curva(potencias_kw, timestamps, arquivo_curva)
+        simulador = SimuladorBESS(
+            potencias_kw=potencias_kw,
+            timestamps=timestamps,
+            capacidade_bess_kwh=capacidades_kwh[0] if capacidades_kwh else 0,
+            potencia_bess_kw=potencias_bess_kw[0] if potencias_bess_kw else 0,
+            estrategia_carregamento=estrategias[0] if estrategias else "grid-offpeak",
+            tarifa_ponta_reais_kwh=tarifa_ponta,
+            tarifa_intermediaria_reais_kwh=tarifa_intermediaria,
+            tarifa_fora_ponta_reais_kwh=tarifa_fora_ponta,
+            cobranca_demanda_reais_kw_mes=cobranca_demanda,
+            feriados=feriados,
+            eficiencia_carga=eficiencia_carga,
+            eficiencia_descarga=eficiencia_descarga,
         )
         
-        return simulador.simular_periodo_completo()
+        return simulador.simular_varredura(
+            capacidades_kwh,
+            potencias_bess_kw,
+            estrategias=estrategias,
+            custo_kwh_reais=custo_kwh_reais,
+            custo_kw_reais=custo_kw_reais,
+            premissas_financeiras=premissas_financeiras,
+        )
         
     except Exception as e:
         return {
@@ -344,7 +1694,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Simulador de BESS")
     parser.add_argument("--capacity", type=float, required=True, help="Capacidade BESS (kWh)")
     parser.add_argument("--power", type=float, required=True, help="Potência BESS (kW)")
-    parser.add_argument("--strategy", required=True, choices=["solar", "grid-offpeak"])
+    parser.add_argument("--strategy", required=True, choices=ESTRATEGIAS)
+    parser.add_argument("--efficiency", type=float, default=1.0, help="Eficiência de ida e volta (0-1)")
+    parser.add_argument("--degradation", action="store_true", help="Conta ciclos (rainflow) e perda de capacidade")
+    parser.add_argument("--detail", default="resumo", choices=DETALHES, help="Séries por passo no resultado (completo) ou no servidor (resumo)")
     
     args = parser.parse_args()
     
@@ -365,6 +1718,10 @@ if __name__ == "__main__":
         tarifa_intermediaria=1.12,
         tarifa_fora_ponta=0.72,
         cobranca_demanda=50,
+        detalhe=args.detail,
+        eficiencia_carga=args.efficiency ** 0.5,
+        eficiencia_descarga=args.efficiency ** 0.5,
+        modelo_degradacao={} if args.degradation else None,
     )
     
     print(json.dumps(resultado, indent=2, ensure_ascii=False))
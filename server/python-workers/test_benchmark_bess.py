@@ -0,0 +1,114 @@
+"""
+Testes da detecção de regressões dos benchmarks
+
+O histórico é montado à mão: a referência de cada caso é a mediana das
+últimas execuções com sucesso, e só pioras acima do limiar e do ruído
+absoluto contam como regressão.
+"""
+
+import pytest
+
+from benchmark_bess import (
+    RUIDO_ALOCACAO_MB,
+    RUIDO_TEMPO_S,
+    carregar_historico,
+    gravar_historico,
+    verificar_regressoes,
+)
+
+CASO = "simular_periodo_completo/1a/15min"
+
+
+def medicao(tempo=1.0, alocacao=100.0, sucesso=True):
+    if not sucesso:
+        return {"sucesso": False, "erro": "falhou"}
+    return {"sucesso": True, "tempo_mediano_s": tempo, "alocacao_pico_mb": alocacao}
+
+
+def historico(*execucoes):
+    return {"execucoes": [{"resultados": resultados} for resultados in execucoes]}
+
+
+def test_regressao_acima_do_limiar():
+    anterior = historico({CASO: medicao(1.0, 100.0)})
+
+    regressoes = verificar_regressoes({CASO: medicao(1.25, 100.0)}, anterior, limiar=0.2)
+
+    assert regressoes == [{
+        "caso": CASO,
+        "metrica": "tempo_mediano_s",
+        "referencia": 1.0,
+        "atual": 1.25,
+        "variacao_percent": 25.0,
+    }]
+    assert verificar_regressoes({CASO: medicao(1.19, 100.0)}, anterior, limiar=0.2) == []
+    # Melhorar nunca é regressão
+    assert verificar_regressoes({CASO: medicao(0.5, 10.0)}, anterior, limiar=0.2) == []
+
+
+def test_regressao_de_memoria():
+    anterior = historico({CASO: medicao(1.0, 100.0)})
+
+    regressoes = verificar_regressoes({CASO: medicao(1.0, 150.0)}, anterior, limiar=0.2)
+
+    assert [(r["metrica"], r["variacao_percent"]) for r in regressoes] == [("alocacao_pico_mb", 50.0)]
+
+
+def test_ruido_absoluto_ignorado():
+    # Casos rápidos: o dobro do tempo, mas abaixo do ruído absoluto
+    anterior = historico({CASO: medicao(RUIDO_TEMPO_S / 2, RUIDO_ALOCACAO_MB / 2)})
+
+    atual = medicao(RUIDO_TEMPO_S, RUIDO_ALOCACAO_MB)
+
+    assert verificar_regressoes({CASO: atual}, anterior, limiar=0.2) == []
+
+
+def test_referencia_mediana_das_ultimas_execucoes():
+    # Execução antiga lenta fica fora da janela; falhas não entram
+    anterior = historico(
+        {CASO: medicao(10.0)},
+        {CASO: medicao(1.0)},
+        {CASO: medicao(sucesso=False)},
+        {CASO: medicao(1.2)},
+        {CASO: medicao(5.0)},
+    )
+
+    regressoes = verificar_regressoes({CASO: medicao(1.5)}, anterior, limiar=0.2, execucoes_referencia=3)
+    assert regressoes[0]["referencia"] == 1.2
+    assert regressoes[0]["variacao_percent"] == 25.0
+
+    # Com as 4 execuções com sucesso, a mediana inclui a lenta
+    assert verificar_regressoes({CASO: medicao(1.5)}, anterior, limiar=0.2, execucoes_referencia=4) == []
+
+
+def test_casos_sem_referencia_ou_com_falha():
+    anterior = historico({CASO: medicao(1.0)}, {"outro/1d/60min": medicao(sucesso=False)})
+
+    atuais = {
+        CASO: medicao(sucesso=False),
+        "outro/1d/60min": medicao(9.0),
+        "novo/5a/15min": medicao(9.0),
+    }
+
+    assert verificar_regressoes(atuais, anterior) == []
+    assert verificar_regressoes({CASO: medicao(9.0)}, {"execucoes": []}) == []
+
+
+def test_historico_gravado_e_lido(tmp_path):
+    caminho = str(tmp_path / "historico.json")
+    assert carregar_historico(caminho) == {"execucoes": []}
+
+    esperado = historico({CASO: medicao(1.0)})
+    gravar_historico(caminho, esperado)
+
+    assert carregar_historico(caminho) == esperado
+    assert verificar_regressoes({CASO: medicao(2.0)}, carregar_historico(caminho), limiar=0.5)[0]["caso"] == CASO
+
+
+@pytest.mark.parametrize("limiar", [0.1, 0.5])
+def test_limiar_configuravel(limiar):
+    anterior = historico({CASO: medicao(1.0)})
+
+    regressoes = verificar_regressoes({CASO: medicao(1.3)}, anterior, limiar=limiar)
+
+    assert bool(regressoes) == (limiar < 0.3)
@@ -0,0 +1,158 @@
+"""
+Testes do cache de resultados
+
+Conferem a chave (curva, parâmetros e versão do código da tarefa) e a
+remoção dos menos usados em memória e em disco.
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from cache_resultados import (
+    CacheResultados,
+    cacheavel,
+    chave_resultado,
+    digest_curva,
+    modulos_dependentes,
+    versao_tarefa,
+)
+from casos_sinteticos import TARIFAS, curva_sintetica
+from curva_colunar import salvar_curva_colunar
+
+
+@pytest.fixture(scope="module")
+def parametros():
+    potencias, timestamps = curva_sintetica(dias=3)
+    return {
+        "potencias_kw": potencias,
+        "timestamps": timestamps,
+        "capacidade_bess_kwh": 400,
+        "potencia_bess_kw": 200,
+        **TARIFAS,
+    }
+
+
+def test_chave_depende_da_curva_e_dos_parametros(parametros):
+    chave = chave_resultado("simular_bess", parametros)
+
+    reordenados = dict(reversed(list(parametros.items())))
+    assert chave_resultado("simular_bess", reordenados) == chave
+    assert chave_resultado("simular_bess", {**parametros, "potencia_bess_kw": 201}) != chave
+    assert chave_resultado("varrer_bess", parametros) != chave
+
+    outra_curva = [p + 1 for p in parametros["potencias_kw"]]
+    assert chave_resultado("simular_bess", {**parametros, "potencias_kw": outra_curva}) != chave
+
+
+def test_digest_de_array_considera_o_dtype(parametros):
+    array = {"potencias_kw": np.array(parametros["potencias_kw"])}
+
+    assert digest_curva(array) == digest_curva({"potencias_kw": np.array(parametros["potencias_kw"])})
+    assert digest_curva(array) != digest_curva({"potencias_kw": array["potencias_kw"].astype(np.float32)})
+
+
+def test_digest_do_arquivo_colunar_pelo_conteudo(parametros, tmp_path):
+    primeiro = str(tmp_path / "a.bcurva")
+    segundo = str(tmp_path / "b.bcurva")
+    salvar_curva_colunar(primeiro, parametros["timestamps"], parametros["potencias_kw"])
+    salvar_curva_colunar(segundo, parametros["timestamps"], parametros["potencias_kw"])
+
+    assert digest_curva({"arquivo_curva": primeiro}) == digest_curva({"arquivo_curva": segundo})
+
+    salvar_curva_colunar(segundo, parametros["timestamps"], parametros["potencias_kw"][::-1])
+    assert digest_curva({"arquivo_curva": primeiro}) != digest_curva({"arquivo_curva": segundo})
+
+
+def test_versao_inclui_modulos_importados():
+    dependencias = modulos_dependentes("dimensionador_bess")
+
+    assert "dimensionador_bess" in dependencias
+    assert "simulador_bess" in dependencias
+    assert "curva_colunar" in dependencias
+    assert list(dependencias) == sorted(dependencias)
+    assert set(versao_tarefa("dimensionar_bess")) == set(dependencias)
+    assert "curva_colunar" in versao_tarefa("simular_bess")
+
+
+def test_lru_em_memoria():
+    cache = CacheResultados(max_entradas_memoria=2)
+    cache.gravar("a", {"sucesso": True, "valor": 1})
+    cache.gravar("b", {"sucesso": True, "valor": 2})
+    assert cache.obter("a")["valor"] == 1
+
+    # "b" é o menos usado
+    cache.gravar("c", {"sucesso": True, "valor": 3})
+
+    assert cache.obter("b") is None
+    assert cache.obter("a")["valor"] == 1
+    estatisticas = cache.estatisticas()
+    assert estatisticas["entradas_memoria"] == 2
+    assert estatisticas["remocoes_memoria"] == 1
+    assert estatisticas["falhas"] == 1
+    assert estatisticas["taxa_acerto"] == round(2 / 3, 4)
+
+
+def test_disco_remove_os_menos_usados(tmp_path):
+    resultado = {"sucesso": True, "dados": "x" * 1000}
+    tamanho = len(json.dumps(resultado))
+    cache = CacheResultados(str(tmp_path), max_entradas_memoria=1, max_bytes_disco=int(tamanho * 2.5))
+
+    cache.gravar("antiga", resultado)
+    cache.gravar("recente", resultado)
+    os.utime(tmp_path / "antiga.json", (1000, 1000))
+    os.utime(tmp_path / "recente.json", (2000, 2000))
+    cache.gravar("nova", resultado)
+
+    assert not (tmp_path / "antiga.json").exists()
+    assert (tmp_path / "recente.json").exists()
+    estatisticas = cache.estatisticas()
+    assert estatisticas["remocoes_disco"] == 1
+    assert estatisticas["bytes_disco"] == 2 * tamanho
+
+    # Outra instância (outro processo) encontra o resultado em disco
+    reaberto = CacheResultados(str(tmp_path))
+    assert reaberto.estatisticas()["bytes_disco"] == 2 * tamanho
+    assert reaberto.obter("recente") == resultado
+    assert reaberto.estatisticas()["acertos_disco"] == 1
+
+
+def test_obter_ou_calcular_so_grava_sucesso(parametros):
+    cache = CacheResultados()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return {"sucesso": len(chamadas) > 1}
+
+    assert not cache.obter_ou_calcular("simular_bess", parametros, calcular)["sucesso"]
+    assert cache.obter_ou_calcular("simular_bess", parametros, calcular)["sucesso"]
+    assert cache.obter_ou_calcular("simular_bess", parametros, calcular)["sucesso"]
+    assert len(chamadas) == 2
+
+    # Tarefas fora de TAREFAS_CACHEAVEIS sempre calculam
+    cache.obter_ou_calcular("monte_carlo_bess", parametros, calcular)
+    assert len(chamadas) == 3
+
+
+def test_simulacao_com_checkpoint_sempre_executa(parametros, tmp_path):
+    cache = CacheResultados()
+    incremental = {**parametros, "estrategia_carregamento": "grid-offpeak",
+                   "caminho_checkpoint": str(tmp_path / "checkpoint.npz")}
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return {"sucesso": True}
+
+    assert cacheavel("simular_bess", parametros)
+    assert not cacheavel("simular_bess", incremental)
+    assert cacheavel("simular_bess", {**incremental, "caminho_checkpoint": None})
+
+    # O checkpoint precisa ser gravado a cada chamada: nada vem do cache
+    cache.obter_ou_calcular("simular_bess", incremental, calcular)
+    cache.obter_ou_calcular("simular_bess", incremental, calcular)
+    assert len(chamadas) == 2
+    assert cache.estatisticas()["entradas_memoria"] == 0
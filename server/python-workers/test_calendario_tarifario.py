@@ -0,0 +1,115 @@
+"""
+Testes do calendário tarifário
+
+A classificação vetorizada é comparada com a regra aplicada instante a
+instante (weekday/hora), com fins de semana e feriados sem ponta.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from calendario_tarifario import (
+    CLASSE_FORA_PONTA,
+    CLASSE_INTERMEDIARIA,
+    CLASSE_PONTA,
+    CalendarioTarifario,
+    obter_calendario,
+)
+from parser_excel import classificar_por_horario
+
+# Segunda-feira 04/03/2024 a domingo 17/03/2024
+INICIO = datetime(2024, 3, 4)
+FERIADOS = ["2024-03-08", "2024-03-13"]
+
+
+def classe_referencia(instante, ponta=(18, 21), intermediaria=(17, 22), feriados=FERIADOS, dias_uteis=5):
+    if instante.weekday() >= dias_uteis or instante.date().isoformat() in feriados:
+        return CLASSE_FORA_PONTA
+    hora = instante.hour + instante.minute / 60
+    if ponta[0] <= hora < ponta[1]:
+        return CLASSE_PONTA
+    if intermediaria[0] <= hora < intermediaria[1]:
+        return CLASSE_INTERMEDIARIA
+    return CLASSE_FORA_PONTA
+
+
+@pytest.fixture(scope="module")
+def instantes():
+    return [INICIO + timedelta(minutes=15 * i) for i in range(14 * 96)]
+
+
+def test_classificar_igual_a_regra_por_instante(instantes):
+    calendario = CalendarioTarifario(feriados=FERIADOS)
+
+    classes = calendario.classificar([t.isoformat() for t in instantes])
+
+    assert classes.dtype == np.uint8
+    assert classes.tolist() == [classe_referencia(t) for t in instantes]
+    assert all(calendario.classe_instante(t) == classe_referencia(t) for t in instantes[::7])
+
+
+def test_fim_de_semana_e_feriado_sem_ponta(instantes):
+    classes = CalendarioTarifario(feriados=FERIADOS).classificar([t.isoformat() for t in instantes])
+    por_dia = classes.reshape(14, 96)
+
+    uteis = [d for d in range(14) if d not in (4, 5, 6, 9, 12, 13)]
+    assert (por_dia[[4, 5, 6, 9, 12, 13]] == CLASSE_FORA_PONTA).all()
+    assert (por_dia[uteis].max(axis=1) == CLASSE_PONTA).all()
+    # 17h-18h e 21h-22h: intermediária; 18h-21h: ponta
+    assert (por_dia[0, 68:72] == CLASSE_INTERMEDIARIA).all()
+    assert (por_dia[0, 72:84] == CLASSE_PONTA).all()
+    assert (por_dia[0, 84:88] == CLASSE_INTERMEDIARIA).all()
+
+
+def test_janelas_fracionadas_e_mascara_de_dias(instantes):
+    # Ponta 17:30-20:30 e sábado como dia útil
+    calendario = CalendarioTarifario((17.5, 20.5), (17, 21), dias_uteis="1111110")
+
+    classes = calendario.classificar(np.array(instantes, dtype="datetime64[s]"))
+
+    esperado = [classe_referencia(t, (17.5, 20.5), (17, 21), feriados=[], dias_uteis=6) for t in instantes]
+    assert classes.tolist() == esperado
+    assert classes[5 * 96 + 70] == CLASSE_PONTA
+
+
+def test_grade_igual_a_serie(instantes):
+    calendario = CalendarioTarifario(feriados=FERIADOS)
+    datas = [INICIO + timedelta(days=d) for d in range(14)]
+
+    grade = calendario.classificar_grade(datas, 96, 900)
+
+    np.testing.assert_array_equal(grade.ravel(), calendario.classificar([t.isoformat() for t in instantes]))
+
+
+def test_classificacao_memorizada_por_serie(instantes):
+    calendario = CalendarioTarifario(max_series=1)
+    serie = [t.isoformat() for t in instantes]
+
+    primeira = calendario.classificar(serie)
+    assert calendario.classificar(serie) is primeira
+    assert not primeira.flags.writeable
+
+    calendario.classificar(serie[:96])
+    assert calendario.classificar(serie) is not primeira
+
+
+def test_obter_calendario_compartilhado():
+    primeiro = obter_calendario(feriados=["2024-03-13", date(2024, 3, 8)])
+    segundo = obter_calendario((18, 21), (17, 22), ["2024-03-08", "2024-03-13"])
+
+    assert primeiro is segundo
+    assert obter_calendario(feriados=["2024-03-08"]) is not primeiro
+
+
+def test_classificar_por_horario_considera_feriados(instantes):
+    potencias = [100.0] * len(instantes)
+    timestamps = [t.isoformat() for t in instantes]
+
+    sem_feriado = classificar_por_horario(potencias, timestamps)
+    com_feriado = classificar_por_horario(potencias, timestamps, feriados=FERIADOS)
+
+    assert sem_feriado["sucesso"] and com_feriado["sucesso"]
+    assert com_feriado["classificacao"] != sem_feriado["classificacao"]
+    assert com_feriado["classificacao"]["ponta"]["pontos"] == 8 * 12
@@ -0,0 +1,115 @@
+"""
+Testes do formato colunar (.bcurva)
+
+Conferem a ida e volta da curva (cabeçalho, timestamps e potências), a
+gravação em blocos e a escolha feita por resolver_curva.
+"""
+
+import numpy as np
+import pytest
+
+from casos_sinteticos import curva_sintetica
+from curva_colunar import (
+    ASSINATURA,
+    EscritorCurvaColunar,
+    carregar_curva_colunar,
+    intervalo_dominante,
+    para_datetime64,
+    resolver_curva,
+    salvar_curva_colunar,
+)
+
+
+@pytest.mark.parametrize("dtype_potencia", ["float64", "float32"])
+def test_ida_e_volta(tmp_path, dtype_potencia):
+    potencias, timestamps = curva_sintetica(dias=3)
+    caminho = str(tmp_path / f"curva_{dtype_potencia}.bcurva")
+
+    gravado = salvar_curva_colunar(
+        caminho, timestamps, potencias, metadados={"arquivo": "medicao.xlsx", "fuso": "America/Sao_Paulo"},
+        dtype_potencia=dtype_potencia,
+    )
+    curva = carregar_curva_colunar(caminho)
+
+    assert curva.cabecalho == gravado
+    assert curva.cabecalho["total_pontos"] == len(potencias) == len(curva)
+    assert curva.cabecalho["intervalo_s"] == 900
+    assert curva.cabecalho["fuso"] == "America/Sao_Paulo"
+    assert curva.cabecalho["origem"] == {"arquivo": "medicao.xlsx"}
+    assert curva.potencias.dtype == np.dtype(dtype_potencia)
+    np.testing.assert_array_equal(curva.potencias, np.asarray(potencias, dtype=dtype_potencia))
+    np.testing.assert_array_equal(curva.timestamps, np.array(timestamps, dtype="datetime64[s]"))
+    assert curva.timestamps_iso()[1] == "2024-03-04T00:15:00"
+
+    # Colunas alinhadas a 8 bytes após o cabeçalho
+    with open(caminho, "rb") as arquivo:
+        assert arquivo.read(len(ASSINATURA)) == ASSINATURA
+    assert curva.potencias.offset % 8 == 0
+
+
+def test_escritor_em_blocos_igual_a_gravacao_unica(tmp_path):
+    potencias, timestamps = curva_sintetica(dias=5)
+    salvar_curva_colunar(str(tmp_path / "unica.bcurva"), timestamps, potencias)
+
+    escritor = EscritorCurvaColunar(str(tmp_path / "blocos.bcurva"))
+    for inicio in range(0, len(potencias), 77):
+        escritor.adicionar(timestamps[inicio:inicio + 77], potencias[inicio:inicio + 77])
+    escritor.finalizar()
+
+    unica = carregar_curva_colunar(str(tmp_path / "unica.bcurva"))
+    blocos = carregar_curva_colunar(str(tmp_path / "blocos.bcurva"))
+    assert blocos.cabecalho == unica.cabecalho
+    np.testing.assert_array_equal(blocos.timestamps, unica.timestamps)
+    np.testing.assert_array_equal(blocos.potencias, unica.potencias)
+
+
+def test_curva_vazia(tmp_path):
+    caminho = str(tmp_path / "vazia.bcurva")
+    salvar_curva_colunar(caminho, np.empty(0, dtype="datetime64[s]"), [])
+
+    curva = carregar_curva_colunar(caminho)
+    assert len(curva) == 0
+    assert curva.cabecalho["intervalo_s"] is None
+
+
+def test_arquivo_sem_assinatura(tmp_path):
+    caminho = tmp_path / "outro.bcurva"
+    caminho.write_bytes(b"PK\x03\x04" + b"\x00" * 32)
+
+    with pytest.raises(ValueError, match="formato colunar"):
+        carregar_curva_colunar(str(caminho))
+
+
+def test_dtype_invalido(tmp_path):
+    with pytest.raises(ValueError, match="dtype_potencia"):
+        EscritorCurvaColunar(str(tmp_path / "curva.bcurva"), "int16")
+
+
+def test_para_datetime64_mantem_horario_de_parede():
+    convertidos = para_datetime64(["2024-03-04T10:15:00", "2024-03-04T10:30:00"])
+    com_fuso = para_datetime64(["2024-03-04T10:15:00-03:00", "2024-03-04T10:30:00-03:00"])
+
+    np.testing.assert_array_equal(convertidos, com_fuso)
+    assert str(convertidos[0]) == "2024-03-04T10:15:00"
+
+
+def test_intervalo_dominante_ignora_lacunas():
+    segundos = np.array([0, 900, 1800, 5400, 6300, 7200, 7200])
+
+    assert intervalo_dominante(segundos) == 900
+    assert intervalo_dominante(segundos[:1]) is None
+
+
+def test_resolver_curva(tmp_path):
+    potencias, timestamps = curva_sintetica(dias=2)
+    caminho = str(tmp_path / "curva.bcurva")
+    salvar_curva_colunar(caminho, timestamps, potencias, dtype_potencia="float32")
+
+    do_arquivo, instantes = resolver_curva(None, None, caminho)
+    assert do_arquivo.dtype == np.float64
+    np.testing.assert_allclose(do_arquivo, potencias, rtol=1e-6)
+    assert len(instantes) == len(timestamps)
+
+    assert resolver_curva(potencias, timestamps) == (potencias, timestamps)
+    with pytest.raises(ValueError):
+        resolver_curva(None, timestamps)
@@ -0,0 +1,88 @@
+"""
+Testes da contagem de ciclos (rainflow)
+
+O contador incremental é conferido com o exemplo da ASTM E1049 e com a
+mesma trajetória entregue de uma só vez ou em trechos.
+"""
+
+import numpy as np
+import pytest
+
+from degradacao_bess import (
+    CICLOS_VIDA_100_DOD,
+    EXPOENTE_DOD,
+    ContadorRainflow,
+    fatores_retencao,
+)
+
+
+def test_exemplo_astm():
+    # Reversões -2, 1, -3, 5, -1, 3, -4, 4, -2 (em décimos da capacidade)
+    contador = ContadorRainflow()
+    contador.adicionar(np.array([-2, 1, -3, 5, -1, 3, -4, 4, -2]) / 10 + 0.5)
+
+    resumo = contador.resumo(100, 365)
+
+    # Ciclo de 4; meios ciclos de 3, 4, 6, 8, 8 e 9
+    assert resumo["ciclos_completos"] == 1
+    assert resumo["meios_ciclos"] == 6
+    assert resumo["ciclos_equivalentes"] == pytest.approx(0.4 + 0.5 * (0.3 + 0.4 + 0.6 + 0.8 + 0.8 + 0.9))
+    dano = (0.4 ** EXPOENTE_DOD + 0.5 * sum(d ** EXPOENTE_DOD for d in (0.3, 0.4, 0.6, 0.8, 0.8, 0.9)))
+    assert contador.dano_total() == pytest.approx(dano / CICLOS_VIDA_100_DOD)
+
+
+def test_trajetoria_constante_sem_ciclos():
+    contador = ContadorRainflow()
+    for _ in range(10):
+        contador.adicionar(np.full(96, 0.5))
+
+    resumo = contador.resumo(100, 10)
+    assert resumo["ciclos_equivalentes"] == 0
+    assert resumo["meios_ciclos"] == 0
+    assert contador.perda_capacidade() == 0
+
+
+def test_ciclos_diarios_completos():
+    contador = ContadorRainflow()
+    dia = np.concatenate((np.linspace(0, 1, 48), np.linspace(1, 0, 48)))
+    for _ in range(365):
+        contador.adicionar(dia)
+
+    resumo = contador.resumo(100, 365)
+    assert resumo["ciclos_equivalentes"] == pytest.approx(365, abs=0.01)
+    assert contador.dano_total() == pytest.approx(365 / CICLOS_VIDA_100_DOD)
+    assert resumo["capacidade_final_kwh"] == pytest.approx(100 * (1 - 365 / CICLOS_VIDA_100_DOD * 0.2), abs=0.01)
+
+
+def test_trechos_iguais_a_serie_inteira():
+    rng = np.random.default_rng(2)
+    serie = np.clip(0.5 + np.cumsum(rng.normal(0, 0.05, 5000)), 0, 1)
+    serie[rng.choice(len(serie), 50, replace=False)] = np.nan
+
+    inteira = ContadorRainflow()
+    inteira.adicionar(serie)
+    em_trechos = ContadorRainflow()
+    for trecho in np.split(serie, np.sort(rng.choice(len(serie), 40, replace=False))):
+        em_trechos.adicionar(trecho)
+
+    assert em_trechos.resumo(100, 365) == inteira.resumo(100, 365)
+    assert em_trechos.dano_total() == pytest.approx(inteira.dano_total(), rel=1e-12)
+    assert inteira.ciclos_completos > 0
+
+
+def test_ciclos_rasos_desgastam_menos_por_kwh():
+    raso = ContadorRainflow()
+    raso.adicionar(np.append(np.tile([0.5, 1.0], 200), 0.5))
+    profundo = ContadorRainflow()
+    profundo.adicionar(np.append(np.tile([0.0, 1.0], 100), 0.0))
+
+    # Mesma energia movimentada: 200 ciclos de 50% ou 100 de 100%
+    assert raso.resumo(100, 1)["ciclos_equivalentes"] == profundo.resumo(100, 1)["ciclos_equivalentes"] == 100
+    assert raso.dano_total() < profundo.dano_total()
+
+
+def test_parametros_invalidos_e_retencao():
+    with pytest.raises(ValueError):
+        ContadorRainflow(ciclos_vida_100_dod=0)
+
+    np.testing.assert_allclose(fatores_retencao(0.3, 5), [1.0, 0.7, 0.4, 0.1, 0.0])
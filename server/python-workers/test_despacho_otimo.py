@@ -0,0 +1,96 @@
+"""
+Testes do despacho ótimo (programação linear)
+
+Conferem as restrições da solução de resolver_horizonte, casos pequenos
+com ótimo conhecido e que o custo ótimo nunca supera o da regra fixa de
+despachar_soc, que é uma solução viável do mesmo problema.
+"""
+
+import numpy as np
+import pytest
+
+from casos_sinteticos import montar_caso
+from despacho_otimo import despachar_otimo, resolver_horizonte
+from simulador_bess import despachar_soc
+
+TOLERANCIA = 1e-6
+
+
+def custo_dia(carga_kw, tarifas, cargas, descargas, horas_passo, custo_demanda_dia):
+    liquida = carga_kw + (cargas - descargas) / horas_passo
+    return float((tarifas * liquida * horas_passo).sum() + custo_demanda_dia * liquida.max())
+
+
+def test_arbitragem_com_perdas():
+    cargas, descargas = resolver_horizonte(
+        np.array([[50.0, 50.0]]), np.array([[0.5, 2.0]]), capacidade_kwh=10, potencia_kw=100,
+        horas_passo=1.0, soc_inicial_kwh=0, custo_demanda_dia=0,
+        eficiencia_carga=0.9, eficiencia_descarga=0.9,
+    )
+
+    # Enche a bateria no passo barato e entrega 90% dela no caro
+    np.testing.assert_allclose(cargas, [[10 / 0.9, 0]], atol=TOLERANCIA)
+    np.testing.assert_allclose(descargas, [[0, 9]], atol=TOLERANCIA)
+
+
+def test_corte_de_pico():
+    carga = np.array([[100.0, 100.0, 300.0, 100.0]])
+    cargas, descargas = resolver_horizonte(
+        carga, np.full_like(carga, 0.8), capacidade_kwh=100, potencia_kw=200,
+        horas_passo=1.0, soc_inicial_kwh=100, custo_demanda_dia=50,
+    )
+
+    liquida = carga + cargas - descargas
+    assert liquida.max() == pytest.approx(200, abs=TOLERANCIA)
+    assert descargas.sum() == pytest.approx(100, abs=TOLERANCIA)
+
+
+@pytest.mark.parametrize("eficiencias", [(1.0, 1.0), (0.95, 0.92)])
+def test_solucao_respeita_restricoes(eficiencias):
+    rng = np.random.default_rng(11)
+    matriz, _, janela = montar_caso(rng, 2, 96)
+    tarifas = np.where(janela, 1.9, 0.5)[None, :].repeat(2, axis=0)
+    capacidade, potencia, horas_passo, soc_inicial = 300.0, 120.0, 0.25, 90.0
+
+    cargas, descargas = resolver_horizonte(
+        matriz, tarifas, capacidade, potencia, horas_passo, soc_inicial, 40.0, *eficiencias,
+    )
+
+    assert cargas.min() >= 0 and descargas.min() >= 0
+    assert cargas.max() <= potencia * horas_passo + TOLERANCIA
+    assert (descargas <= np.minimum(potencia, matriz) * horas_passo + TOLERANCIA).all()
+    socs = soc_inicial + np.cumsum((cargas * eficiencias[0] - descargas / eficiencias[1]).ravel())
+    assert socs.min() >= -TOLERANCIA
+    assert socs.max() <= capacidade + TOLERANCIA
+    assert descargas.sum() > 0
+
+
+@pytest.mark.parametrize("eficiencias", [(1.0, 1.0), (0.95, 0.95)])
+def test_custo_otimo_nao_supera_regra_fixa(eficiencias):
+    rng = np.random.default_rng(5)
+    matriz, limite_carga, janela = montar_caso(rng, 5, 96)
+    tarifas = np.where(janela, 1.9, 0.5)[None, :].repeat(len(matriz), axis=0)
+    horas_passo, custo_demanda_dia = 0.25, 40 / 30
+    argumentos = dict(capacidade_kwh=400.0, potencia_kw=150.0, horas_passo=horas_passo,
+                      eficiencia_carga=eficiencias[0], eficiencia_descarga=eficiencias[1])
+
+    regra = despachar_soc(matriz, limite_carga, janela, limiar_descarga_kw=420.0, **argumentos)
+    otimo = despachar_otimo(matriz, tarifas, custo_demanda_dia=custo_demanda_dia, dias_horizonte=1, **argumentos)
+
+    for dia in range(len(matriz)):
+        # Mesmo SoC inicial: a regra fixa é uma solução viável do LP do dia
+        soc_inicial = regra[2][dia, 0]
+        cargas, descargas = resolver_horizonte(
+            matriz[dia:dia + 1], tarifas[dia:dia + 1], 400.0, 150.0, horas_passo,
+            soc_inicial, custo_demanda_dia, *eficiencias,
+        )
+        argumentos_custo = (matriz[dia], tarifas[dia])
+        custo_regra = custo_dia(*argumentos_custo, regra[0][dia], regra[1][dia], horas_passo, custo_demanda_dia)
+        custo_lp = custo_dia(*argumentos_custo, cargas[0], descargas[0], horas_passo, custo_demanda_dia)
+        assert custo_lp <= custo_regra + 1e-3
+
+    # Saída no mesmo formato de despachar_soc
+    assert otimo[0].shape == otimo[1].shape == matriz.shape
+    assert otimo[2].shape == (len(matriz), matriz.shape[1] + 1)
+    assert len(otimo[3]) == len(matriz)
+    assert otimo[2].max() <= 400.0 + TOLERANCIA
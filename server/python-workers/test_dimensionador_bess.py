@@ -0,0 +1,97 @@
+"""
+Testes do dimensionador BESS
+
+A busca branch-and-bound de dimensionar_otimo é comparada com uma
+varredura densa do mesmo retângulo (potência x energia).
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from dimensionador_bess import DimensionadorBESS, dimensionar_bess
+from gerador_casos_teste import gerar_curvas_carga
+from projecao_financeira import normalizar_premissas
+
+CUSTO_KWH = 1200
+CUSTO_KW = 600
+
+
+@pytest.fixture(scope="module")
+def curva():
+    timestamps, potencias = gerar_curvas_carga(
+        [500], "leve", 60, datetime(2024, 1, 1), 60, rng=np.random.default_rng(1)
+    )
+    return potencias[0].tolist(), timestamps
+
+
+@pytest.fixture(scope="module")
+def dimensionador(curva):
+    return DimensionadorBESS(*curva, 1.71, 0.72, 50, tarifa_intermediaria=1.12)
+
+
+@pytest.fixture(scope="module")
+def varredura_densa(dimensionador):
+    simulador = dimensionador.criar_simulador()
+    _, matriz = simulador.montar_grade_diaria()
+    _, janela = simulador.montar_perfil_despacho(matriz.shape[1], simulador.intervalo_s)
+    horas_passo = simulador.intervalo_s / 3600
+    excedentes = np.maximum(matriz[:, janela] - simulador.demanda_contratada * 0.7, 0)
+    potencia_max = excedentes.max()
+    energia_max = excedentes.sum(axis=1).max() * horas_passo
+    horas_janela = janela.sum() * horas_passo
+
+    potencias, energias = [], []
+    for potencia in np.linspace(potencia_max / 40, potencia_max, 40):
+        for fracao in np.linspace(1 / 40, 1, 40):
+            potencias.append(round(potencia, 1))
+            energias.append(round(min(potencia * horas_janela, energia_max) * fracao, 1))
+    return simulador.simular_varredura(
+        energias, potencias, custo_kwh_reais=CUSTO_KWH, custo_kw_reais=CUSTO_KW,
+        premissas_financeiras=normalizar_premissas(),
+    )["resultados"]
+
+
+def test_dimensionar_otimo_vpl_alcanca_varredura_densa(dimensionador, varredura_densa):
+    resultado = dimensionador.dimensionar_otimo("vpl", CUSTO_KWH, CUSTO_KW)
+
+    assert resultado["sucesso"], resultado.get("erro")
+    melhor_denso = max(varredura_densa["vpl_reais"])
+    assert melhor_denso > 0
+    assert resultado["vpl_reais"] >= melhor_denso - 0.005 * abs(melhor_denso)
+
+    busca = resultado["busca"]
+    # O limite é conferido por lote (até 16 caixas x 4 filhas x 2 pontos)
+    assert busca["simulacoes"] <= 1000 + 16 * 8
+    assert busca["caixas_podadas"] > 0
+
+
+def test_dimensionar_otimo_payback_alcanca_varredura_densa(dimensionador, varredura_densa):
+    resultado = dimensionador.dimensionar_otimo("payback", CUSTO_KWH, CUSTO_KW)
+
+    assert resultado["sucesso"], resultado.get("erro")
+    investimento = np.array(varredura_densa["custo_investimento_reais"])
+    economia = np.array(varredura_densa["economia_anual_estimada_reais"])
+    melhor_denso = (investimento[economia > 0] / economia[economia > 0]).min()
+    achado = resultado["custo_investimento_reais"] / resultado["economia"]["economia_total_anual_reais"]
+    assert achado <= melhor_denso * 1.01
+
+
+def test_dimensionar_otimo_sem_custos_falha(dimensionador):
+    resultado = dimensionador.dimensionar_otimo("vpl")
+
+    assert not resultado["sucesso"]
+    assert "custo" in resultado["erro"]
+
+
+def test_wrapper_repassa_estrategia_e_tarifa_intermediaria(curva, dimensionador):
+    resultado = dimensionar_bess(
+        *curva, 1.71, 0.72, 50, objetivo="vpl", custo_kwh_reais=CUSTO_KWH, custo_kw_reais=CUSTO_KW,
+        tarifa_intermediaria=1.12, estrategia_carregamento="solar",
+    )
+    direto = dimensionador.dimensionar_otimo("vpl", CUSTO_KWH, CUSTO_KW, estrategia="solar")
+
+    assert resultado["dimensionamento"]["estrategia"] == "solar"
+    assert resultado["dimensionamento"] == direto["dimensionamento"]
+    assert resultado["vpl_reais"] == direto["vpl_reais"]
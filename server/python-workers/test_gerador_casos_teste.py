@@ -0,0 +1,172 @@
+"""
+Testes do gerador de casos de teste
+
+Conferem a reprodutibilidade pela semente, o formato dos arrays e a
+composição da curva (curva base da hora, ruído da severidade, perfil
+semanal e fator sazonal). Os arquivos gravados em blocos (.xlsx, .csv e
+.parquet) são lidos de volta e comparados com a curva gerada.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import gerador_casos_teste
+from gerador_casos_teste import (
+    PERFIL_BASE_HORARIO,
+    SEASONAL_PEAK_DAY,
+    SEVERITY_LEVELS,
+    WEEKLY_PROFILES,
+    cabecalho_potencia,
+    gerar_curva_carga,
+    gerar_curvas_carga,
+    gravar_curva,
+)
+from curva_colunar import carregar_curva_colunar
+from parser_excel import parsear_arquivo_excel, parsear_arquivo_streaming
+
+# Segunda-feira
+INICIO = datetime(2024, 3, 4)
+
+
+def gerar(semente=5, **opcoes):
+    argumentos = dict(severidade="leve", dias=7, data_inicio=INICIO, rng=np.random.default_rng(semente))
+    return gerar_curvas_carga([100.0, 250.0], **{**argumentos, **opcoes})
+
+
+def test_mesma_semente_mesma_curva():
+    timestamps, potencias = gerar(semente=5)
+    _, repetidas = gerar(semente=5)
+    _, outras = gerar(semente=6)
+
+    np.testing.assert_array_equal(potencias, repetidas)
+    assert not np.array_equal(potencias, outras)
+
+    # A versão de uma curva usa a mesma sequência do gerador
+    lista_ts, lista_potencias = gerar_curva_carga(100.0, "leve", 7, INICIO, semente=5)
+    assert lista_ts == timestamps.astype(object).tolist()
+    assert lista_potencias == gerar_curvas_carga(
+        100.0, "leve", 7, INICIO, rng=np.random.default_rng(5)
+    )[1][0].tolist()
+
+
+@pytest.mark.parametrize("intervalo_minutos", [60, 15, 1])
+def test_formato_dos_arrays(intervalo_minutos):
+    timestamps, potencias = gerar(dias=3, intervalo_minutos=intervalo_minutos)
+
+    passos = 3 * 24 * 60 // intervalo_minutos
+    assert timestamps.dtype == np.dtype("datetime64[s]")
+    assert timestamps.shape == (passos,)
+    assert potencias.shape == (2, passos)
+    assert timestamps[0] == np.datetime64(INICIO, "s")
+    assert set(np.diff(timestamps).astype(np.int64)) == {intervalo_minutos * 60}
+    # kW com uma casa decimal
+    np.testing.assert_allclose(potencias, np.round(potencias, 1), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("severidade", list(SEVERITY_LEVELS))
+def test_curva_base_mais_ruido_da_severidade(severidade):
+    timestamps, potencias = gerar(severidade=severidade, dias=28, intervalo_minutos=15)
+
+    horas = (timestamps.astype(np.int64) // 3600) % 24
+    base = PERFIL_BASE_HORARIO[horas]
+    config = SEVERITY_LEVELS[severidade]
+    for demanda, curva in zip((100.0, 250.0), potencias):
+        ruido = curva / demanda - base
+        # Arredondamento de 0,05 kW sobre a demanda
+        folga = 0.05 / demanda + 1e-9
+        assert ruido.min() >= config["min_var"] - folga
+        assert ruido.max() <= config["max_var"] + folga
+        # Ruído uniforme centrado: a média de cada hora fica na curva base
+        # (4 desvios-padrão da média de 112 pontos)
+        amostras = np.bincount(horas)
+        medias = np.bincount(horas, weights=curva / demanda) / amostras
+        desvio = config["max_var"] / np.sqrt(3 * amostras)
+        np.testing.assert_allclose(medias, PERFIL_BASE_HORARIO, atol=4 * desvio.max())
+
+
+def test_perfil_semanal():
+    timestamps, potencias = gerar(perfil_semanal="industrial")
+
+    horas = (timestamps.astype(np.int64) // 3600) % 24
+    fatores = np.repeat(WEEKLY_PROFILES["industrial"], 24)
+    ruido = potencias[0] / 100.0 - PERFIL_BASE_HORARIO[horas] * fatores
+    assert np.abs(ruido).max() <= 0.05 + 0.0005 + 1e-9
+    # Sábado e domingo abaixo dos dias úteis
+    diarias = potencias[0].reshape(7, 24).mean(axis=1)
+    assert diarias[5] < diarias[:5].min() and diarias[6] < diarias[5]
+
+
+def test_fator_sazonal():
+    _, potencias = gerar(
+        dias=366, data_inicio=datetime(2024, 1, 1), amplitude_sazonal=0.2, rng=np.random.default_rng(1)
+    )
+
+    diarias = potencias[0].reshape(366, 24).mean(axis=1) / 100.0
+    dia = np.arange(366)
+    esperadas = PERFIL_BASE_HORARIO.mean() * (1 + 0.2 * np.cos(2 * np.pi * (dia - SEASONAL_PEAK_DAY) / 365.25))
+    np.testing.assert_allclose(diarias, esperadas, atol=0.03)
+    assert int(np.argmax(esperadas)) == SEASONAL_PEAK_DAY
+
+
+def test_opcoes_invalidas():
+    with pytest.raises(ValueError, match="Intervalo"):
+        gerar(intervalo_minutos=7)
+    with pytest.raises(ValueError, match="Perfil"):
+        gerar(perfil_semanal="noturno")
+    with pytest.raises(ValueError, match="Severidade"):
+        gerar(severidade="extrema")
+
+
+@pytest.fixture
+def blocos_pequenos(monkeypatch):
+    # Vários blocos de escrita, com o último incompleto
+    monkeypatch.setattr(gerador_casos_teste, "WRITE_BLOCK_ROWS", 37)
+
+
+@pytest.mark.parametrize("formato", ["xlsx", "csv"])
+def test_arquivo_gravado_lido_pelo_parser(formato, blocos_pequenos, tmp_path):
+    timestamps, potencias = gerar(severidade="grave", dias=2, intervalo_minutos=15)
+    caminho = gravar_curva(timestamps, potencias[0], "Metalúrgica Ação & Filhos", str(tmp_path / f"curva.{formato}"))
+    caminho_colunar = str(tmp_path / "curva.bcurva")
+
+    resultado = parsear_arquivo_streaming(caminho, tamanho_bloco=50, caminho_colunar=caminho_colunar)
+
+    assert resultado["sucesso"], resultado.get("erro")
+    assert resultado["avisos"] is None
+    assert resultado["dados"]["total_pontos"] == len(timestamps)
+    gravada = carregar_curva_colunar(caminho_colunar)
+    np.testing.assert_array_equal(gravada.potencias, potencias[0])
+    assert gravada.timestamps_iso() == np.datetime_as_string(timestamps, unit="s").tolist()
+
+    if formato == "xlsx":
+        completo = parsear_arquivo_excel(caminho)
+        assert completo["sucesso"], completo.get("erro")
+        assert completo["dados"]["potencias"] == potencias[0].tolist()
+        assert completo["dados"]["timestamps"] == gravada.timestamps_iso()
+
+
+def test_arquivo_parquet(blocos_pequenos, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    timestamps, potencias = gerar(dias=2, intervalo_minutos=15)
+
+    caminho = gravar_curva(timestamps, potencias[1], "Loja", str(tmp_path / "curva.parquet"))
+
+    tabela = pq.read_table(caminho)
+    assert pq.ParquetFile(caminho).num_row_groups == -(-len(timestamps) // 37)
+    np.testing.assert_array_equal(tabela["timestamp"].to_numpy(), timestamps)
+    np.testing.assert_array_equal(tabela["potencia_kw"].to_numpy(), potencias[1])
+    assert tabela.schema.metadata[b"coluna_potencia"].decode() == cabecalho_potencia("Loja")
+
+
+def test_limites_da_gravacao(monkeypatch, tmp_path):
+    timestamps, potencias = gerar(dias=1)
+    monkeypatch.setattr(gerador_casos_teste, "EXCEL_MAX_ROWS", 24)
+
+    # 24 pontos + cabeçalho não cabem na planilha; em CSV sim
+    with pytest.raises(ValueError, match="limite de linhas"):
+        gravar_curva(timestamps, potencias[0], "Loja", str(tmp_path / "curva.xlsx"))
+    assert parsear_arquivo_streaming(gravar_curva(timestamps, potencias[0], "Loja", str(tmp_path / "curva.csv")))["sucesso"]
+    with pytest.raises(ValueError, match="não suportado"):
+        gravar_curva(timestamps, potencias[0], "Loja", str(tmp_path / "curva.json"))
@@ -0,0 +1,112 @@
+"""
+Testes das métricas de execução
+
+Fora de coletar_metricas os ganchos (fase, contar, cronometrada) não têm
+efeito; dentro, os tempos e contadores são acumulados e o perfil
+(cProfile ou tracemalloc) só aparece quando pedido. executar_tarefa só
+devolve o bloco "metricas" com as opções de métricas.
+"""
+
+import tracemalloc
+
+import pytest
+
+from casos_sinteticos import TARIFAS, curva_sintetica
+from metricas import coletar_metricas, contar, cronometrada, fase
+from servidor_workers import executar_tarefa
+
+
+@cronometrada("somar")
+def somar(a, b):
+    contar("somas")
+    return a + b
+
+
+def test_ganchos_sem_coleta_nao_fazem_nada():
+    with fase("solta"):
+        contar("solto", 3)
+
+    assert somar(1, 2) == 3
+    with coletar_metricas() as coletor:
+        pass
+    assert coletor.resultado()["fases_s"] == {}
+    assert coletor.resultado()["contadores"] == {}
+
+
+def test_fases_e_contadores_acumulados():
+    with coletar_metricas() as coletor:
+        for _ in range(3):
+            somar(1, 2)
+        with fase("externa"):
+            with fase("interna"):
+                contar("lidos", 10)
+        contar("lidos", 5)
+
+    metricas = coletor.resultado()
+    assert metricas["chamadas"] == {"somar": 3, "interna": 1, "externa": 1}
+    assert metricas["contadores"] == {"somas": 3, "lidos": 15}
+    assert metricas["fases_s"]["externa"] >= metricas["fases_s"]["interna"]
+    assert metricas["tempo_total_s"] >= metricas["fases_s"]["externa"]
+    assert "perfil" not in metricas
+
+    # Encerrada a coleta, os ganchos voltam a não ter efeito
+    somar(1, 2)
+    assert coletor.resultado()["chamadas"]["somar"] == 3
+
+
+def test_perfil_cprofile():
+    with coletar_metricas(perfil="cprofile") as coletor:
+        somar(1, 2)
+
+    perfil = coletor.resultado()["perfil"]
+    assert perfil["tipo"] == "cprofile"
+    assert any("(somar)" in funcao["funcao"] for funcao in perfil["funcoes"])
+
+
+def test_perfil_tracemalloc():
+    assert not tracemalloc.is_tracing()
+
+    with coletar_metricas(perfil="tracemalloc") as coletor:
+        blocos = [bytearray(1024) for _ in range(1024)]
+
+    perfil = coletor.resultado()["perfil"]
+    assert perfil["tipo"] == "tracemalloc"
+    assert perfil["alocacao_pico_mb"] >= 1
+    assert perfil["linhas"]
+    assert not tracemalloc.is_tracing()
+    del blocos
+
+
+def test_perfil_invalido():
+    with pytest.raises(ValueError, match="Perfil"):
+        with coletar_metricas(perfil="perf"):
+            pass
+
+
+def test_metricas_da_tarefa_so_quando_pedidas():
+    potencias, timestamps = curva_sintetica(dias=3)
+    parametros = {
+        "potencias_kw": potencias,
+        "timestamps": timestamps,
+        "capacidade_bess_kwh": 400,
+        "potencia_bess_kw": 200,
+        "estrategia_carregamento": "grid-offpeak",
+        **TARIFAS,
+    }
+
+    sem_metricas = executar_tarefa("simular_bess", dict(parametros))
+    com_metricas = executar_tarefa("simular_bess", dict(parametros), {"espera_fila_s": 0.5})
+    com_perfil = executar_tarefa("simular_bess", dict(parametros), {"perfil": "cprofile"})
+
+    assert sem_metricas["sucesso"] and "metricas" not in sem_metricas
+    metricas = com_metricas.pop("metricas")
+    assert com_metricas == sem_metricas
+    assert metricas["tarefa"] == "simular_bess"
+    assert metricas["espera_fila_s"] == 0.5
+    assert {"agrupar_dias", "despacho_soc", "serializar_json"} <= set(metricas["fases_s"])
+    assert metricas["contadores"]["dias_simulados"] == 3
+    assert "perfil" not in metricas
+    assert com_perfil["metricas"]["perfil"]["tipo"] == "cprofile"
+
+    invalido = executar_tarefa("simular_bess", dict(parametros), {"perfil": "perf"})
+    assert not invalido["sucesso"] and "metricas" not in invalido
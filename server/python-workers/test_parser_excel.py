@@ -0,0 +1,161 @@
+"""
+Testes do parser Elspec
+
+O modo streaming (parsear_arquivo_streaming) é comparado com o parse
+completo de parsear_arquivo_excel, com blocos pequenos para que a curva
+atravesse vários blocos. Os indicadores da análise (_indicadores_curva)
+são comparados com NumPy e com um groupby por dia do pandas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from casos_sinteticos import curva_sintetica
+from curva_colunar import carregar_curva_colunar
+from parser_excel import (
+    PERCENTIS,
+    _indicadores_curva,
+    parsear_arquivo_excel,
+    parsear_arquivo_streaming,
+)
+
+CAMPOS = ["data_inicio", "data_fim", "total_dias", "total_pontos",
+          "potencia_maxima_kw", "potencia_minima_kw", "potencia_media_kw"]
+
+
+@pytest.fixture(scope="module")
+def curva():
+    potencias, timestamps = curva_sintetica(dias=10)
+    textos = pd.to_datetime(timestamps).strftime("%d/%m/%Y %H:%M:%S.000000").tolist()
+    return textos, potencias
+
+
+@pytest.fixture(scope="module")
+def planilha(curva, tmp_path_factory):
+    caminho = tmp_path_factory.mktemp("parser") / "medicao.xlsx"
+    textos, potencias = curva
+    pd.DataFrame({"Time": textos, "Potência Ativa (kW)": potencias}).to_excel(caminho, index=False)
+    return str(caminho)
+
+
+@pytest.fixture(scope="module")
+def referencia(planilha):
+    resultado = parsear_arquivo_excel(planilha)
+    assert resultado["sucesso"], resultado.get("erro")
+    return resultado["dados"]
+
+
+def test_streaming_excel_igual_ao_parse_completo(planilha, referencia, tmp_path):
+    caminho_colunar = str(tmp_path / "medicao.bcurva")
+    resultado = parsear_arquivo_streaming(planilha, tamanho_bloco=97, caminho_colunar=caminho_colunar)
+
+    assert resultado["sucesso"], resultado.get("erro")
+    assert resultado["avisos"] is None
+    for campo in CAMPOS:
+        assert resultado["dados"][campo] == referencia[campo], campo
+
+    gravada = carregar_curva_colunar(caminho_colunar)
+    np.testing.assert_array_equal(gravada.potencias, referencia["potencias"])
+    assert gravada.timestamps_iso() == referencia["timestamps"]
+    assert gravada.cabecalho["intervalo_s"] == 900
+
+
+def test_streaming_csv_com_decimal_virgula(curva, referencia, tmp_path):
+    textos, potencias = curva
+    caminho = tmp_path / "medicao.csv"
+    linhas = ["Time;Potência Ativa (kW)"]
+    linhas += [f"{ts};{str(p).replace('.', ',')}" for ts, p in zip(textos, potencias)]
+    caminho.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+
+    resultado = parsear_arquivo_streaming(str(caminho), tamanho_bloco=500)
+
+    assert resultado["sucesso"], resultado.get("erro")
+    for campo in CAMPOS:
+        assert resultado["dados"][campo] == referencia[campo], campo
+    horas = pd.to_datetime(referencia["timestamps"]).hour
+    esperado = pd.Series(referencia["potencias"]).groupby(horas).mean().round(2)
+    assert resultado["dados"]["media_por_hora"] == pytest.approx(esperado.to_dict(), abs=0.011)
+
+
+def test_streaming_conta_linhas_invalidas(tmp_path):
+    caminho = tmp_path / "medicao.csv"
+    caminho.write_text(
+        "Time,Potência\n"
+        "01/03/2024 00:00:00.000000,100.5\n"
+        "data ruim,110\n"
+        "01/03/2024 00:30:00.000000,sem valor\n"
+        "01/03/2024 00:45:00.000000,130\n",
+        encoding="utf-8",
+    )
+
+    resultado = parsear_arquivo_streaming(str(caminho), tamanho_bloco=2)
+
+    assert resultado["sucesso"], resultado.get("erro")
+    assert resultado["dados"]["total_pontos"] == 2
+    assert resultado["total_avisos"] == 2
+    assert [aviso["linha"] for aviso in resultado["avisos"]] == [2, 3]
+
+
+def test_streaming_erros_de_arquivo(tmp_path):
+    ausente = parsear_arquivo_streaming(str(tmp_path / "nao_existe.csv"))
+    assert not ausente["sucesso"]
+    assert "não encontrado" in ausente["erro"]
+
+    caminho = tmp_path / "medicao.json"
+    caminho.write_text("[]", encoding="utf-8")
+    formato = parsear_arquivo_streaming(str(caminho))
+    assert not formato["sucesso"]
+    assert ".json" in formato["erro"]
+
+
+@pytest.fixture(scope="module")
+def serie_desordenada():
+    potencias, timestamps = curva_sintetica(dias=6)
+    potencias = np.array(potencias)
+    instantes = np.array(timestamps, dtype="datetime64[s]")
+    # Empate no pico do dia 2: vale a primeira ocorrência (10h, não 19h)
+    potencias[2 * 96 + 40] = potencias[2 * 96 + 76] = potencias.max() + 100
+    # Primeiro e último dias incompletos, pontos fora de ordem
+    potencias, instantes = potencias[30:-20], instantes[30:-20]
+    ordem = np.random.default_rng(8).permutation(len(potencias))
+    return potencias[ordem], instantes[ordem]
+
+
+def test_indicadores_iguais_as_referencias(serie_desordenada):
+    potencias, instantes = serie_desordenada
+
+    analise = _indicadores_curva(potencias, instantes)["analise"]
+
+    tabela = pd.DataFrame({"instante": instantes, "potencia": potencias}).sort_values("instante", kind="stable")
+    assert analise["percentis"] == {
+        f"p{p}": pytest.approx(v, abs=0.006) for p, v in zip(PERCENTIS, np.percentile(potencias, PERCENTIS))
+    }
+    tempo = np.array(analise["curva_duracao"]["percentual_tempo"])
+    np.testing.assert_allclose(tempo, np.linspace(0, 100, 101))
+    np.testing.assert_allclose(analise["curva_duracao"]["potencia_kw"], np.percentile(potencias, 100 - tempo), atol=0.006)
+    medias = tabela.groupby(tabela["instante"].dt.hour)["potencia"].mean()
+    assert analise["media_por_hora"] == {h: pytest.approx(v, abs=0.006) for h, v in medias.items()}
+
+    dias = tabela.groupby(tabela["instante"].dt.date)["potencia"]
+    picos = dias.max()
+    horas_pico = tabela.loc[dias.idxmax(), "instante"].dt.hour
+    picos_diarios = analise["picos_diarios"]
+    assert picos_diarios["dias"] == 6
+    assert picos_diarios["media_kw"] == pytest.approx(picos.mean(), abs=0.006)
+    assert picos_diarios["maximo_kw"] == pytest.approx(picos.max(), abs=0.006)
+    assert picos_diarios["minimo_kw"] == pytest.approx(picos.min(), abs=0.006)
+    assert picos_diarios["desvio_padrao_kw"] == pytest.approx(picos.std(ddof=0), abs=0.006)
+    assert picos_diarios["p90_kw"] == pytest.approx(np.percentile(picos, 90), abs=0.006)
+    assert picos_diarios["frequencia_por_hora"] == np.bincount(horas_pico, minlength=24).tolist()
+    assert picos_diarios["hora_mais_frequente"] == int(np.bincount(horas_pico, minlength=24).argmax())
+    assert horas_pico.iloc[2] == 10
+
+
+def test_indicadores_nao_dependem_da_ordem(serie_desordenada):
+    potencias, instantes = serie_desordenada
+    ordem = np.argsort(instantes, kind="stable")
+
+    assert _indicadores_curva(potencias, instantes) == _indicadores_curva(potencias[ordem], instantes[ordem])
+    with pytest.raises(ValueError):
+        _indicadores_curva(np.array([]), np.array([], dtype="datetime64[s]"))
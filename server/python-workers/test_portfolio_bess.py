@@ -0,0 +1,151 @@
+"""
+Testes da análise de portfólio
+
+Um lote com um CSV de dois medidores, uma planilha de um medidor e um
+arquivo ausente é analisado de ponta a ponta; o consolidador é conferido
+com sites montados à mão (totais, fluxo somado e ranking por VPL).
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from casos_sinteticos import TARIFAS, curva_sintetica
+from dimensionador_bess import dimensionar_bess
+from portfolio_bess import ConsolidadorPortfolio, analisar_portfolio, analisar_site
+from projecao_financeira import calcular_tir
+
+CUSTOS = dict(custo_kwh_reais=1500, custo_kw_reais=800)
+
+
+def site_manual(nome, fluxos, economia=1000.0, reducao=10.0, potencia=100.0, capacidade=200.0):
+    fluxos = [float(f) for f in fluxos]
+    vpl = sum(f / 1.1 ** ano for ano, f in enumerate(fluxos))
+    return {
+        "sucesso": True,
+        "arquivo": f"{nome}.xlsx",
+        "medidor": nome,
+        "potencia_bess_kw": potencia,
+        "capacidade_bess_kwh": capacidade,
+        "investimento_reais": -fluxos[0],
+        "resumo": {"economia_anual_estimada_reais": economia, "reducao_demanda_media_kw": reducao},
+        "projecao": {
+            "vpl_reais": round(vpl, 2),
+            "tir_percent": None,
+            "payback_simples_anos": None,
+            "fluxos_anuais_reais": fluxos,
+        },
+    }
+
+
+@pytest.fixture(scope="module")
+def lote(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("portfolio")
+    potencias, timestamps = curva_sintetica(dias=14)
+    textos = pd.to_datetime(timestamps).strftime("%d/%m/%Y %H:%M:%S").tolist()
+    maiores = [round(p * 1.5, 1) for p in potencias]
+
+    varios = pasta / "medidores.csv"
+    linhas = ["Time;Medidor A;Medidor B"]
+    linhas += [f"{ts};{str(a).replace('.', ',')};{str(b).replace('.', ',')}"
+               for ts, a, b in zip(textos, potencias, maiores)]
+    varios.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+
+    unico = pasta / "loja.xlsx"
+    pd.DataFrame({"Time": textos, "Potência Ativa (kW)": potencias}).to_excel(unico, index=False)
+
+    saida = pasta / "sites.jsonl"
+    resultado = analisar_portfolio(
+        [str(varios), str(pasta / "ausente.csv"), str(unico)], str(pasta),
+        estrategia_carregamento="grid-offpeak", processos=1, saida_jsonl=str(saida),
+        diretorio_series=str(pasta / "series"), **TARIFAS, **CUSTOS,
+    )
+    assert resultado["sucesso"], resultado.get("erro")
+    sites = [json.loads(linha) for linha in saida.read_text(encoding="utf-8").splitlines()]
+    return resultado, sites
+
+
+def test_jsonl_com_uma_linha_por_site(lote):
+    resultado, sites = lote
+
+    assert "sites" not in resultado
+    assert sorted(site["medidor"] for site in sites) == ["Medidor A", "Medidor B", "Potência Ativa (kW)"]
+    assert all(site["sucesso"] for site in sites)
+    assert all("resultados_diarios" not in site for site in sites)
+
+
+def test_arquivo_ausente_nao_interrompe_o_lote(lote):
+    resumo = lote[0]["resumo"]
+
+    assert resumo["sites"] == resumo["sites_sucesso"] == 3
+    assert resumo["total_falhas"] == 1
+    assert resumo["falhas"][0]["arquivo"].endswith("ausente.csv")
+    assert "não encontrado" in resumo["falhas"][0]["erro"]
+
+
+def test_totais_somam_os_sites(lote):
+    resumo, sites = lote[0]["resumo"], lote[1]
+
+    def total(extrair):
+        return round(sum(extrair(site) for site in sites), 2)
+
+    assert resumo["potencia_total_bess_kw"] == total(lambda s: s["potencia_bess_kw"])
+    assert resumo["capacidade_total_bess_kwh"] == total(lambda s: s["capacidade_bess_kwh"])
+    assert resumo["investimento_total_reais"] == total(lambda s: s["investimento_reais"])
+    assert resumo["economia_anual_total_reais"] == total(lambda s: s["resumo"]["economia_anual_estimada_reais"])
+    assert resumo["vpl_total_reais"] == total(lambda s: s["projecao"]["vpl_reais"])
+
+    fluxos = np.sum([site["projecao"]["fluxos_anuais_reais"] for site in sites], axis=0)
+    tir = float(calcular_tir(fluxos[None, :])[0])
+    assert resumo["tir_portfolio_percent"] == round(tir * 100, 2)
+    # O medidor B (carga 1,5x) pede o maior BESS; A e a planilha têm a mesma curva
+    a, b, planilha = sorted(sites, key=lambda s: s["medidor"])
+    assert b["capacidade_bess_kwh"] > a["capacidade_bess_kwh"] == planilha["capacidade_bess_kwh"]
+
+
+def test_consolidador_soma_os_fluxos():
+    consolidador = ConsolidadorPortfolio()
+    consolidador.adicionar(site_manual("a", [-60, 20, 20, 20, 20, 20], economia=20))
+    consolidador.adicionar(site_manual("b", [-40, 10, 10, 10, 10, 10], economia=10))
+
+    resumo = consolidador.resultado()
+
+    # Fluxo somado -100, 30 x 5
+    assert resumo["tir_portfolio_percent"] == pytest.approx(15.24, abs=0.01)
+    assert resumo["investimento_total_reais"] == 100
+    assert resumo["economia_anual_total_reais"] == 30
+    assert resumo["payback_portfolio_anos"] == 3.3
+    assert resumo["potencia_total_bess_kw"] == 200
+    assert resumo["reducao_demanda_total_kw"] == 20
+
+
+def test_consolidador_ranking_e_falhas():
+    consolidador = ConsolidadorPortfolio(tamanho_ranking=2)
+    for nome, retorno in (("baixo", 12), ("alto", 40), ("negativo", 5), ("medio", 30)):
+        consolidador.adicionar(site_manual(nome, [-100] + [retorno] * 5))
+    consolidador.adicionar({"sucesso": False, "arquivo": "x.csv", "medidor": "X", "erro": "falhou"})
+    consolidador.adicionar_falha({"arquivo": "y.csv", "erro": "ilegível"})
+
+    resumo = consolidador.resultado()
+
+    assert [item["medidor"] for item in resumo["ranking_vpl"]] == ["alto", "medio"]
+    assert resumo["ranking_vpl"][0]["vpl_reais"] > resumo["ranking_vpl"][1]["vpl_reais"]
+    assert resumo["sites"] == 5
+    assert resumo["sites_sucesso"] == 4
+    assert resumo["sites_vpl_positivo"] == 2
+    assert resumo["total_falhas"] == 2
+    assert [falha["arquivo"] for falha in resumo["falhas"]] == ["x.csv", "y.csv"]
+
+
+def test_site_dimensionado_com_a_estrategia_e_as_tarifas(lote, tmp_path):
+    arquivo_curva = next(site for site in lote[1] if site["medidor"] == "Medidor A")["arquivo_curva"]
+    comuns = dict(objetivo="vpl", estrategia_carregamento="solar", **TARIFAS, **CUSTOS)
+
+    site = analisar_site(arquivo_curva, diretorio_series=str(tmp_path), **comuns)
+    direto = dimensionar_bess(None, None, arquivo_curva=arquivo_curva, **comuns)
+
+    assert site["sucesso"], site.get("erro")
+    assert site["capacidade_bess_kwh"] == direto["dimensionamento"]["capacidade_bess_kwh"]
+    assert site["potencia_bess_kw"] == direto["dimensionamento"]["potencia_bess_kw"]
@@ -0,0 +1,142 @@
+"""
+Testes da projeção financeira
+
+Casos de resultado conhecido (fluxo -100, 30 x 5), reposição das baterias
+pelo fim de vida e pela vida calendário, paybacks além do horizonte e TIR
+inexistente, além da mesma projeção escalar e vetorizada.
+"""
+
+import numpy as np
+import pytest
+
+from projecao_financeira import (
+    calcular_tir,
+    montar_fluxos,
+    normalizar_premissas,
+    projetar_investimento,
+    resumir_projecao,
+)
+
+
+def test_fluxo_constante_conhecido():
+    premissas = {"anos_analise": 5}
+    projecao = projetar_investimento(30, 100, premissas, incluir_fluxos=True)
+
+    np.testing.assert_allclose(projecao["fluxos"], [-100, 30, 30, 30, 30, 30])
+    assert projecao["tir"] == pytest.approx(0.1524, abs=1e-4)
+    assert projecao["payback_simples"] == pytest.approx(10 / 3)
+    assert projecao["vpl"] == pytest.approx(-100 + sum(30 / 1.1 ** ano for ano in range(1, 6)))
+    assert projecao["lucro"] == pytest.approx(50)
+    assert projecao["roi_percent"] == pytest.approx(50)
+
+    resumo = resumir_projecao(projecao, premissas)
+    assert resumo["tir_percent"] == 15.24
+    assert resumo["payback_simples_anos"] == 3.3
+    # Descontado a 10%: 95,09 recuperados em 4 anos, o resto em 0,26 do ano 5
+    assert resumo["payback_descontado_anos"] == 4.3
+    assert resumo["premissas"]["anos_analise"] == 5
+    assert resumo["fluxos_anuais_reais"] == [-100, 30, 30, 30, 30, 30]
+
+
+def test_reposicao_pelo_fim_de_vida():
+    premissas = normalizar_premissas({
+        "perda_capacidade_anual": 0.06,
+        "capacidade_fim_vida": 0.8,
+        "custo_reposicao_percent": 50,
+    })
+
+    montado = montar_fluxos(30.0, 100.0, premissas)
+
+    # Capacidade 100, 94, 88, 82%; no ano 5 cairia a 76%: troca (50% do
+    # investimento) e volta a 100%; a próxima troca é no ano 9
+    esperado = [-100, 30, 28.2, 26.4, 24.6, 30 - 50, 28.2, 26.4, 24.6, 30 - 50, 28.2]
+    np.testing.assert_allclose(montado["fluxos"], esperado)
+    assert montado["reposicoes"] == 2
+
+
+def test_reposicao_pela_vida_calendario_com_custo_variavel():
+    premissas = normalizar_premissas({
+        "anos_analise": 6,
+        "vida_util_anos": 4,
+        "custo_reposicao_percent": 50,
+        "variacao_custo_reposicao_anual": -0.1,
+    })
+
+    montado = montar_fluxos(30.0, 100.0, premissas)
+
+    # Sem perda de capacidade, troca no ano 5 a 50% x 0,9^4 do investimento
+    np.testing.assert_allclose(montado["fluxos"], [-100, 30, 30, 30, 30, 30 - 50 * 0.9 ** 4, 30])
+    assert montado["reposicoes"] == 1
+
+
+def test_sem_reposicao_a_economia_cai_com_a_capacidade():
+    premissas = normalizar_premissas({"anos_analise": 4, "perda_capacidade_anual": 0.3})
+
+    montado = montar_fluxos(100.0, 50.0, premissas)
+
+    # Capacidade 100, 70, 40, 10%: a retenção nunca fica negativa
+    np.testing.assert_allclose(montado["fluxos"], [-50, 100, 70, 40, 10])
+    assert montado["reposicoes"] == 0
+
+
+def test_payback_extrapolado_e_infinito():
+    projecao = projetar_investimento(np.array([10.0, 0.0]), 100, {"anos_analise": 5})
+
+    # Com economia de 10/ano, o acumulado chega a zero no ano 10
+    assert projecao["payback_simples"][0] == pytest.approx(10)
+    assert projecao["payback_descontado"][0] == np.inf
+    assert projecao["payback_simples"][1] == np.inf
+
+    resumo = resumir_projecao({nome: valores[1] for nome, valores in projecao.items()})
+    assert resumo["payback_simples_anos"] is None
+    assert resumo["payback_descontado_anos"] is None
+    assert resumo["tir_percent"] is None
+    assert resumo["roi_percent"] == -100
+
+
+def test_tir_sem_troca_de_sinal():
+    fluxos = np.array([
+        [-100, 30, 30, 30, 30, 30],
+        [-100, 0, 0, 0, 0, 0],
+        [100, 10, 10, 10, 10, 10],
+        [-100, 20, 20, 20, 20, 20],
+    ], dtype=np.float64)
+
+    tir = calcular_tir(fluxos)
+
+    assert tir[0] == pytest.approx(0.1524, abs=1e-4)
+    assert np.isnan(tir[1]) and np.isnan(tir[2])
+    assert tir[3] == pytest.approx(0, abs=1e-9)
+
+
+def test_vetorizada_igual_a_escalar():
+    economias = np.array([[20.0, 30.0, 45.0], [10.0, 25.0, 60.0]])
+    perdas = np.array([0.0, 0.02, 0.05])
+    premissas = {
+        "reajuste_tarifa_anual": 0.04,
+        "custo_om_anual_percent": 1.5,
+        "reajuste_om_anual": 0.05,
+        "custo_reposicao_percent": 40,
+        "capacidade_fim_vida": 0.85,
+        "anos_analise": 15,
+    }
+
+    lote = projetar_investimento(economias, 150.0, premissas, perdas)
+
+    for i, j in np.ndindex(economias.shape):
+        escalar = projetar_investimento(economias[i, j], 150.0, premissas, perdas[j])
+        for nome, valor in escalar.items():
+            np.testing.assert_allclose(lote[nome][i, j], valor, err_msg=nome)
+
+
+def test_premissas_invalidas():
+    with pytest.raises(ValueError, match="taxa_juros"):
+        normalizar_premissas({"taxa_juros": 0.1})
+    with pytest.raises(ValueError):
+        normalizar_premissas({"anos_analise": 0})
+    with pytest.raises(ValueError):
+        normalizar_premissas({"capacidade_fim_vida": 1})
+
+    # Valores de `sobrepor` substituem os informados, exceto None
+    premissas = normalizar_premissas({"anos_analise": 12}, anos_analise=None, taxa_desconto=0.08)
+    assert (premissas["anos_analise"], premissas["taxa_desconto"]) == (12, 0.08)
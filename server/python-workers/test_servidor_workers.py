@@ -0,0 +1,270 @@
+"""
+Testes do servidor de workers
+
+Sobem o servidor como o Node faz (JSON por linha em stdin/stdout) e
+conferem a associação por id, o JSON estrito das respostas, o progresso,
+as métricas pedidas por tarefa, o cancelamento e o timeout por tarefa.
+O pool também é usado direto, sem workers, para conferir quando uma
+tarefa dividida em subtarefas deixa de contar como pendente.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import portfolio_bess
+from casos_sinteticos import TARIFAS, curva_sintetica
+from servidor_workers import PoolWorkers
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+ESPERA_S = 60
+
+
+def _rejeitar_constante(nome):
+    raise ValueError(f"Constante não JSON: {nome}")
+
+
+class Servidor:
+    """
+    Cliente mínimo do protocolo: envia requisições e separa as respostas
+    por id.
+    """
+
+    def __init__(self, *argumentos):
+        self.processo = subprocess.Popen(
+            [sys.executable, "servidor_workers.py", "--no-cache", *argumentos],
+            cwd=DIRETORIO,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self.mensagens = {}
+        self.trava = threading.Lock()
+        self.leitor = threading.Thread(target=self._ler, daemon=True)
+        self.leitor.start()
+
+    def _ler(self):
+        for linha in self.processo.stdout:
+            # Falha aqui se o servidor escrever NaN/Infinity
+            mensagem = json.loads(linha, parse_constant=_rejeitar_constante)
+            with self.trava:
+                self.mensagens.setdefault(mensagem["id"], queue.Queue()).put(mensagem)
+
+    def _fila(self, id_tarefa):
+        with self.trava:
+            return self.mensagens.setdefault(id_tarefa, queue.Queue())
+
+    def enviar(self, mensagem):
+        self.processo.stdin.write(json.dumps(mensagem) + "\n")
+        self.processo.stdin.flush()
+
+    def proxima(self, id_tarefa):
+        return self._fila(id_tarefa).get(timeout=ESPERA_S)
+
+    def resultado(self, id_tarefa):
+        while True:
+            mensagem = self.proxima(id_tarefa)
+            if "resultado" in mensagem:
+                return mensagem["resultado"]
+
+    def executar(self, id_tarefa, tarefa, parametros, **opcoes):
+        self.enviar({"id": id_tarefa, "tarefa": tarefa, "parametros": parametros, **opcoes})
+        return self.resultado(id_tarefa)
+
+    def encerrar(self):
+        self.processo.stdin.close()
+        try:
+            self.processo.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.processo.kill()
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    servidor = Servidor("--workers", "1")
+    yield servidor
+    servidor.encerrar()
+
+
+def parametros_simulacao(dias=21, estrategia="grid-offpeak"):
+    potencias, timestamps = curva_sintetica(dias=dias)
+    return {
+        "potencias_kw": potencias,
+        "timestamps": timestamps,
+        "capacidade_bess_kwh": 400,
+        "potencia_bess_kw": 200,
+        "estrategia_carregamento": estrategia,
+        **TARIFAS,
+    }
+
+
+def test_respostas_associadas_pelo_id(servidor):
+    potencias, timestamps = curva_sintetica(dias=7)
+    servidor.enviar({"id": "analise", "tarefa": "analisar_curva_carga",
+                     "parametros": {"potencias": potencias, "timestamps": timestamps}})
+    servidor.enviar({"id": "desconhecida", "tarefa": "nao_existe", "parametros": {}})
+    servidor.enviar({"id": 7, "tarefa": "classificar_por_horario",
+                     "parametros": {"potencias": potencias, "timestamps": timestamps}})
+
+    assert servidor.resultado("analise")["sucesso"]
+    assert servidor.resultado(7)["sucesso"]
+    desconhecida = servidor.resultado("desconhecida")
+    assert not desconhecida["sucesso"]
+    assert "nao_existe" in desconhecida["erro"]
+
+
+def test_linha_invalida_responde_erro(servidor):
+    servidor.processo.stdin.write("{isto não é json\n")
+    servidor.processo.stdin.flush()
+
+    resposta = servidor.resultado(None)
+    assert not resposta["sucesso"]
+    assert "JSON inválido" in resposta["erro"]
+
+
+def test_resposta_sem_valores_nao_finitos(servidor):
+    # Sem economia o payback é infinito; deve chegar como null
+    resultado = servidor.executar("payback", "dimensionar_bess", {
+        "potencias_kw": [100.0] * 96 * 3,
+        "timestamps": [f"2024-01-0{1 + i // 96}T{(i % 96) // 4:02d}:{15 * (i % 4):02d}:00" for i in range(96 * 3)],
+        "tarifa_ponta": 0.5,
+        "tarifa_fora_ponta": 0.5,
+        "cobranca_demanda": 0,
+        "custo_investimento_reais": 1000,
+    })
+
+    assert resultado["sucesso"], resultado.get("erro")
+    assert resultado["payback"]["payback_anos"] is None
+
+
+def test_progresso_antes_da_resposta(servidor):
+    servidor.enviar({"id": "progresso", "tarefa": "simular_bess",
+                     "parametros": parametros_simulacao(), "progresso": True})
+
+    eventos = []
+    while True:
+        mensagem = servidor.proxima("progresso")
+        if "resultado" in mensagem:
+            break
+        eventos.append(mensagem["progresso"])
+
+    assert mensagem["resultado"]["sucesso"]
+    assert eventos and eventos[0]["etapa"] == "dias_simulados"
+    assert eventos[0]["total"] == 21
+
+
+def test_metricas_so_quando_pedidas(servidor):
+    parametros = parametros_simulacao(dias=7)
+
+    sem_metricas = servidor.executar("sem_metricas", "simular_bess", parametros)
+    com_metricas = servidor.executar("com_metricas", "simular_bess", parametros, metricas=True)
+    com_perfil = servidor.executar("com_perfil", "simular_bess", parametros, perfil="tracemalloc")
+
+    assert sem_metricas["sucesso"] and "metricas" not in sem_metricas
+    assert com_metricas["metricas"]["tarefa"] == "simular_bess"
+    assert com_metricas["metricas"]["espera_fila_s"] >= 0
+    assert "perfil" not in com_metricas["metricas"]
+    assert com_perfil["metricas"]["perfil"]["tipo"] == "tracemalloc"
+
+
+def test_cancelar_tarefa_em_execucao_e_na_fila(servidor):
+    longa = parametros_simulacao(dias=730, estrategia="otimo")
+    servidor.enviar({"id": "longa", "tarefa": "simular_bess", "parametros": longa, "progresso": True})
+    servidor.enviar({"id": "na_fila", "tarefa": "simular_bess", "parametros": longa})
+
+    # O primeiro progresso garante que a tarefa longa está no worker
+    assert "progresso" in servidor.proxima("longa")
+
+    # A tarefa na fila é respondida na hora, sem esperar a vez dela
+    assert servidor.executar("cancela_fila", "cancelar_tarefa", {"id": "na_fila"})["encontrada"]
+    assert servidor.resultado("na_fila")["cancelada"]
+    assert servidor.proxima("longa").get("progresso")
+    assert servidor.executar("cancela_longa", "cancelar_tarefa", {"id": "longa"})["encontrada"]
+    assert servidor.resultado("longa")["cancelada"]
+
+    # Id já concluído: nada a cancelar
+    assert not servidor.executar("cancela_de_novo", "cancelar_tarefa", {"id": "longa"})["encontrada"]
+
+    # O worker substituído continua atendendo
+    assert servidor.executar("depois", "simular_bess", parametros_simulacao(dias=7))["sucesso"]
+
+
+def test_timeout_substitui_worker(servidor):
+    resultado = servidor.executar(
+        "estoura", "simular_bess", parametros_simulacao(dias=730, estrategia="otimo"), timeout=0.5
+    )
+
+    assert not resultado["sucesso"]
+    assert resultado["erro"] == "Tempo limite excedido"
+    assert servidor.executar("seguinte", "simular_bess", parametros_simulacao(dias=7))["sucesso"]
+
+
+@pytest.fixture(scope="module")
+def servidor_fila_curta():
+    # Fila menor que os lotes de uma tarefa: o envio dos lotes bloqueia
+    servidor = Servidor("--workers", "2", "--max-queue", "2")
+    yield servidor
+    servidor.encerrar()
+
+
+def test_cancelar_monte_carlo_com_fila_cheia(servidor_fila_curta):
+    # 8 lotes de 500 cenários: enviados pelo leitor de stdin, o cancelamento
+    # só seria lido depois de 4 lotes concluídos (~20 s)
+    parametros = {**parametros_simulacao(dias=120), "cenarios": 4000, "semente": 1}
+    servidor_fila_curta.executar("aquece", "simular_bess", parametros_simulacao(dias=7))
+    servidor_fila_curta.enviar({"id": "mc", "tarefa": "monte_carlo_bess", "parametros": parametros})
+
+    inicio = time.monotonic()
+    assert servidor_fila_curta.executar("cancela_mc", "cancelar_tarefa", {"id": "mc"})["encontrada"]
+    resultado = servidor_fila_curta.resultado("mc")
+    assert time.monotonic() - inicio < 5
+    assert not resultado["sucesso"]
+    assert resultado["erro"] == "Tarefa cancelada"
+
+    parametros["cenarios"] = 40
+    assert servidor_fila_curta.executar("mc_depois", "monte_carlo_bess", parametros)["cenarios"] == 40
+
+
+def test_cancelar_corpus_com_fila_cheia(servidor_fila_curta, tmp_path):
+    servidor_fila_curta.enviar({"id": "corpus", "tarefa": "gerar_corpus", "parametros": {
+        "diretorio": str(tmp_path), "repeticoes": 10, "dias": 3, "semente": 1,
+    }})
+
+    assert servidor_fila_curta.executar("cancela_corpus", "cancelar_tarefa", {"id": "corpus"})["encontrada"]
+    resultado = servidor_fila_curta.resultado("corpus")
+    # Antes o cancelamento só era lido com quase todos os casos já na fila
+    assert resultado["total_casos"] == 150
+    assert resultado["casos_gerados"] < 75
+    assert any(falha.get("cancelada") for falha in resultado["falhas"])
+
+
+
+def test_portfolio_pendente_ate_a_resposta_final(tmp_path, monkeypatch):
+    # Pool sem workers: as subtarefas ficam na fila e são concluídas à mão
+    pool = PoolWorkers(num_workers=1)
+    liberar = threading.Event()
+    monkeypatch.setattr(portfolio_bess, "listar_sites", lambda *args: liberar.wait(ESPERA_S) and [])
+    respostas = queue.Queue()
+
+    arquivo = tmp_path / "medidores.csv"
+    arquivo.write_text("Time;Medidor A\n", encoding="utf-8")
+    pool.submeter({"id": "portfolio", "tarefa": "analisar_portfolio", "parametros": {
+        "arquivos": [str(arquivo)], "diretorio": str(tmp_path), **TARIFAS,
+    }}, respostas.put)
+    _, concluir, _, _ = pool.fila.get(timeout=ESPERA_S)
+    concluir({"id": "portfolio:arquivo:0", "resultado": {"sucesso": True, "medidores": []}})
+
+    # Arquivo ingerido e sites ainda não enviados: nenhuma subtarefa
+    # pendente, mas o portfólio não respondeu
+    assert not pool.ocioso()
+    liberar.set()
+    final = respostas.get(timeout=ESPERA_S)
+    assert final["resultado"]["sucesso"]
+    assert pool.ocioso()
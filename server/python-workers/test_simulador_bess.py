@@ -0,0 +1,276 @@
+"""
+Testes do simulador BESS
+
+O kernel vetorizado (despachar_soc) e a versão em lote são comparados com
+o laço passo a passo do motor original, que fica aqui como referência; a
+varredura (varrer_bess) é comparada com simulações isoladas e a
+simulação incremental (checkpoint) com uma simulação do zero. Também
+confere os passos sem medição e as amostras duplicadas da grade e a
+remoção dos arquivos de séries por idade e por tamanho.
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from casos_sinteticos import TARIFAS, curva_sintetica, montar_caso
+from despacho_otimo import DIAS_HORIZONTE
+from simulador_bess import (
+    caminho_series,
+    despachar_soc,
+    despachar_soc_lote,
+    limitar_series,
+    obter_series_simulacao,
+    simular_bess,
+    varrer_bess,
+)
+
+
+def despachar_referencia(
+    matriz,
+    limite_carga,
+    janela_descarga,
+    capacidade_kwh,
+    potencia_kw,
+    limiar_descarga_kw,
+    horas_passo=1.0,
+    soc_inicial_percent=50,
+    eficiencia_carga=1.0,
+    eficiencia_descarga=1.0,
+):
+    """
+    Laço passo a passo do motor original (carrega, depois descarrega).
+    """
+    n_dias, n_passos = matriz.shape
+    cargas = np.zeros((n_dias, n_passos))
+    descargas = np.zeros((n_dias, n_passos))
+    socs = np.zeros((n_dias, n_passos + 1))
+    socs_finais = []
+
+    soc_percent = soc_inicial_percent
+    for d in range(n_dias):
+        soc = (soc_percent / 100) * capacidade_kwh
+        socs[d, 0] = soc
+        for p in range(n_passos):
+            if limite_carga[p] > 0 and soc < capacidade_kwh:
+                energia = min(limite_carga[p], (capacidade_kwh - soc) / eficiencia_carga)
+                soc += energia * eficiencia_carga
+                cargas[d, p] = energia
+            if janela_descarga[p]:
+                alvo = min(potencia_kw * horas_passo, max(0, matriz[d, p] - limiar_descarga_kw) * horas_passo)
+                energia = min(alvo, soc * eficiencia_descarga)
+                if energia > 0:
+                    soc -= energia / eficiencia_descarga
+                    descargas[d, p] = energia
+            socs[d, p + 1] = soc
+        soc_percent = round((soc / capacidade_kwh) * 100, 1)
+        socs_finais.append(soc_percent)
+
+    return cargas, descargas, socs, socs_finais
+
+
+@pytest.mark.parametrize("passos_por_dia", [24, 96])
+@pytest.mark.parametrize("misto", [False, True])
+@pytest.mark.parametrize("eficiencias", [(1.0, 1.0), (0.95, 0.92)])
+def test_despachar_soc_igual_ao_laco(passos_por_dia, misto, eficiencias):
+    rng = np.random.default_rng(passos_por_dia + misto)
+    matriz, limite_carga, janela = montar_caso(rng, 30, passos_por_dia, misto)
+    horas_passo = 24 / passos_por_dia
+    argumentos = dict(
+        capacidade_kwh=400.0,
+        potencia_kw=150.0,
+        limiar_descarga_kw=420.0,
+        horas_passo=horas_passo,
+        soc_inicial_percent=35,
+        eficiencia_carga=eficiencias[0],
+        eficiencia_descarga=eficiencias[1],
+    )
+
+    cargas, descargas, socs, finais = despachar_soc(matriz, limite_carga, janela, **argumentos)
+    ref_cargas, ref_descargas, ref_socs, ref_finais = despachar_referencia(matriz, limite_carga, janela, **argumentos)
+
+    np.testing.assert_allclose(cargas, ref_cargas, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(descargas, ref_descargas, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(socs, ref_socs, rtol=0, atol=1e-9)
+    assert finais == ref_finais
+
+
+def test_despachar_soc_lote_igual_a_execucoes_isoladas():
+    rng = np.random.default_rng(7)
+    matriz, limite_unitario, janela = montar_caso(rng, 20, 96, misto=True)
+    tarifas = np.where(janela, 1.8, 0.45)[None, :].repeat(len(matriz), axis=0)
+    capacidades = np.array([100.0, 350.0, 800.0])
+    potencias = np.array([50.0, 120.0, 400.0])
+    # Limite de carga proporcional à potência de cada candidato
+    limites = limite_unitario[None, :] * (potencias / 80.0)[:, None]
+
+    lote = despachar_soc_lote(
+        matriz, tarifas, limites, janela, capacidades, potencias,
+        limiar_descarga_kw=420.0, cobrar_carga=True, horas_passo=0.25,
+        eficiencia_carga=0.95, eficiencia_descarga=0.95,
+    )
+
+    for k in range(len(capacidades)):
+        cargas, descargas, _, _ = despachar_soc(
+            matriz, limites[k], janela, capacidades[k], potencias[k], 420.0,
+            horas_passo=0.25, eficiencia_carga=0.95, eficiencia_descarga=0.95,
+        )
+        np.testing.assert_allclose(lote["energia_carregada_kwh"][:, k], cargas.sum(axis=1), atol=1e-9)
+        np.testing.assert_allclose(lote["energia_descarregada_kwh"][:, k], descargas.sum(axis=1), atol=1e-9)
+        np.testing.assert_allclose(lote["custo_carregamento_reais"][:, k], (cargas * tarifas).sum(axis=1), atol=1e-9)
+        np.testing.assert_allclose(lote["economia_descarga_reais"][:, k], (descargas * tarifas).sum(axis=1), atol=1e-9)
+        np.testing.assert_allclose(
+            lote["demanda_max_com_bess_kw"][:, k], (matriz - descargas / 0.25).max(axis=1), atol=1e-9
+        )
+
+
+@pytest.mark.parametrize("estrategia", ["grid-offpeak", "solar", "otimo"])
+def test_varrer_bess_igual_a_simulacoes_isoladas(estrategia):
+    potencias, timestamps = curva_sintetica()
+    capacidades = [150.0, 400.0, 900.0]
+    potencias_bess = [75.0, 200.0, 300.0]
+
+    varredura = varrer_bess(
+        potencias, timestamps, capacidades, potencias_bess, [estrategia],
+        custo_kwh_reais=1500, custo_kw_reais=800, eficiencia_carga=0.95, eficiencia_descarga=0.95, **TARIFAS,
+    )
+    assert varredura["sucesso"], varredura.get("erro")
+    colunas = varredura["resultados"]
+    assert varredura["total_candidatos"] == len(capacidades)
+
+    for k, (capacidade, potencia) in enumerate(zip(capacidades, potencias_bess)):
+        isolada = simular_bess(
+            potencias, timestamps, capacidade, potencia, estrategia,
+            detalhe="completo", eficiencia_carga=0.95, eficiencia_descarga=0.95, **TARIFAS,
+        )
+        assert isolada["sucesso"], isolada.get("erro")
+        resumo = isolada["resumo"]
+        assert colunas["economia_total_periodo_reais"][k] == pytest.approx(resumo["economia_total_periodo_reais"], abs=0.011)
+        assert colunas["economia_anual_estimada_reais"][k] == pytest.approx(resumo["economia_anual_estimada_reais"], abs=0.011)
+        assert colunas["reducao_demanda_media_kw"][k] == pytest.approx(resumo["reducao_demanda_media_kw"], abs=0.011)
+    assert max(colunas["economia_total_periodo_reais"]) > 0
+
+
+@pytest.mark.parametrize("estrategia", ["solar", "grid-offpeak", "otimo"])
+def test_incremental_igual_a_simulacao_do_zero(estrategia, tmp_path):
+    potencias, timestamps = curva_sintetica()
+    # Pico nos primeiros dias: os dias acrescentados não mudam o limiar de descarga
+    potencias[40] = max(potencias) + 50
+    checkpoint = str(tmp_path / "checkpoint.npz")
+    dias_refeitos = DIAS_HORIZONTE - 1 if estrategia == "otimo" else 0
+
+    def comparar(potencias, timestamps, tarifas, reaproveitados):
+        argumentos = dict(detalhe="completo", eficiencia_carga=0.95, eficiencia_descarga=0.95, **tarifas)
+        incremental = simular_bess(
+            potencias, timestamps, 400, 200, estrategia, caminho_checkpoint=checkpoint, **argumentos
+        )
+        do_zero = simular_bess(potencias, timestamps, 400, 200, estrategia, **argumentos)
+        assert incremental["sucesso"], incremental.get("erro")
+
+        dias = len(timestamps) // 96
+        assert incremental["incremental"] == {
+            "dias_reaproveitados": reaproveitados,
+            "dias_despachados": dias - reaproveitados,
+        }
+        assert incremental["resumo"] == pytest.approx(do_zero["resumo"], abs=0.011)
+        assert len(incremental["resultados_diarios"]) == dias
+        for dia, referencia in zip(incremental["resultados_diarios"], do_zero["resultados_diarios"]):
+            assert dia == pytest.approx(referencia, abs=0.011)
+
+    # 14 dias do zero; depois mais 7 dias acrescentados
+    comparar(potencias[:14 * 96], timestamps[:14 * 96], TARIFAS, 0)
+    comparar(potencias, timestamps, TARIFAS, 14 - dias_refeitos)
+
+    # Só as tarifas mudam: nada é despachado de novo, exceto no ótimo (as
+    # tarifas entram na impressão de cada dia útil, a partir do primeiro)
+    novas_tarifas = {**TARIFAS, "tarifa_ponta": 2.4}
+    comparar(potencias, timestamps, novas_tarifas, 0 if estrategia == "otimo" else 21)
+
+    # Um passo do dia 17 editado: o despacho recomeça nesse dia
+    editadas = list(potencias)
+    editadas[17 * 96 + 75] -= 120
+    comparar(editadas, timestamps, novas_tarifas, 17 - dias_refeitos)
+
+
+@pytest.mark.parametrize("estrategia", ["grid-offpeak", "solar", "otimo"])
+def test_passos_sem_medicao_nao_despacham(estrategia):
+    potencias, timestamps = curva_sintetica(dias=7)
+    # Dia 3 sem a madrugada (carga fora de ponta) nem as 18h-21h (ponta)
+    faltando = set(range(3 * 96, 3 * 96 + 24)) | set(range(3 * 96 + 72, 3 * 96 + 84))
+    potencias = [p for i, p in enumerate(potencias) if i not in faltando]
+    timestamps = [t for i, t in enumerate(timestamps) if i not in faltando]
+
+    resultado = simular_bess(potencias, timestamps, 400, 200, estrategia, detalhe="completo", **TARIFAS)
+
+    assert resultado["sucesso"], resultado.get("erro")
+    assert resultado["resumo"]["qualidade_dados"] == {
+        "passos_sem_medicao": len(faltando),
+        "amostras_duplicadas": 0,
+        "amostras_desalinhadas": 0,
+    }
+    dia = resultado["resultados_diarios"][3]
+    socs = np.array(dia["socs"])
+    for passo in sorted(p - 3 * 96 for p in faltando):
+        assert socs[passo + 1] == socs[passo]
+        assert dia["potencias_com_bess"][passo] == dia["potencias_original"][passo] == 0
+    assert resultado["resumo"]["economia_total_periodo_reais"] > 0
+
+    # A varredura (kernel em lote) respeita os mesmos passos
+    varredura = varrer_bess(potencias, timestamps, [400], [200], [estrategia], **TARIFAS)
+    assert varredura["qualidade_dados"] == resultado["resumo"]["qualidade_dados"]
+    assert varredura["resultados"]["economia_total_periodo_reais"][0] == pytest.approx(
+        resultado["resumo"]["economia_total_periodo_reais"], abs=0.011
+    )
+
+
+def test_amostras_duplicadas_entram_pela_media():
+    potencias, timestamps = curva_sintetica(dias=3)
+    # Repetição do passo 10 do dia 1 e uma amostra às 00:07 do dia 2
+    potencias += [potencias[96 + 10] + 100, 500.0]
+    timestamps += [timestamps[96 + 10], "2024-03-06T00:07:00"]
+
+    resultado = simular_bess(potencias, timestamps, 400, 200, "grid-offpeak", detalhe="completo", **TARIFAS)
+
+    assert resultado["sucesso"], resultado.get("erro")
+    assert resultado["resumo"]["qualidade_dados"] == {
+        "passos_sem_medicao": 0,
+        "amostras_duplicadas": 2,
+        "amostras_desalinhadas": 1,
+    }
+    dias = resultado["resultados_diarios"]
+    assert dias[1]["potencias_original"][10] == pytest.approx(round(potencias[96 + 10] + 50, 1), abs=0.051)
+    assert dias[2]["potencias_original"][0] == pytest.approx(round((potencias[2 * 96] + 500) / 2, 1), abs=0.051)
+
+    completa = simular_bess(*curva_sintetica(dias=3), 400, 200, "grid-offpeak", **TARIFAS)
+    assert "qualidade_dados" not in completa["resumo"]
+
+
+def test_limitar_series_por_idade_e_tamanho(tmp_path):
+    diretorio = str(tmp_path)
+    ids = []
+    for semente in range(4):
+        potencias, timestamps = curva_sintetica(dias=7, semente=semente)
+        resultado = simular_bess(potencias, timestamps, 400, 200, "grid-offpeak", diretorio_series=diretorio, **TARIFAS)
+        assert resultado["sucesso"], resultado.get("erro")
+        ids.append(resultado["series"]["id"])
+    assert len(os.listdir(diretorio)) == 4
+
+    # Sem acesso há 10 dias: expirada
+    agora = time.time()
+    os.utime(caminho_series(ids[0], diretorio), (agora - 10 * 86400,) * 2)
+    assert limitar_series(diretorio)["removidos"] == 1
+    assert "expiradas" in obter_series_simulacao(ids[0], diretorio_series=diretorio)["erro"]
+
+    # Acima do limite sai a acessada há mais tempo; a leitura conta como acesso
+    os.utime(caminho_series(ids[1], diretorio), (agora - 200,) * 2)
+    os.utime(caminho_series(ids[2], diretorio), (agora - 100,) * 2)
+    assert obter_series_simulacao(ids[1], diretorio_series=diretorio)["sucesso"]
+    tamanho = os.path.getsize(caminho_series(ids[1], diretorio))
+
+    resumo = limitar_series(diretorio, max_bytes=2 * tamanho + 1024)
+
+    assert resumo["removidos"] == 1
+    assert sorted(os.listdir(diretorio)) == sorted(f"{i}.npz" for i in (ids[1], ids[3]))
+    assert resumo["bytes"] == sum(os.path.getsize(os.path.join(diretorio, nome)) for nome in os.listdir(diretorio))
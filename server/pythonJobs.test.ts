@@ -0,0 +1,285 @@
+/**
+ * TESTES: Jobs assíncronos Python
+ *
+ * Valida a fila de jobs (limite de execução, ordem de chegada, posições),
+ * o cancelamento e a rota de server-sent events, com o pool de workers
+ * Python substituído por tarefas controladas pelo teste.
+ */
+
+import { EventEmitter } from "events";
+import { afterEach, beforeEach, describe, expect, it, vi } from "vitest";
+import type { ProgressEvent, TaskOptions } from "./pythonWorkerPool";
+
+type TarefaFalsa = {
+  id: number;
+  task: string;
+  params: Record<string, unknown>;
+  options: TaskOptions;
+  resolve: (value: any) => void;
+};
+
+const pool = vi.hoisted(() => ({
+  tarefas: [] as TarefaFalsa[],
+  proximoId: 1,
+}));
+
+vi.mock("./pythonWorkerPool", () => ({
+  submitPythonTask: vi.fn((task: string, params: Record<string, unknown>, options: TaskOptions = {}) => {
+    const id = pool.proximoId++;
+    const result = new Promise<any>((resolve) => {
+      pool.tarefas.push({ id, task, params, options, resolve });
+    });
+    return { id, result };
+  }),
+  // Como o servidor Python: a tarefa em execução termina com `cancelada`
+  cancelPythonTask: vi.fn(async (id: number) => {
+    const tarefa = pool.tarefas.find((t) => t.id === id);
+    tarefa?.resolve({ sucesso: false, cancelada: true, erro: "Tarefa cancelada" });
+    return Boolean(tarefa);
+  }),
+}));
+
+/**
+ * Carrega pythonJobs de novo (estado e limites lidos do ambiente)
+ */
+async function carregarJobs(maxJobs = "2", maxFila = "3") {
+  vi.stubEnv("PYTHON_MAX_JOBS", maxJobs);
+  vi.stubEnv("PYTHON_MAX_QUEUED_JOBS", maxFila);
+  vi.resetModules();
+  const jobs = await import("./pythonJobs");
+  const workers = await import("./pythonWorkerPool");
+  return { ...jobs, submitPythonTask: vi.mocked(workers.submitPythonTask) };
+}
+
+/**
+ * Deixa rodar as continuações das promessas (conclusão dos jobs)
+ */
+function esperarPromessas(): Promise<void> {
+  return new Promise((resolve) => setImmediate(resolve));
+}
+
+function tarefaDoJob(ordem: number): TarefaFalsa {
+  return pool.tarefas[ordem];
+}
+
+describe("Fila de jobs Python", () => {
+  beforeEach(() => {
+    pool.tarefas = [];
+    pool.proximoId = 1;
+  });
+
+  afterEach(() => {
+    vi.unstubAllEnvs();
+  });
+
+  it("deve limitar os jobs em execução a PYTHON_MAX_JOBS", async () => {
+    const { submitJob, getJobStatus } = await carregarJobs("2", "10");
+
+    const ids = ["a", "b", "c", "d"].map((nome) => submitJob("simular_bess", { nome }).id);
+
+    expect(pool.tarefas).toHaveLength(2);
+    expect(ids.map((id) => getJobStatus(id)?.state)).toEqual(["running", "running", "queued", "queued"]);
+  });
+
+  it("deve iniciar os jobs da fila em ordem de chegada", async () => {
+    const { submitJob, getJobStatus } = await carregarJobs("1", "10");
+
+    const ids = ["a", "b", "c"].map((nome) => submitJob("varrer_bess", { nome }).id);
+    expect(pool.tarefas.map((t) => t.params.nome)).toEqual(["a"]);
+
+    tarefaDoJob(0).resolve({ sucesso: true });
+    await esperarPromessas();
+    expect(pool.tarefas.map((t) => t.params.nome)).toEqual(["a", "b"]);
+    expect(getJobStatus(ids[0])?.state).toBe("succeeded");
+
+    // Uma falha também libera a vaga
+    tarefaDoJob(1).resolve({ sucesso: false, erro: "Curva vazia" });
+    await esperarPromessas();
+    expect(pool.tarefas.map((t) => t.params.nome)).toEqual(["a", "b", "c"]);
+    expect(getJobStatus(ids[1])).toMatchObject({ state: "failed", error: "Curva vazia" });
+  });
+
+  it("deve atualizar a posição na fila", async () => {
+    const { submitJob, getJobStatus, subscribeJob } = await carregarJobs("1", "10");
+
+    const primeiro = submitJob("simular_bess", {});
+    const segundo = submitJob("simular_bess", {});
+    const terceiro = submitJob("simular_bess", {});
+    expect([primeiro.queuePosition, segundo.queuePosition, terceiro.queuePosition]).toEqual([null, 1, 2]);
+
+    const posicoes: Array<number | null> = [];
+    subscribeJob(terceiro.id, (evento) => {
+      if (evento.type === "state") {
+        posicoes.push(evento.status.queuePosition);
+      }
+    });
+
+    tarefaDoJob(0).resolve({ sucesso: true });
+    await esperarPromessas();
+    expect(getJobStatus(segundo.id)).toMatchObject({ state: "running", queuePosition: null });
+    expect(getJobStatus(terceiro.id)?.queuePosition).toBe(1);
+
+    tarefaDoJob(1).resolve({ sucesso: true });
+    await esperarPromessas();
+    expect(posicoes).toEqual([1, null]);
+    expect(getJobStatus(terceiro.id)?.state).toBe("running");
+  });
+
+  it("deve cancelar um job na fila sem chamar o Python", async () => {
+    const { submitJob, cancelJob, getJobStatus, getJobResult } = await carregarJobs("1", "10");
+    const workers = await import("./pythonWorkerPool");
+
+    const emExecucao = submitJob("simular_bess", {});
+    const naFila = submitJob("simular_bess", {});
+    const depois = submitJob("simular_bess", {});
+
+    expect(await cancelJob(naFila.id)).toBe(true);
+
+    expect(workers.cancelPythonTask).not.toHaveBeenCalled();
+    expect(getJobResult(naFila.id)?.status).toMatchObject({ state: "cancelled", error: "Tarefa cancelada" });
+    expect(getJobStatus(depois.id)?.queuePosition).toBe(1);
+    expect(getJobStatus(emExecucao.id)?.state).toBe("running");
+    expect(pool.tarefas).toHaveLength(1);
+
+    // Já concluído: nada a cancelar
+    expect(await cancelJob(naFila.id)).toBe(false);
+  });
+
+  it("deve cancelar um job em execução pelo servidor Python", async () => {
+    const { submitJob, cancelJob, getJobStatus } = await carregarJobs("1", "10");
+    const workers = await import("./pythonWorkerPool");
+
+    const emExecucao = submitJob("monte_carlo_bess", {});
+    const naFila = submitJob("simular_bess", {});
+
+    expect(await cancelJob(emExecucao.id)).toBe(true);
+    await esperarPromessas();
+
+    expect(workers.cancelPythonTask).toHaveBeenCalledWith(tarefaDoJob(0).id);
+    expect(getJobStatus(emExecucao.id)?.state).toBe("cancelled");
+    // A vaga liberada vai para o próximo da fila
+    expect(getJobStatus(naFila.id)?.state).toBe("running");
+  });
+
+  it("deve recusar jobs com a fila cheia", async () => {
+    const { submitJob, getJobStatus } = await carregarJobs("1", "2");
+
+    submitJob("simular_bess", {});
+    submitJob("simular_bess", {});
+    const ultimo = submitJob("simular_bess", {});
+
+    expect(() => submitJob("simular_bess", {})).toThrow("Fila de jobs cheia");
+    expect(getJobStatus(ultimo.id)?.queuePosition).toBe(2);
+
+    // Com uma vaga na fila, volta a aceitar
+    tarefaDoJob(0).resolve({ sucesso: true });
+    await esperarPromessas();
+    expect(submitJob("simular_bess", {}).queuePosition).toBe(2);
+  });
+
+  it("deve repassar parâmetros e timeout ao pool", async () => {
+    const { submitJob, submitPythonTask } = await carregarJobs();
+
+    submitJob("simular_bess", { potencias_kw: [1, 2, 3] }, 30);
+
+    expect(submitPythonTask).toHaveBeenCalledWith(
+      "simular_bess",
+      { potencias_kw: [1, 2, 3] },
+      expect.objectContaining({ timeoutSeconds: 30 })
+    );
+  });
+});
+
+describe("Rota de eventos dos jobs", () => {
+  type Rota = (req: any, res: any) => void;
+
+  function montarRota(registrar: (app: any) => void): Rota {
+    let rota: Rota | undefined;
+    registrar({ get: (_caminho: string, handler: Rota) => (rota = handler) });
+    return rota!;
+  }
+
+  function montarResposta() {
+    const blocos: string[] = [];
+    const res = {
+      blocos,
+      statusCode: 200,
+      writeHead: vi.fn(),
+      write: vi.fn((bloco: string) => blocos.push(bloco)),
+      end: vi.fn(),
+      status(codigo: number) {
+        this.statusCode = codigo;
+        return this;
+      },
+      json: vi.fn(),
+    };
+    return res;
+  }
+
+  function eventos(blocos: string[]): string[] {
+    return blocos.map((bloco) => bloco.split("\n")[0].replace("event: ", ""));
+  }
+
+  beforeEach(() => {
+    pool.tarefas = [];
+    pool.proximoId = 1;
+  });
+
+  afterEach(() => {
+    vi.unstubAllEnvs();
+  });
+
+  it("deve enviar estado, progresso e parciais e fechar no estado final", async () => {
+    const { submitJob, registerJobEventsRoute } = await carregarJobs();
+    const rota = montarRota(registerJobEventsRoute);
+    const job = submitJob("analisar_portfolio", {});
+    const req = Object.assign(new EventEmitter(), { params: { id: job.id } });
+    const res = montarResposta();
+
+    rota(req, res);
+
+    expect(res.writeHead).toHaveBeenCalledWith(200, expect.objectContaining({ "Content-Type": "text/event-stream" }));
+    expect(res.blocos[0]).toContain('"state":"running"');
+
+    const progresso: ProgressEvent = { etapa: "sites", feitos: 1, total: 3 };
+    tarefaDoJob(0).options.onProgress?.(progresso);
+    tarefaDoJob(0).options.onPartial?.({ medidor: "A" });
+    tarefaDoJob(0).resolve({ sucesso: true });
+    await esperarPromessas();
+
+    expect(eventos(res.blocos)).toEqual(["state", "progress", "partial", "state"]);
+    expect(res.blocos[3]).toContain('"state":"succeeded"');
+    expect(res.end).toHaveBeenCalledTimes(1);
+
+    // Depois de fechada, a conexão não recebe mais eventos
+    tarefaDoJob(0).options.onProgress?.(progresso);
+    expect(res.blocos).toHaveLength(4);
+  });
+
+  it("deve responder e fechar na hora para um job já concluído", async () => {
+    const { submitJob, cancelJob, registerJobEventsRoute } = await carregarJobs("1", "10");
+    const rota = montarRota(registerJobEventsRoute);
+    submitJob("simular_bess", {});
+    const cancelado = submitJob("simular_bess", {});
+    await cancelJob(cancelado.id);
+    const res = montarResposta();
+
+    rota(Object.assign(new EventEmitter(), { params: { id: cancelado.id } }), res);
+
+    expect(eventos(res.blocos)).toEqual(["state"]);
+    expect(res.blocos[0]).toContain('"state":"cancelled"');
+    expect(res.end).toHaveBeenCalledTimes(1);
+  });
+
+  it("deve responder 404 para um job desconhecido", async () => {
+    const { registerJobEventsRoute } = await carregarJobs();
+    const rota = montarRota(registerJobEventsRoute);
+    const res = montarResposta();
+
+    rota(Object.assign(new EventEmitter(), { params: { id: "nao-existe" } }), res);
+
+    expect(res.statusCode).toBe(404);
+    expect(res.json).toHaveBeenCalledWith({ erro: "Job não encontrado" });
+    expect(res.writeHead).not.toHaveBeenCalled();
+  });
+});
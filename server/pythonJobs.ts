@@ -0,0 +1,309 @@
+/**
+ * CLIENTE: Jobs assíncronos sobre o pool de workers Python
+ *
+ * Simulações de um ano, varreduras, Monte Carlo e portfólios podem levar
+ * minutos; em vez de prender a mutation até o fim, o job é submetido, o
+ * id volta na hora e o cliente acompanha o andamento por consulta
+ * (`getJobStatus`) ou por server-sent events (`/api/jobs/:id/events`).
+ *
+ * No máximo PYTHON_MAX_JOBS jobs rodam ao mesmo tempo (padrão: 2); os
+ * demais esperam na fila em ordem de chegada, até PYTHON_MAX_QUEUED_JOBS.
+ * Assim uma rajada de usuários não disputa todos os workers de uma vez.
+ * Jobs concluídos ficam disponíveis por JOB_RETENTION_MS.
+ */
+
+import { EventEmitter } from "events";
+import { randomUUID } from "crypto";
+import type { Express, Request, Response } from "express";
+import {
+  cancelPythonTask,
+  submitPythonTask,
+  type ProgressEvent,
+  type PythonTask,
+} from "./pythonWorkerPool";
+
+const MAX_RUNNING_JOBS = parsePositiveInt(process.env.PYTHON_MAX_JOBS, 2);
+const MAX_QUEUED_JOBS = parsePositiveInt(process.env.PYTHON_MAX_QUEUED_JOBS, 100);
+const JOB_RETENTION_MS = 60 * 60 * 1000;
+
+/**
+ * Tarefas que podem ser executadas como job
+ */
+export const JOB_TASKS = [
+  "simular_bess",
+  "varrer_bess",
+  "dimensionar_bess",
+  "monte_carlo_bess",
+  "analisar_portfolio",
+] as const satisfies readonly PythonTask[];
+
+export type JobTask = (typeof JOB_TASKS)[number];
+
+export type JobState = "queued" | "running" | "succeeded" | "failed" | "cancelled";
+
+type Job = {
+  id: string;
+  task: JobTask;
+  params: Record<string, unknown>;
+  timeoutSeconds?: number;
+  state: JobState;
+  progress: Record<string, ProgressEvent>;
+  partials: number;
+  result?: any;
+  error?: string;
+  pythonTaskId?: number;
+  createdAt: number;
+  startedAt?: number;
+  finishedAt?: number;
+};
+
+/**
+ * Estado público de um job (sem parâmetros nem resultado)
+ */
+export type JobStatus = {
+  id: string;
+  task: JobTask;
+  state: JobState;
+  queuePosition: number | null;
+  progress: ProgressEvent[];
+  partials: number;
+  error?: string;
+  createdAt: number;
+  startedAt?: number;
+  finishedAt?: number;
+};
+
+/**
+ * Eventos emitidos por job: mudança de estado, progresso e parciais
+ */
+export type JobEvent =
+  | { type: "state"; status: JobStatus }
+  | { type: "progress"; progress: ProgressEvent }
+  | { type: "partial"; partial: any };
+
+const jobs = new Map<string, Job>();
+const waiting: string[] = [];
+const events = new EventEmitter();
+events.setMaxListeners(0);
+let running = 0;
+
+function parsePositiveInt(value: string | undefined, fallback: number): number {
+  const parsed = Number.parseInt(value ?? "", 10);
+  return Number.isFinite(parsed) && parsed > 0 ? parsed : fallback;
+}
+
+function isFinished(state: JobState): boolean {
+  return state === "succeeded" || state === "failed" || state === "cancelled";
+}
+
+function toStatus(job: Job): JobStatus {
+  const position = waiting.indexOf(job.id);
+  return {
+    id: job.id,
+    task: job.task,
+    state: job.state,
+    queuePosition: position >= 0 ? position + 1 : null,
+    progress: Object.values(job.progress),
+    partials: job.partials,
+    error: job.error,
+    createdAt: job.createdAt,
+    startedAt: job.startedAt,
+    finishedAt: job.finishedAt,
+  };
+}
+
+function emit(job: Job, event: JobEvent): void {
+  events.emit(job.id, event);
+}
+
+function finish(job: Job, state: JobState, result?: any, error?: string): void {
+  job.state = state;
+  job.result = result;
+  job.error = error;
+  job.finishedAt = Date.now();
+  emit(job, { type: "state", status: toStatus(job) });
+
+  // Libera o resultado da memória depois do prazo de retenção
+  setTimeout(() => jobs.delete(job.id), JOB_RETENTION_MS).unref();
+}
+
+/**
+ * Inicia jobs da fila enquanto houver vaga
+ */
+function startWaitingJobs(): void {
+  while (running < MAX_RUNNING_JOBS && waiting.length > 0) {
+    const job = jobs.get(waiting.shift()!);
+    if (!job || job.state !== "queued") {
+      continue;
+    }
+    running++;
+    job.state = "running";
+    job.startedAt = Date.now();
+    emit(job, { type: "state", status: toStatus(job) });
+
+    const { id, result } = submitPythonTask(job.task, job.params, {
+      timeoutSeconds: job.timeoutSeconds,
+      onProgress: (progress) => {
+        job.progress[progress.etapa] = progress;
+        emit(job, { type: "progress", progress });
+      },
+      onPartial: (partial) => {
+        job.partials++;
+        emit(job, { type: "partial", partial });
+      },
+    });
+    job.pythonTaskId = id;
+    // As curvas de um ano pesam alguns MB; não precisam ficar retidas no job
+    job.params = {};
+
+    result
+      .then((value) => {
+        if (value?.cancelada) {
+          finish(job, "cancelled", value, value.erro);
+        } else if (!value || value.sucesso === false) {
+          finish(job, "failed", value, value?.erro || "Erro desconhecido");
+        } else {
+          finish(job, "succeeded", value);
+        }
+      })
+      .catch((error: Error) => finish(job, "failed", undefined, error.message))
+      .finally(() => {
+        running--;
+        startWaitingJobs();
+      });
+  }
+
+  // As posições na fila mudaram
+  waiting.forEach((id) => {
+    const job = jobs.get(id);
+    if (job) {
+      emit(job, { type: "state", status: toStatus(job) });
+    }
+  });
+}
+
+/**
+ * Submete um job e retorna sem esperar a execução
+ *
+ * @param task - Tarefa Python (uma de JOB_TASKS)
+ * @param params - Argumentos nomeados da função Python
+ * @param timeoutSeconds - Tempo limite da execução (não conta a espera na fila)
+ * @returns Estado inicial do job
+ */
+export function submitJob(
+  task: JobTask,
+  params: Record<string, unknown>,
+  timeoutSeconds?: number
+): JobStatus {
+  if (waiting.length >= MAX_QUEUED_JOBS) {
+    throw new Error("Fila de jobs cheia, tente novamente mais tarde");
+  }
+
+  const job: Job = {
+    id: randomUUID(),
+    task,
+    params,
+    timeoutSeconds,
+    state: "queued",
+    progress: {},
+    partials: 0,
+    createdAt: Date.now(),
+  };
+  jobs.set(job.id, job);
+  waiting.push(job.id);
+  startWaitingJobs();
+  return toStatus(job);
+}
+
+/**
+ * Estado, posição na fila e último progresso de cada etapa
+ */
+export function getJobStatus(jobId: string): JobStatus | null {
+  const job = jobs.get(jobId);
+  return job ? toStatus(job) : null;
+}
+
+/**
+ * Resultado de um job concluído (null enquanto não terminar)
+ */
+export function getJobResult(jobId: string): { status: JobStatus; result: any } | null {
+  const job = jobs.get(jobId);
+  if (!job || !isFinished(job.state)) {
+    return null;
+  }
+  return { status: toStatus(job), result: job.result };
+}
+
+/**
+ * Cancela um job na fila (na hora) ou em execução (via servidor Python)
+ *
+ * @returns false se o job não existe ou já terminou
+ */
+export async function cancelJob(jobId: string): Promise<boolean> {
+  const job = jobs.get(jobId);
+  if (!job || isFinished(job.state)) {
+    return false;
+  }
+
+  if (job.state === "queued") {
+    waiting.splice(waiting.indexOf(job.id), 1);
+    finish(job, "cancelled", undefined, "Tarefa cancelada");
+    startWaitingJobs();
+    return true;
+  }
+
+  // A promessa da tarefa resolve com `cancelada` e conclui o job
+  return cancelPythonTask(job.pythonTaskId!);
+}
+
+/**
+ * Assina os eventos de um job
+ *
+ * @returns Função que cancela a assinatura
+ */
+export function subscribeJob(jobId: string, listener: (event: JobEvent) => void): () => void {
+  events.on(jobId, listener);
+  return () => events.off(jobId, listener);
+}
+
+/**
+ * Registra `GET /api/jobs/:id/events` (server-sent events)
+ *
+ * O primeiro evento é o estado atual; a conexão é fechada quando o job
+ * termina. Eventos: `state`, `progress` e `partial`.
+ */
+export function registerJobEventsRoute(app: Express): void {
+  app.get("/api/jobs/:id/events", (req: Request, res: Response) => {
+    const job = jobs.get(req.params.id);
+    if (!job) {
+      res.status(404).json({ erro: "Job não encontrado" });
+      return;
+    }
+
+    res.writeHead(200, {
+      "Content-Type": "text/event-stream",
+      "Cache-Control": "no-cache",
+      Connection: "keep-alive",
+    });
+
+    const send = (event: JobEvent) => {
+      const { type, ...data } = event;
+      res.write(`event: ${type}\ndata: ${JSON.stringify(data)}\n\n`);
+    };
+
+    send({ type: "state", status: toStatus(job) });
+    if (isFinished(job.state)) {
+      res.end();
+      return;
+    }
+
+    const unsubscribe = subscribeJob(job.id, (event) => {
+      send(event);
+      if (event.type === "state" && isFinished(event.status.state)) {
+        unsubscribe();
+        res.end();
+      }
+    });
+    req.on("close", unsubscribe);
+  });
+}
@@ -0,0 +1,292 @@
+/**
+ * CLIENTE: Pool persistente de workers Python
+ *
+ * Mantém um único processo `servidor_workers.py` vivo e envia tarefas como
+ * JSON delimitado por nova linha, evitando iniciar um `python3` por
+ * requisição. As respostas são associadas às requisições pelo `id`.
+ * Tarefas longas (ex.: analisar_portfolio) podem enviar respostas
+ * parciais antes da final; elas vão para o callback `onPartial`. Com
+ * `onProgress`, o servidor também envia eventos de andamento (dias
+ * simulados, candidatos avaliados...) enquanto a tarefa roda.
+ */
+
+import { spawn, type ChildProcessWithoutNullStreams } from "child_process";
+import { createInterface } from "readline";
+import path from "path";
+import { fileURLToPath } from "url";
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+const SERVER_SCRIPT = path.join(__dirname, "python-workers/servidor_workers.py");
+
+/**
+ * Tarefas disponíveis no servidor Python
+ */
+export type PythonTask =
+  | "parsear_arquivo_excel"
+  | "parsear_arquivo_streaming"
+  | "analisar_curva_carga"
+  | "classificar_por_horario"
+  | "dimensionar_bess"
+  | "simular_bess"
+  | "varrer_bess"
+  | "obter_series_simulacao"
+  | "gerar_caso_teste"
+  | "monte_carlo_bess"
+  | "gerar_corpus"
+  | "separar_medidores"
+  | "analisar_site"
+  | "analisar_portfolio"
+  | "estatisticas_cache"
+  | "cancelar_tarefa";
+
+/**
+ * Evento de andamento de uma tarefa (total null quando ainda desconhecido)
+ */
+export type ProgressEvent = {
+  etapa: string;
+  feitos: number;
+  total: number | null;
+};
+
+export type TaskOptions = {
+  timeoutSeconds?: number;
+  metrics?: MetricsOption;
+  onPartial?: (partial: any) => void;
+  onProgress?: (event: ProgressEvent) => void;
+};
+
+type PendingJob = {
+  task: PythonTask;
+  resolve: (value: any) => void;
+  reject: (error: Error) => void;
+  onPartial?: (partial: any) => void;
+  onProgress?: (event: ProgressEvent) => void;
+  timeoutMs: number;
+  timer?: NodeJS.Timeout;
+};
+
+// Timeout por tarefa do servidor Python quando a requisição não informa um
+const SERVER_DEFAULT_TIMEOUT_SECONDS = 120;
+
+// Folga além do timeout da tarefa (espera na fila do servidor, envio da
+// resposta) antes de o Node desistir de uma tarefa sem resposta
+const RESPONSE_GRACE_MS = parsePositiveSeconds(process.env.PYTHON_RESPONSE_GRACE_SECONDS, 300) * 1000;
+
+// Respostas começam pelo id (ver servidor_workers._criar_responder)
+const RESPONSE_ID_PATTERN = /^\{"id":\s*(\d+)/;
+
+/**
+ * Instrumentação opcional das tarefas
+ *
+ * PYTHON_METRICS=1 pede o bloco `metricas` em todas as tarefas;
+ * PYTHON_METRICS=cprofile ou tracemalloc inclui também o perfil.
+ */
+export type MetricsOption = boolean | "cprofile" | "tracemalloc";
+
+const DEFAULT_METRICS: MetricsOption = parseMetricsOption(process.env.PYTHON_METRICS);
+
+function parsePositiveSeconds(value: string | undefined, fallback: number): number {
+  const parsed = Number.parseFloat(value ?? "");
+  return Number.isFinite(parsed) && parsed > 0 ? parsed : fallback;
+}
+
+function parseMetricsOption(value: string | undefined): MetricsOption {
+  if (value === "cprofile" || value === "tracemalloc") {
+    return value;
+  }
+  return value === "1" || value === "true";
+}
+
+let workerProcess: ChildProcessWithoutNullStreams | null = null;
+let nextJobId = 1;
+const pendingJobs = new Map<number, PendingJob>();
+
+/**
+ * Remove a tarefa das pendentes e rejeita a promessa
+ */
+function failJob(id: number, error: Error): void {
+  const job = pendingJobs.get(id);
+  if (!job) {
+    return;
+  }
+  clearTimeout(job.timer);
+  pendingJobs.delete(id);
+  job.reject(error);
+}
+
+/**
+ * (Re)inicia o prazo da tarefa; parciais e progresso contam como atividade
+ */
+function armTimeout(id: number, job: PendingJob): void {
+  clearTimeout(job.timer);
+  job.timer = setTimeout(() => {
+    // Libera o worker, se a tarefa ainda estiver no servidor
+    if (job.task !== "cancelar_tarefa") {
+      cancelPythonTask(id).catch(() => undefined);
+    }
+    failJob(id, new Error(`Sem resposta do servidor Python para ${job.task} em ${Math.round(job.timeoutMs / 1000)} s`));
+  }, job.timeoutMs);
+  job.timer.unref();
+}
+
+/**
+ * Inicia (uma vez) o servidor Python e conecta a leitura das respostas
+ */
+function ensureWorkerProcess(): ChildProcessWithoutNullStreams {
+  if (workerProcess) {
+    return workerProcess;
+  }
+
+  const args = [SERVER_SCRIPT];
+  if (process.env.PYTHON_WORKERS) {
+    args.push("--workers", process.env.PYTHON_WORKERS);
+  }
+  if (process.env.PYTHON_CACHE_DIR) {
+    args.push("--cache-dir", process.env.PYTHON_CACHE_DIR);
+  }
+
+  const child = spawn("python3", args);
+  workerProcess = child;
+
+  createInterface({ input: child.stdout }).on("line", (line) => {
+    let message: { id: number; resultado?: any; parcial?: any; progresso?: ProgressEvent };
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      console.error("[PythonWorkers] Resposta inválida:", line.slice(0, 200));
+      const id = RESPONSE_ID_PATTERN.exec(line)?.[1];
+      if (id !== undefined) {
+        failJob(Number(id), new Error("Resposta inválida do servidor Python"));
+      }
+      return;
+    }
+
+    const job = pendingJobs.get(message.id);
+    if (!job) {
+      return;
+    }
+
+    if ("parcial" in message) {
+      armTimeout(message.id, job);
+      job.onPartial?.(message.parcial);
+      return;
+    }
+    if ("progresso" in message) {
+      armTimeout(message.id, job);
+      job.onProgress?.(message.progresso!);
+      return;
+    }
+    clearTimeout(job.timer);
+    pendingJobs.delete(message.id);
+
+    // Uma linha JSON por tarefa instrumentada, para log e gráficos
+    if (message.resultado?.metricas) {
+      console.info(
+        "[PythonWorkers] metricas",
+        JSON.stringify({ id: message.id, ...message.resultado.metricas })
+      );
+    }
+    job.resolve(message.resultado);
+  });
+
+  child.stderr.on("data", (data) => {
+    console.error("[PythonWorkers]", data.toString());
+  });
+
+  child.on("exit", (code) => {
+    workerProcess = null;
+    const error = new Error(`Servidor Python encerrado (código ${code})`);
+    pendingJobs.forEach((job) => {
+      clearTimeout(job.timer);
+      job.reject(error);
+    });
+    pendingJobs.clear();
+  });
+
+  return child;
+}
+
+/**
+ * Envia uma tarefa ao pool persistente de workers Python
+ *
+ * @param task - Nome da tarefa registrada em servidor_workers.py
+ * @param params - Argumentos nomeados da função Python
+ * @param options - Timeout, métricas e callbacks de parciais/progresso
+ * @returns Id da tarefa no servidor (para cancelar) e a promessa do resultado
+ */
+export function submitPythonTask(
+  task: PythonTask,
+  params: Record<string, unknown>,
+  options: TaskOptions = {}
+): { id: number; result: Promise<any> } {
+  const child = ensureWorkerProcess();
+  const id = nextJobId++;
+  const metrics = options.metrics ?? DEFAULT_METRICS;
+
+  const result = new Promise<any>((resolve, reject) => {
+    const job: PendingJob = {
+      task,
+      resolve,
+      reject,
+      onPartial: options.onPartial,
+      onProgress: options.onProgress,
+      timeoutMs: (options.timeoutSeconds ?? SERVER_DEFAULT_TIMEOUT_SECONDS) * 1000 + RESPONSE_GRACE_MS,
+    };
+    pendingJobs.set(id, job);
+    armTimeout(id, job);
+
+    const line =
+      JSON.stringify({
+        id,
+        tarefa: task,
+        parametros: params,
+        timeout: options.timeoutSeconds,
+        metricas: metrics !== false || undefined,
+        perfil: typeof metrics === "string" ? metrics : undefined,
+        progresso: options.onProgress ? true : undefined,
+      }) + "\n";
+
+    // Com a fila do servidor cheia o pipe deixa de ser lido e o Node
+    // apenas acumula as linhas no buffer de escrita
+    child.stdin.write(line);
+  });
+
+  return { id, result };
+}
+
+/**
+ * Executa uma tarefa no pool persistente de workers Python
+ *
+ * @param task - Nome da tarefa registrada em servidor_workers.py
+ * @param params - Argumentos nomeados da função Python
+ * @param timeoutSeconds - Tempo limite da tarefa (padrão do servidor se omitido)
+ * @param metrics - Pede o bloco `metricas` (true) e, opcionalmente, um perfil
+ * @param onPartial - Recebe cada resposta parcial antes da final
+ * @returns Dict retornado pela função Python
+ */
+export function runPythonTask(
+  task: PythonTask,
+  params: Record<string, unknown>,
+  timeoutSeconds?: number,
+  metrics: MetricsOption = DEFAULT_METRICS,
+  onPartial?: (partial: any) => void
+): Promise<any> {
+  return submitPythonTask(task, params, { timeoutSeconds, metrics, onPartial }).result;
+}
+
+/**
+ * Cancela uma tarefa enviada com submitPythonTask
+ *
+ * Na fila, a tarefa é descartada; em execução, o worker é substituído.
+ * A promessa da tarefa resolve com `{ sucesso: false, cancelada: true }`.
+ *
+ * @param id - Id devolvido por submitPythonTask
+ * @returns true se a tarefa ainda estava na fila ou em execução
+ */
+export async function cancelPythonTask(id: number): Promise<boolean> {
+  const { result } = submitPythonTask("cancelar_tarefa", { id }, { metrics: false });
+  const response = await result;
+  return Boolean(response?.encontrada);
+}
@@ -6,10 +6,16 @@
 
 import { publicProcedure, router } from "../_core/trpc";
 import { z } from "zod";
-import { spawn } from "child_process";
 import { readFile } from "fs/promises";
 import path from "path";
 import { fileURLToPath } from "url";
+import { runPythonTask } from "../pythonWorkerPool";
+import {
+  cancelJob,
+  getJobResult,
+  getJobStatus,
+  submitJob,
+} from "../pythonJobs";
 
 // Corrige __dirname para ESM
 const __filename = fileURLToPath(import.meta.url);
@@ -31,78 +37,308 @@ const GenerateTestCaseSchema = z.object({
 
 type GenerateTestCaseInput = z.infer<typeof GenerateTestCaseSchema>;
 
+/**
+ * Schema de validação para geração de corpus de casos de teste
+ */
+const GenerateTestCorpusSchema = z.object({
+  // Estágios incluídos (padrão: todos)
+  stages: z.array(z.number().int().min(1).max(5)).optional(),
+
+  // Severidades incluídas (padrão: todas)
+  severities: z.array(z.enum(["leve", "moderado", "grave"])).optional(),
+
+  // Casos por combinação estágio x severidade
+  repeats: z.number().int().min(1).max(1000),
+
+  // Número de dias de cada caso
+  days: z.number().int().min(1).max(365),
+
+  // Semente do corpus (reprodutibilidade)
+  seed: z.number().int().min(0).default(0),
+});
+
+type GenerateTestCorpusInput = z.infer<typeof GenerateTestCorpusSchema>;
+
+/**
+ * Raiz de todos os arquivos que os jobs leem ou gravam
+ *
+ * Os parâmetros de job nunca trazem caminhos: curvas, checkpoints e
+ * planilhas de portfólio são referenciados por id/nome e resolvidos aqui.
+ */
+const UPLOADS_DIR = path.join(__dirname, "../../uploads");
+
+const STRATEGIES = ["solar", "grid-offpeak", "otimo"] as const;
+
+// Curva colunar gravada no upload (uploads/curvas/<digest>.bcurva)
+const CurveIdSchema = z.string().regex(/^[0-9a-f]{64}$/);
+
+// Nome de checkpoint incremental (uploads/checkpoints/<nome>.ckpt.npz)
+const CheckpointNameSchema = z.string().regex(/^[A-Za-z0-9_-]{1,64}$/);
+
+// Planilha enviada para uploads/ (só o nome, sem diretório)
+const UploadFileNameSchema = z.string().regex(/^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}\.(xlsx|xls|csv)$/);
+
+const amount = z.number().nonnegative();
+const efficiency = z.number().gt(0).max(1);
+const fraction = z.number().min(0).max(1);
+
+/**
+ * Premissas financeiras (ver projecao_financeira.PREMISSAS_PADRAO)
+ */
+const FinancialAssumptionsSchema = z
+  .object({
+    anos_analise: z.number().int().min(1).max(50),
+    taxa_desconto: z.number().min(0).max(1),
+    reajuste_tarifa_anual: z.number().min(-1).max(1),
+    custo_om_anual_percent: z.number().min(0).max(100),
+    reajuste_om_anual: z.number().min(-1).max(1),
+    perda_capacidade_anual: fraction,
+    custo_reposicao_percent: z.number().min(0).max(200).nullable(),
+    variacao_custo_reposicao_anual: z.number().min(-1).max(1),
+    capacidade_fim_vida: fraction,
+    vida_util_anos: z.number().int().min(1).max(50).nullable(),
+  })
+  .partial()
+  .strict();
+
+/**
+ * Parâmetros do modelo de degradação (ver degradacao_bess.ContadorRainflow)
+ */
+const DegradationModelSchema = z
+  .object({
+    ciclos_vida_100_dod: z.number().positive(),
+    expoente_dod: z.number().positive(),
+    perda_fim_vida: z.number().gt(0).max(1),
+  })
+  .partial()
+  .strict();
+
+/**
+ * Curva de carga: listas no corpo ou `curva_id` de um upload
+ */
+const curveFields = {
+  potencias_kw: z.array(z.number()).min(1).optional(),
+  timestamps: z.array(z.string()).min(1).optional(),
+  curva_id: CurveIdSchema.optional(),
+  feriados: z.array(z.string().regex(/^\d{4}-\d{2}-\d{2}$/)).optional(),
+};
+
+const tariffFields = {
+  tarifa_ponta: amount,
+  tarifa_intermediaria: amount,
+  tarifa_fora_ponta: amount,
+  cobranca_demanda: amount.optional(),
+};
+
+function hasSingleCurve(params: { potencias_kw?: unknown; timestamps?: unknown; curva_id?: unknown }): boolean {
+  const hasAnyList = params.potencias_kw !== undefined || params.timestamps !== undefined;
+  const hasBothLists = params.potencias_kw !== undefined && params.timestamps !== undefined;
+  return params.curva_id !== undefined ? !hasAnyList : hasBothLists;
+}
+
+const singleCurve = {
+  message: "Informe potencias_kw e timestamps ou curva_id",
+};
+
+const SimulateJobParamsSchema = z
+  .object({
+    ...curveFields,
+    ...tariffFields,
+    capacidade_bess_kwh: z.number().positive(),
+    potencia_bess_kw: z.number().positive(),
+    estrategia_carregamento: z.enum(STRATEGIES),
+    multa_ultrapassagem: amount.optional(),
+    checkpoint: CheckpointNameSchema.optional(),
+    detalhe: z.enum(["resumo", "completo"]).optional(),
+    eficiencia_carga: efficiency.optional(),
+    eficiencia_descarga: efficiency.optional(),
+    modelo_degradacao: DegradationModelSchema.optional(),
+    custo_investimento_reais: amount.optional(),
+    premissas_financeiras: FinancialAssumptionsSchema.optional(),
+  })
+  .strict()
+  .refine(hasSingleCurve, singleCurve);
+
+const SweepJobParamsSchema = z
+  .object({
+    ...curveFields,
+    ...tariffFields,
+    capacidades_kwh: z.array(z.number().positive()).min(1).max(1000),
+    potencias_bess_kw: z.array(z.number().positive()).min(1).max(1000),
+    estrategias: z.array(z.enum(STRATEGIES)).min(1),
+    custo_kwh_reais: amount.optional(),
+    custo_kw_reais: amount.optional(),
+    eficiencia_carga: efficiency.optional(),
+    eficiencia_descarga: efficiency.optional(),
+    premissas_financeiras: FinancialAssumptionsSchema.optional(),
+  })
+  .strict()
+  .refine(hasSingleCurve, singleCurve);
+
+const DimensionJobParamsSchema = z
+  .object({
+    ...curveFields,
+    tarifa_ponta: amount,
+    tarifa_intermediaria: amount.optional(),
+    tarifa_fora_ponta: amount,
+    cobranca_demanda: amount,
+    estrategia_carregamento: z.enum(STRATEGIES).optional(),
+    reducao_demanda_percent: z.number().min(0).max(100).optional(),
+    custo_investimento_reais: amount.optional(),
+    objetivo: z.enum(["vpl", "payback"]).optional(),
+    custo_kwh_reais: amount.optional(),
+    custo_kw_reais: amount.optional(),
+    perda_capacidade_anual: fraction.optional(),
+    premissas_financeiras: FinancialAssumptionsSchema.optional(),
+  })
+  .strict()
+  .refine(hasSingleCurve, singleCurve);
+
+const MonteCarloJobParamsSchema = z
+  .object({
+    ...curveFields,
+    ...tariffFields,
+    capacidade_bess_kwh: z.number().positive(),
+    potencia_bess_kw: z.number().positive(),
+    estrategia_carregamento: z.enum(STRATEGIES),
+    cenarios: z.number().int().min(1).max(100000).optional(),
+    severidade: z.enum(["leve", "moderado", "grave"]).optional(),
+    semente: z.number().int().min(0).optional(),
+    demanda_referencia_kw: z.number().positive().optional(),
+    custo_investimento_reais: amount.optional(),
+    custo_kwh_reais: amount.optional(),
+    custo_kw_reais: amount.optional(),
+    incluir_cenarios: z.boolean().optional(),
+    premissas_financeiras: FinancialAssumptionsSchema.optional(),
+  })
+  .strict()
+  .refine(hasSingleCurve, singleCurve);
+
+const PortfolioJobParamsSchema = z
+  .object({
+    ...tariffFields,
+    arquivos: z.array(UploadFileNameSchema).min(1).max(500),
+    estrategia_carregamento: z.enum(STRATEGIES).optional(),
+    reducao_demanda_percent: z.number().min(0).max(100).optional(),
+    objetivo: z.enum(["vpl", "payback"]).optional(),
+    custo_kwh_reais: amount.optional(),
+    custo_kw_reais: amount.optional(),
+    feriados: curveFields.feriados,
+    premissas_financeiras: FinancialAssumptionsSchema.optional(),
+  })
+  .strict();
+
+const jobTimeout = z.number().positive().max(3600).optional();
+
+/**
+ * Schema de validação de submitJob: parâmetros permitidos por tarefa
+ */
+const SubmitJobSchema = z.discriminatedUnion("task", [
+  z.object({ task: z.literal("simular_bess"), params: SimulateJobParamsSchema, timeoutSeconds: jobTimeout }),
+  z.object({ task: z.literal("varrer_bess"), params: SweepJobParamsSchema, timeoutSeconds: jobTimeout }),
+  z.object({ task: z.literal("dimensionar_bess"), params: DimensionJobParamsSchema, timeoutSeconds: jobTimeout }),
+  z.object({ task: z.literal("monte_carlo_bess"), params: MonteCarloJobParamsSchema, timeoutSeconds: jobTimeout }),
+  z.object({ task: z.literal("analisar_portfolio"), params: PortfolioJobParamsSchema, timeoutSeconds: jobTimeout }),
+]);
+
+type SubmitJobInput = z.infer<typeof SubmitJobSchema>;
+
+/**
+ * Converte os parâmetros validados nos argumentos da função Python
+ *
+ * Todos os caminhos são montados aqui, dentro de UPLOADS_DIR.
+ *
+ * @param input - Tarefa e parâmetros validados por SubmitJobSchema
+ * @returns Argumentos nomeados da função Python
+ */
+function resolveJobParams(input: SubmitJobInput): Record<string, unknown> {
+  if (input.task === "analisar_portfolio") {
+    const { arquivos, ...params } = input.params;
+    return {
+      ...params,
+      arquivos: arquivos.map((nome) => path.join(UPLOADS_DIR, nome)),
+      diretorio: path.join(UPLOADS_DIR, `portfolio_${Date.now()}`),
+    };
+  }
+
+  const { curva_id, ...params }: Record<string, unknown> & { curva_id?: string } = { ...input.params };
+  if (curva_id !== undefined) {
+    params.arquivo_curva = path.join(UPLOADS_DIR, "curvas", `${curva_id}.bcurva`);
+  }
+  if (typeof params.checkpoint === "string") {
+    params.caminho_checkpoint = path.join(UPLOADS_DIR, "checkpoints", `${params.checkpoint}.ckpt.npz`);
+  }
+  delete params.checkpoint;
+  return params;
+}
+
 /**
  * Executa o gerador Python de casos de teste
  * 
+ * Usa o pool persistente de workers Python em vez de iniciar um
+ * processo por requisição.
+ * 
  * @param params - Parâmetros de entrada
  * @returns Resultado da geração
  */
 async function executeTestCaseGenerator(
   params: GenerateTestCaseInput
 ): Promise<any> {
-  return new Promise((resolve, reject) => {
-    // Caminho do script Python
-    const scriptPath = path.join(
-      __dirname,
-      "../python-workers/gerador_casos_teste.py"
-    );
-
-    // Caminho de saída do arquivo
-    const outputPath = path.join(
-      __dirname,
-      `../../uploads/caso_teste_${Date.now()}.xlsx`
-    );
-
-    // Argumentos para o script Python
-    const args = [
-      scriptPath,
-      "--stage",
-      params.stage.toString(),
-      "--severity",
-      params.severity,
-      "--days",
-      params.days.toString(),
-      "--output",
-      outputPath,
-    ];
-
-    // Executar script Python
-    const process = spawn("python3", args);
-
-    let stdout = "";
-    let stderr = "";
-
-    // Capturar saída padrão
-    process.stdout.on("data", (data) => {
-      stdout += data.toString();
-    });
-
-    // Capturar erros
-    process.stderr.on("data", (data) => {
-      stderr += data.toString();
-    });
-
-    // Quando o processo termina
-    process.on("close", (code) => {
-      if (code !== 0) {
-        reject(new Error(`Erro ao gerar caso de teste: ${stderr}`));
-        return;
-      }
+  // Caminho de saída do arquivo
+  const outputPath = path.join(
+    __dirname,
+    `../../uploads/caso_teste_${Date.now()}.xlsx`
+  );
 
-      try {
-        // Parse do resultado JSON
-        const result = JSON.parse(stdout);
-        resolve(result);
-      } catch (error) {
-        reject(new Error(`Erro ao parsear resultado: ${error}`));
-      }
-    });
-
-    // Erro ao iniciar o processo
-    process.on("error", (error) => {
-      reject(error);
-    });
+  const result = await runPythonTask("gerar_caso_teste", {
+    stage: params.stage,
+    severidade: params.severity,
+    dias: params.days,
+    caminho_saida: outputPath,
   });
+
+  if (!result || result.sucesso === false) {
+    throw new Error(`Erro ao gerar caso de teste: ${result?.erro}`);
+  }
+
+  return result;
+}
+
+/**
+ * Gera um corpus de casos de teste em uma única tarefa
+ *
+ * O servidor Python distribui os casos entre os workers e grava um
+ * manifesto com os metadados de todos eles.
+ *
+ * @param params - Parâmetros de entrada
+ * @returns Caminho do manifesto e contagem de casos
+ */
+async function executeTestCorpusGenerator(
+  params: GenerateTestCorpusInput
+): Promise<any> {
+  const outputDir = path.join(
+    __dirname,
+    `../../uploads/corpus_${Date.now()}`
+  );
+
+  const result = await runPythonTask(
+    "gerar_corpus",
+    {
+      diretorio: outputDir,
+      stages: params.stages,
+      severidades: params.severities,
+      repeticoes: params.repeats,
+      dias: params.days,
+      semente: params.seed,
+    },
+    600
+  );
+
+  if (!result || result.sucesso === false) {
+    throw new Error(`Erro ao gerar corpus: ${result?.erro}`);
+  }
+
+  return result;
 }
 
 /**
@@ -143,6 +379,171 @@ export const bessRouter = router({
       }
     }),
 
+  /**
+   * Gera um corpus de casos de teste (estágios x severidades x repetições)
+   *
+   * Cada caso tem semente derivada da semente do corpus; os metadados de
+   * todos os casos ficam em um único manifesto.
+   *
+   * @param stages - Estágios incluídos (padrão: todos)
+   * @param severities - Severidades incluídas (padrão: todas)
+   * @param repeats - Casos por combinação
+   * @param days - Número de dias de cada caso
+   * @param seed - Semente do corpus
+   *
+   * @returns Caminho do manifesto e contagem de casos gerados
+   */
+  generateTestCorpus: publicProcedure
+    .input(GenerateTestCorpusSchema)
+    .mutation(async ({ input }) => {
+      try {
+        const result = await executeTestCorpusGenerator(input);
+
+        return {
+          sucesso: true,
+          dados: result,
+        };
+      } catch (erro) {
+        console.error("[BESS] Erro ao gerar corpus de teste:", erro);
+
+        return {
+          sucesso: false,
+          erro: erro instanceof Error ? erro.message : "Erro desconhecido",
+        };
+      }
+    }),
+
+  /**
+   * Obtém potências e SoC por passo de uma simulação, por intervalo de datas
+   *
+   * A simulação devolve só valores agregados por dia e um descritor
+   * `series`; as séries ficam no servidor Python e são lidas sob demanda.
+   * Cada série vem como float32 little-endian em base64, com a forma
+   * (dias x passos) em `formas`.
+   *
+   * @param seriesId - `series.id` do resultado da simulação
+   * @param start - Primeiro dia (ISO, opcional)
+   * @param end - Último dia (ISO, opcional)
+   * @param maxDays - Máximo de dias por página
+   *
+   * @returns Datas, formas das matrizes, séries e `proxima_data` da próxima página
+   */
+  getSimulationSeries: publicProcedure
+    .input(
+      z.object({
+        seriesId: z.string().regex(/^[0-9a-f]{32}$/),
+        start: z.string().optional(),
+        end: z.string().optional(),
+        maxDays: z.number().int().min(1).max(366).default(31),
+      })
+    )
+    .query(async ({ input }) => {
+      try {
+        const result = await runPythonTask("obter_series_simulacao", {
+          id_series: input.seriesId,
+          data_inicio: input.start,
+          data_fim: input.end,
+          max_dias: input.maxDays,
+        });
+
+        if (!result || result.sucesso === false) {
+          throw new Error(result?.erro || "Erro ao obter séries");
+        }
+
+        return {
+          sucesso: true,
+          dados: result,
+        };
+      } catch (erro) {
+        console.error("[BESS] Erro ao obter séries da simulação:", erro);
+
+        return {
+          sucesso: false,
+          erro: erro instanceof Error ? erro.message : "Erro desconhecido",
+        };
+      }
+    }),
+
+  /**
+   * Submete uma tarefa longa como job assíncrono
+   *
+   * Retorna na hora com o id do job; o andamento é acompanhado por
+   * `getJobStatus` ou pelos eventos em `/api/jobs/:id/events`, e o
+   * resultado é lido com `getJobResult`.
+   *
+   * @param task - Tarefa Python (simular_bess, varrer_bess, dimensionar_bess,
+   *   monte_carlo_bess ou analisar_portfolio)
+   * @param params - Parâmetros numéricos/enum da tarefa (ver SubmitJobSchema);
+   *   a curva vem como listas ou `curva_id`, o portfólio como nomes de
+   *   arquivos em uploads/, e o checkpoint como nome
+   * @param timeoutSeconds - Tempo limite da execução
+   *
+   * @returns Estado inicial do job (id, posição na fila)
+   */
+  submitJob: publicProcedure
+    .input(SubmitJobSchema)
+    .mutation(async ({ input }) => {
+      try {
+        return {
+          sucesso: true,
+          dados: submitJob(input.task, resolveJobParams(input), input.timeoutSeconds),
+        };
+      } catch (erro) {
+        return {
+          sucesso: false,
+          erro: erro instanceof Error ? erro.message : "Erro desconhecido",
+        };
+      }
+    }),
+
+  /**
+   * Estado de um job: fila, execução ou concluído, com o último progresso
+   * de cada etapa (dias simulados, candidatos avaliados, sites analisados...)
+   *
+   * @param jobId - Id devolvido por submitJob
+   */
+  getJobStatus: publicProcedure
+    .input(z.object({ jobId: z.string().uuid() }))
+    .query(({ input }) => {
+      const status = getJobStatus(input.jobId);
+      return status
+        ? { sucesso: true, dados: status }
+        : { sucesso: false, erro: "Job não encontrado" };
+    }),
+
+  /**
+   * Resultado de um job concluído
+   *
+   * @param jobId - Id devolvido por submitJob
+   */
+  getJobResult: publicProcedure
+    .input(z.object({ jobId: z.string().uuid() }))
+    .query(({ input }) => {
+      const job = getJobResult(input.jobId);
+      if (!job) {
+        return { sucesso: false, erro: "Job não encontrado ou ainda em execução" };
+      }
+      return { sucesso: job.status.state === "succeeded", dados: job.result, status: job.status };
+    }),
+
+  /**
+   * Cancela um job na fila ou em execução
+   *
+   * @param jobId - Id devolvido por submitJob
+   */
+  cancelJob: publicProcedure
+    .input(z.object({ jobId: z.string().uuid() }))
+    .mutation(async ({ input }) => {
+      try {
+        return { sucesso: await cancelJob(input.jobId) };
+      } catch (erro) {
+        return {
+          sucesso: false,
+          erro: erro instanceof Error ? erro.message : "Erro desconhecido",
+        };
+      }
+    }),
+
   /**
    * Lista todos os uploads realizados
    * 
@@ -177,7 +578,7 @@ export const bessRouter = router({
    * @param tariffConfigId - ID da configuração tarifária
    * @param bessCapacityKwh - Capacidade do BESS em kWh
    * @param bessPowerKw - Potência do BESS em kW
-   * @param chargingStrategy - Estratégia de carregamento (solar ou grid-offpeak)
+   * @param chargingStrategy - Estratégia de carregamento (solar, grid-offpeak ou otimo)
    * 
    * @returns Resultados da simulação
    */
@@ -188,7 +589,7 @@ export const bessRouter = router({
         tariffConfigId: z.number(),
         bessCapacityKwh: z.number().positive(),
         bessPowerKw: z.number().positive(),
-        chargingStrategy: z.enum(["solar", "grid-offpeak"]),
+        chargingStrategy: z.enum(["solar", "grid-offpeak", "otimo"]),
       })
     )
     .mutation(async ({ input }) => {